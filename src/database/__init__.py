@@ -20,8 +20,11 @@ __all__ = [
     'FriendshipDAL',
     'GlobalCacheDAL',
     'HistoryDAL',
+    'HistoryWordFrequencyDAL',
+    'ImageHashDAL',
     'PluginDAL',
     'SignInDAL',
+    'SignInSummaryDAL',
     'SocialMediaContentDAL',
     'StatisticDAL',
     'SubscriptionDAL',
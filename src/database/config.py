@@ -124,6 +124,20 @@ class SQLiteDatabaseConfig(DatabaseType):
         )
 
 
+class DatabaseHistoryArchiveConfig(BaseModel):
+    """消息历史记录归档文件配置"""
+    # 归档文件目录, 相对路径为相对于 bot 运行目录
+    database_history_archive_folder: str = 'history_archive'
+    # 查询消息历史记录时是否同时读取时间范围内的归档文件
+    database_history_archive_query_enable: bool = True
+
+    model_config = ConfigDict(extra='ignore')
+
+    @property
+    def archive_folder(self) -> pathlib.Path:
+        return pathlib.Path(os.path.abspath(sys.path[0])).joinpath(self.database_history_archive_folder).resolve()
+
+
 try:
     database_type = get_plugin_config(DatabaseType)  # 导入并验证数据库类型
     match database_type.database:  # 验证数据库配置
@@ -135,6 +149,7 @@ try:
             database_config = get_plugin_config(SQLiteDatabaseConfig)
         case _:
             raise ValueError(f'illegal database type: {database_type.database}')
+    history_archive_config = get_plugin_config(DatabaseHistoryArchiveConfig)
 except (ValidationError, ValueError) as e:
     logger.opt(colors=True).critical(f'<r>数据库配置格式验证失败</r>, 错误信息:\n{e}')
     sys.exit(f'数据库配置格式验证失败, {e}')
@@ -142,4 +157,5 @@ except (ValidationError, ValueError) as e:
 
 __all__ = [
     'database_config',
+    'history_archive_config',
 ]
@@ -15,12 +15,62 @@ from typing import Any
 
 from nonebot import get_driver, logger
 from nonebot.matcher import current_event, current_matcher
+from sqlalchemy import Connection, Index, inspect
+from sqlalchemy.schema import DropIndex
 from sqlalchemy.ext.asyncio import AsyncSession, async_scoped_session
 
 from .connector import async_session_factory, engine
+from .schema import HistoryOrm
 from .schema_base import OmegaDeclarativeBase
 
 
+def _create_missing_indexes(conn: Connection) -> None:
+    """create_all 仅创建不存在的表, 为已存在的表补充之后新增的索引"""
+    for table in OmegaDeclarativeBase.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(conn, checkfirst=True)
+
+
+_SUPERSEDED_INDEXES: dict[str, tuple[tuple[str, ...], tuple[str, ...]]] = {
+    HistoryOrm.__tablename__: (
+        ('bot_self_id', 'event_entity_id', 'user_entity_id', 'message_type'),
+        (f'ix_{HistoryOrm.__tablename__}_event_entity_received_time',
+         f'ix_{HistoryOrm.__tablename__}_user_entity_received_time'),
+    ),
+}
+"""已被联合索引代替的单列索引, 表名 -> (旧单列索引的字段, 代替旧索引的联合索引名称)"""
+
+
+def _drop_superseded_indexes(conn: Connection) -> None:
+    """删除已被联合索引代替的单列索引
+
+    旧版本创建的表仍保留这些单列索引, 多余的索引会拖慢写入, 仅在代替的联合索引均已存在时删除
+    """
+    inspector = inspect(conn)
+    for table in OmegaDeclarativeBase.metadata.sorted_tables:
+        if (superseded := _SUPERSEDED_INDEXES.get(table.name)) is None or not inspector.has_table(table.name):
+            continue
+
+        columns, replacements = superseded
+        exist_indexes = inspector.get_indexes(table.name)
+        if not set(replacements).issubset(x['name'] for x in exist_indexes):
+            continue
+
+        for exist_index in exist_indexes:
+            if (
+                    exist_index['name'] in replacements
+                    or len(exist_index['column_names']) != 1
+                    or exist_index['column_names'][0] not in columns
+            ):
+                continue
+
+            index = Index(exist_index['name'], table.c[exist_index['column_names'][0]])
+            # 仅用于生成 DROP INDEX 语句, 不保留在表结构中
+            table.indexes.discard(index)
+            conn.execute(DropIndex(index))
+            logger.opt(colors=True).info(f'<lc>Database</lc> | 已删除被联合索引代替的索引 {exist_index["name"]}')
+
+
 @get_driver().on_startup
 async def __database_init_models():
     """初始化数据库表结构"""
@@ -35,6 +85,8 @@ async def __database_init_models():
             # where synchronous IO calls will be transparently translated for
             # await.
             await conn.run_sync(OmegaDeclarativeBase.metadata.create_all)
+            await conn.run_sync(_create_missing_indexes)
+            await conn.run_sync(_drop_superseded_indexes)
         logger.opt(colors=True).success('<lc>Database</lc> | <lg>数据库初始化已完成</lg>')
     except Exception as _e:
         import sys
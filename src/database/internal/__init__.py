@@ -16,8 +16,11 @@ from .entity import EntityDAL
 from .friendship import FriendshipDAL
 from .global_cache import GlobalCacheDAL
 from .history import HistoryDAL
+from .history_word_frequency import HistoryWordFrequencyDAL
+from .image_hash import ImageHashDAL
 from .plugin import PluginDAL
 from .sign_in import SignInDAL
+from .sign_in_summary import SignInSummaryDAL
 from .social_media_content import SocialMediaContentDAL
 from .statistic import StatisticDAL
 from .subscription import SubscriptionDAL
@@ -34,8 +37,11 @@ __all__ = [
     'FriendshipDAL',
     'GlobalCacheDAL',
     'HistoryDAL',
+    'HistoryWordFrequencyDAL',
+    'ImageHashDAL',
     'PluginDAL',
     'SignInDAL',
+    'SignInSummaryDAL',
     'SocialMediaContentDAL',
     'StatisticDAL',
     'SubscriptionDAL',
@@ -8,15 +8,49 @@
 @Software       : PyCharm 
 """
 
-from collections.abc import Sequence
+import random
+from collections.abc import Hashable, Sequence
 from datetime import datetime
 from typing import Literal
 
-from sqlalchemy import and_, delete, desc, func, or_, select, update
+from sqlalchemy import ColumnElement, and_, delete, desc, func, insert, not_, or_, select, tuple_, update
 
 from src.compat import parse_obj_as
+from src.utils.cache_utils import TTLCache
 from ..model import BaseDataAccessLayerModel, BaseDataQueryResultModel
-from ..schema import ArtworkCollectionOrm
+from ..schema import ArtworkCollectionOrm, ArtworkTagOrm
+
+
+def _normalize_tag(tag: str) -> str:
+    """规范化标签, 去除首尾空白并转为小写"""
+    return tag.strip().lower()[:255]
+
+
+def _split_index_tags(*fields: str | None) -> set[str]:
+    """将以逗号分隔的标签, 标题及作者名拆分为规范化的索引标签"""
+    return {tag for field in fields if field for x in field.split(',') if (tag := _normalize_tag(x))}
+
+
+_SAMPLE_KEYS_LIMIT: int = 5000
+"""缓存的候选主键数量上限, 满足筛选条件的作品超过该数量时不缓存主键, 改为随机主键区间探测抽样"""
+
+_SAMPLE_KEYS_CACHE: TTLCache[Hashable, list[tuple[str, str]]] = TTLCache(maxsize=16, ttl=600)
+"""随机抽样候选主键缓存, 按筛选条件缓存满足条件的作品主键, 过期后重新查询"""
+
+_OVERSIZED_SAMPLE_KEYS: TTLCache[Hashable, bool] = TTLCache(maxsize=128, ttl=600)
+"""候选主键数量超过上限的筛选条件, 过期前不再尝试查询其候选主键"""
+
+_SAMPLE_ANCHOR_STEP: int = 64
+"""随机主键区间探测的锚点间隔, 每个来源按主键顺序每隔该数量的作品记录一个主键作为锚点"""
+
+_SAMPLE_ANCHORS_CACHE: TTLCache[str, tuple[list[str], int]] = TTLCache(maxsize=32, ttl=3600)
+"""各来源的主键锚点及作品总数缓存, 用于随机主键区间探测时按排名均匀地选取起点, 过期后重新查询
+
+锚点过时只会使起点分布略有偏差, 新增的作品仍可被探测到, 因此缓存时间较长
+"""
+
+_ORIGINS_CACHE: TTLCache[Hashable, list[str]] = TTLCache(maxsize=1, ttl=600)
+"""全部作品来源缓存, 用于匹配全部来源的随机主键区间探测"""
 
 
 class ArtworkCollection(BaseDataQueryResultModel):
@@ -85,6 +119,9 @@ class ArtworkCollectionDAL(BaseDataAccessLayerModel[ArtworkCollectionOrm, Artwor
             rating_min: int = 0,
             rating_max: int = 0,
             acc_mode: bool = False,
+            keyword_match: Literal['all', 'any'] = 'all',
+            exclude_keywords: Sequence[str] | None = None,
+            tag_prefix: bool = False,
             ratio: int | None = None,
             order_mode: Literal['random', 'latest', 'aid', 'aid_desc'] = 'random',
     ) -> list[ArtworkCollection]:
@@ -97,7 +134,10 @@ class ArtworkCollectionDAL(BaseDataAccessLayerModel[ArtworkCollectionOrm, Artwor
         :param classification_max: 分类标签最大值
         :param rating_min: 分级标签最小值
         :param rating_max: 分级标签最大值
-        :param acc_mode: 是否启用精确搜索模式
+        :param acc_mode: 是否启用精确搜索模式, 精确搜索模式下通过标签倒排索引匹配标签/标题/作者名
+        :param keyword_match: 关键词匹配模式, all: 匹配全部关键词, any: 匹配任意关键词
+        :param exclude_keywords: 排除的关键词列表, 通过标签倒排索引匹配, 命中任意一个即排除
+        :param tag_prefix: 通过标签倒排索引匹配时是否按前缀匹配
         :param ratio: 图片长宽, 1: 横图, -1: 纵图, 0: 正方形图
         :param order_mode: 排序模式
         """
@@ -107,23 +147,104 @@ class ArtworkCollectionDAL(BaseDataAccessLayerModel[ArtworkCollectionOrm, Artwor
         if rating_min > rating_max:
             raise ValueError('param: rating_min must be less than rating_max')
 
-        stmt = select(ArtworkCollectionOrm)
+        conditions = self._build_query_conditions(
+            origin=origin,
+            keywords=keywords,
+            classification_min=classification_min,
+            classification_max=classification_max,
+            rating_min=rating_min,
+            rating_max=rating_max,
+            acc_mode=acc_mode,
+            keyword_match=keyword_match,
+            exclude_keywords=exclude_keywords,
+            tag_prefix=tag_prefix,
+            ratio=ratio,
+        )
+
+        # 随机模式下优先从缓存的主键中抽样后再按主键查询
+        if order_mode not in ('aid', 'aid_desc', 'latest'):
+            # 无关键词时同一组筛选条件的候选主键可以复用, 有关键词时条件多变, 缓存无法复用, 直接随机探测主键区间
+            if keywords or exclude_keywords:
+                sample_key = None
+            else:
+                sample_key = (
+                    (origin,) if isinstance(origin, str) else (None if origin is None else tuple(sorted(origin))),
+                    classification_min, classification_max, rating_min, rating_max,
+                    None if ratio is None else (ratio > 0) - (ratio < 0),
+                )
+            return await self._query_random_sample(
+                conditions=conditions,
+                origins=(origin,) if isinstance(origin, str) else origin,
+                num=num,
+                sample_key=sample_key,
+            )
+
+        stmt = select(ArtworkCollectionOrm).where(*conditions)
+
+        # 根据 order_mode 构造排序语句
+        match order_mode:
+            case 'aid':
+                stmt = stmt.order_by(ArtworkCollectionOrm.aid)
+            case 'aid_desc':
+                stmt = stmt.order_by(desc(ArtworkCollectionOrm.aid))
+            case 'latest':
+                stmt = stmt.order_by(desc(ArtworkCollectionOrm.created_at))
+
+        # 结果数量限制
+        if num is None:
+            pass
+        else:
+            stmt = stmt.limit(num)
+
+        session_result = await self.db_session.execute(stmt)
+        return parse_obj_as(list[ArtworkCollection], session_result.scalars().all())
+
+    @staticmethod
+    def _build_tag_condition(tags: Sequence[str], *, prefix: bool = False) -> ColumnElement[bool]:
+        """构造通过标签倒排索引匹配任意一个标签的查询条件"""
+        normalized_tags = [x for x in (_normalize_tag(tag) for tag in tags) if x]
+        if prefix:
+            tag_condition = or_(*(ArtworkTagOrm.tag.startswith(x, autoescape=True) for x in normalized_tags))
+        else:
+            tag_condition = ArtworkTagOrm.tag.in_(normalized_tags)
+
+        postings = select(ArtworkTagOrm.origin, ArtworkTagOrm.aid).where(tag_condition)
+        return tuple_(ArtworkCollectionOrm.origin, ArtworkCollectionOrm.aid).in_(postings)
+
+    @classmethod
+    def _build_query_conditions(
+            cls,
+            origin: str | Sequence[str] | None,
+            keywords: Sequence[str] | None,
+            *,
+            classification_min: int,
+            classification_max: int,
+            rating_min: int,
+            rating_max: int,
+            acc_mode: bool,
+            keyword_match: Literal['all', 'any'],
+            exclude_keywords: Sequence[str] | None,
+            tag_prefix: bool,
+            ratio: int | None,
+    ) -> list[ColumnElement[bool]]:
+        """构造搜索图库收录作品的筛选条件"""
+        conditions: list[ColumnElement[bool]] = []
 
         if origin is None:
             # 匹配所有来源
             pass
         elif isinstance(origin, str):
             # 匹配单一来源
-            stmt = stmt.where(ArtworkCollectionOrm.origin == origin)
+            conditions.append(ArtworkCollectionOrm.origin == origin)
         else:
             # 匹配任意来源
-            stmt = stmt.where(or_(*(ArtworkCollectionOrm.origin == x for x in origin)))
+            conditions.append(or_(*(ArtworkCollectionOrm.origin == x for x in origin)))
 
         # classification 条件
-        stmt = stmt.where(and_(ArtworkCollectionOrm.classification >= classification_min,
+        conditions.append(and_(ArtworkCollectionOrm.classification >= classification_min,
                                ArtworkCollectionOrm.classification <= classification_max))
         # rating 条件
-        stmt = stmt.where(and_(ArtworkCollectionOrm.rating >= rating_min,
+        conditions.append(and_(ArtworkCollectionOrm.rating >= rating_min,
                                ArtworkCollectionOrm.rating <= rating_max))
 
         # 根据 acc_mode 构造关键词查询语句
@@ -131,51 +252,281 @@ class ArtworkCollectionDAL(BaseDataAccessLayerModel[ArtworkCollectionOrm, Artwor
             # 无关键词则随机
             pass
         elif acc_mode:
-            # 精确搜索标题, 用户, tag
-            for keyword in keywords:
-                stmt = stmt.where(or_(
-                    func.find_in_set(keyword, ArtworkCollectionOrm.title),
-                    func.find_in_set(keyword, ArtworkCollectionOrm.uname),
-                    func.find_in_set(keyword, ArtworkCollectionOrm.tags)
-                ))
+            # 精确搜索标题, 用户, tag, 通过倒排索引求各关键词对应作品的交集/并集
+            if keyword_match == 'any':
+                conditions.append(cls._build_tag_condition(keywords, prefix=tag_prefix))
+            else:
+                conditions.extend(cls._build_tag_condition([keyword], prefix=tag_prefix) for keyword in keywords)
         else:
             # 模糊搜索标题, 用户, tag
-            for keyword in keywords:
-                stmt = stmt.where(or_(
+            keyword_conditions = [
+                or_(
                     ArtworkCollectionOrm.title.ilike(f'%{keyword}%'),
                     ArtworkCollectionOrm.uname.ilike(f'%{keyword}%'),
                     ArtworkCollectionOrm.tags.ilike(f'%{keyword}%')
-                ))
+                )
+                for keyword in keywords
+            ]
+            if keyword_match == 'any':
+                conditions.append(or_(*keyword_conditions))
+            else:
+                conditions.extend(keyword_conditions)
+
+        # 排除关键词
+        if exclude_keywords:
+            conditions.append(not_(cls._build_tag_condition(exclude_keywords, prefix=tag_prefix)))
 
         # 根据 ratio 构造图片长宽类型查询语句
         if ratio is None:
             pass
         elif ratio < 0:
-            stmt = stmt.where(ArtworkCollectionOrm.width <= ArtworkCollectionOrm.height)
+            conditions.append(ArtworkCollectionOrm.width <= ArtworkCollectionOrm.height)
         elif ratio > 0:
-            stmt = stmt.where(ArtworkCollectionOrm.width >= ArtworkCollectionOrm.height)
+            conditions.append(ArtworkCollectionOrm.width >= ArtworkCollectionOrm.height)
         else:
-            stmt = stmt.where(ArtworkCollectionOrm.width == ArtworkCollectionOrm.height)
+            conditions.append(ArtworkCollectionOrm.width == ArtworkCollectionOrm.height)
 
-        # 根据 order_mode 构造排序语句
-        match order_mode:
-            case 'aid':
-                stmt = stmt.order_by(ArtworkCollectionOrm.aid)
-            case 'aid_desc':
-                stmt = stmt.order_by(desc(ArtworkCollectionOrm.aid))
-            case 'latest':
-                stmt = stmt.order_by(desc(ArtworkCollectionOrm.created_at))
-            case 'random' | _:
-                stmt = stmt.order_by(func.random())
+        return conditions
 
-        # 结果数量限制
-        if num is None:
-            pass
-        else:
-            stmt = stmt.limit(num)
+    async def _query_sample_keys(
+            self,
+            conditions: Sequence[ColumnElement[bool]],
+            sample_key: Hashable,
+            *,
+            refresh: bool = False,
+    ) -> list[tuple[str, str]] | None:
+        """查询满足筛选条件的全部作品主键 (origin, aid), 仅扫描而不排序
+
+        :param conditions: 筛选条件
+        :param sample_key: 候选主键缓存键
+        :param refresh: 是否忽略已缓存的候选主键
+        :return: 候选主键, 数量超过缓存上限时返回 None
+        """
+        if not refresh:
+            if (cached_keys := _SAMPLE_KEYS_CACHE.get(sample_key)) is not None:
+                return cached_keys
+            if sample_key in _OVERSIZED_SAMPLE_KEYS:
+                return None
+
+        # 先在数据库中计数 (至多扫描到上限), 超过上限时不读取主键
+        limited_stmt = select(ArtworkCollectionOrm.origin).where(*conditions).limit(_SAMPLE_KEYS_LIMIT + 1)
+        count_stmt = select(func.count()).select_from(limited_stmt.subquery())
+        if (await self.db_session.execute(count_stmt)).scalar_one() > _SAMPLE_KEYS_LIMIT:
+            _SAMPLE_KEYS_CACHE.pop(sample_key)
+            _OVERSIZED_SAMPLE_KEYS.set(sample_key, True)
+            return None
+
+        stmt = select(ArtworkCollectionOrm.origin, ArtworkCollectionOrm.aid).where(*conditions)
+        session_result = await self.db_session.execute(stmt)
+        keys = [(origin, aid) for origin, aid in session_result.all()]
 
+        _SAMPLE_KEYS_CACHE.set(sample_key, keys)
+        return keys
+
+    async def _query_shuffled(
+            self,
+            conditions: Sequence[ColumnElement[bool]],
+    ) -> list[ArtworkCollection]:
+        """查询满足筛选条件的全部作品, 以随机顺序返回"""
+        stmt = select(ArtworkCollectionOrm).where(*conditions)
         session_result = await self.db_session.execute(stmt)
-        return parse_obj_as(list[ArtworkCollection], session_result.scalars().all())
+        artworks = list(session_result.scalars().all())
+        random.shuffle(artworks)
+        return parse_obj_as(list[ArtworkCollection], artworks)
+
+    async def _query_origins(self, origins: Sequence[str] | None) -> list[str]:
+        """查询 (或从缓存读取) 全部作品来源, 指定来源时直接返回"""
+        if origins is not None:
+            return list(origins)
+
+        if (cached_origins := _ORIGINS_CACHE.get(None)) is not None:
+            return cached_origins
+
+        stmt = select(ArtworkCollectionOrm.origin).distinct()
+        session_result = await self.db_session.execute(stmt)
+        all_origins = list(session_result.scalars().all())
+
+        _ORIGINS_CACHE.set(None, all_origins)
+        return all_origins
+
+    async def _query_sample_anchors(self, origin: str) -> tuple[list[str], int]:
+        """查询 (或从缓存读取) 来源的主键锚点及作品总数, 不应用其他筛选条件
+
+        按主键顺序每隔 _SAMPLE_ANCHOR_STEP 个作品取一个主键, 在数据库中编号及筛选, 仅读取锚点主键
+
+        :param origin: 作品来源
+        :return: 主键锚点, 作品总数
+        """
+        if (cached_anchors := _SAMPLE_ANCHORS_CACHE.get(origin)) is not None:
+            return cached_anchors
+
+        count_stmt = select(func.count()).select_from(ArtworkCollectionOrm).where(ArtworkCollectionOrm.origin == origin)
+        total = (await self.db_session.execute(count_stmt)).scalar_one()
+
+        ranked = (select(ArtworkCollectionOrm.aid,
+                         (func.row_number().over(order_by=ArtworkCollectionOrm.aid) - 1).label('rank'))
+                  .where(ArtworkCollectionOrm.origin == origin)
+                  .subquery())
+        stmt = select(ranked.c.aid).where(ranked.c.rank % _SAMPLE_ANCHOR_STEP == 0).order_by(ranked.c.aid)
+        session_result = await self.db_session.execute(stmt)
+        anchor_keys = list(session_result.scalars().all())
+        anchors = (anchor_keys, total if anchor_keys else 0)
+
+        _SAMPLE_ANCHORS_CACHE.set(origin, anchors)
+        return anchors
+
+    async def _query_from_random_key(
+            self,
+            conditions: Sequence[ColumnElement[bool]],
+            origin: str,
+            anchors: tuple[list[str], int],
+            limit: int,
+    ) -> list[ArtworkCollectionOrm]:
+        """从来源中随机排名的作品起按主键顺序查询至多 limit 个满足筛选条件的作品, 到达末尾后从头继续
+
+        :param conditions: 筛选条件
+        :param origin: 作品来源
+        :param anchors: 该来源的主键锚点及作品总数
+        :param limit: 数量
+        """
+        anchor_keys, total = anchors
+        rank = random.randrange(total)
+        anchor = anchor_keys[min(rank // _SAMPLE_ANCHOR_STEP, len(anchor_keys) - 1)]
+
+        # 从锚点起沿主键索引跳过不足一个锚点间隔的作品得到起点, 锚点缓存过时导致越过末尾时以锚点作为起点
+        pivot = func.coalesce(
+            select(ArtworkCollectionOrm.aid)
+            .where(ArtworkCollectionOrm.origin == origin, ArtworkCollectionOrm.aid >= anchor)
+            .order_by(ArtworkCollectionOrm.aid)
+            .offset(rank % _SAMPLE_ANCHOR_STEP)
+            .limit(1)
+            .scalar_subquery(),
+            anchor,
+        )
+        stmt = (select(ArtworkCollectionOrm)
+                .where(ArtworkCollectionOrm.origin == origin, *conditions)
+                .order_by(ArtworkCollectionOrm.aid))
+
+        session_result = await self.db_session.execute(
+            stmt.where(ArtworkCollectionOrm.aid >= pivot).limit(limit)
+        )
+        artworks = list(session_result.scalars().all())
+        if len(artworks) < limit:
+            session_result = await self.db_session.execute(
+                stmt.where(ArtworkCollectionOrm.aid < pivot).limit(limit - len(artworks))
+            )
+            artworks.extend(session_result.scalars().all())
+        return artworks
+
+    async def _query_random_range(
+            self,
+            conditions: Sequence[ColumnElement[bool]],
+            origins: Sequence[str] | None,
+            num: int,
+    ) -> list[ArtworkCollection]:
+        """通过随机主键区间探测从满足筛选条件的作品中随机抽取指定数量的作品
+
+        每次按作品总数随机选取一个排名, 经缓存的主键锚点定位到该排名的作品作为起点,
+        沿主键索引取其后第一个满足筛选条件的作品, 扫描的行数约为作品总数与满足条件作品数之比,
+        不会对全部满足条件的作品排序.
+        作品被抽中的概率与其前方连续不满足条件的作品数量相关, 筛选条件与主键顺序无关时近似均匀.
+        满足条件的作品较少时探测结果容易重复, 此时从随机起点按主键顺序连续查询补足数量.
+
+        :param conditions: 筛选条件
+        :param origins: 作品来源, 为空则匹配全部来源
+        :param num: 数量
+        """
+        origin_anchors: dict[str, tuple[list[str], int]] = {}
+        for origin in await self._query_origins(origins=origins):
+            if (anchors := await self._query_sample_anchors(origin=origin))[1] > 0:
+                origin_anchors[origin] = anchors
+
+        artworks: dict[tuple[str, str], ArtworkCollectionOrm] = {}
+        for _ in range(num):
+            if not origin_anchors:
+                break
+
+            # 按各来源作品总数加权选择来源
+            origin = random.choices(list(origin_anchors), weights=[x[1] for x in origin_anchors.values()])[0]
+            probed = await self._query_from_random_key(conditions, origin, origin_anchors[origin], limit=1)
+            if not probed:
+                # 起点前后均未找到, 该来源没有满足条件的作品
+                origin_anchors.pop(origin)
+                continue
+            artworks.setdefault((probed[0].origin, probed[0].aid), probed[0])
+
+        for origin in random.sample(list(origin_anchors), len(origin_anchors)):
+            if len(artworks) >= num:
+                break
+            for artwork in await self._query_from_random_key(conditions, origin, origin_anchors[origin], limit=num):
+                artworks.setdefault((artwork.origin, artwork.aid), artwork)
+
+        sampled_artworks = random.sample(list(artworks.values()), min(num, len(artworks)))
+        return parse_obj_as(list[ArtworkCollection], sampled_artworks)
+
+    async def _query_random_sample(
+            self,
+            conditions: Sequence[ColumnElement[bool]],
+            origins: Sequence[str] | None,
+            num: int | None,
+            sample_key: Hashable | None,
+    ) -> list[ArtworkCollection]:
+        """从满足筛选条件的作品中随机抽取指定数量的作品
+
+        对可缓存的筛选条件, 先查询 (或从缓存读取) 满足条件的主键, 在本地随机抽样后再按主键批量查询作品,
+        查询作品时会再次应用筛选条件, 因此缓存中已失效的主键会被自动排除.
+        不可缓存或候选主键数量超过上限时使用随机主键区间探测抽样, 避免读取或排序全部满足条件的作品
+
+        :param conditions: 筛选条件
+        :param origins: 作品来源, 为空则匹配全部来源
+        :param num: 数量, 为空则返回全部作品 (随机顺序)
+        :param sample_key: 候选主键缓存键, 为空则不使用缓存
+        """
+        if num is None:
+            return await self._query_shuffled(conditions=conditions)
+
+        if sample_key is None:
+            return await self._query_random_range(conditions=conditions, origins=origins, num=num)
+
+        if (keys := await self._query_sample_keys(conditions=conditions, sample_key=sample_key)) is None:
+            return await self._query_random_range(conditions=conditions, origins=origins, num=num)
+
+        sampled_keys = random.sample(keys, min(num, len(keys)))
+        artworks = await self._query_by_keys(conditions=conditions, keys=sampled_keys)
+
+        # 缓存的候选主键已过时 (作品被删除或修改) 导致数量不足时, 刷新缓存后重新抽样
+        if len(artworks) < len(sampled_keys):
+            keys = await self._query_sample_keys(conditions=conditions, sample_key=sample_key, refresh=True)
+            if keys is None:
+                return await self._query_random_range(conditions=conditions, origins=origins, num=num)
+
+            sampled_keys = random.sample(keys, min(num, len(keys)))
+            artworks = await self._query_by_keys(conditions=conditions, keys=sampled_keys)
+
+        return artworks
+
+    async def _query_by_keys(
+            self,
+            conditions: Sequence[ColumnElement[bool]],
+            keys: Sequence[tuple[str, str]],
+    ) -> list[ArtworkCollection]:
+        """按主键批量查询满足筛选条件的作品, 结果顺序与 keys 一致
+
+        筛选条件作为查询列返回而不放在 WHERE 子句中, 避免优化器放弃主键索引转而使用筛选条件列的索引进行扫描
+        """
+        is_matched = and_(*conditions).label('is_matched')
+        artworks: dict[tuple[str, str], ArtworkCollectionOrm] = {}
+        for index in range(0, len(keys), 500):
+            grouped_aids: dict[str, list[str]] = {}
+            for origin, aid in keys[index:index + 500]:
+                grouped_aids.setdefault(origin, []).append(aid)
+
+            stmt = (select(ArtworkCollectionOrm, is_matched)
+                    .where(or_(*(and_(ArtworkCollectionOrm.origin == origin, ArtworkCollectionOrm.aid.in_(aids))
+                                 for origin, aids in grouped_aids.items()))))
+            session_result = await self.db_session.execute(stmt)
+            artworks.update(((x.origin, x.aid), x) for x, matched in session_result.all() if matched)
+        return parse_obj_as(list[ArtworkCollection], [artworks[key] for key in keys if key in artworks])
 
     async def query_classification_statistic(
             self,
@@ -297,6 +648,20 @@ class ArtworkCollectionDAL(BaseDataAccessLayerModel[ArtworkCollectionOrm, Artwor
         session_result = await self.db_session.execute(stmt)
         return parse_obj_as(list[str], session_result.scalars().all())
 
+    async def query_users_created_times(
+            self,
+            origin: str,
+            uids: Sequence[str],
+            start_time: datetime,
+    ) -> list[tuple[str, datetime]]:
+        """查询指定来源多个用户在某时间之后收录的全部作品的 (用户ID, 收录时间), 用于估计用户的发布频率"""
+        stmt = (select(ArtworkCollectionOrm.uid, ArtworkCollectionOrm.created_at)
+                .where(ArtworkCollectionOrm.origin == origin)
+                .where(ArtworkCollectionOrm.uid.in_(uids))
+                .where(ArtworkCollectionOrm.created_at >= start_time))
+        session_result = await self.db_session.execute(stmt)
+        return [(uid, created_at) for uid, created_at in session_result.all()]
+
     async def query_exists_aids(
             self,
             origin: str | None,
@@ -372,6 +737,32 @@ class ArtworkCollectionDAL(BaseDataAccessLayerModel[ArtworkCollectionOrm, Artwor
                                        description=description if description is None else description[:4096],
                                        created_at=datetime.now())
         await self._add(new_obj)
+        await self._update_tag_index(origin=origin, aid=aid, title=title, uname=uname, tags=tags[:4096])
+
+    async def add_many(self, artworks: Sequence[ArtworkCollection]) -> None:
+        """批量插入新作品及其标签倒排索引, 调用方需确保作品均不存在"""
+        if not artworks:
+            return
+
+        created_at = datetime.now()
+        await self.db_session.execute(insert(ArtworkCollectionOrm), [
+            {
+                'origin': x.origin, 'aid': x.aid, 'title': x.title, 'uid': x.uid, 'uname': x.uname,
+                'classification': x.classification, 'rating': x.rating, 'width': x.width, 'height': x.height,
+                'tags': x.tags[:4096], 'source': x.source, 'cover_page': x.cover_page,
+                'description': x.description if x.description is None else x.description[:4096],
+                'created_at': created_at,
+            }
+            for x in artworks
+        ])
+
+        index_values = [
+            {'tag': tag, 'origin': x.origin, 'aid': x.aid}
+            for x in artworks
+            for tag in _split_index_tags(x.title, x.uname, x.tags[:4096])
+        ]
+        if index_values:
+            await self.db_session.execute(insert(ArtworkTagOrm), index_values)
 
     async def upsert(
             self,
@@ -396,6 +787,7 @@ class ArtworkCollectionDAL(BaseDataAccessLayerModel[ArtworkCollectionOrm, Artwor
                                        description=description if description is None else description[:4096],
                                        updated_at=datetime.now())
         await self._merge(new_obj)
+        await self._update_tag_index(origin=origin, aid=aid, title=title, uname=uname, tags=tags[:4096])
 
     async def update(
             self,
@@ -443,12 +835,80 @@ class ArtworkCollectionDAL(BaseDataAccessLayerModel[ArtworkCollectionOrm, Artwor
         stmt.execution_options(synchronize_session='fetch')
         await self.db_session.execute(stmt)
 
+        if title is not None or uname is not None or tags is not None:
+            indexed_stmt = (select(ArtworkCollectionOrm.title, ArtworkCollectionOrm.uname, ArtworkCollectionOrm.tags)
+                            .where(ArtworkCollectionOrm.origin == origin)
+                            .where(ArtworkCollectionOrm.aid == aid))
+            session_result = await self.db_session.execute(indexed_stmt)
+            if (indexed_fields := session_result.one_or_none()) is not None:
+                await self._update_tag_index(
+                    origin=origin, aid=aid,
+                    title=indexed_fields.title, uname=indexed_fields.uname, tags=indexed_fields.tags
+                )
+
     async def delete(self, origin: str, aid: str) -> None:
         stmt = (delete(ArtworkCollectionOrm)
                 .where(ArtworkCollectionOrm.origin == origin)
                 .where(ArtworkCollectionOrm.aid == aid))
         stmt.execution_options(synchronize_session='fetch')
         await self.db_session.execute(stmt)
+        await self._delete_tag_index(origin=origin, aid=aid)
+
+    async def _delete_tag_index(self, origin: str, aid: str) -> None:
+        """内部方法, 删除作品的标签倒排索引"""
+        stmt = (delete(ArtworkTagOrm)
+                .where(ArtworkTagOrm.origin == origin)
+                .where(ArtworkTagOrm.aid == aid))
+        await self.db_session.execute(stmt)
+
+    async def _update_tag_index(self, origin: str, aid: str, title: str, uname: str, tags: str) -> None:
+        """内部方法, 重建作品的标签倒排索引"""
+        await self._delete_tag_index(origin=origin, aid=aid)
+        if index_tags := _split_index_tags(title, uname, tags):
+            await self.db_session.execute(
+                insert(ArtworkTagOrm), [{'tag': tag, 'origin': origin, 'aid': aid} for tag in index_tags]
+            )
+
+    async def check_tag_index_exists(self) -> bool:
+        """检查标签倒排索引是否已有数据"""
+        stmt = select(ArtworkTagOrm.tag).limit(1)
+        session_result = await self.db_session.execute(stmt)
+        return session_result.scalar_one_or_none() is not None
+
+    async def rebuild_tag_index(self, *, batch_size: int = 1000) -> int:
+        """从图库作品表的标签, 标题及作者名全量重建标签倒排索引
+
+        :param batch_size: 每批处理的作品数
+        :return: 已处理的作品数
+        """
+        await self.db_session.execute(delete(ArtworkTagOrm))
+
+        processed_count = 0
+        last_key: tuple[str, str] | None = None
+        while True:
+            stmt = (select(ArtworkCollectionOrm.origin, ArtworkCollectionOrm.aid,
+                           ArtworkCollectionOrm.title, ArtworkCollectionOrm.uname, ArtworkCollectionOrm.tags)
+                    .order_by(ArtworkCollectionOrm.origin, ArtworkCollectionOrm.aid)
+                    .limit(batch_size))
+            if last_key is not None:
+                stmt = stmt.where(tuple_(ArtworkCollectionOrm.origin, ArtworkCollectionOrm.aid) > last_key)
+            session_result = await self.db_session.execute(stmt)
+            rows = session_result.all()
+            if not rows:
+                break
+
+            values = [
+                {'tag': tag, 'origin': origin, 'aid': aid}
+                for origin, aid, title, uname, tags in rows
+                for tag in _split_index_tags(title, uname, tags)
+            ]
+            if values:
+                await self.db_session.execute(insert(ArtworkTagOrm), values)
+
+            processed_count += len(rows)
+            last_key = (rows[-1].origin, rows[-1].aid)
+
+        return processed_count
 
 
 __all__ = [
@@ -8,6 +8,7 @@
 @Software       : PyCharm 
 """
 
+from collections.abc import Sequence
 from datetime import datetime
 
 from sqlalchemy import delete, select, update
@@ -58,6 +59,22 @@ class AuthSettingDAL(BaseDataAccessLayerModel[AuthSettingOrm, AuthSetting]):
         session_result = await self.db_session.execute(stmt)
         return parse_obj_as(list[AuthSetting], session_result.scalars().all())
 
+    async def query_entities_all(
+            self,
+            entity_index_ids: Sequence[int],
+            modules: Sequence[str] | None = None,
+    ) -> list[AuthSetting]:
+        """批量查询多个 Entity 具有的全部/某些模块的权限配置"""
+        if not entity_index_ids:
+            return []
+
+        stmt = select(AuthSettingOrm).where(AuthSettingOrm.entity_index_id.in_(entity_index_ids))
+        if modules is not None:
+            stmt = stmt.where(AuthSettingOrm.module.in_(modules))
+        stmt = stmt.order_by(AuthSettingOrm.entity_index_id)
+        session_result = await self.db_session.execute(stmt)
+        return parse_obj_as(list[AuthSetting], session_result.scalars().all())
+
     async def query_module_plugin_all(self, module: str, plugin: str) -> list[AuthSetting]:
         """查询某个模块/插件所有已配置的权限配置"""
         stmt = (select(AuthSettingOrm)
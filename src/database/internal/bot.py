@@ -8,6 +8,7 @@
 @Software       : PyCharm 
 """
 
+from collections.abc import Iterable
 from copy import deepcopy
 from datetime import datetime
 from enum import StrEnum, unique
@@ -64,6 +65,12 @@ class BotSelfDAL(BaseDataAccessLayerModel[BotSelfOrm, BotSelf]):
         session_result = await self.db_session.execute(stmt)
         return BotSelf.model_validate(session_result.scalar_one())
 
+    async def query_by_index_ids(self, index_ids: Iterable[int]) -> list[BotSelf]:
+        """批量查询多个索引 ID 对应的 Bot, 不存在的索引 ID 不包含在结果中"""
+        stmt = select(BotSelfOrm).where(BotSelfOrm.id.in_(set(index_ids)))
+        session_result = await self.db_session.execute(stmt)
+        return parse_obj_as(list[BotSelf], session_result.scalars().all())
+
     async def query_all(self) -> list[BotSelf]:
         stmt = select(BotSelfOrm).order_by(BotSelfOrm.self_id)
         session_result = await self.db_session.execute(stmt)
@@ -8,6 +8,7 @@
 @Software       : PyCharm 
 """
 
+from collections.abc import Sequence
 from datetime import datetime
 
 from sqlalchemy import delete, select, update
@@ -38,6 +39,27 @@ class CoolDownDAL(BaseDataAccessLayerModel[CoolDownOrm, CoolDown]):
         session_result = await self.db_session.execute(stmt)
         return CoolDown.model_validate(session_result.scalar_one())
 
+    async def query_entities_events(self, entity_index_ids: Sequence[int], events: Sequence[str]) -> list[CoolDown]:
+        """批量查询多个 Entity 的多个冷却事件"""
+        if not entity_index_ids or not events:
+            return []
+
+        stmt = (select(CoolDownOrm)
+                .where(CoolDownOrm.entity_index_id.in_(entity_index_ids))
+                .where(CoolDownOrm.event.in_(events))
+                .order_by(CoolDownOrm.entity_index_id))
+        session_result = await self.db_session.execute(stmt)
+        return parse_obj_as(list[CoolDown], session_result.scalars().all())
+
+    async def query_event_active(self, event: str) -> list[CoolDown]:
+        """查询某个冷却事件全部未到期的冷却"""
+        stmt = (select(CoolDownOrm)
+                .where(CoolDownOrm.event == event)
+                .where(CoolDownOrm.stop_at > datetime.now())
+                .order_by(CoolDownOrm.entity_index_id))
+        session_result = await self.db_session.execute(stmt)
+        return parse_obj_as(list[CoolDown], session_result.scalars().all())
+
     async def query_all(self) -> list[CoolDown]:
         stmt = select(CoolDownOrm).order_by(CoolDownOrm.entity_index_id)
         session_result = await self.db_session.execute(stmt)
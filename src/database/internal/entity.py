@@ -8,15 +8,16 @@
 @Software       : PyCharm 
 """
 
+from collections.abc import Iterable
 from copy import deepcopy
 from datetime import datetime
 from enum import StrEnum, unique
 
-from sqlalchemy import delete, select, update
+from sqlalchemy import and_, delete, or_, select, update
 
 from src.compat import parse_obj_as
 from ..model import BaseDataAccessLayerModel, BaseDataQueryResultModel
-from ..schema import AuthSettingOrm, EntityOrm, SubscriptionOrm
+from ..schema import AuthSettingOrm, BotSelfOrm, EntityOrm, SubscriptionOrm
 
 
 @unique
@@ -92,6 +93,34 @@ class EntityDAL(BaseDataAccessLayerModel[EntityOrm, Entity]):
         session_result = await self.db_session.execute(stmt)
         return Entity.model_validate(session_result.scalar_one())
 
+    async def query_bot_entities(
+            self,
+            bot_self_id: str,
+            entities: Iterable[tuple[str, str, str]],
+    ) -> list[Entity]:
+        """批量查询 Bot 下的多个 Entity
+
+        :param bot_self_id: 所属 Bot 的 self_id
+        :param entities: (entity_type, entity_id, parent_id) 组成的序列
+        """
+        conditions = [
+            and_(
+                EntityOrm.entity_type == EntityType(entity_type),
+                EntityOrm.entity_id == entity_id,
+                EntityOrm.parent_id == parent_id,
+            )
+            for entity_type, entity_id, parent_id in entities
+        ]
+        if not conditions:
+            return []
+
+        stmt = (select(EntityOrm)
+                .join(BotSelfOrm)
+                .where(BotSelfOrm.self_id == bot_self_id)
+                .where(or_(*conditions)))
+        session_result = await self.db_session.execute(stmt)
+        return parse_obj_as(list[Entity], session_result.scalars().all())
+
     async def query_all_by_type(self, entity_type: str) -> list[Entity]:
         """查询符合 entity_type 的全部结果"""
         stmt = select(EntityOrm).where(EntityOrm.entity_type == entity_type).order_by(EntityOrm.entity_id)
@@ -8,9 +8,10 @@
 @Software       : PyCharm 
 """
 
+from collections.abc import Mapping, Sequence
 from datetime import datetime, timedelta
 
-from sqlalchemy import delete, select
+from sqlalchemy import delete, insert, select
 
 from src.compat import parse_obj_as
 from ..model import BaseDataAccessLayerModel, BaseDataQueryResultModel
@@ -50,6 +51,27 @@ class GlobalCacheDAL(BaseDataAccessLayerModel[GlobalCacheOrm, GlobalCache]):
         session_result = await self.db_session.execute(stmt)
         return parse_obj_as(list[GlobalCache], session_result.scalars().all())
 
+    async def query_many(
+            self,
+            cache_name: str,
+            cache_keys: Sequence[str],
+            *,
+            include_expired: bool = False,
+    ) -> list[GlobalCache]:
+        """批量查询同一缓存下的多个键"""
+        if not cache_keys:
+            return []
+
+        stmt = (select(GlobalCacheOrm)
+                .where(GlobalCacheOrm.cache_name == cache_name)
+                .where(GlobalCacheOrm.cache_key.in_(cache_keys)))
+
+        if not include_expired:
+            stmt = stmt.where(GlobalCacheOrm.expired_at >= datetime.now())
+
+        session_result = await self.db_session.execute(stmt)
+        return parse_obj_as(list[GlobalCache], session_result.scalars().all())
+
     async def query_all(self, *, include_expired: bool = False) -> list[GlobalCache]:
         stmt = select(GlobalCacheOrm).order_by(GlobalCacheOrm.cache_name)
 
@@ -93,6 +115,41 @@ class GlobalCacheDAL(BaseDataAccessLayerModel[GlobalCacheOrm, GlobalCache]):
                                  cache_value=cache_value, expired_at=expired_at, updated_at=datetime.now())
         await self._merge(new_obj)
 
+    async def upsert_many(
+            self,
+            cache_name: str,
+            cache_items: Mapping[str, str],
+            expired_time: datetime | timedelta | None = None,
+    ) -> None:
+        """批量新增或更新同一缓存下的多个键, 先删除已存在的键再以单条多行 INSERT 语句写入"""
+        if not cache_items:
+            return
+
+        if expired_time is None:
+            expired_at = datetime(year=9999, month=12, day=31)
+        elif isinstance(expired_time, datetime):
+            expired_at = expired_time
+        else:
+            expired_at = datetime.now() + expired_time
+
+        delete_stmt = (delete(GlobalCacheOrm)
+                       .where(GlobalCacheOrm.cache_name == cache_name)
+                       .where(GlobalCacheOrm.cache_key.in_(cache_items.keys())))
+        delete_stmt.execution_options(synchronize_session='fetch')
+        await self.db_session.execute(delete_stmt)
+
+        updated_at = datetime.now()
+        await self.db_session.execute(insert(GlobalCacheOrm), [
+            {
+                'cache_name': cache_name,
+                'cache_key': key,
+                'cache_value': value,
+                'expired_at': expired_at,
+                'updated_at': updated_at,
+            }
+            for key, value in cache_items.items()
+        ])
+
     async def update(self, *args, **kwargs) -> None:
         raise NotImplementedError
 
@@ -8,11 +8,16 @@
 @Software       : PyCharm 
 """
 
+from collections.abc import Callable, Mapping, Sequence
 from datetime import datetime
+from typing import Any
 
-from sqlalchemy import desc, select
+from nonebot.utils import run_sync
+from sqlalchemy import ColumnElement, delete, desc, func, insert, not_, or_, select
 
 from src.compat import parse_obj_as
+from .history_archive import ArchivedRecord, history_archive
+from ..config import history_archive_config
 from ..model import BaseDataAccessLayerModel, BaseDataQueryResultModel
 from ..schema import HistoryOrm
 
@@ -33,7 +38,12 @@ class History(BaseDataQueryResultModel):
 
 
 class HistoryDAL(BaseDataAccessLayerModel[HistoryOrm, History]):
-    """系统参数 数据库操作对象"""
+    """系统参数 数据库操作对象
+
+    超过保留时间的记录会被按月归档至文件 (见 `history_archive`),
+    按时间范围查询的方法在范围涉及已归档的月份时同时读取归档文件.
+    `query_unique` 仅查询数据库中的记录.
+    """
 
     async def query_unique(
             self,
@@ -50,6 +60,120 @@ class HistoryDAL(BaseDataAccessLayerModel[HistoryOrm, History]):
         session_result = await self.db_session.execute(stmt)
         return History.model_validate(session_result.scalar_one())
 
+    @staticmethod
+    def _build_entity_records_conditions(
+            bot_self_id: str,
+            event_entity_id: str | None = None,
+            user_entity_id: str | None = None,
+            *,
+            start_time: datetime | None = None,
+            end_time: datetime | None = None,
+            message_type: str | None = None,
+            exclude_bot_self_message: bool = False,
+    ) -> list[ColumnElement[bool]]:
+        """构造查询某个实体一段时间内的消息历史记录的条件"""
+        if event_entity_id is None and user_entity_id is None:
+            raise ValueError('need at least one of the event_entity_id and user_entity_id parameters')
+
+        conditions = [HistoryOrm.bot_self_id == bot_self_id]
+        if event_entity_id is not None:
+            conditions.append(HistoryOrm.event_entity_id == event_entity_id)
+        if user_entity_id is not None:
+            conditions.append(HistoryOrm.user_entity_id == user_entity_id)
+        if start_time is not None:
+            conditions.append(HistoryOrm.received_time >= int(start_time.timestamp()))
+        if end_time is not None:
+            conditions.append(HistoryOrm.received_time <= int(end_time.timestamp()))
+        if message_type is not None:
+            conditions.append(HistoryOrm.message_type == message_type)
+        if exclude_bot_self_message:
+            conditions.append(HistoryOrm.bot_self_id != HistoryOrm.user_entity_id)
+        return conditions
+
+    @staticmethod
+    def _build_entity_records_predicate(
+            bot_self_id: str,
+            event_entity_id: str | None = None,
+            user_entity_id: str | None = None,
+            *,
+            start_time: datetime | None = None,
+            end_time: datetime | None = None,
+            message_type: str | None = None,
+            exclude_bot_self_message: bool = False,
+    ) -> Callable[[ArchivedRecord], bool]:
+        """构造筛选归档记录的条件, 与 `_build_entity_records_conditions` 一致"""
+        start_timestamp = None if start_time is None else int(start_time.timestamp())
+        end_timestamp = None if end_time is None else int(end_time.timestamp())
+
+        def _predicate(record: ArchivedRecord) -> bool:
+            return (
+                    record['bot_self_id'] == bot_self_id
+                    and (event_entity_id is None or record['event_entity_id'] == event_entity_id)
+                    and (user_entity_id is None or record['user_entity_id'] == user_entity_id)
+                    and (start_timestamp is None or record['received_time'] >= start_timestamp)
+                    and (end_timestamp is None or record['received_time'] <= end_timestamp)
+                    and (message_type is None or record['message_type'] == message_type)
+                    and (not exclude_bot_self_message or record['bot_self_id'] != record['user_entity_id'])
+            )
+
+        return _predicate
+
+    @staticmethod
+    async def _is_archive_involved(start_time: datetime | None = None) -> bool:
+        """时间范围是否涉及已归档的月份, 未启用归档查询时总是返回 False"""
+        if not history_archive_config.database_history_archive_query_enable:
+            return False
+
+        archived_until = await run_sync(history_archive.get_archived_until)()
+        return archived_until is not None and (start_time is None or start_time < archived_until)
+
+    @classmethod
+    async def _query_archived_records(
+            cls,
+            predicate: Callable[[ArchivedRecord], bool],
+            *,
+            start_time: datetime | None = None,
+            end_time: datetime | None = None,
+    ) -> list[History]:
+        """查询时间范围内的归档记录, 时间范围不涉及已归档的月份时不读取文件"""
+        if not await cls._is_archive_involved(start_time=start_time):
+            return []
+
+        records = await run_sync(history_archive.query_records)(
+            predicate=predicate,
+            start_time=None if start_time is None else int(start_time.timestamp()),
+            end_time=None if end_time is None else int(end_time.timestamp()),
+        )
+        return parse_obj_as(list[History], records)
+
+    @classmethod
+    async def _count_archived_records(
+            cls,
+            predicate: Callable[[ArchivedRecord], bool],
+            *,
+            start_time: datetime | None = None,
+            end_time: datetime | None = None,
+    ) -> int:
+        """统计时间范围内的归档记录数量, 读取时逐条计数, 不保留记录"""
+        if not await cls._is_archive_involved(start_time=start_time):
+            return 0
+
+        return await run_sync(history_archive.count_records)(
+            predicate=predicate,
+            start_time=None if start_time is None else int(start_time.timestamp()),
+            end_time=None if end_time is None else int(end_time.timestamp()),
+        )
+
+    @staticmethod
+    def _merge_archived_records(records: list[History], archived_records: Sequence[History]) -> list[History]:
+        """合并数据库及归档文件中的记录, 归档后尚未从数据库删除的记录只保留一条"""
+        if not archived_records:
+            return records
+
+        live_ids = {x.id for x in records}
+        records.extend(x for x in archived_records if x.id not in live_ids)
+        return records
+
     async def query_entity_records(
             self,
             bot_self_id: str,
@@ -71,27 +195,167 @@ class HistoryDAL(BaseDataAccessLayerModel[HistoryOrm, History]):
         :param message_type: 消息事件类型, 为空则返回全部
         :param exclude_bot_self_message: 是否排除机器人自身的消息
         """
-        if event_entity_id is None and user_entity_id is None:
-            raise ValueError('need at least one of the event_entity_id and user_entity_id parameters')
+        conditions = self._build_entity_records_conditions(
+            bot_self_id=bot_self_id, event_entity_id=event_entity_id, user_entity_id=user_entity_id,
+            start_time=start_time, end_time=end_time, message_type=message_type,
+            exclude_bot_self_message=exclude_bot_self_message,
+        )
+        stmt = select(HistoryOrm).where(*conditions).order_by(desc(HistoryOrm.received_time))
+        session_result = await self.db_session.execute(stmt)
+        records = parse_obj_as(list[History], session_result.scalars().all())
 
+        predicate = self._build_entity_records_predicate(
+            bot_self_id=bot_self_id, event_entity_id=event_entity_id, user_entity_id=user_entity_id,
+            start_time=start_time, end_time=end_time, message_type=message_type,
+            exclude_bot_self_message=exclude_bot_self_message,
+        )
+        archived_records = await self._query_archived_records(predicate, start_time=start_time, end_time=end_time)
+        if archived_records:
+            records = self._merge_archived_records(records, archived_records)
+            records.sort(key=lambda x: x.received_time, reverse=True)
+        return records
+
+    async def count_entity_records(
+            self,
+            bot_self_id: str,
+            event_entity_id: str | None = None,
+            user_entity_id: str | None = None,
+            *,
+            start_time: datetime | None = None,
+            end_time: datetime | None = None,
+            message_type: str | None = None,
+            exclude_bot_self_message: bool = False,
+    ) -> int:
+        """统计某个实体一段时间内的消息历史记录数量, 参数同 `query_entity_records`"""
+        conditions = self._build_entity_records_conditions(
+            bot_self_id=bot_self_id, event_entity_id=event_entity_id, user_entity_id=user_entity_id,
+            start_time=start_time, end_time=end_time, message_type=message_type,
+            exclude_bot_self_message=exclude_bot_self_message,
+        )
+        stmt = select(func.count(HistoryOrm.id)).where(*conditions)
+        session_result = await self.db_session.execute(stmt)
+        count = session_result.scalar_one()
+
+        predicate = self._build_entity_records_predicate(
+            bot_self_id=bot_self_id, event_entity_id=event_entity_id, user_entity_id=user_entity_id,
+            start_time=start_time, end_time=end_time, message_type=message_type,
+            exclude_bot_self_message=exclude_bot_self_message,
+        )
+        archived_count = await self._count_archived_records(predicate, start_time=start_time, end_time=end_time)
+        return count + archived_count
+
+    async def query_records_by_time(
+            self,
+            start_time: datetime,
+            end_time: datetime,
+            *,
+            after_id: int = 0,
+            limit: int = 5000,
+    ) -> list[History]:
+        """按 ID 顺序分批查询一段时间内全部实体的消息历史记录
+
+        :param start_time: 起始时间 (包含)
+        :param end_time: 结束时间 (不包含)
+        :param after_id: 仅返回 ID 大于该值的记录, 传入上一批最后一条记录的 ID 以查询下一批
+        :param limit: 单批数量
+        """
+        records = await self.query_live_records_by_time(
+            start_time=start_time, end_time=end_time, after_id=after_id, limit=limit
+        )
+
+        if not await self._is_archive_involved(start_time=start_time):
+            return records
+
+        archived_records = parse_obj_as(list[History], await run_sync(history_archive.query_records_by_id)(
+            start_time=int(start_time.timestamp()), end_time=int(end_time.timestamp()), after_id=after_id, limit=limit
+        ))
+        if archived_records:
+            records = self._merge_archived_records(records, archived_records)
+            records.sort(key=lambda x: x.id)
+            records = records[:limit]
+        return records
+
+    @staticmethod
+    def _build_entity_type_conditions(
+            entity_types: Sequence[str] | None = None,
+            exclude_entity_types: Sequence[str] = (),
+    ) -> list[ColumnElement[bool]]:
+        """构造按实体类型筛选记录的条件, 实体类型为消息事件类型 (message_type) 的前缀"""
+        conditions = []
+        if entity_types is not None:
+            conditions.append(
+                or_(*(HistoryOrm.message_type.startswith(f'{x}.', autoescape=True) for x in entity_types))
+            )
+        conditions.extend(
+            not_(HistoryOrm.message_type.startswith(f'{x}.', autoescape=True)) for x in exclude_entity_types
+        )
+        return conditions
+
+    async def query_live_records_by_time(
+            self,
+            start_time: datetime,
+            end_time: datetime,
+            *,
+            after_id: int = 0,
+            limit: int = 5000,
+            entity_types: Sequence[str] | None = None,
+            exclude_entity_types: Sequence[str] = (),
+    ) -> list[History]:
+        """按 ID 顺序分批查询一段时间内数据库中 (不包括归档文件) 的消息历史记录
+
+        :param start_time: 起始时间 (包含)
+        :param end_time: 结束时间 (不包含)
+        :param after_id: 仅返回 ID 大于该值的记录, 传入上一批最后一条记录的 ID 以查询下一批
+        :param limit: 单批数量
+        :param entity_types: 仅查询这些实体类型的记录, 为空则查询全部
+        :param exclude_entity_types: 排除这些实体类型的记录
+        """
         stmt = (select(HistoryOrm)
-                .where(HistoryOrm.bot_self_id == bot_self_id)
-                .order_by(desc(HistoryOrm.received_time)))
-        if event_entity_id is not None:
-            stmt = stmt.where(HistoryOrm.event_entity_id == event_entity_id)
-        if user_entity_id is not None:
-            stmt = stmt.where(HistoryOrm.user_entity_id == user_entity_id)
-        if start_time is not None:
-            stmt = stmt.where(HistoryOrm.received_time >= int(start_time.timestamp()))
-        if end_time is not None:
-            stmt = stmt.where(HistoryOrm.received_time <= int(end_time.timestamp()))
-        if message_type is not None:
-            stmt = stmt.where(HistoryOrm.message_type == message_type)
-        if exclude_bot_self_message:
-            stmt = stmt.where(HistoryOrm.bot_self_id != HistoryOrm.user_entity_id)
+                .where(HistoryOrm.received_time >= int(start_time.timestamp()))
+                .where(HistoryOrm.received_time < int(end_time.timestamp()))
+                .where(HistoryOrm.id > after_id)
+                .where(*self._build_entity_type_conditions(entity_types, exclude_entity_types))
+                .order_by(HistoryOrm.id)
+                .limit(limit))
         session_result = await self.db_session.execute(stmt)
         return parse_obj_as(list[History], session_result.scalars().all())
 
+    async def query_oldest_received_time(
+            self,
+            *,
+            entity_types: Sequence[str] | None = None,
+            exclude_entity_types: Sequence[str] = (),
+    ) -> int | None:
+        """查询数据库中最早一条记录的时间戳, 没有记录时返回 None"""
+        stmt = (select(func.min(HistoryOrm.received_time))
+                .where(*self._build_entity_type_conditions(entity_types, exclude_entity_types)))
+        session_result = await self.db_session.execute(stmt)
+        return session_result.scalar_one()
+
+    async def delete_records_by_id_range(
+            self,
+            start_time: datetime,
+            end_time: datetime,
+            *,
+            first_id: int,
+            last_id: int,
+            entity_types: Sequence[str] | None = None,
+            exclude_entity_types: Sequence[str] = (),
+    ) -> int:
+        """删除一段时间内 ID 在范围内 (包含两端) 的记录, 用于删除已归档的记录, 参数与归档时的查询条件一致
+
+        :return: 删除的记录数量
+        """
+        stmt = (delete(HistoryOrm)
+                .where(HistoryOrm.received_time >= int(start_time.timestamp()))
+                .where(HistoryOrm.received_time < int(end_time.timestamp()))
+                .where(HistoryOrm.id >= first_id)
+                .where(HistoryOrm.id <= last_id)
+                .where(*self._build_entity_type_conditions(entity_types, exclude_entity_types))
+                .execution_options(synchronize_session='fetch'))
+        session_result = await self.db_session.execute(stmt)
+        return session_result.rowcount
+
     async def query_all(self) -> list[History]:
         raise NotImplementedError
 
@@ -111,6 +375,18 @@ class HistoryDAL(BaseDataAccessLayerModel[HistoryOrm, History]):
                              message_raw=message_raw, message_text=message_text, created_at=datetime.now())
         await self._add(new_obj)
 
+    async def add_all(self, records: Sequence[Mapping[str, Any]]) -> None:
+        """使用单条多行 INSERT 语句批量新增行
+
+        :param records: 待写入的行, 各字段与 `add` 方法参数一致
+        """
+        if not records:
+            return
+
+        created_at = datetime.now()
+        stmt = insert(HistoryOrm)
+        await self.db_session.execute(stmt, [{**record, 'created_at': created_at} for record in records])
+
     async def upsert(self, *args, **kwargs) -> None:
         raise NotImplementedError
 
@@ -0,0 +1,264 @@
+"""
+@Author         : Ailitonia
+@Date           : 2025/1/22 20:30
+@FileName       : history_archive
+@Project        : nonebot2_miya
+@Description    : 消息历史记录归档文件存储
+@GitHub         : https://github.com/Ailitonia
+@Software       : PyCharm
+"""
+
+import gzip
+import heapq
+import json
+import os
+import pathlib
+import re
+import threading
+from collections import OrderedDict, deque
+from collections.abc import Callable, Iterator, Mapping, Sequence
+from datetime import datetime
+from typing import IO, Any
+
+from ..config import history_archive_config
+
+type ArchivedRecord = dict[str, Any]
+
+
+def get_month_key(time: datetime | int) -> str:
+    """获取时间 (或时间戳) 所在月份的归档分区名称"""
+    if isinstance(time, int):
+        time = datetime.fromtimestamp(time)
+    return time.strftime('%Y-%m')
+
+
+class HistoryArchiveWriter:
+    """单个归档文件的写入对象
+
+    先写入临时文件, 提交时替换正式文件.
+    归档文件已存在时 (如上次归档后未能完成删除) 先复制已有记录, 并跳过重复 ID 的记录.
+    """
+
+    def __init__(self, path: pathlib.Path, *, on_commit: Callable[[], None] | None = None) -> None:
+        self._path = path
+        self._part_path = path.with_name(f'.{path.name}.part')
+        self._on_commit = on_commit
+        self._written_ids: set[int] = set()
+
+        self._path.parent.mkdir(parents=True, exist_ok=True)
+        self._file: IO[str] = gzip.open(self._part_path, 'wt', encoding='utf-8')
+        if self._path.is_file():
+            with gzip.open(self._path, 'rt', encoding='utf-8') as f:
+                for line in f:
+                    self._written_ids.add(json.loads(line)['id'])
+                    self._file.write(line)
+
+    def write(self, records: Sequence[Mapping[str, Any]]) -> int:
+        """写入记录, 记录应按 ID 升序传入
+
+        :return: 写入的记录数量
+        """
+        written_count = 0
+        for record in records:
+            if record['id'] in self._written_ids:
+                continue
+            self._file.write(json.dumps(record, ensure_ascii=False, separators=(',', ':')))
+            self._file.write('\n')
+            self._written_ids.add(record['id'])
+            written_count += 1
+        return written_count
+
+    def commit(self) -> None:
+        self._file.close()
+        os.replace(self._part_path, self._path)
+        if self._on_commit is not None:
+            self._on_commit()
+
+    def abort(self) -> None:
+        self._file.close()
+        self._part_path.unlink(missing_ok=True)
+
+
+class HistoryArchive:
+    """消息历史记录归档文件存储
+
+    超过保留时间的消息历史记录按月分区归档为 gzip 压缩的 JSON Lines 文件, 每个月份一个目录,
+    目录下每个保留策略一个文件, 文件内记录按 ID 升序排列
+    """
+
+    _month_pattern: re.Pattern[str] = re.compile(r'^\d{4}-\d{2}$')
+
+    def __init__(self, folder: pathlib.Path) -> None:
+        self._folder = folder
+        self._months: list[str] | None = None
+        self._cursors: OrderedDict[tuple[Any, ...], _ArchiveRecordCursor] = OrderedDict()
+        self._cursors_maxsize: int = 4
+        self._lock = threading.Lock()
+
+    def __repr__(self) -> str:
+        return f'{self.__class__.__name__}(folder={self._folder.as_posix()!r})'
+
+    def _invalidate(self) -> None:
+        with self._lock:
+            self._months = None
+            cursors = list(self._cursors.values())
+            self._cursors.clear()
+        for cursor in cursors:
+            cursor.close()
+
+    def list_months(self) -> list[str]:
+        """已归档的月份分区, 按时间升序排列"""
+        with self._lock:
+            if self._months is None:
+                self._months = sorted(
+                    x.name for x in self._folder.iterdir() if x.is_dir() and self._month_pattern.match(x.name)
+                ) if self._folder.is_dir() else []
+            return list(self._months)
+
+    def get_archived_until(self) -> datetime | None:
+        """已归档的最新月份分区的结束时间, 此时间之后的记录都不在归档文件中"""
+        if not (months := self.list_months()):
+            return None
+        year, month = map(int, months[-1].split('-'))
+        return datetime(year + 1, 1, 1) if month == 12 else datetime(year, month + 1, 1)
+
+    def open_writer(self, month: str, policy: str) -> HistoryArchiveWriter:
+        """打开归档文件写入对象
+
+        :param month: 月份分区名称, 格式为 YYYY-MM
+        :param policy: 保留策略名称
+        """
+        if not self._month_pattern.match(month):
+            raise ValueError(f'illegal month partition: {month!r}')
+        return HistoryArchiveWriter(self._folder.joinpath(month, f'{policy}.jsonl.gz'), on_commit=self._invalidate)
+
+    def _iter_month_files(self, start_time: int | None, end_time: int | None) -> Iterator[pathlib.Path]:
+        start_month = None if start_time is None else get_month_key(start_time)
+        end_month = None if end_time is None else get_month_key(end_time)
+        for month in self.list_months():
+            if (start_month is not None and month < start_month) or (end_month is not None and month > end_month):
+                continue
+            yield from sorted(self._folder.joinpath(month).glob('*.jsonl.gz'))
+
+    @staticmethod
+    def _iter_file_records(file: pathlib.Path) -> Iterator[ArchivedRecord]:
+        with gzip.open(file, 'rt', encoding='utf-8') as f:
+            for line in f:
+                yield json.loads(line)
+
+    def _iter_records(self, start_time: int | None, end_time: int | None) -> Iterator[ArchivedRecord]:
+        for file in self._iter_month_files(start_time=start_time, end_time=end_time):
+            yield from self._iter_file_records(file)
+
+    def query_records(
+            self,
+            predicate: Callable[[ArchivedRecord], bool],
+            *,
+            start_time: int | None = None,
+            end_time: int | None = None,
+    ) -> list[ArchivedRecord]:
+        """读取时间范围所在月份分区的归档文件, 返回满足条件的记录
+
+        :param predicate: 记录筛选条件, 需自行判断记录时间是否在范围内
+        :param start_time: 起始时间戳, 用于确定需要读取的月份分区, 为空则从最早的分区开始
+        :param end_time: 结束时间戳, 用于确定需要读取的月份分区, 为空则读取至最新的分区
+        """
+        return [record for record in self._iter_records(start_time=start_time, end_time=end_time) if predicate(record)]
+
+    def count_records(
+            self,
+            predicate: Callable[[ArchivedRecord], bool],
+            *,
+            start_time: int | None = None,
+            end_time: int | None = None,
+    ) -> int:
+        """统计时间范围所在月份分区的归档文件中满足条件的记录数量, 参数同 `query_records`"""
+        return sum(1 for record in self._iter_records(start_time=start_time, end_time=end_time) if predicate(record))
+
+    def query_records_by_id(
+            self,
+            start_time: int,
+            end_time: int,
+            *,
+            after_id: int = 0,
+            limit: int = 5000,
+    ) -> list[ArchivedRecord]:
+        """按 ID 顺序分批读取一段时间内的归档记录
+
+        各归档文件内的记录按 ID 升序排列, 读取时合并各文件并在取够数量后停止.
+        读取位置会被保留, 以上一批最后一条记录的 ID 继续查询时从该位置继续读取, 无需重新解压文件.
+
+        :param start_time: 起始时间戳 (包含)
+        :param end_time: 结束时间戳 (不包含)
+        :param after_id: 仅返回 ID 大于该值的记录
+        :param limit: 单批数量
+        """
+        files = tuple(
+            (x, x.stat().st_mtime_ns) for x in self._iter_month_files(start_time=start_time, end_time=end_time)
+        )
+        key = (start_time, end_time, files)
+
+        with self._lock:
+            cursor = self._cursors.pop(key, None)
+        if cursor is None or cursor.position > after_id:
+            if cursor is not None:
+                cursor.close()
+            cursor = _ArchiveRecordCursor(
+                heapq.merge(*(self._iter_file_records(x) for x, _ in files), key=lambda x: x['id']),
+                predicate=lambda x: start_time <= x['received_time'] < end_time,
+            )
+
+        records = cursor.take(after_id=after_id, limit=limit)
+        with self._lock:
+            self._cursors[key] = cursor
+            evicted = [self._cursors.popitem(last=False)[1] for _ in range(len(self._cursors) - self._cursors_maxsize)]
+        for x in evicted:
+            x.close()
+        return records
+
+
+class _ArchiveRecordCursor:
+    """按 ID 升序读取归档记录的读取位置, 缓存已读取但尚未返回的记录"""
+
+    def __init__(self, records: Iterator[ArchivedRecord], predicate: Callable[[ArchivedRecord], bool]) -> None:
+        self._records = records
+        self._predicate = predicate
+        self._pending: deque[ArchivedRecord] = deque()
+        self.position: int = 0
+        self._exhausted: bool = False
+
+    def take(self, after_id: int, limit: int) -> list[ArchivedRecord]:
+        """返回 ID 大于 after_id 的最多 limit 条记录, 返回的记录在下次以更大的 after_id 读取前仍会保留"""
+        self.position = after_id
+        while self._pending and self._pending[0]['id'] <= after_id:
+            self._pending.popleft()
+
+        while not self._exhausted and len(self._pending) < limit:
+            try:
+                record = next(self._records)
+            except StopIteration:
+                self._exhausted = True
+                break
+            if record['id'] > after_id and self._predicate(record):
+                self._pending.append(record)
+
+        return list(self._pending)[:limit]
+
+    def close(self) -> None:
+        close = getattr(self._records, 'close', None)
+        if close is not None:
+            close()
+        self._pending.clear()
+
+
+history_archive = HistoryArchive(folder=history_archive_config.archive_folder)
+"""全局消息历史记录归档文件存储"""
+
+
+__all__ = [
+    'ArchivedRecord',
+    'HistoryArchive',
+    'HistoryArchiveWriter',
+    'get_month_key',
+    'history_archive',
+]
@@ -0,0 +1,145 @@
+"""
+@Author         : Ailitonia
+@Date           : 2025/1/3 20:16
+@FileName       : history_word_frequency
+@Project        : nonebot2_miya
+@Description    : HistoryWordFrequency DAL
+@GitHub         : https://github.com/Ailitonia
+@Software       : PyCharm
+"""
+
+from collections.abc import Mapping, Sequence
+from datetime import date
+from typing import Any
+
+from sqlalchemy import delete, func, insert, select
+
+from src.compat import parse_obj_as
+from ..model import BaseDataAccessLayerModel, BaseDataQueryResultModel
+from ..schema import HistoryWordFrequencyOrm
+
+
+class HistoryWordFrequency(BaseDataQueryResultModel):
+    """消息记录词频统计 Model"""
+    bot_self_id: str
+    event_entity_id: str
+    user_entity_id: str
+    stat_date: date
+    word: str
+    frequency: int
+
+
+class HistoryWordFrequencyDAL(BaseDataAccessLayerModel[HistoryWordFrequencyOrm, HistoryWordFrequency]):
+    """消息记录词频统计 数据库操作对象"""
+
+    async def query_unique(
+            self,
+            bot_self_id: str,
+            event_entity_id: str,
+            user_entity_id: str,
+            stat_date: date,
+            word: str,
+    ) -> HistoryWordFrequency:
+        stmt = (select(HistoryWordFrequencyOrm)
+                .where(HistoryWordFrequencyOrm.bot_self_id == bot_self_id)
+                .where(HistoryWordFrequencyOrm.event_entity_id == event_entity_id)
+                .where(HistoryWordFrequencyOrm.user_entity_id == user_entity_id)
+                .where(HistoryWordFrequencyOrm.stat_date == stat_date)
+                .where(HistoryWordFrequencyOrm.word == word))
+        session_result = await self.db_session.execute(stmt)
+        return HistoryWordFrequency.model_validate(session_result.scalar_one())
+
+    async def query_date_records(self, stat_date: date) -> list[HistoryWordFrequency]:
+        """查询某日的全部词频统计"""
+        stmt = select(HistoryWordFrequencyOrm).where(HistoryWordFrequencyOrm.stat_date == stat_date)
+        session_result = await self.db_session.execute(stmt)
+        return parse_obj_as(list[HistoryWordFrequency], session_result.scalars().all())
+
+    async def query_entity_word_frequency(
+            self,
+            bot_self_id: str,
+            event_entity_id: str | None = None,
+            user_entity_id: str | None = None,
+            *,
+            start_date: date,
+            end_date: date,
+    ) -> dict[str, int]:
+        """合并某个实体一段日期内的词频统计
+
+        :param bot_self_id: 收到消息的机器人ID
+        :param event_entity_id: 消息事件实体ID, 为空则合并全部
+        :param user_entity_id: 发送对象实体ID, 为空则合并全部
+        :param start_date: 起始日期 (包含)
+        :param end_date: 结束日期 (包含)
+        :return: {词语: 出现次数}
+        """
+        if event_entity_id is None and user_entity_id is None:
+            raise ValueError('need at least one of the event_entity_id and user_entity_id parameters')
+
+        stmt = (select(HistoryWordFrequencyOrm.word, func.sum(HistoryWordFrequencyOrm.frequency))
+                .where(HistoryWordFrequencyOrm.bot_self_id == bot_self_id)
+                .where(HistoryWordFrequencyOrm.stat_date >= start_date)
+                .where(HistoryWordFrequencyOrm.stat_date <= end_date)
+                .group_by(HistoryWordFrequencyOrm.word))
+        if event_entity_id is not None:
+            stmt = stmt.where(HistoryWordFrequencyOrm.event_entity_id == event_entity_id)
+        if user_entity_id is not None:
+            stmt = stmt.where(HistoryWordFrequencyOrm.user_entity_id == user_entity_id)
+        session_result = await self.db_session.execute(stmt)
+        return {word: int(frequency) for word, frequency in session_result.all()}
+
+    async def query_all(self) -> list[HistoryWordFrequency]:
+        raise NotImplementedError
+
+    async def add(self, *args, **kwargs) -> None:
+        raise NotImplementedError
+
+    async def replace_date_records(
+            self,
+            stat_date: date,
+            records: Sequence[Mapping[str, Any]],
+            *,
+            batch_size: int = 5000,
+    ) -> None:
+        """替换某日的全部词频统计, 先删除该日已有的统计再分批写入
+
+        :param stat_date: 统计日期
+        :param records: 待写入的行, 包含 bot_self_id, event_entity_id, user_entity_id, word, frequency 字段
+        :param batch_size: 单条 INSERT 语句写入的行数
+        """
+        await self.delete_date_records(stat_date=stat_date)
+        if not records:
+            return
+
+        stmt = insert(HistoryWordFrequencyOrm)
+        for index in range(0, len(records), batch_size):
+            await self.db_session.execute(
+                stmt, [{**record, 'stat_date': stat_date} for record in records[index:index + batch_size]]
+            )
+
+    async def upsert(self, *args, **kwargs) -> None:
+        raise NotImplementedError
+
+    async def update(self, *args, **kwargs) -> None:
+        raise NotImplementedError
+
+    async def delete(self, *args, **kwargs) -> None:
+        raise NotImplementedError
+
+    async def delete_date_records(self, stat_date: date) -> None:
+        """删除某日的全部词频统计"""
+        stmt = delete(HistoryWordFrequencyOrm).where(HistoryWordFrequencyOrm.stat_date == stat_date)
+        stmt.execution_options(synchronize_session='fetch')
+        await self.db_session.execute(stmt)
+
+    async def delete_expired_records(self, before_date: date) -> None:
+        """删除早于指定日期的全部词频统计"""
+        stmt = delete(HistoryWordFrequencyOrm).where(HistoryWordFrequencyOrm.stat_date < before_date)
+        stmt.execution_options(synchronize_session='fetch')
+        await self.db_session.execute(stmt)
+
+
+__all__ = [
+    'HistoryWordFrequency',
+    'HistoryWordFrequencyDAL',
+]
@@ -0,0 +1,104 @@
+"""
+@Author         : Ailitonia
+@Date           : 2025/1/8 20:36
+@FileName       : image_hash
+@Project        : nonebot2_miya
+@Description    : ImageHash DAL
+@GitHub         : https://github.com/Ailitonia
+@Software       : PyCharm
+"""
+
+from collections.abc import Sequence
+from datetime import datetime
+
+from pydantic import field_validator
+from sqlalchemy import delete, select
+
+from src.compat import parse_obj_as
+from ..model import BaseDataAccessLayerModel, BaseDataQueryResultModel
+from ..schema import ImageHashOrm
+
+_UINT64_SIGN_BIT: int = 1 << 63
+_UINT64_RANGE: int = 1 << 64
+
+
+def _to_signed(value: int) -> int:
+    return value - _UINT64_RANGE if value >= _UINT64_SIGN_BIT else value
+
+
+class ImageHash(BaseDataQueryResultModel):
+    """图片感知哈希 Model, hash_value 为无符号 64 位整数"""
+    namespace: str
+    resource_key: str
+    hash_value: int
+    created_at: datetime | None
+    updated_at: datetime | None
+
+    @field_validator('hash_value', mode='after')
+    @classmethod
+    def _to_unsigned(cls, value: int) -> int:
+        return value + _UINT64_RANGE if value < 0 else value
+
+
+class ImageHashDAL(BaseDataAccessLayerModel[ImageHashOrm, ImageHash]):
+    """图片感知哈希 数据库操作对象"""
+
+    async def query_unique(self, namespace: str, resource_key: str) -> ImageHash:
+        stmt = (select(ImageHashOrm)
+                .where(ImageHashOrm.namespace == namespace)
+                .where(ImageHashOrm.resource_key == resource_key))
+        session_result = await self.db_session.execute(stmt)
+        return ImageHash.model_validate(session_result.scalar_one())
+
+    async def query_namespace_all(self, namespace: str) -> list[ImageHash]:
+        """查询分类下的全部哈希"""
+        stmt = select(ImageHashOrm).where(ImageHashOrm.namespace == namespace)
+        session_result = await self.db_session.execute(stmt)
+        return parse_obj_as(list[ImageHash], session_result.scalars().all())
+
+    async def query_namespace_expired_keys(self, namespace: str, expired_before: datetime) -> list[str]:
+        """查询分类下创建时间早于 expired_before 的资源标识"""
+        stmt = (select(ImageHashOrm.resource_key)
+                .where(ImageHashOrm.namespace == namespace)
+                .where(ImageHashOrm.created_at < expired_before))
+        session_result = await self.db_session.execute(stmt)
+        return list(session_result.scalars().all())
+
+    async def query_all(self) -> list[ImageHash]:
+        raise NotImplementedError
+
+    async def add(self, namespace: str, resource_key: str, hash_value: int) -> None:
+        new_obj = ImageHashOrm(namespace=namespace, resource_key=resource_key,
+                               hash_value=_to_signed(hash_value), created_at=datetime.now())
+        await self._add(new_obj)
+
+    async def upsert(self, namespace: str, resource_key: str, hash_value: int) -> None:
+        new_obj = ImageHashOrm(namespace=namespace, resource_key=resource_key,
+                               hash_value=_to_signed(hash_value), created_at=datetime.now(), updated_at=datetime.now())
+        await self._merge(new_obj)
+
+    async def update(self, *args, **kwargs) -> None:
+        raise NotImplementedError
+
+    async def delete(self, namespace: str, resource_key: str) -> None:
+        stmt = (delete(ImageHashOrm)
+                .where(ImageHashOrm.namespace == namespace)
+                .where(ImageHashOrm.resource_key == resource_key))
+        stmt.execution_options(synchronize_session='fetch')
+        await self.db_session.execute(stmt)
+
+    async def delete_many(self, namespace: str, resource_keys: Sequence[str]) -> None:
+        if not resource_keys:
+            return
+
+        stmt = (delete(ImageHashOrm)
+                .where(ImageHashOrm.namespace == namespace)
+                .where(ImageHashOrm.resource_key.in_(resource_keys)))
+        stmt.execution_options(synchronize_session='fetch')
+        await self.db_session.execute(stmt)
+
+
+__all__ = [
+    'ImageHash',
+    'ImageHashDAL',
+]
@@ -0,0 +1,169 @@
+"""
+@Author         : Ailitonia
+@Date           : 2025/1/16 21:05
+@FileName       : sign_in_summary
+@Project        : nonebot2_miya
+@Description    : SignInSummary DAL
+@GitHub         : https://github.com/Ailitonia
+@Software       : PyCharm
+"""
+
+from collections.abc import Iterable
+from datetime import date, datetime, timedelta
+
+from sqlalchemy import delete, desc, select, update
+from sqlalchemy.exc import NoResultFound
+
+from src.compat import parse_obj_as
+from ..model import BaseDataAccessLayerModel, BaseDataQueryResultModel
+from ..schema import SignInOrm, SignInSummaryOrm
+
+
+class SignInSummary(BaseDataQueryResultModel):
+    """签到统计 Model"""
+    entity_index_id: int
+    total_days: int
+    continuous_days: int
+    last_sign_in_date: date
+    last_missing_date: date
+    created_at: datetime | None = None
+    updated_at: datetime | None = None
+
+
+def calculate_sign_in_summary(sign_in_days: Iterable[date]) -> tuple[int, int, date] | None:
+    """根据全部签到日期计算总签到天数, 截至最后签到日期的连续签到天数及最后签到日期, 没有签到记录返回 None"""
+    all_sign_in_list = sorted(set(sign_in_days), reverse=True)
+    if not all_sign_in_list:
+        return None
+
+    last_sign_in_date = all_sign_in_list[0]
+    continuous_days = len(all_sign_in_list)
+    for index, value in enumerate(all_sign_in_list):
+        if (last_sign_in_date - value).days != index:
+            continuous_days = index
+            break
+
+    return len(all_sign_in_list), continuous_days, last_sign_in_date
+
+
+class SignInSummaryDAL(BaseDataAccessLayerModel[SignInSummaryOrm, SignInSummary]):
+    """签到统计 数据库操作对象"""
+
+    async def query_unique(self, entity_index_id: int) -> SignInSummary:
+        stmt = select(SignInSummaryOrm).where(SignInSummaryOrm.entity_index_id == entity_index_id)
+        session_result = await self.db_session.execute(stmt)
+        return SignInSummary.model_validate(session_result.scalar_one())
+
+    async def query_all(self) -> list[SignInSummary]:
+        stmt = select(SignInSummaryOrm).order_by(desc(SignInSummaryOrm.last_sign_in_date))
+        session_result = await self.db_session.execute(stmt)
+        return parse_obj_as(list[SignInSummary], session_result.scalars().all())
+
+    async def query_missing_entity_index_ids(self, *, limit: int = 1000) -> list[int]:
+        """查询有签到记录但还没有签到统计的 Entity"""
+        stmt = (select(SignInOrm.entity_index_id)
+                .where(SignInOrm.entity_index_id.not_in(select(SignInSummaryOrm.entity_index_id)))
+                .group_by(SignInOrm.entity_index_id)
+                .order_by(SignInOrm.entity_index_id)
+                .limit(limit))
+        session_result = await self.db_session.execute(stmt)
+        return list(session_result.scalars().all())
+
+    async def add(self, *args, **kwargs) -> None:
+        raise NotImplementedError
+
+    async def upsert(
+            self,
+            entity_index_id: int,
+            total_days: int,
+            continuous_days: int,
+            last_sign_in_date: date,
+    ) -> None:
+        new_obj = SignInSummaryOrm(entity_index_id=entity_index_id, total_days=total_days,
+                                   continuous_days=continuous_days, last_sign_in_date=last_sign_in_date,
+                                   last_missing_date=last_sign_in_date - timedelta(days=continuous_days),
+                                   updated_at=datetime.now())
+        await self._merge(new_obj)
+
+    async def update(self, *args, **kwargs) -> None:
+        raise NotImplementedError
+
+    async def delete(self, entity_index_id: int) -> None:
+        stmt = delete(SignInSummaryOrm).where(SignInSummaryOrm.entity_index_id == entity_index_id)
+        stmt.execution_options(synchronize_session='fetch')
+        await self.db_session.execute(stmt)
+
+    async def rebuild(self, entity_index_id: int) -> SignInSummary | None:
+        """从全部签到记录重建 Entity 的签到统计, 没有签到记录时删除统计并返回 None"""
+        stmt = select(SignInOrm.sign_in_date).where(SignInOrm.entity_index_id == entity_index_id)
+        session_result = await self.db_session.execute(stmt)
+
+        if (summary := calculate_sign_in_summary(session_result.scalars().all())) is None:
+            await self.delete(entity_index_id=entity_index_id)
+            return None
+
+        total_days, continuous_days, last_sign_in_date = summary
+        await self.upsert(entity_index_id=entity_index_id, total_days=total_days,
+                          continuous_days=continuous_days, last_sign_in_date=last_sign_in_date)
+        return await self.query_unique(entity_index_id=entity_index_id)
+
+    async def rebuild_missing(self, *, batch_size: int = 1000) -> int:
+        """为有签到记录但还没有签到统计的全部 Entity 建立签到统计
+
+        :param batch_size: 每批处理的 Entity 数
+        :return: 已处理的 Entity 数
+        """
+        processed_count = 0
+        while entity_index_ids := await self.query_missing_entity_index_ids(limit=batch_size):
+            stmt = (select(SignInOrm.entity_index_id, SignInOrm.sign_in_date)
+                    .where(SignInOrm.entity_index_id.in_(entity_index_ids)))
+            session_result = await self.db_session.execute(stmt)
+
+            sign_in_days: dict[int, list[date]] = {}
+            for entity_index_id, sign_in_date in session_result.all():
+                sign_in_days.setdefault(entity_index_id, []).append(sign_in_date)
+
+            for entity_index_id, days in sign_in_days.items():
+                if (summary := calculate_sign_in_summary(days)) is None:
+                    continue
+                total_days, continuous_days, last_sign_in_date = summary
+                await self.upsert(entity_index_id=entity_index_id, total_days=total_days,
+                                  continuous_days=continuous_days, last_sign_in_date=last_sign_in_date)
+            processed_count += len(entity_index_ids)
+
+        return processed_count
+
+    async def apply_sign_in(self, entity_index_id: int, sign_in_date: date) -> None:
+        """新增一条 (不重复的) 签到记录后更新签到统计
+
+        签到日期晚于最后签到日期时直接递推, 早于最后签到日期时 (补签), 若补上的正好是最近一次断签日期,
+        可能连接此前的连签记录, 此时从全部签到记录重建, 否则仅增加总签到天数
+        """
+        try:
+            summary = await self.query_unique(entity_index_id=entity_index_id)
+        except NoResultFound:
+            await self.rebuild(entity_index_id=entity_index_id)
+            return
+
+        if sign_in_date > summary.last_sign_in_date:
+            if sign_in_date - summary.last_sign_in_date == timedelta(days=1):
+                continuous_days = summary.continuous_days + 1
+            else:
+                continuous_days = 1
+            await self.upsert(entity_index_id=entity_index_id, total_days=summary.total_days + 1,
+                              continuous_days=continuous_days, last_sign_in_date=sign_in_date)
+        elif sign_in_date == summary.last_missing_date:
+            await self.rebuild(entity_index_id=entity_index_id)
+        else:
+            stmt = (update(SignInSummaryOrm)
+                    .where(SignInSummaryOrm.entity_index_id == entity_index_id)
+                    .values(total_days=SignInSummaryOrm.total_days + 1, updated_at=datetime.now()))
+            stmt.execution_options(synchronize_session='fetch')
+            await self.db_session.execute(stmt)
+
+
+__all__ = [
+    'SignInSummary',
+    'SignInSummaryDAL',
+    'calculate_sign_in_summary',
+]
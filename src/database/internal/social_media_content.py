@@ -106,6 +106,20 @@ class SocialMediaContentDAL(BaseDataAccessLayerModel[SocialMediaContentOrm, Soci
         exists_mids = await self.query_user_exists_mids(source=source, uid=uid, mids=mids)
         return sorted(list(set(mids) - set(exists_mids)), reverse=True)
 
+    async def query_users_created_times(
+            self,
+            source: str,
+            uids: Sequence[str],
+            start_time: datetime,
+    ) -> list[tuple[str, datetime]]:
+        """查询指定来源平台多个用户在某时间之后新增的全部记录的 (用户ID, 记录时间), 用于估计用户的发布频率"""
+        stmt = (select(SocialMediaContentOrm.m_uid, SocialMediaContentOrm.created_at)
+                .where(SocialMediaContentOrm.source == source)
+                .where(SocialMediaContentOrm.m_uid.in_(uids))
+                .where(SocialMediaContentOrm.created_at >= start_time))
+        session_result = await self.db_session.execute(stmt)
+        return [(uid, created_at) for uid, created_at in session_result.all()]
+
     async def add(
             self,
             source: str,
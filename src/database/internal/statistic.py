@@ -8,9 +8,11 @@
 @Software       : PyCharm 
 """
 
+from collections.abc import Mapping, Sequence
 from datetime import datetime
+from typing import Any
 
-from sqlalchemy import desc, func, select
+from sqlalchemy import desc, func, insert, select
 
 from src.compat import parse_obj_as
 from ..model import BaseDataAccessLayerModel, BaseDataQueryResultModel
@@ -92,6 +94,18 @@ class StatisticDAL(BaseDataAccessLayerModel[StatisticOrm, Statistic]):
                                call_time=call_time, call_info=call_info, created_at=datetime.now())
         await self._add(new_obj)
 
+    async def add_all(self, records: Sequence[Mapping[str, Any]]) -> None:
+        """使用单条多行 INSERT 语句批量新增行
+
+        :param records: 待写入的行, 各字段与 `add` 方法参数一致
+        """
+        if not records:
+            return
+
+        created_at = datetime.now()
+        stmt = insert(StatisticOrm)
+        await self.db_session.execute(stmt, [{**record, 'created_at': created_at} for record in records])
+
     async def upsert(self, *args, **kwargs) -> None:
         raise NotImplementedError
 
@@ -10,7 +10,7 @@
 
 from datetime import date, datetime
 
-from sqlalchemy import ForeignKey, Sequence
+from sqlalchemy import ForeignKey, Index, Sequence
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 from sqlalchemy.types import BigInteger, Date, DateTime, Float, Integer, String
 
@@ -111,19 +111,25 @@ class StatisticOrm(Base):
 class HistoryOrm(Base):
     """原始消息记录表"""
     __tablename__ = f'{database_config.db_prefix}message_history'
-    if database_config.table_args is not None:
-        __table_args__ = database_config.table_args
+    # 按实体查询一段时间内的记录为主要查询方式, 使用 (实体, 时间) 联合索引代替各实体字段的单列索引
+    __table_args__ = (
+        Index(f'ix_{__tablename__}_event_entity_received_time', 'event_entity_id', 'received_time'),
+        Index(f'ix_{__tablename__}_user_entity_received_time', 'user_entity_id', 'received_time'),
+        *(() if database_config.table_args is None else (database_config.table_args,)),
+    )
 
     # 表结构
     id: Mapped[int] = mapped_column(
         IndexInt, Sequence(f'{__tablename__}_id_seq'), primary_key=True, nullable=False, index=True, unique=True
     )
     message_id: Mapped[str] = mapped_column(String(64), nullable=False, index=True, comment='消息ID')
-    bot_self_id: Mapped[str] = mapped_column(String(64), nullable=False, index=True, comment='收到消息的机器人ID')
-    event_entity_id: Mapped[str] = mapped_column(String(64), nullable=False, index=True, comment='消息事件实体ID')
-    user_entity_id: Mapped[str] = mapped_column(String(64), nullable=False, index=True, comment='发送对象实体ID')
+    bot_self_id: Mapped[str] = mapped_column(String(64), nullable=False, comment='收到消息的机器人ID')
+    event_entity_id: Mapped[str] = mapped_column(String(64), nullable=False, comment='消息事件实体ID')
+    user_entity_id: Mapped[str] = mapped_column(String(64), nullable=False, comment='发送对象实体ID')
     received_time: Mapped[int] = mapped_column(BigInteger, nullable=False, index=True, comment='收到消息事件的时间戳')
-    message_type: Mapped[str] = mapped_column(String(64), nullable=False, index=True, comment='消息事件类型')
+    message_type: Mapped[str] = mapped_column(
+        String(64), nullable=False, comment='消息事件类型, 格式为 "{实体类型}.{事件名称}"'
+    )
     message_raw: Mapped[str] = mapped_column(String(4096), nullable=False, comment='原始消息数据')
     message_text: Mapped[str] = mapped_column(String(4096), nullable=False, comment='经处理的消息文本内容')
     created_at: Mapped[datetime] = mapped_column(DateTime, nullable=True, default=datetime.now)
@@ -137,6 +143,30 @@ class HistoryOrm(Base):
                 f'created_at={self.created_at!r}, updated_at={self.updated_at!r})')
 
 
+class HistoryWordFrequencyOrm(Base):
+    """消息记录词频统计表, 按日统计各实体消息记录分词后的词频"""
+    __tablename__ = f'{database_config.db_prefix}message_history_word_frequency'
+    if database_config.table_args is not None:
+        __table_args__ = database_config.table_args
+
+    # 表结构
+    bot_self_id: Mapped[str] = mapped_column(String(64), primary_key=True, nullable=False, comment='收到消息的机器人ID')
+    event_entity_id: Mapped[str] = mapped_column(
+        String(64), primary_key=True, nullable=False, index=True, comment='消息事件实体ID'
+    )
+    user_entity_id: Mapped[str] = mapped_column(
+        String(64), primary_key=True, nullable=False, index=True, comment='发送对象实体ID'
+    )
+    stat_date: Mapped[date] = mapped_column(Date, primary_key=True, nullable=False, index=True, comment='统计日期')
+    word: Mapped[str] = mapped_column(String(64), primary_key=True, nullable=False, comment='词语')
+    frequency: Mapped[int] = mapped_column(Integer, nullable=False, comment='出现次数')
+
+    def __repr__(self) -> str:
+        return (f'HistoryWordFrequencyOrm(bot_self_id={self.bot_self_id!r}, event_entity_id={self.event_entity_id!r}, '
+                f'user_entity_id={self.user_entity_id!r}, stat_date={self.stat_date!r}, '
+                f'word={self.word!r}, frequency={self.frequency!r})')
+
+
 class BotSelfOrm(Base):
     """Bot表 对应不同机器人协议端"""
     __tablename__ = f'{database_config.db_prefix}bots'
@@ -200,6 +230,10 @@ class EntityOrm(Base):
     entity_signin: Mapped[list['SignInOrm']] = relationship(
         'SignInOrm', back_populates='signin_back_entity', cascade='all, delete-orphan', passive_deletes=True
     )
+    entity_signin_summary: Mapped[list['SignInSummaryOrm']] = relationship(
+        'SignInSummaryOrm', back_populates='signin_summary_back_entity', cascade='all, delete-orphan',
+        passive_deletes=True
+    )
     entity_auth: Mapped[list['AuthSettingOrm']] = relationship(
         'AuthSettingOrm', back_populates='auth_back_entity', cascade='all, delete-orphan', passive_deletes=True
     )
@@ -277,6 +311,34 @@ class SignInOrm(Base):
                 f'sign_in_info={self.sign_in_info!r}, created_at={self.created_at!r}, updated_at={self.updated_at!r})')
 
 
+class SignInSummaryOrm(Base):
+    """签到统计表, 签到时同步更新, 避免查询连签及总签到天数时扫描全部签到记录"""
+    __tablename__ = f'{database_config.db_prefix}sign_in_summary'
+    if database_config.table_args is not None:
+        __table_args__ = database_config.table_args
+
+    entity_index_id: Mapped[int] = mapped_column(
+        Integer, ForeignKey(EntityOrm.id, ondelete='CASCADE'), primary_key=True, nullable=False
+    )
+    total_days: Mapped[int] = mapped_column(Integer, nullable=False, comment='总签到天数')
+    continuous_days: Mapped[int] = mapped_column(Integer, nullable=False, comment='截至最后签到日期的连续签到天数')
+    last_sign_in_date: Mapped[date] = mapped_column(Date, nullable=False, comment='最后签到日期')
+    last_missing_date: Mapped[date] = mapped_column(Date, nullable=False, comment='最近一次断签日期')
+    created_at: Mapped[datetime] = mapped_column(DateTime, nullable=True, default=datetime.now)
+    updated_at: Mapped[datetime] = mapped_column(DateTime, nullable=True)
+
+    # 设置级联和关系加载
+    signin_summary_back_entity: Mapped[EntityOrm] = relationship(
+        EntityOrm, back_populates='entity_signin_summary', lazy='joined', innerjoin=True
+    )
+
+    def __repr__(self) -> str:
+        return (f'SignInSummaryOrm(entity_index_id={self.entity_index_id!r}, total_days={self.total_days!r}, '
+                f'continuous_days={self.continuous_days!r}, last_sign_in_date={self.last_sign_in_date!r}, '
+                f'last_missing_date={self.last_missing_date!r}, '
+                f'created_at={self.created_at!r}, updated_at={self.updated_at!r})')
+
+
 class AuthSettingOrm(Base):
     """授权配置表, 主要用于权限管理, 同时兼用于存放使用插件时需要持久化的配置"""
     __tablename__ = f'{database_config.db_prefix}auth_setting'
@@ -463,6 +525,39 @@ class ArtworkCollectionOrm(Base):
                 f'created_at={self.created_at!r}, updated_at={self.updated_at!r})')
 
 
+class ArtworkTagOrm(Base):
+    """图库作品标签倒排索引表, 由图库作品表的标签, 标题及作者名拆分得到"""
+    __tablename__ = f'{database_config.db_prefix}artwork_tag'
+    if database_config.table_args is not None:
+        __table_args__ = database_config.table_args
+
+    # 表结构
+    tag: Mapped[str] = mapped_column(String(255), primary_key=True, nullable=False, comment='规范化后的标签')
+    origin: Mapped[str] = mapped_column(String(64), primary_key=True, nullable=False, index=True, comment='作品来源')
+    aid: Mapped[str] = mapped_column(String(64), primary_key=True, nullable=False, index=True, comment='作品原始ID')
+
+    def __repr__(self) -> str:
+        return f'ArtworkTagOrm(tag={self.tag!r}, origin={self.origin!r}, aid={self.aid!r})'
+
+
+class ImageHashOrm(Base):
+    """图片感知哈希表, 用于近似图片检索"""
+    __tablename__ = f'{database_config.db_prefix}image_hash'
+    if database_config.table_args is not None:
+        __table_args__ = database_config.table_args
+
+    # 表结构
+    namespace: Mapped[str] = mapped_column(String(64), primary_key=True, nullable=False, comment='哈希所属分类')
+    resource_key: Mapped[str] = mapped_column(String(255), primary_key=True, nullable=False, comment='图片对应资源标识')
+    hash_value: Mapped[int] = mapped_column(BigInteger, nullable=False, comment='64位感知哈希, 按有符号整数存储')
+    created_at: Mapped[datetime] = mapped_column(DateTime, nullable=True, default=datetime.now)
+    updated_at: Mapped[datetime] = mapped_column(DateTime, nullable=True)
+
+    def __repr__(self) -> str:
+        return (f'ImageHashOrm(namespace={self.namespace!r}, resource_key={self.resource_key!r}, '
+                f'hash_value={self.hash_value!r}, created_at={self.created_at!r}, updated_at={self.updated_at!r})')
+
+
 class WordBankOrm(Base):
     """问答语料词句表"""
     __tablename__ = f'{database_config.db_prefix}word_bank'
@@ -493,15 +588,18 @@ __all__ = [
     'PluginOrm',
     'StatisticOrm',
     'HistoryOrm',
+    'HistoryWordFrequencyOrm',
     'BotSelfOrm',
     'EntityOrm',
     'FriendshipOrm',
     'SignInOrm',
+    'SignInSummaryOrm',
     'AuthSettingOrm',
     'CoolDownOrm',
     'SubscriptionSourceOrm',
     'SubscriptionOrm',
     'SocialMediaContentOrm',
     'ArtworkCollectionOrm',
+    'ArtworkTagOrm',
     'WordBankOrm',
 ]
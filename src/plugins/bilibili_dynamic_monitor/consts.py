@@ -28,11 +28,13 @@ IGNORED_DYNAMIC_TYPES: list[DynamicType] = [
 
 # 计划任务相关
 MONITOR_JOB_ID: Literal['bili_dynamic_update_monitor'] = 'bili_dynamic_update_monitor'
-"""动态检查的定时任务 ID"""
+"""动态检查的轮询监控名称"""
 AVERAGE_CHECKING_PER_MINUTE: int = 12
-"""每分钟检查动态的用户数(数值大小影响风控概率, 请谨慎调整)"""
+"""每分钟检查动态的用户数上限(数值大小影响风控概率, 请谨慎调整)"""
 CHECKING_DELAY_UNDER_RATE_LIMITING: int = 6
 """被风控时的延迟间隔"""
+CHECKING_INTERVAL_RANGE: tuple[int, int] = (2, 60)
+"""单个用户动态检查间隔的上下限, 根据用户的动态发布频率在此范围内调整, 单位分钟"""
 
 # 插件相关
 MODULE_NAME = str(__name__).rsplit('.', maxsplit=1)[0]
@@ -46,6 +48,7 @@ __all__ = [
     'MONITOR_JOB_ID',
     'AVERAGE_CHECKING_PER_MINUTE',
     'CHECKING_DELAY_UNDER_RATE_LIMITING',
+    'CHECKING_INTERVAL_RANGE',
     'MODULE_NAME',
     'PLUGIN_NAME',
 ]
@@ -9,10 +9,10 @@
 """
 
 from collections.abc import Sequence
+from datetime import datetime
 from typing import TYPE_CHECKING
 
 from nonebot import logger
-from nonebot.exception import ActionFailed
 
 from src.database import SocialMediaContentDAL, begin_db_session
 from src.exception import WebSourceException
@@ -20,9 +20,7 @@ from src.service import (
     OmegaEntity,
     OmegaMessage,
     OmegaMessageSegment,
-)
-from src.service import (
-    OmegaEntityInterface as OmEI,
+    broadcast_dispatcher,
 )
 from src.service import (
     OmegaMatcherInterface as OmMI,
@@ -128,6 +126,18 @@ async def query_all_subscribed_dynamic_sub_source() -> list[int]:
     return [int(x.sub_id) for x in source_res]
 
 
+async def query_dynamic_sub_source_activity(
+        user_ids: Sequence[str],
+        start_time: datetime,
+) -> list[tuple[str, datetime]]:
+    """获取用户在某时间之后新增动态的 (用户 UID, 记录时间), 用于估计用户的动态发布频率"""
+    async with begin_db_session() as session:
+        result = await SocialMediaContentDAL(session=session).query_users_created_times(
+            source=BILI_DYNAMIC_SUB_TYPE, uids=user_ids, start_time=start_time
+        )
+    return result
+
+
 async def query_subscribed_entity_by_bili_user(user_id: int | str) -> list['Entity']:
     """根据 Bilibili 用户查询已经订阅了这个用户的内部 Entity 对象"""
     async with begin_db_session() as session:
@@ -161,21 +171,27 @@ async def _has_notice_at_all_node(entity: OmegaEntity) -> bool:
         return False
 
 
-async def _msg_sender(entity: 'Entity', message: str | OmegaMessage) -> None:
-    """向 entity 发送动态消息"""
-    try:
-        async with begin_db_session() as session:
+async def _msg_sender(entities: Sequence['Entity'], message: str | OmegaMessage) -> None:
+    """向订阅对象发送动态消息"""
+    notice_at_all_entities: list[Entity] = []
+    other_entities: list[Entity] = []
+    async with begin_db_session() as session:
+        for entity in entities:
             internal_entity = await OmegaEntity.init_from_entity_index_id(session=session, index_id=entity.id)
-            interface = OmEI(entity=internal_entity)
-
             if await _has_notice_at_all_node(internal_entity):
-                message = OmegaMessageSegment.at_all() + message
+                notice_at_all_entities.append(entity)
+            else:
+                other_entities.append(entity)
 
-            await interface.send_entity_message(message=message)
-    except ActionFailed as e:
-        logger.warning(f'BilibiliDynamicMonitor | Sending message to {entity} failed with ActionFailed, {e!r}')
-    except Exception as e:
-        logger.error(f'BilibiliDynamicMonitor | Sending message to {entity} failed, {e!r}')
+    # 广播在后台执行, 订阅者较多时不受检查任务超时的影响, 避免已记录的动态未能发送给剩余订阅者
+    for targets, send_message in (
+            (notice_at_all_entities, OmegaMessageSegment.at_all() + message),
+            (other_entities, message),
+    ):
+        if targets:
+            broadcast_dispatcher.broadcast_in_background(
+                message=send_message, targets=targets, source='BilibiliDynamicMonitor'
+            )
 
 
 @run_async_delay(delay_time=8, random_sigma=4)
@@ -208,11 +224,8 @@ async def bili_dynamic_monitor_main(user_id: int | str) -> None:
 
     # 向订阅者发送新动态信息
     subscribed_entity = await query_subscribed_entity_by_bili_user(user_id=user_id)
-    send_tasks = [
-        _msg_sender(entity=entity, message=send_msg)
-        for entity in subscribed_entity for send_msg in send_messages
-    ]
-    await semaphore_gather(tasks=send_tasks, semaphore_num=2)
+    for send_msg in send_messages:
+        await _msg_sender(entities=subscribed_entity, message=send_msg)
 
 
 __all__ = [
@@ -220,5 +233,6 @@ __all__ = [
     'delete_dynamic_sub',
     'query_entity_subscribed_dynamic_sub_source',
     'query_all_subscribed_dynamic_sub_source',
+    'query_dynamic_sub_source_activity',
     'bili_dynamic_monitor_main',
 ]
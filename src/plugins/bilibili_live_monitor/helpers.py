@@ -8,20 +8,18 @@
 @Software       : PyCharm 
 """
 
+from collections.abc import Sequence
 from datetime import datetime
 from typing import TYPE_CHECKING
 
 from nonebot import logger
-from nonebot.exception import ActionFailed
 
 from src.database import begin_db_session
 from src.service import (
     OmegaEntity,
     OmegaMessage,
     OmegaMessageSegment,
-)
-from src.service import (
-    OmegaEntityInterface as OmEI,
+    broadcast_dispatcher,
 )
 from src.service import (
     OmegaMatcherInterface as OmMI,
@@ -149,21 +147,27 @@ async def _has_notice_at_all_node(entity: OmegaEntity) -> bool:
         return False
 
 
-async def _msg_sender(entity: 'Entity', message: str | OmegaMessage) -> None:
-    """向 entity 发送直播间通知"""
-    try:
-        async with begin_db_session() as session:
+async def _msg_sender(entities: Sequence['Entity'], message: str | OmegaMessage) -> None:
+    """向订阅对象发送直播间通知"""
+    notice_at_all_entities: list[Entity] = []
+    other_entities: list[Entity] = []
+    async with begin_db_session() as session:
+        for entity in entities:
             internal_entity = await OmegaEntity.init_from_entity_index_id(session=session, index_id=entity.id)
-            interface = OmEI(entity=internal_entity)
-
             if await _has_notice_at_all_node(internal_entity):
-                message = OmegaMessageSegment.at_all() + message
+                notice_at_all_entities.append(entity)
+            else:
+                other_entities.append(entity)
 
-            await interface.send_entity_message(message=message)
-    except ActionFailed as e:
-        logger.warning(f'BilibiliLiveRoomMonitor | Sending message to {entity} failed with ActionFailed, {e!r}')
-    except Exception as e:
-        logger.error(f'BilibiliLiveRoomMonitor | Sending message to {entity} failed, {e!r}')
+    for targets, send_message in (
+            (notice_at_all_entities, OmegaMessageSegment.at_all() + message),
+            (other_entities, message),
+    ):
+        result = await broadcast_dispatcher.broadcast(message=send_message, targets=targets)
+        if result.failed:
+            logger.warning(
+                f'BilibiliLiveRoomMonitor | Sending message to {result.failed} subscriber(s) failed, {result}'
+            )
 
 
 async def _process_bili_live_room_update(room_info: 'RoomInfoData') -> None:
@@ -180,12 +184,8 @@ async def _process_bili_live_room_update(room_info: 'RoomInfoData') -> None:
     subscribed_entity = await query_subscribed_entity_by_live_room(room_id=room_info.room_id)
 
     # 向订阅者发送直播间更新信息
-    send_tasks = [
-        _msg_sender(entity=entity, message=send_msg)
-        for entity in subscribed_entity
-        if send_msg is not None
-    ]
-    await semaphore_gather(tasks=send_tasks, semaphore_num=2)
+    if send_msg is not None:
+        await _msg_sender(entities=subscribed_entity, message=send_msg)
 
 
 async def bili_live_room_monitor_main() -> None:
@@ -8,7 +8,8 @@
 @Software       : PyCharm
 """
 
-from collections.abc import Sequence
+import hashlib
+from collections.abc import AsyncIterator, Sequence
 from datetime import datetime
 from typing import TYPE_CHECKING, Annotated
 
@@ -18,17 +19,24 @@ from nonebot.params import ArgStr, Depends, RawCommand
 from nonebot.plugin import on_command
 from nonebot.typing import T_State
 
+from src.compat import dump_json_as, parse_json_as
 from src.params.handler import get_command_str_single_arg_parser_handler
 from src.resource import StaticResource, TemporaryResource
 from src.service import OmegaMatcherInterface as OmMI
-from src.service import OmegaMessageSegment, enable_processor_state
+from src.service import OmegaMessageSegment, enable_processor_state, image_hash_index
 from src.utils import OmegaRequests, semaphore_gather
 from src.utils.image_searcher import ComplexImageSearcher, TraceMoe
+from src.utils.image_searcher.model import ImageSearchingResult
 from src.utils.image_utils import ImageUtils
 from src.utils.image_utils.template import PreviewImageModel, PreviewImageThumbs, generate_thumbs_preview_image
 
 if TYPE_CHECKING:
-    from src.utils.image_searcher.model import ImageSearchingResult
+    from src.utils.image_searcher.model import BaseImageSearcher
+
+_IMAGE_HASH_NAMESPACE: str = 'image_searcher'
+"""识图结果缓存所使用的图片感知哈希分类"""
+_RESULT_CACHE_DISTANCE: int = 4
+"""命中识图结果缓存的最大汉明距离"""
 
 
 @on_command(
@@ -63,16 +71,25 @@ async def handle_search_image(
             searcher = ComplexImageSearcher
 
     if msg_images:
-        search_coro = searcher(image_url=msg_images[0]).search()
+        search_iter = _iter_search_with_result_cache(searcher=searcher, image_url=msg_images[0])
     elif image_url and image_url.startswith(('http://', 'https://')):
-        search_coro = searcher(image_url=image_url).search()
+        search_iter = _iter_search_with_result_cache(searcher=searcher, image_url=image_url)
     else:
         await interface.finish_reply('不是可用的图片或图片链接, 请确认后重试')
 
     await interface.send_reply('获取识别结果中, 请稍候~')
 
     try:
-        searching_results = await search_coro
+        searching_results: list[ImageSearchingResult] = []
+        confident_replied = False
+        async for results in search_iter:
+            searching_results.extend(results)
+            # 首个高置信度结果到达后立即回复文本结果, 预览图在搜索结束后补发
+            confident_results = [x for x in results if searcher.is_confident_result(x)]
+            if confident_results and not confident_replied:
+                await interface.send_reply(f'匹配到高相似度结果:\n{_generate_result_desc_text(confident_results)}')
+                confident_replied = True
+
         if not searching_results:
             await interface.send_reply('没有找到相似度足够高的图片')
             return
@@ -98,6 +115,76 @@ async def handle_search_image(
         await interface.finish_reply('获取识别结果失败了, 发生了意外的错误, 请稍后再试')
 
 
+def _get_result_cache_file(resource_key: str) -> TemporaryResource:
+    return TemporaryResource('image_searcher', 'result_cache', f'{resource_key.replace("/", "_")}.json')
+
+
+async def _load_cached_results(resource_key: str) -> list[ImageSearchingResult] | None:
+    cache_file = _get_result_cache_file(resource_key=resource_key)
+    if not cache_file.is_file:
+        return None
+
+    async with cache_file.async_open('r', encoding='utf-8') as af:
+        content = await af.read()
+    try:
+        return parse_json_as(list[ImageSearchingResult], content)
+    except Exception as e:
+        logger.warning(f'ImageSearcher | 识图结果缓存 {resource_key} 已损坏, 忽略该缓存, {e!r}')
+        return None
+
+
+async def _iter_search_with_result_cache(
+        searcher: type['BaseImageSearcher'],
+        image_url: str,
+) -> AsyncIterator[list[ImageSearchingResult]]:
+    """逐批获取识图结果, 近似图片 (如同一图片的不同尺寸或压缩版本) 在缓存有效期内直接返回此前的识别结果
+
+    计算哈希时下载的图片内容同时交给识图引擎使用, 支持上传图片的识图引擎无需再次获取图片
+    """
+    try:
+        content = OmegaRequests.parse_content_as_bytes(await OmegaRequests(timeout=15).get(image_url))
+    except Exception as e:
+        logger.warning(f'ImageSearcher | 下载图片失败, 跳过识图结果缓存, {e!r}')
+        async for results in searcher(image_url=image_url).iter_search():
+            yield results
+        return
+
+    try:
+        hash_value = await image_hash_index.hash_bytes(content=content)
+    except Exception as e:
+        logger.warning(f'ImageSearcher | 计算图片哈希失败, 跳过识图结果缓存, {e!r}')
+        async for results in searcher(image_url=image_url, image_content=content).iter_search():
+            yield results
+        return
+
+    key_prefix = f'{searcher.__name__}/'
+    matches = await image_hash_index.query(
+        namespace=_IMAGE_HASH_NAMESPACE, hash_value=hash_value, max_distance=_RESULT_CACHE_DISTANCE
+    )
+    for match in matches:
+        if not match.resource_key.startswith(key_prefix):
+            continue
+        if (cached_results := await _load_cached_results(resource_key=match.resource_key)) is not None:
+            logger.debug(f'ImageSearcher | 命中识图结果缓存 {match.resource_key}, distance={match.distance}')
+            yield cached_results
+            return
+
+    searching_results = []
+    async for results in searcher(image_url=image_url, image_content=content).iter_search():
+        searching_results.extend(results)
+        yield results
+
+    # 未找到结果可能是识图引擎暂时不可用, 不缓存空结果
+    if not searching_results:
+        return
+
+    resource_key = f'{key_prefix}{hashlib.sha256(content).hexdigest()[:32]}'
+    await _get_result_cache_file(resource_key=resource_key).async_write_atomic(
+        dump_json_as(list[ImageSearchingResult], searching_results), encoding='utf-8'
+    )
+    await image_hash_index.add(namespace=_IMAGE_HASH_NAMESPACE, resource_key=resource_key, hash_value=hash_value)
+
+
 async def _fetch_result_as_preview_body(result: 'ImageSearchingResult') -> PreviewImageThumbs:
     requests = OmegaRequests(
         timeout=15,
@@ -131,12 +218,16 @@ async def _generate_result_preview_image(results: Sequence['ImageSearchingResult
     return preview_img_file
 
 
-async def _generate_result_desc_image(results: Sequence['ImageSearchingResult']) -> TemporaryResource:
-    preview_txt = '\n\n'.join(
+def _generate_result_desc_text(results: Sequence['ImageSearchingResult']) -> str:
+    return '\n\n'.join(
         f'来源: {result.source}\n相似度: {result.similarity if result.similarity else "未知"}\n来源地址:\n{url}'
         for result in results
         for url in result.source_urls or [None]
     )
+
+
+async def _generate_result_desc_image(results: Sequence['ImageSearchingResult']) -> TemporaryResource:
+    preview_txt = _generate_result_desc_text(results=results)
     image: ImageUtils = await ImageUtils.async_init_from_text(text=preview_txt)
     save_file_name = f'{datetime.now().strftime("%Y%m%d%H%M%S")}_{hash(preview_txt)}.jpg'
     return await image.save(TemporaryResource('image_searcher', 'desc', save_file_name))
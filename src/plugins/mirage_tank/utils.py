@@ -12,11 +12,11 @@ from collections.abc import Callable
 from datetime import datetime
 
 from PIL import Image, ImageEnhance, ImageMath, ImageOps
-from nonebot.utils import run_sync
 
 from src.resource import TemporaryResource
 from src.utils import OmegaRequests
 from src.utils.image_utils import ImageUtils
+from src.utils.render_executor import render_executor
 
 _TMP_FOLDER: TemporaryResource = TemporaryResource('mirage_tank')
 """缓存路径"""
@@ -46,13 +46,13 @@ async def generate_mirage_tank(
     base_image = await _load_image(image_content=base_image_content)
 
     if addition_image_url is None:
-        make_image = await run_sync(factory)(base_image.image)
+        make_image = await render_executor.run('mirage_tank', factory, base_image.image)
         base_image.set_image(image=make_image)
     else:
         addition_image_content = await _fetch_image(image_url=addition_image_url)
         addition_image = await _load_image(image_content=addition_image_content)
 
-        make_image = await run_sync(factory)(base_image.image, addition_image.image)
+        make_image = await render_executor.run('mirage_tank', factory, base_image.image, addition_image.image)
         base_image.set_image(image=make_image)
 
     output_file = _TMP_FOLDER(f'{factory.__name__}_{datetime.now().strftime("%Y%m%d%H%M%S")}.png'.strip('_'))
@@ -25,12 +25,19 @@ from .config import moe_plugin_config
 from .consts import ALLOW_R18_NODE
 from .helpers import (
     get_query_argument_parser,
+    get_query_num,
     has_allow_r18_node,
     parse_from_query_parser,
     prepare_send_image,
     query_artworks_from_database,
+    register_warm_pool_bucket,
+    take_prepared_images_from_warm_pool,
 )
 
+# 预先注册默认来源的萌图及涩图预热池分组
+register_warm_pool_bucket(allow_rating_range=(0, 0))
+register_warm_pool_bucket(allow_rating_range=(1, 2))
+
 
 @on_shell_command(
     '来点涩图',
@@ -72,26 +79,39 @@ async def handle_setu(
         if not allow_r18:
             await interface.finish_reply('没有涩涩的权限, 禁止开车车!')
 
-    artworks = await query_artworks_from_database(
+    query_num = get_query_num(num=parsed_args.num)
+    send_messages = take_prepared_images_from_warm_pool(
         keywords=keywords,
         origin=parsed_args.origin,
         all_origin=parsed_args.all_origin,
         allow_rating_range=allow_rating_range,
         latest=parsed_args.latest,
         ratio=parsed_args.ratio,
-        num=parsed_args.num,
+        num=query_num,
     )
 
-    if not artworks:
-        await interface.finish_reply('找不到涩图QAQ')
-
-    await interface.send_reply('稍等, 正在下载图片~')
-
-    send_messages = await semaphore_gather(
-        tasks=[prepare_send_image(x) for x in artworks],
-        semaphore_num=4,
-        filter_exception=True
-    )
+    # 预热池中的图片不足时实时查询补足
+    if (remain_num := query_num - len(send_messages)) > 0:
+        artworks = await query_artworks_from_database(
+            keywords=keywords,
+            origin=parsed_args.origin,
+            all_origin=parsed_args.all_origin,
+            allow_rating_range=allow_rating_range,
+            latest=parsed_args.latest,
+            ratio=parsed_args.ratio,
+            num=remain_num,
+        )
+
+        if not artworks and not send_messages:
+            await interface.finish_reply('找不到涩图QAQ')
+
+        if artworks:
+            await interface.send_reply('稍等, 正在下载图片~')
+            send_messages.extend(await semaphore_gather(
+                tasks=[prepare_send_image(x) for x in artworks],
+                semaphore_num=4,
+                filter_exception=True
+            ))
 
     if not send_messages:
         await interface.finish_reply('所有图片都获取失败了QAQ, 可能是网络原因或作品被删除, 请稍后再试')
@@ -140,26 +160,39 @@ async def handle_moe(
         if re.match(r'^[Rr]-?18[Gg]?$', word):
             keywords.remove(word)
 
-    artworks = await query_artworks_from_database(
+    query_num = get_query_num(num=parsed_args.num)
+    send_messages = take_prepared_images_from_warm_pool(
         keywords=keywords,
         origin=parsed_args.origin,
         all_origin=parsed_args.all_origin,
         allow_rating_range=(0, 0),
         latest=parsed_args.latest,
         ratio=parsed_args.ratio,
-        num=parsed_args.num,
+        num=query_num,
     )
 
-    if not artworks:
-        await interface.finish_reply('找不到萌图QAQ')
-
-    await interface.send_reply('稍等, 正在下载图片~')
-
-    send_messages = await semaphore_gather(
-        tasks=[prepare_send_image(x) for x in artworks],
-        semaphore_num=4,
-        filter_exception=True
-    )
+    # 预热池中的图片不足时实时查询补足
+    if (remain_num := query_num - len(send_messages)) > 0:
+        artworks = await query_artworks_from_database(
+            keywords=keywords,
+            origin=parsed_args.origin,
+            all_origin=parsed_args.all_origin,
+            allow_rating_range=(0, 0),
+            latest=parsed_args.latest,
+            ratio=parsed_args.ratio,
+            num=remain_num,
+        )
+
+        if not artworks and not send_messages:
+            await interface.finish_reply('找不到萌图QAQ')
+
+        if artworks:
+            await interface.send_reply('稍等, 正在下载图片~')
+            send_messages.extend(await semaphore_gather(
+                tasks=[prepare_send_image(x) for x in artworks],
+                semaphore_num=4,
+                filter_exception=True
+            ))
 
     if not send_messages:
         await interface.finish_reply('所有图片都获取失败了QAQ, 可能是网络原因或作品被删除, 请稍后再试')
@@ -15,13 +15,16 @@ from nonebot.log import logger
 from nonebot.rule import ArgumentParser, Namespace
 from pydantic import BaseModel, ConfigDict
 
-from src.service import OmegaMessageSegment
+from src.service import OmegaMessageSegment, artwork_warm_pool
 from src.service.artwork_collection import get_artwork_collection, get_artwork_collection_type
 from src.service.artwork_proxy.add_ons.image_ops import ImageOpsMixin
+from src.service.artwork_warm_pool import WarmPoolProducer
+from src.utils import semaphore_gather
 from .config import moe_plugin_config
 from .consts import ALL_MOE_PLUGIN_ARTWORK_ORIGIN, ALLOW_MOE_PLUGIN_ARTWORK_ORIGIN, ALLOW_R18_NODE
 
 if TYPE_CHECKING:
+    from src.resource import TemporaryResource
     from src.service import OmegaMatcherInterface
     from src.service.artwork_collection.typing import CollectedArtwork
 
@@ -82,6 +85,24 @@ def parse_from_query_parser(args: Namespace) -> QueryArguments:
     return QueryArguments.model_validate(args)
 
 
+def _get_query_origin(origin: ALLOW_MOE_PLUGIN_ARTWORK_ORIGIN | None, all_origin: bool) -> str | tuple[str, ...]:
+    """获取查询的作品来源"""
+    if all_origin:
+        return ALL_MOE_PLUGIN_ARTWORK_ORIGIN
+    elif origin is None:
+        return moe_plugin_config.moe_plugin_default_origin
+    else:
+        return origin
+
+
+def get_query_num(num: int = 0) -> int:
+    """根据用户参数及配置获取每次查询的图片数量"""
+    return min(
+        max(num, moe_plugin_config.moe_plugin_query_image_num),
+        moe_plugin_config.moe_plugin_query_image_limit
+    )
+
+
 async def query_artworks_from_database(
         keywords: Sequence[str],
         origin: ALLOW_MOE_PLUGIN_ARTWORK_ORIGIN | None = None,
@@ -89,45 +110,108 @@ async def query_artworks_from_database(
         allow_rating_range: tuple[int, int] = (0, 0),
         latest: bool = False,
         ratio: int | None = None,
-        num: int = 0,
+        num: int = 3,
 ) -> list['CollectedArtwork']:
-    """从数据库查询收藏作品, 特别的: 当参数 `origin` 值为 `none` 时代表从所有的来源随机获取"""
-    if all_origin:
-        query_origin = ALL_MOE_PLUGIN_ARTWORK_ORIGIN
-    elif origin is None:
-        query_origin = moe_plugin_config.moe_plugin_default_origin
-    else:
-        query_origin = origin
-
-    query_num = min(
-        max(num, moe_plugin_config.moe_plugin_query_image_num),
-        moe_plugin_config.moe_plugin_query_image_limit
-    )
+    """从数据库查询收藏作品, 特别的: 当参数 `origin` 值为 `none` 时代表从所有的来源随机获取
 
+    :param num: 查询的作品数量, 应先由 `get_query_num` 根据用户参数及配置确定
+    """
+    query_origin = _get_query_origin(origin=origin, all_origin=all_origin)
     order_mode: Literal['latest', 'random'] = 'latest' if latest else 'random'
 
     random_artworks = await get_artwork_collection_type().query_any_origin_by_condition(
-        keywords=keywords, origin=query_origin, num=query_num,
+        keywords=keywords, origin=query_origin, num=num,
         allow_classification_range=(2, 3), allow_rating_range=allow_rating_range, ratio=ratio, order_mode=order_mode,
     )
 
     return [get_artwork_collection(artwork=artwork) for artwork in random_artworks]
 
 
-async def prepare_send_image(collected_artwork: 'CollectedArtwork') -> OmegaMessageSegment:
-    """预处理待发送图片"""
+async def _prepare_send_image_file(collected_artwork: 'CollectedArtwork') -> 'TemporaryResource':
+    """下载并处理待发送图片"""
     if not isinstance(collected_artwork.artwork_proxy, ImageOpsMixin):
         raise RuntimeError(f'{collected_artwork} is not compatible with the image processing method')
 
-    output_file = await collected_artwork.artwork_proxy.get_proceed_page_file(no_blur_rating=3)
+    return await collected_artwork.artwork_proxy.get_proceed_page_file(no_blur_rating=3)
+
 
+async def prepare_send_image(collected_artwork: 'CollectedArtwork') -> OmegaMessageSegment:
+    """预处理待发送图片"""
+    output_file = await _prepare_send_image_file(collected_artwork=collected_artwork)
     return OmegaMessageSegment.image(url=output_file.path)
 
 
+def _get_warm_pool_key(query_origin: str | tuple[str, ...], allow_rating_range: tuple[int, int]) -> str:
+    """预热池分组名称, 按作品来源, 分类及分级范围分组"""
+    origin_key = query_origin if isinstance(query_origin, str) else ','.join(sorted(query_origin))
+    return f'moe:{origin_key}:c2-3:r{allow_rating_range[0]}-{allow_rating_range[1]}'
+
+
+def _warm_pool_producer(
+        query_origin: str | tuple[str, ...],
+        allow_rating_range: tuple[int, int],
+) -> WarmPoolProducer['TemporaryResource']:
+    """生成预热池分组的生产函数: 随机查询作品并下载处理图片"""
+
+    async def _producer(num: int) -> list['TemporaryResource']:
+        random_artworks = await get_artwork_collection_type().query_any_origin_by_condition(
+            keywords=[], origin=query_origin, num=num,
+            allow_classification_range=(2, 3), allow_rating_range=allow_rating_range, order_mode='random',
+        )
+        prepared_files = await semaphore_gather(
+            tasks=[_prepare_send_image_file(get_artwork_collection(artwork=x)) for x in random_artworks],
+            semaphore_num=4,
+            filter_exception=True
+        )
+        return list(prepared_files)
+
+    return _producer
+
+
+def register_warm_pool_bucket(
+        origin: ALLOW_MOE_PLUGIN_ARTWORK_ORIGIN | None = None,
+        all_origin: bool = False,
+        allow_rating_range: tuple[int, int] = (0, 0),
+) -> None:
+    """预先注册预热池分组, 使其在首次使用前即开始补充"""
+    query_origin = _get_query_origin(origin=origin, all_origin=all_origin)
+    artwork_warm_pool.register(
+        key=_get_warm_pool_key(query_origin=query_origin, allow_rating_range=allow_rating_range),
+        producer=_warm_pool_producer(query_origin=query_origin, allow_rating_range=allow_rating_range),
+        validator=lambda x: x.is_file,
+    )
+
+
+def take_prepared_images_from_warm_pool(
+        keywords: Sequence[str],
+        origin: ALLOW_MOE_PLUGIN_ARTWORK_ORIGIN | None = None,
+        all_origin: bool = False,
+        allow_rating_range: tuple[int, int] = (0, 0),
+        latest: bool = False,
+        ratio: int | None = None,
+        num: int = 3,
+) -> list[OmegaMessageSegment]:
+    """从预热池取出已处理好的图片, 仅适用于不带关键词及其他筛选条件的随机查询, 不足 num 张时由调用方实时查询补足"""
+    if keywords or latest or ratio is not None:
+        return []
+
+    query_origin = _get_query_origin(origin=origin, all_origin=all_origin)
+    prepared_files = artwork_warm_pool.take(
+        key=_get_warm_pool_key(query_origin=query_origin, allow_rating_range=allow_rating_range),
+        producer=_warm_pool_producer(query_origin=query_origin, allow_rating_range=allow_rating_range),
+        num=num,
+        validator=lambda x: x.is_file,
+    )
+    return [OmegaMessageSegment.image(url=x.path) for x in prepared_files]
+
+
 __all__ = [
     'has_allow_r18_node',
     'get_query_argument_parser',
+    'get_query_num',
     'parse_from_query_parser',
     'prepare_send_image',
     'query_artworks_from_database',
+    'register_warm_pool_bucket',
+    'take_prepared_images_from_warm_pool',
 ]
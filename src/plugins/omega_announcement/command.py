@@ -19,10 +19,8 @@ from nonebot.rule import to_me
 
 from src.database import EntityDAL
 from src.params.handler import get_command_message_arg_parser_handler
-from src.service import OmegaEntity, enable_processor_state
-from src.service import OmegaEntityInterface as OmEI
+from src.service import OmegaEntity, broadcast_dispatcher, enable_processor_state
 from src.service import OmegaMatcherInterface as OmMI
-from src.utils import semaphore_gather
 
 
 @on_command(
@@ -43,20 +41,24 @@ async def handle_announce(
     announce_message = interface.get_message_extractor()(message=announcement_content).message
 
     all_entity = await entity_dal.query_all()
-    tasks = []
+    announce_entity = []
     for entity in all_entity:
         internal_entity = await OmegaEntity.init_from_entity_index_id(session=entity_dal.db_session, index_id=entity.id)
-        if not await internal_entity.check_global_permission():
-            continue
-        tasks.append(OmEI(entity=internal_entity).send_entity_message(message=announce_message))
-
-    announce_result = await semaphore_gather(tasks=tasks, semaphore_num=3)
-    if any(isinstance(x, Exception) for x in announce_result):
-        logger.warning('Announce | 公告批量发送完成, 部分公告发送失败')
-        await interface.finish_reply('公告批量发送完成, 部分对象发送失败')
+        if await internal_entity.check_global_permission():
+            announce_entity.append(entity)
+
+    announce_result = await broadcast_dispatcher.broadcast(message=announce_message, targets=announce_entity)
+    if announce_result.failed:
+        logger.warning(f'Announce | 公告批量发送完成, 部分公告发送失败, {announce_result}')
+        await interface.finish_reply(
+            f'公告批量发送完成, 成功 {announce_result.succeeded} 个, 失败 {announce_result.failed} 个, '
+            f'跳过 {announce_result.skipped} 个'
+        )
     else:
-        logger.success('Announce | 公告批量发送完成')
-        await interface.finish_reply('公告批量发送完成, 所有对象均已发送成功')
+        logger.success(f'Announce | 公告批量发送完成, {announce_result}')
+        await interface.finish_reply(
+            f'公告批量发送完成, 成功 {announce_result.succeeded} 个, 跳过 {announce_result.skipped} 个'
+        )
 
 
 __all__ = []
@@ -19,13 +19,14 @@ from pydantic import BaseModel, ConfigDict
 
 from src.params.handler import get_shell_command_parse_failed_handler
 from src.service import OmegaMatcherInterface as OmMI
-from src.service import OmegaMessage, OmegaMessageSegment, enable_processor_state
+from src.service import OmegaMessage, OmegaMessageSegment, artwork_warm_pool, enable_processor_state
 from src.utils import semaphore_gather
 from .consts import ALLOW_R18_NODE
 
 if TYPE_CHECKING:
     from nonebot.typing import T_Handler
 
+    from src.resource import TemporaryResource
     from src.service.artwork_proxy.add_ons.image_ops import ImageOpsMixin
 
 
@@ -120,24 +121,55 @@ class ArtworkHandlerManager[T: 'ImageOpsMixin']:
         else:
             await interface.send_reply(send_msg)
 
-    async def _send_artworks_preview_message(
+    async def _generate_artworks_preview(
             self,
-            interface: OmMI,
             title: str,
             artworks: Sequence[T],
             *,
             no_blur_rating: int = 1,
-    ) -> None:
+    ) -> 'TemporaryResource':
         """生成多个作品的预览图"""
-        need_revoke = True if no_blur_rating >= 2 else False
-
-        preview_image = await self._artwork_class.generate_artworks_preview(
+        return await self._artwork_class.generate_artworks_preview(
             preview_name=title,
             artworks=artworks,
             no_blur_rating=no_blur_rating,
             preview_size=(360, 360),
             num_of_line=6,
         )
+
+    async def _generate_random_artworks_preview(self, *, no_blur_rating: int = 1) -> 'TemporaryResource':
+        """生成随机作品的预览图"""
+        return await self._generate_artworks_preview(
+            title=f'{self._command_name.title()} Random Artworks',
+            artworks=await self._artwork_class.random(),
+            no_blur_rating=no_blur_rating,
+        )
+
+    def _take_random_artworks_preview_from_warm_pool(self, *, no_blur_rating: int = 1) -> 'TemporaryResource | None':
+        """从预热池取出已生成的随机作品预览图, 预热池为空时返回 None"""
+
+        async def _producer(num: int) -> list['TemporaryResource']:
+            # 预览图生成开销较大, 每次补充仅生成一张
+            return [await self._generate_random_artworks_preview(no_blur_rating=no_blur_rating)]
+
+        previews = artwork_warm_pool.take(
+            key=f'any_artworks:{self._command_name}:random:nb{no_blur_rating}',
+            producer=_producer,
+            num=1,
+            size=2,
+            validator=lambda x: x.is_file,
+        )
+        return previews[0] if previews else None
+
+    @staticmethod
+    async def _send_artworks_preview_message(
+            interface: OmMI,
+            preview_image: 'TemporaryResource',
+            *,
+            no_blur_rating: int = 1,
+    ) -> None:
+        """发送作品预览图"""
+        need_revoke = True if no_blur_rating >= 2 else False
         send_msg = OmegaMessageSegment.image(preview_image.path)
 
         if need_revoke:
@@ -163,23 +195,32 @@ class ArtworkHandlerManager[T: 'ImageOpsMixin']:
             allow_r18 = await self._has_allow_r18_node(interface=interface)
             no_blur_rating = 3 if allow_r18 else 1
 
-            await interface.send_reply('稍等, 正在获取作品信息~')
+            # 随机作品优先使用预热池中已生成的预览图
+            random_preview = (
+                self._take_random_artworks_preview_from_warm_pool(no_blur_rating=no_blur_rating)
+                if parsed_args.random else None
+            )
+            if random_preview is None:
+                await interface.send_reply('稍等, 正在获取作品信息~')
 
             try:
                 if parsed_args.random:
-                    artworks = await self._artwork_class.random()
+                    if random_preview is None:
+                        random_preview = await self._generate_random_artworks_preview(no_blur_rating=no_blur_rating)
                     await self._send_artworks_preview_message(
                         interface=interface,
-                        title=f'{self._command_name.title()} Random Artworks',
-                        artworks=artworks,
+                        preview_image=random_preview,
                         no_blur_rating=no_blur_rating,
                     )
                 elif parsed_args.search:
                     artworks = await self._artwork_class.search(keyword=keyword, page=parsed_args.page)
                     await self._send_artworks_preview_message(
                         interface=interface,
-                        title=f'{self._command_name.title()} Search: {keyword}',
-                        artworks=artworks,
+                        preview_image=await self._generate_artworks_preview(
+                            title=f'{self._command_name.title()} Search: {keyword}',
+                            artworks=artworks,
+                            no_blur_rating=no_blur_rating,
+                        ),
                         no_blur_rating=no_blur_rating,
                     )
                 elif (artwork_id := keyword.strip()).isdigit():
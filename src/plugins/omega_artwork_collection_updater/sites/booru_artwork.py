@@ -22,7 +22,6 @@ from src.service.artwork_proxy import (
     KonachanSafeArtworkProxy,
     YandereArtworkProxy,
 )
-from src.utils import semaphore_gather
 
 if TYPE_CHECKING:
     from src.service.artwork_collection.typing import ArtworkCollectionType
@@ -44,8 +43,10 @@ class BooruArtworksUpdater:
             artworks: Sequence['ProxiedArtwork'],
             semaphore_num: int = 4,
     ) -> None:
-        tasks = [ac_t(x.s_aid).add_artwork_into_database_ignore_exists() for x in artworks]
-        await semaphore_gather(tasks=tasks, semaphore_num=semaphore_num, return_exceptions=False)
+        # 搜索结果已包含作品元数据, 不再逐个查询作品信息
+        await ac_t.add_artworks_into_database_ignore_exists(
+            artworks=artworks, index_image_hash=True, semaphore_num=semaphore_num
+        )
 
     @classmethod
     async def update_danbooru_high_score_sfw_artworks(cls) -> None:
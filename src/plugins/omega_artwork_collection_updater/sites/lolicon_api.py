@@ -18,6 +18,8 @@ from src.utils import BaseCommonAPI, semaphore_gather
 if TYPE_CHECKING:
     from nonebot.internal.driver import CookieTypes, HeaderTypes
 
+    from src.service.artwork_proxy.internal import BaseArtworkProxy
+
 
 class BaseLoliconModel(BaseModel):
     model_config = ConfigDict(extra='ignore', frozen=True, coerce_numbers_to_str=True)
@@ -76,22 +78,29 @@ class LoliconAPI(BaseCommonAPI):
         json = {'r18': str(r18), 'num': str(num)}
         return LoliconAPIReturn.model_validate(await cls._post_json(url=cls._get_setu_api_url(), json=json))
 
-    @classmethod
-    async def _add_lolicon_setu_into_database(cls, pixiv_ac: PixivArtworkCollection) -> None:
-        """在数据库中添加作品信息"""
-        artwork_data = await pixiv_ac.artwork_proxy.query()
-
-        classification = 1 if artwork_data.classification == 1 else 2
-        rating = 3 if artwork_data.rating == 3 else 1
-
-        await pixiv_ac.add_artwork_into_database_ignore_exists(classification=classification, rating=rating)
-
     @classmethod
     async def update_lolicon_setu(cls) -> None:
         """从 lolicon API 获取涩图数据并导入数据库"""
         setu_data = await cls._query_setu(r18=2, num=20)
-        tasks = [cls._add_lolicon_setu_into_database(PixivArtworkCollection(artwork_id=x.pid)) for x in setu_data.data]
-        await semaphore_gather(tasks=tasks, semaphore_num=8, return_exceptions=False)
+
+        # 仅查询数据库中还不存在的作品信息
+        not_exists_pids = await PixivArtworkCollection.query_not_exists_aids(aids=[str(x.pid) for x in setu_data.data])
+        artworks = [PixivArtworkCollection(artwork_id=x).artwork_proxy for x in not_exists_pids]
+        await semaphore_gather(tasks=[x.query() for x in artworks], semaphore_num=8, return_exceptions=True)
+
+        # 按写入的分类分级分组后批量导入
+        grouped_artworks: dict[tuple[int, int], list[BaseArtworkProxy]] = {}
+        for artwork in artworks:
+            if artwork.artwork_data is None:
+                continue
+            classification = 1 if artwork.artwork_data.classification == 1 else 2
+            rating = 3 if artwork.artwork_data.rating == 3 else 1
+            grouped_artworks.setdefault((classification, rating), []).append(artwork)
+
+        for (classification, rating), group in grouped_artworks.items():
+            await PixivArtworkCollection.add_artworks_into_database_ignore_exists(
+                artworks=group, classification=classification, rating=rating
+            )
 
 
 __all__ = [
@@ -12,7 +12,6 @@ from asyncio import sleep as async_sleep
 from collections.abc import Sequence
 
 from src.service.artwork_collection import PixivArtworkCollection
-from src.utils import semaphore_gather
 from src.utils.pixiv_api import PixivArtwork
 
 
@@ -21,8 +20,9 @@ class PixivArtworkUpdater:
 
     @staticmethod
     async def _add_artwork_into_database(pids: Sequence[int], semaphore_num: int = 8) -> None:
-        tasks = [PixivArtworkCollection(x).add_artwork_into_database_ignore_exists() for x in pids]
-        await semaphore_gather(tasks=tasks, semaphore_num=semaphore_num, return_exceptions=False)
+        await PixivArtworkCollection.add_artworks_into_database_ignore_exists(
+            artworks=pids, index_image_hash=True, semaphore_num=semaphore_num
+        )
 
     @classmethod
     async def update_random_discovery_artworks(cls) -> None:
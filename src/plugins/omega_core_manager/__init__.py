@@ -28,7 +28,8 @@ __plugin_meta__ = PluginMetadata(
           '/omega.allow-plugin-node [plugin_name] [auth_node]\n'
           '/omega.deny-plugin-node [plugin_name] [auth_node]\n'
           '/omega.list-configured-auth\n'
-          '/omega.set-limiting [seconds]',
+          '/omega.set-limiting [seconds]\n'
+          '/omega.resource-cache [sweep]',
     config=None,
     extra={'author': 'Ailitonia'},
 )
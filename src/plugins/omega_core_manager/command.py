@@ -22,7 +22,7 @@ from nonebot.typing import T_State
 from src.database import PluginDAL
 from src.params.permission import IS_ADMIN
 from src.service import OmegaMatcherInterface as OmMI
-from src.service import enable_processor_state
+from src.service import enable_processor_state, resource_cache
 from .helpers import get_all_plugins_desc, get_plugin_auth_node, get_plugin_desc, list_command_by_priority
 from .status import get_status
 
@@ -351,4 +351,29 @@ async def handle_set_limiting(
         await interface.matcher.send('Omega 设置流控限制失败, 请联系管理员处理')
 
 
+@omega.command(
+    'resource-cache', aliases={'OmegaResourceCache', 'omega_resource_cache'}, handlers=[handle_parse_args]
+).handle()
+async def handle_resource_cache(matcher: Matcher, state: T_State) -> None:
+    operation = state.get('omega_arg_0', '').strip().lower()
+
+    try:
+        if operation == 'sweep':
+            usages = await resource_cache.sweep()
+            evicted_count = sum(x.evicted_count for x in usages)
+            evicted_size = sum(x.evicted_size for x in usages)
+            await matcher.send(f'已清理缓存文件 {evicted_count} 个, 共 {evicted_size / 1024 / 1024:.2f} MB')
+
+        usages = await resource_cache.statistics()
+        usage_text = '\n'.join(
+            f'{x.namespace}: {x.used / 1024 / 1024:.1f}/{x.budget // 1024 // 1024} MB ({x.usage_ratio:.0%}), '
+            f'{x.file_count} 个文件, 累计清理 {x.evicted_count} 个 ({x.evicted_size / 1024 / 1024:.1f} MB)'
+            for x in usages
+        )
+        await matcher.send(f'Omega 临时资源缓存占用:\n\n{usage_text}')
+    except Exception as e:
+        logger.error(f'查询 Omega 临时资源缓存占用失败, {e!r}')
+        await matcher.send('查询 Omega 临时资源缓存占用失败, 请稍后再试或联系管理员处理')
+
+
 __all__ = []
@@ -14,7 +14,7 @@ from datetime import datetime
 from io import BytesIO
 from typing import TYPE_CHECKING, Literal, Optional, Union
 
-from PIL import Image, ImageDraw, ImageFont
+from PIL import Image, ImageDraw
 from nonebot.log import logger
 from nonebot.utils import run_sync
 from pydantic import BaseModel
@@ -22,7 +22,7 @@ from pydantic import BaseModel
 from src.compat import parse_json_as, parse_obj_as
 from src.service.artwork_collection import get_artwork_collection, get_artwork_collection_type
 from src.utils import OmegaRequests
-from src.utils.image_utils import ImageUtils
+from src.utils.image_utils import ImageUtils, load_font
 from .config import sign_in_config, sign_local_resource_config
 
 if TYPE_CHECKING:
@@ -323,19 +323,19 @@ async def generate_signin_card(
 
         # 字体
         bd_font_path = sign_local_resource_config.default_bold_font.resolve_path
-        bd_font = ImageFont.truetype(bd_font_path, width // 10)
-        bd_title_font = ImageFont.truetype(bd_font_path, width // 12)
-        bd_text_font = ImageFont.truetype(bd_font_path, width // 18)
+        bd_font = load_font(bd_font_path, width // 10)
+        bd_title_font = load_font(bd_font_path, width // 12)
+        bd_text_font = load_font(bd_font_path, width // 18)
 
         main_font_path = sign_local_resource_config.default_font.resolve_path
-        text_font = ImageFont.truetype(main_font_path, width // 28)
+        text_font = load_font(main_font_path, width // 28)
 
         level_font_path = sign_local_resource_config.default_level_font.resolve_path
-        level_font = ImageFont.truetype(level_font_path, width // 20)
+        level_font = load_font(level_font_path, width // 20)
 
         bottom_font_path = sign_local_resource_config.default_footer_font.resolve_path
-        bottom_text_font = ImageFont.truetype(bottom_font_path, width // 40)
-        remark_text_font = ImageFont.truetype(bottom_font_path, width // 54)
+        bottom_text_font = load_font(bottom_font_path, width // 40)
+        remark_text_font = load_font(bottom_font_path, width // 54)
 
         # 打招呼
         if 4 <= datetime.now().hour < 11:
@@ -23,6 +23,7 @@ from nonebot.adapters.onebot.v11 import (
 from src.compat import parse_json_as, parse_obj_as
 from src.database import HistoryDAL, begin_db_session
 from src.service import OmegaMatcherInterface
+from src.service.omega_processor import flush_message_history
 
 type MessageHistory = tuple[datetime, OneBotV11Message]
 """查询到的消息记录: 消息发送时间, 消息内容"""
@@ -38,6 +39,8 @@ async def query_message_from_adapter(bot: OneBotV11Bot, message_id: int) -> Mess
 
 async def query_message_from_database(bot: OneBotV11Bot, event: OneBotV11Event, message_id: int) -> MessageHistory:
     """从数据库查询用户消息"""
+    # 消息历史记录为批量延迟写入, 查询前先写入缓冲队列中的记录, 避免查询不到刚收到的消息
+    await flush_message_history()
     async with begin_db_session() as session:
         event_entity = OmegaMatcherInterface.get_entity(bot, event, session, acquire_type='event')
         user_entity = OmegaMatcherInterface.get_entity(bot, event, session, acquire_type='user')
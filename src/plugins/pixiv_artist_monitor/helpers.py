@@ -13,17 +13,13 @@ from collections.abc import Callable, Coroutine, Sequence
 from datetime import datetime
 from typing import TYPE_CHECKING, Any, Literal
 
-from nonebot.exception import ActionFailed
 from nonebot.log import logger
 
 from src.database import begin_db_session
 from src.service import (
-    OmegaEntity,
     OmegaMessage,
     OmegaMessageSegment,
-)
-from src.service import (
-    OmegaEntityInterface as OmEI,
+    broadcast_dispatcher,
 )
 from src.service import (
     OmegaMatcherInterface as OmMI,
@@ -123,6 +119,14 @@ async def query_all_subscribed_pixiv_user_sub_source() -> list[int]:
     return [int(x.sub_id) for x in source_res]
 
 
+async def query_pixiv_user_sub_source_activity(
+        uids: Sequence[str],
+        start_time: datetime,
+) -> list[tuple[str, datetime]]:
+    """获取用户在某时间之后收录作品的 (用户 UID, 收录时间), 用于估计用户的作品发布频率"""
+    return await PixivArtworkCollection.query_users_created_times(uids=uids, start_time=start_time)
+
+
 async def query_subscribed_entity_by_pixiv_user(pixiv_user: 'PixivUser') -> list['Entity']:
     """根据 Pixiv 用户查询已经订阅了这个用户的内部 Entity 对象"""
     async with begin_db_session() as session:
@@ -164,17 +168,11 @@ async def _format_pixiv_user_new_artwork_message(
     return send_msg
 
 
-async def _msg_sender(entity: 'Entity', message: OmegaMessage) -> None:
-    """向 entity 发送消息"""
-    try:
-        async with begin_db_session() as session:
-            internal_entity = await OmegaEntity.init_from_entity_index_id(session=session, index_id=entity.id)
-            interface = OmEI(entity=internal_entity)
-            await interface.send_entity_message(message=message)
-    except ActionFailed as e:
-        logger.warning(f'PixivUserSubscriptionMonitor | Sending message to {entity} failed with ActionFailed, {e!r}')
-    except Exception as e:
-        logger.error(f'PixivUserSubscriptionMonitor | Sending message to {entity} failed, {e!r}')
+async def _msg_sender(entities: Sequence['Entity'], message: OmegaMessage) -> None:
+    """向订阅对象发送消息, 广播在后台执行, 订阅者较多时不受检查任务超时的影响"""
+    broadcast_dispatcher.broadcast_in_background(
+        message=message, targets=entities, source='PixivUserSubscriptionMonitor'
+    )
 
 
 async def pixiv_user_new_artworks_monitor_main(pixiv_user: 'PixivUser') -> None:
@@ -205,11 +203,8 @@ async def pixiv_user_new_artworks_monitor_main(pixiv_user: 'PixivUser') -> None:
 
     # 向订阅者发送新作品信息
     subscribed_entity = await query_subscribed_entity_by_pixiv_user(pixiv_user=pixiv_user)
-    send_tasks = [
-        _msg_sender(entity=entity, message=send_msg)
-        for entity in subscribed_entity for send_msg in send_messages
-    ]
-    await semaphore_gather(tasks=send_tasks, semaphore_num=2)
+    for send_msg in send_messages:
+        await _msg_sender(entities=subscribed_entity, message=send_msg)
 
 
 """作品预览图生成工具"""
@@ -275,6 +270,7 @@ __all__ = [
     'delete_pixiv_user_sub',
     'query_entity_subscribed_pixiv_user_sub_source',
     'query_all_subscribed_pixiv_user_sub_source',
+    'query_pixiv_user_sub_source_activity',
     'pixiv_user_new_artworks_monitor_main',
     'generate_artworks_preview',
     'get_ranking_preview_factory',
@@ -8,51 +8,48 @@
 @Software       : PyCharm 
 """
 
-from nonebot.log import logger
+from typing import Literal
 
-from src.service import scheduler
-from src.utils import run_async_with_time_limited, semaphore_gather
+from src.service import PollingMonitor, polling_engine, scheduler
 from src.utils.pixiv_api import PixivUser
-from .helpers import pixiv_user_new_artworks_monitor_main, query_all_subscribed_pixiv_user_sub_source
+from .helpers import (
+    pixiv_user_new_artworks_monitor_main,
+    query_all_subscribed_pixiv_user_sub_source,
+    query_pixiv_user_sub_source_activity,
+)
+
+_MONITOR_JOB_ID: Literal['pixiv_user_new_artworks_monitor'] = 'pixiv_user_new_artworks_monitor'
+"""Pixiv 用户作品更新检查的轮询监控名称"""
+_AVERAGE_CHECKING_PER_MINUTE: float = 20
+"""每分钟检查作品的用户数上限"""
+_CHECKING_DELAY_UNDER_RATE_LIMITING: int = 5
+"""被风控时的延迟间隔"""
+_CHECKING_INTERVAL_RANGE: tuple[int, int] = (5, 120)
+"""单个用户作品检查间隔的上下限, 根据用户的作品发布频率在此范围内调整, 单位分钟"""
 
 
-@run_async_with_time_limited(delay_time=300)
-async def pixiv_user_new_artworks_monitor() -> None:
+async def pixiv_user_new_artworks_monitor(uid: str) -> None:
     """Pixiv 用户订阅 作品更新监控"""
-    logger.debug('PixivUserSubscriptionMonitor | Started checking pixiv user artworks update')
-
-    # 获取所有已添加的 Pixiv 用户订阅源
-    subscribed_uid = await query_all_subscribed_pixiv_user_sub_source()
-    if not subscribed_uid:
-        logger.debug('PixivUserSubscriptionMonitor | No pixiv user subscription, ignore')
-        return
-
-    # 检查新作品并发送消息
-    tasks = [pixiv_user_new_artworks_monitor_main(pixiv_user=PixivUser(uid=uid)) for uid in subscribed_uid]
-    await semaphore_gather(tasks=tasks, semaphore_num=3, return_exceptions=True)
-
-    logger.debug('PixivUserSubscriptionMonitor | Pixiv user artworks update checking completed')
-
-
-scheduler.add_job(
-    pixiv_user_new_artworks_monitor,
-    'cron',
-    # year=None,
-    # month=None,
-    # day='*/1',
-    # week=None,
-    # day_of_week=None,
-    # hour=None,
-    minute='*/5',
-    second='47',
-    # start_date=None,
-    # end_date=None,
-    # timezone=None,
-    id='pixiv_user_new_artworks_monitor',
-    coalesce=True,
-    max_instances=1,
-    misfire_grace_time=300,
+    await pixiv_user_new_artworks_monitor_main(pixiv_user=PixivUser(uid=int(uid)))
+
+
+# 各用户的检查间隔根据其作品发布频率调整, 全部用户共享 pixiv 的请求预算
+polling_engine.register_domain(
+    'pixiv',
+    rate_per_minute=_AVERAGE_CHECKING_PER_MINUTE,
+    concurrency=3,
+    backoff=_CHECKING_DELAY_UNDER_RATE_LIMITING * 60,
 )
+polling_engine.register(PollingMonitor(
+    name=_MONITOR_JOB_ID,
+    domain='pixiv',
+    query_sources=query_all_subscribed_pixiv_user_sub_source,
+    check=pixiv_user_new_artworks_monitor,
+    query_activity=query_pixiv_user_sub_source_activity,
+    min_interval=_CHECKING_INTERVAL_RANGE[0] * 60,
+    max_interval=_CHECKING_INTERVAL_RANGE[1] * 60,
+    timeout=300,
+))
 
 
 __all__ = [
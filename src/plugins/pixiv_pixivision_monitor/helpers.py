@@ -12,18 +12,14 @@ from collections.abc import Sequence
 from typing import TYPE_CHECKING
 
 from nonebot import logger
-from nonebot.exception import ActionFailed
 
 from src.database import SocialMediaContentDAL, begin_db_session
 from src.database.internal.subscription_source import SubscriptionSource, SubscriptionSourceType
 from src.resource import TemporaryResource
 from src.service import (
-    OmegaEntity,
     OmegaMessage,
     OmegaMessageSegment,
-)
-from src.service import (
-    OmegaEntityInterface as OmEI,
+    broadcast_dispatcher,
 )
 from src.service import (
     OmegaMatcherInterface as OmMI,
@@ -196,17 +192,13 @@ async def format_pixivision_article_message(article: Pixivision, msg_prefix: str
     return send_message
 
 
-async def _msg_sender(entity: 'Entity', message: str | OmegaMessage) -> None:
-    """向 entity 发送消息"""
-    try:
-        async with begin_db_session() as session:
-            internal_entity = await OmegaEntity.init_from_entity_index_id(session=session, index_id=entity.id)
-            interface = OmEI(entity=internal_entity)
-            await interface.send_entity_message(message=message)
-    except ActionFailed as e:
-        logger.warning(f'PixivisionArticleMonitor | Sending message to {entity} failed with ActionFailed, {e!r}')
-    except Exception as e:
-        logger.error(f'PixivisionArticleMonitor | Sending message to {entity} failed, {e!r}')
+async def _msg_sender(entities: Sequence['Entity'], message: str | OmegaMessage) -> None:
+    """向订阅对象发送消息"""
+    result = await broadcast_dispatcher.broadcast(message=message, targets=entities)
+    if result.failed:
+        logger.warning(
+            f'PixivisionArticleMonitor | Sending message to {result.failed} subscriber(s) failed, {result}'
+        )
 
 
 async def pixivision_monitor_main() -> None:
@@ -237,11 +229,8 @@ async def pixivision_monitor_main() -> None:
 
     # 向订阅者发送新动态信息
     subscribed_entity = await _query_subscribed_entity()
-    send_tasks = [
-        _msg_sender(entity=entity, message=send_msg)
-        for entity in subscribed_entity for send_msg in send_messages
-    ]
-    await semaphore_gather(tasks=send_tasks, semaphore_num=2)
+    for send_msg in send_messages:
+        await _msg_sender(entities=subscribed_entity, message=send_msg)
 
 
 __all__ = [
@@ -194,6 +194,7 @@ async def handle_roll_clear_attr(
         exist_attr = await interface.entity.query_auth_setting(module=MODULE_NAME, plugin=PLUGIN_NAME, node=attr_node)
         await auth_dal.delete(id_=exist_attr.id)
         await auth_dal.commit_session()
+        interface.entity.invalidate_cache()
 
         await interface.send_reply(f'你移除了{attr!r}属性/技能')
     except Exception as e:
@@ -220,6 +221,7 @@ async def handle_roll_clear_all_attr(
             if attrs.node.startswith(ATTR_PREFIX):
                 await auth_dal.delete(id_=attrs.id)
         await auth_dal.commit_session()
+        interface.entity.invalidate_cache()
 
         removed_attrs = [x.node.removeprefix(ATTR_PREFIX) for x in exist_attrs if x.node.startswith(ATTR_PREFIX)]
         await interface.finish_reply(f'你移除了{", ".join(removed_attrs)!r}属性/技能')
@@ -16,8 +16,9 @@ from typing import TYPE_CHECKING, Literal, Optional
 
 import imageio.v3 as iio
 from PIL import Image
-from nonebot.utils import run_sync
 
+from src.utils.image_utils import load_static_image
+from src.utils.render_executor import render_executor
 from .consts import STICKER_OUTPUT_PATH
 
 if TYPE_CHECKING:
@@ -184,7 +185,7 @@ class BaseStickerRender(abc.ABC):
 
         output_images = self._main_render(
             text=self.get_text(),
-            static_images=[Image.open(x.path) for x in self.get_static_images()],
+            static_images=[load_static_image(x) for x in self.get_static_images()],
             external_image=external_image,
             fonts=self.get_default_fonts(),
             output_width=self.get_output_width(),
@@ -216,16 +217,19 @@ class BaseStickerRender(abc.ABC):
 
         return save_file
 
-    @run_sync
-    def _async_make(self) -> 'TemporaryResource':
-        """异步执行默认的表情包处理流程"""
-        return self._make()
+    async def _async_make(self) -> 'TemporaryResource':
+        """异步执行默认的表情包处理流程, 在渲染执行器中运行"""
+        return await render_executor.run('sticker', _make_sticker, self)
 
     async def make(self) -> 'TemporaryResource':
         """表情包制作入口函数, 默认使用 self._async_make 方法制作表情包并输出, 但可被重载并自定义其他制作流程"""
         return await self._async_make()
 
 
+def _make_sticker(render: BaseStickerRender) -> 'TemporaryResource':
+    return render._make()
+
+
 __all__ = [
     'BaseStickerRender',
 ]
@@ -13,10 +13,10 @@ from datetime import date
 from typing import TYPE_CHECKING, Any, Literal, Optional
 
 import numpy
-from PIL import Image, ImageDraw, ImageEnhance, ImageFont
+from PIL import Image, ImageDraw, ImageEnhance
 
 from src.utils import OmegaRequests
-from src.utils.image_utils import ImageUtils
+from src.utils.image_utils import ImageUtils, load_font
 from src.utils.tencent_cloud_api import TencentTMT
 from .consts import FONT_RESOURCE, STATIC_RESOURCE, TMP_PATH
 from .model import BaseStickerRender
@@ -72,13 +72,13 @@ class TraitorRender(BaseStickerRender):
         # 处理文字层 字数部分
         text_num_img = Image.new(mode='RGBA', size=image.size, color=(0, 0, 0, 0))
         font_num_size = int(image.width / 16.6)
-        font_num = ImageFont.truetype(fonts[0].resolve_path, font_num_size)
+        font_num = load_font(fonts[0].resolve_path, font_num_size)
         ImageDraw.Draw(text_num_img).text(xy=(0, 0), text=f'{len(text)}/100', font=font_num, fill=(255, 255, 255))
 
         # 处理文字层 主体部分
         text_main_img = Image.new(mode='RGBA', size=image.size, color=(0, 0, 0, 0))
         font_main_size = int(image.width / 15.6)
-        font_main = ImageFont.truetype(fonts[0].resolve_path, font_main_size)
+        font_main = load_font(fonts[0].resolve_path, font_main_size)
         # 按长度切分文本
         test_main_fin = ImageUtils.split_multiline_text(text=text, width=int(image.width * 0.53), font=font_main)
         ImageDraw.Draw(text_main_img).multiline_text(xy=(0, 0), text=test_main_fin, font=font_main, spacing=12,
@@ -140,7 +140,7 @@ class JichouRender(BaseStickerRender):
         text = f'今天是{date.today().strftime("%Y年%m月%d日")}\n{text}，这个仇我先记下了'
 
         font_main_size = int(image.width / 12)
-        font = ImageFont.truetype(fonts[0].resolve_path, font_main_size)
+        font = load_font(fonts[0].resolve_path, font_main_size)
         # 按长度切分文本
         text_main_fin = ImageUtils.split_multiline_text(text=text, width=(image.width * 7 // 8), font=font)
         _, text_h = ImageUtils.get_text_size(text=text_main_fin, font=font)
@@ -209,7 +209,7 @@ class PhLogoRender(BaseStickerRender):
                 white_text = text[:len(text) // 2]
                 yellow_text = text[len(text) // 2:]
 
-        font = ImageFont.truetype(fonts[0].resolve_path, 320)
+        font = load_font(fonts[0].resolve_path, 320)
 
         # 分别确定两边文字的大小
         w_text_width, text_height = ImageUtils.get_text_size(white_text, font)
@@ -300,7 +300,7 @@ class LuxunSayRender(BaseStickerRender):
         text = '我没说过' if text is None else text
         font_size = image.width // 15
         text_stroke_width = int(font_size / 15)
-        font = ImageFont.truetype(fonts[0].resolve_path, font_size)
+        font = load_font(fonts[0].resolve_path, font_size)
         text_width_limit = int(image.width * 0.8125)
 
         sign_text = '—— 鲁迅'
@@ -395,7 +395,7 @@ class JiangzhuangRender(BaseStickerRender):
         # 处理文本主体
         text = ' ' if text is None else text
         font_size = image.width // 22
-        font = ImageFont.truetype(fonts[0].resolve_path, font_size)
+        font = load_font(fonts[0].resolve_path, font_size)
         text_width_limit = int(image.width * 0.65)
 
         # 分割文本
@@ -454,7 +454,7 @@ class XibaoHorizontalRender(BaseStickerRender):
         # 处理文本主体
         text = ' ' if text is None else text
         font_size = image.width // 15
-        font = ImageFont.truetype(fonts[0].resolve_path, font_size)
+        font = load_font(fonts[0].resolve_path, font_size)
         text_stroke_width = int(font_size / 15)
         text_width_limit = int(image.width * 0.75)
 
@@ -518,7 +518,7 @@ class XibaoVerticalRender(BaseStickerRender):
         # 处理文本主体
         text = ' ' if text is None else text
         font_size = image.width // 15
-        font = ImageFont.truetype(fonts[0].resolve_path, font_size)
+        font = load_font(fonts[0].resolve_path, font_size)
         text_stroke_width = int(font_size / 50)
         text_width_limit = int(image.width * 0.75)
 
@@ -585,13 +585,13 @@ class DefaultRender(BaseStickerRender):
         text = ' ' if text is None else text
         font_size = external_image.width // 8
         text_stroke_width = int(font_size / 20)
-        font = ImageFont.truetype(fonts[0].resolve_path, font_size)
+        font = load_font(fonts[0].resolve_path, font_size)
 
         text_w, text_h = ImageUtils.get_text_size(text, font=font, stroke_width=text_stroke_width)
         # 自适应处理文字大小
         while text_w >= int(external_image.width * 0.95):
             font_size -= 1
-            font = ImageFont.truetype(fonts[0].resolve_path, font_size)
+            font = load_font(fonts[0].resolve_path, font_size)
             text_w, text_h = ImageUtils.get_text_size(text, font=font, stroke_width=text_stroke_width)
         # 计算居中文字位置
         text_coordinate = (external_image.width // 2, 9 * (external_image.height - text_h) // 10)
@@ -650,13 +650,13 @@ class LittleAngelRender(BaseStickerRender):
         # 处理文本内容
         text = ' ' if text is None else text
         font_size_up = int(external_image.width / 7)
-        font_up = ImageFont.truetype(fonts[0].resolve_path, font_size_up)
+        font_up = load_font(fonts[0].resolve_path, font_size_up)
         text_up = f'请问你们看到{text}了吗?'
         text_up_w, text_up_h = ImageUtils.get_text_size(text_up, font_up)
         # 自适应处理文字大小
         while text_up_w >= int(external_image.width * 1.14):
             font_size_up -= 1
-            font_up = ImageFont.truetype(fonts[0].resolve_path, font_size_up)
+            font_up = load_font(fonts[0].resolve_path, font_size_up)
             text_up_w, text_up_h = ImageUtils.get_text_size(text_up, font_up)
 
         # 处理图片
@@ -682,14 +682,14 @@ class LittleAngelRender(BaseStickerRender):
         background.paste(external_image, image_coordinate)
 
         # 粘贴底部文字
-        font_down_1 = ImageFont.truetype(fonts[0].resolve_path, int(background.width / 12.75))
+        font_down_1 = load_font(fonts[0].resolve_path, int(background.width / 12.75))
         text_down_1 = r'非常可爱! 简直就是小天使'
         ImageDraw.Draw(background).text(
             xy=(background.width // 2, int(external_image.width * 0.135 + external_image.height + text_up_h)),
             text=text_down_1, anchor='ma', font=font_down_1, fill=(0, 0, 0)
         )
 
-        font_down_2 = ImageFont.truetype(fonts[0].resolve_path, int(background.width / 23.54))
+        font_down_2 = load_font(fonts[0].resolve_path, int(background.width / 23.54))
         text_down_2 = r'她没失踪也没怎么样  我只是觉得你们都该看一下'
         ImageDraw.Draw(background).text(
             xy=(background.width // 2, int(external_image.width * 0.255 + external_image.height + text_up_h)),
@@ -744,12 +744,12 @@ class WhiteBackgroundRender(BaseStickerRender):
 
         text = ' ' if text is None else text
         font_size = external_image.width // 10
-        font = ImageFont.truetype(fonts[0].resolve_path, font_size)
+        font = load_font(fonts[0].resolve_path, font_size)
         text_w, text_h = ImageUtils.get_text_size(text, font=font)
         # 自适应处理文字大小
         while text_w >= int(external_image.width * 8 / 9):
             font_size -= 1
-            font = ImageFont.truetype(fonts[0].resolve_path, font_size)
+            font = load_font(fonts[0].resolve_path, font_size)
             text_w, text_h = ImageUtils.get_text_size(text, font=font)
 
         # 处理图片
@@ -816,12 +816,12 @@ class BlackBackgroundRender(BaseStickerRender):
 
         text = ' ' if text is None else text
         font_size = external_image.width // 8
-        font = ImageFont.truetype(fonts[0].resolve_path, font_size)
+        font = load_font(fonts[0].resolve_path, font_size)
         text_w, text_h = ImageUtils.get_text_size(text, font=font)
         # 自适应处理文字大小
         while text_w >= int(external_image.width * 1.1):
             font_size -= 1
-            font = ImageFont.truetype(fonts[0].resolve_path, font_size)
+            font = load_font(fonts[0].resolve_path, font_size)
             text_w, text_h = ImageUtils.get_text_size(text, font=font)
 
         # 处理图片
@@ -944,7 +944,7 @@ class GunjoRender(BaseStickerRender):
 
         # 写字
         upper_font_size = int(made_image.width / 6)
-        upper_font = ImageFont.truetype(fonts[0].resolve_path, upper_font_size)
+        upper_font = load_font(fonts[0].resolve_path, upper_font_size)
         upper_text_coordinate = (int(made_image.width * 12 / 13), int(made_image.height / 11))
 
         _, upper_text_height = ImageUtils.get_text_size('群\n青', upper_font, stroke_width=upper_font_size // 20)
@@ -954,7 +954,7 @@ class GunjoRender(BaseStickerRender):
         )
 
         lower_font_size = int(made_image.width / 12)
-        lower_font = ImageFont.truetype(fonts[0].resolve_path, lower_font_size)
+        lower_font = load_font(fonts[0].resolve_path, lower_font_size)
         lower_text_coordinate = (int(made_image.width * 12 / 13), upper_text_coordinate[1] + upper_text_height * 1.1)
         ImageDraw.Draw(background).text(
             xy=lower_text_coordinate, text='YOASOBI', anchor='ra', align='center', font=lower_font,
@@ -1065,8 +1065,8 @@ class GrassJaRender(BaseStickerRender):
 
         # 分割文本
         text = ' ' if text is None else text
-        font_zh = ImageFont.truetype(fonts[0].resolve_path, int(image.width / 13))
-        font_jp = ImageFont.truetype(fonts[0].resolve_path, int(image.width / 24))
+        font_zh = load_font(fonts[0].resolve_path, int(image.width / 13))
+        font_jp = load_font(fonts[0].resolve_path, int(image.width / 24))
 
         text_zh, text_jp = text.split(maxsplit=1)
         text_zh = ImageUtils.split_multiline_text(text=text_zh, width=int(image.width * 0.9), font=font_zh)
@@ -1421,7 +1421,7 @@ class WangjingzeRender(BaseStickerRender):
         if (text_len := len(text_list)) < 4:
             text_list.extend(['' for _ in range(4 - text_len)])
 
-        font = ImageFont.truetype(fonts[0].resolve_path, 22)
+        font = load_font(fonts[0].resolve_path, 22)
 
         frames_list = []
         for index, frame in enumerate(static_images):
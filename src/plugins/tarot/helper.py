@@ -12,11 +12,11 @@ from datetime import datetime
 from io import BytesIO
 from typing import TYPE_CHECKING, Literal
 
-from PIL import Image, ImageDraw, ImageFont
+from PIL import Image, ImageDraw
 from nonebot.utils import run_sync
 from sqlalchemy.exc import NoResultFound
 
-from src.utils.image_utils import ImageUtils
+from src.utils.image_utils import ImageUtils, load_font
 from .config import tarot_local_resource_config
 from .resources import TarotResource
 
@@ -104,9 +104,9 @@ async def generate_tarot_card(
 
         # 字体
         font_file = tarot_local_resource_config.default_font_file
-        title_font = ImageFont.truetype(font_file.resolve_path, width // 10)
-        m_title_font = ImageFont.truetype(font_file.resolve_path, width // 20)
-        text_font = ImageFont.truetype(font_file.resolve_path, width // 25)
+        title_font = load_font(font_file.resolve_path, width // 10)
+        m_title_font = load_font(font_file.resolve_path, width // 20)
+        text_font = load_font(font_file.resolve_path, width // 25)
 
         # 标题
         _, title_height = ImageUtils.get_text_size(text=tarot_card.name, font=title_font)
@@ -8,21 +8,18 @@
 @Software       : PyCharm 
 """
 
-from collections.abc import Iterable
+from collections.abc import Iterable, Sequence
+from datetime import datetime
 from typing import TYPE_CHECKING
 
 from nonebot import logger
-from nonebot.exception import ActionFailed
 
 from src.database import SocialMediaContentDAL, begin_db_session
 from src.database.internal.subscription_source import SubscriptionSource, SubscriptionSourceType
 from src.service import (
-    OmegaEntity,
     OmegaMessage,
     OmegaMessageSegment,
-)
-from src.service import (
-    OmegaEntityInterface as OmEI,
+    broadcast_dispatcher,
 )
 from src.service import (
     OmegaMatcherInterface as OmMI,
@@ -129,6 +126,18 @@ async def query_all_subscribed_weibo_user_sub_source() -> list[int]:
     return [int(x.sub_id) for x in source_res]
 
 
+async def query_weibo_user_sub_source_activity(
+        uids: Sequence[str],
+        start_time: datetime,
+) -> list[tuple[str, datetime]]:
+    """获取用户在某时间之后新增微博的 (用户 UID, 记录时间), 用于估计用户的微博发布频率"""
+    async with begin_db_session() as session:
+        result = await SocialMediaContentDAL(session=session).query_users_created_times(
+            source=WEIBO_SUB_TYPE, uids=uids, start_time=start_time
+        )
+    return result
+
+
 async def query_subscribed_entity_by_weibo_user(uid: int) -> list['Entity']:
     """根据微博用户查询已经订阅了这个用户的内部 Entity 对象"""
     async with begin_db_session() as session:
@@ -186,17 +195,9 @@ async def _format_weibo_update_message(card: 'WeiboCard') -> str | OmegaMessage:
     return send_message
 
 
-async def _msg_sender(entity: 'Entity', message: str | OmegaMessage) -> None:
-    """向 entity 发送消息"""
-    try:
-        async with begin_db_session() as session:
-            internal_entity = await OmegaEntity.init_from_entity_index_id(session=session, index_id=entity.id)
-            interface = OmEI(entity=internal_entity)
-            await interface.send_entity_message(message=message)
-    except ActionFailed as e:
-        logger.warning(f'WeiboMonitor | Sending message to {entity} failed with ActionFailed, {e!r}')
-    except Exception as e:
-        logger.error(f'WeiboMonitor | Sending message to {entity} failed, {e!r}')
+async def _msg_sender(entities: Sequence['Entity'], message: str | OmegaMessage) -> None:
+    """向订阅对象发送消息, 广播在后台执行, 订阅者较多时不受检查任务超时的影响"""
+    broadcast_dispatcher.broadcast_in_background(message=message, targets=entities, source='WeiboMonitor')
 
 
 @run_async_delay(delay_time=7)
@@ -224,11 +225,8 @@ async def weibo_user_monitor_main(uid: int) -> None:
 
     # 向订阅者发送新微博信息
     subscribed_entity = await query_subscribed_entity_by_weibo_user(uid=uid)
-    send_tasks = [
-        _msg_sender(entity=entity, message=send_msg)
-        for entity in subscribed_entity for send_msg in send_messages
-    ]
-    await semaphore_gather(tasks=send_tasks, semaphore_num=2)
+    for send_msg in send_messages:
+        await _msg_sender(entities=subscribed_entity, message=send_msg)
 
 
 __all__ = [
@@ -236,5 +234,6 @@ __all__ = [
     'delete_weibo_user_sub',
     'query_entity_subscribed_weibo_user_sub_source',
     'query_all_subscribed_weibo_user_sub_source',
+    'query_weibo_user_sub_source_activity',
     'weibo_user_monitor_main',
 ]
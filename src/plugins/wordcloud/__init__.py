@@ -27,5 +27,6 @@ __plugin_meta__ = PluginMetadata(
 )
 
 from . import command as command
+from . import scheduled_tasks as scheduled_tasks
 
 __all__ = []
@@ -21,7 +21,7 @@ from nonebot.plugin import CommandGroup
 from src.params.handler import get_command_str_single_arg_parser_handler
 from src.service import OmegaMatcherInterface as OmMI
 from src.service import OmegaMessageSegment, enable_processor_state
-from .data_source import add_user_dict, query_entity_message_history, query_profile_image
+from .data_source import add_user_dict, query_entity_message_count, query_entity_word_frequency, query_profile_image
 from .helpers import draw_message_history_wordcloud
 
 # 注册事件响应器
@@ -142,20 +142,23 @@ async def wordcloud_generate_handler(
 ) -> None:
     """词云处理流程 Handler"""
     try:
-        message_history_list = await query_entity_message_history(
+        message_count = await query_entity_message_count(
             bot=bot, event=event, start_time=start_time, match_event=match_event, match_user=match_user
         )
-        if len(message_history_list) < 100 and len([x for x in message_history_list if x.message_text.strip()]) < 10:
+        word_frequency = await query_entity_word_frequency(
+            bot=bot, event=event, start_time=start_time, match_event=match_event, match_user=match_user
+        )
+        if message_count < 100 and len(word_frequency) < 10:
             logger.info(f'WordCloud | {interface.entity} 没有足够的历史消息记录用于生成词云')
             await interface.send_reply('没有足够的历史消息记录用于生成词云, 请稍后再试')
             return
 
         profile_image = await query_profile_image(bot, event, match_user=match_user)
 
-        desc_text += f'\n已统计 {len(message_history_list)} 条消息\n生成于: {datetime.now().strftime("%Y-%m-%d %H:%M:%S")}'
+        desc_text += f'\n已统计 {message_count} 条消息\n生成于: {datetime.now().strftime("%Y-%m-%d %H:%M:%S")}'
 
         wordcloud_image = await draw_message_history_wordcloud(
-            messages=message_history_list, profile_image_file=profile_image, desc_text=desc_text
+            word_frequency=word_frequency, profile_image_file=profile_image, desc_text=desc_text
         )
 
         logger.success(f'WordCloud | 生成 {interface.entity} 自 {start_time} 以来的词云成功')
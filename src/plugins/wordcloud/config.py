@@ -27,6 +27,9 @@ class WordcloudPluginConfig(BaseModel):
     wordcloud_plugin_message_analyse_mode: Literal['TF-IDF', 'TextRank'] = 'TF-IDF'
     # 排除机器人自身的消息
     wordcloud_plugin_exclude_bot_self_message: bool = True
+    # 消息词频按日预先统计, 统计结果保留的天数, 及首次统计时回溯的天数
+    wordcloud_plugin_word_frequency_keep_days: int = 90
+    wordcloud_plugin_word_frequency_backfill_days: int = 31
 
     # 生成词云图片的尺寸
     wordcloud_plugin_generate_default_width: int = 1600
@@ -8,18 +8,23 @@
 @Software       : PyCharm
 """
 
+from collections import Counter, defaultdict
+from datetime import date, datetime, time, timedelta
 from os import SEEK_END, SEEK_SET
 from typing import TYPE_CHECKING, Optional
 
-from src.database import HistoryDAL, begin_db_session
+from nonebot.log import logger
+from nonebot.utils import run_sync
+from sqlalchemy.exc import NoResultFound
+
+from src.database import HistoryDAL, HistoryWordFrequencyDAL, SystemSettingDAL, begin_db_session
 from src.service import OmegaEntityInterface as OmEI
 from src.service import OmegaMatcherInterface as OmMI
 from src.utils import OmegaRequests
 from .config import wordcloud_plugin_config, wordcloud_plugin_resource_config
+from .helpers import analyse_message, count_message_words, prepare_message, weight_word_frequency
 
 if TYPE_CHECKING:
-    from datetime import datetime
-
     from nonebot.internal.adapter import Bot as BaseBot
     from nonebot.internal.adapter import Event as BaseEvent
 
@@ -51,6 +56,174 @@ async def query_entity_message_history(
     return histories_list
 
 
+async def query_entity_message_count(
+        bot: 'BaseBot',
+        event: 'BaseEvent',
+        *,
+        start_time: Optional['datetime'] = None,
+        end_time: Optional['datetime'] = None,
+        match_event: bool = True,
+        match_user: bool = False,
+) -> int:
+    """统计当前事件的消息历史记录数量"""
+    async with begin_db_session() as session:
+        event_entity = OmMI.get_entity(bot, event, session, acquire_type='event')
+        user_entity = OmMI.get_entity(bot, event, session, acquire_type='user')
+        message_count = await HistoryDAL(session).count_entity_records(
+            bot_self_id=bot.self_id,
+            event_entity_id=event_entity.entity_id if match_event else None,
+            user_entity_id=user_entity.entity_id if match_user else None,
+            start_time=start_time,
+            end_time=end_time,
+            exclude_bot_self_message=wordcloud_plugin_config.wordcloud_plugin_exclude_bot_self_message,
+        )
+    return message_count
+
+
+_WORD_FREQUENCY_SETTING_NAME: str = 'wordcloud_plugin'
+_WORD_FREQUENCY_SETTING_KEY: str = 'word_frequency_aggregated_date'
+
+
+async def _query_word_frequency_aggregated_date() -> date | None:
+    """查询消息词频已按日预先统计到的日期"""
+    async with begin_db_session() as session:
+        try:
+            setting = await SystemSettingDAL(session).query_unique(
+                setting_name=_WORD_FREQUENCY_SETTING_NAME, setting_key=_WORD_FREQUENCY_SETTING_KEY
+            )
+        except NoResultFound:
+            return None
+    return date.fromisoformat(setting.setting_value)
+
+
+async def query_entity_word_frequency(
+        bot: 'BaseBot',
+        event: 'BaseEvent',
+        *,
+        start_time: 'datetime',
+        match_event: bool = True,
+        match_user: bool = False,
+) -> dict[str, float]:
+    """查询当前事件自 start_time 以来的消息历史记录词频
+
+    已按日预先统计的完整日期直接合并统计结果, 仅读取起始日当天及尚未统计日期的原始消息记录进行分词.
+    TextRank 模式依赖完整的消息文本, 仍读取全部原始消息记录进行分析.
+    """
+    if wordcloud_plugin_config.wordcloud_plugin_message_analyse_mode == 'TextRank':
+        histories = await query_entity_message_history(
+            bot=bot, event=event, start_time=start_time, match_event=match_event, match_user=match_user
+        )
+        message_text = prepare_message(messages=[x.message_text for x in histories])
+        return await run_sync(analyse_message)(message_text=message_text)
+
+    now = datetime.now()
+    first_full_date = start_time.date() + timedelta(days=1)
+    aggregated_date = await _query_word_frequency_aggregated_date()
+
+    async with begin_db_session() as session:
+        event_entity_id = OmMI.get_entity(bot, event, session, acquire_type='event').entity_id if match_event else None
+        user_entity_id = OmMI.get_entity(bot, event, session, acquire_type='user').entity_id if match_user else None
+
+        if aggregated_date is None or aggregated_date < first_full_date:
+            word_counts = Counter()
+            raw_ranges = [(start_time, now)]
+        else:
+            word_counts = Counter(await HistoryWordFrequencyDAL(session).query_entity_word_frequency(
+                bot_self_id=bot.self_id,
+                event_entity_id=event_entity_id,
+                user_entity_id=user_entity_id,
+                start_date=first_full_date,
+                end_date=aggregated_date,
+            ))
+            raw_ranges = [
+                (start_time, datetime.combine(first_full_date, time.min) - timedelta(seconds=1)),
+                (datetime.combine(aggregated_date + timedelta(days=1), time.min), now),
+            ]
+
+        messages = []
+        for range_start, range_end in raw_ranges:
+            histories = await HistoryDAL(session).query_entity_records(
+                bot_self_id=bot.self_id,
+                event_entity_id=event_entity_id,
+                user_entity_id=user_entity_id,
+                start_time=range_start,
+                end_time=range_end,
+                exclude_bot_self_message=wordcloud_plugin_config.wordcloud_plugin_exclude_bot_self_message,
+            )
+            messages.extend(x.message_text for x in histories)
+
+    if messages:
+        word_counts.update((await run_sync(count_message_words)(message_groups={None: messages}))[None])
+    return weight_word_frequency(word_counts)
+
+
+async def _aggregate_date_word_frequency(stat_date: date, *, batch_size: int = 5000) -> None:
+    """统计某日全部实体的消息历史记录词频, 并更新已统计日期"""
+    start_time = datetime.combine(stat_date, time.min)
+    end_time = start_time + timedelta(days=1)
+    exclude_bot_self_message = wordcloud_plugin_config.wordcloud_plugin_exclude_bot_self_message
+
+    word_counts: defaultdict[tuple[str, str, str], Counter[str]] = defaultdict(Counter)
+    after_id = 0
+    while True:
+        async with begin_db_session() as session:
+            histories = await HistoryDAL(session).query_records_by_time(
+                start_time=start_time, end_time=end_time, after_id=after_id, limit=batch_size
+            )
+        if not histories:
+            break
+        after_id = histories[-1].id
+
+        message_groups: defaultdict[tuple[str, str, str], list[str]] = defaultdict(list)
+        for history in histories:
+            if exclude_bot_self_message and history.bot_self_id == history.user_entity_id:
+                continue
+            message_groups[(history.bot_self_id, history.event_entity_id, history.user_entity_id)].append(
+                history.message_text
+            )
+        for group, group_word_counts in (await run_sync(count_message_words)(message_groups=message_groups)).items():
+            word_counts[group].update(group_word_counts)
+
+    records = [
+        {
+            'bot_self_id': bot_self_id,
+            'event_entity_id': event_entity_id,
+            'user_entity_id': user_entity_id,
+            'word': word,
+            'frequency': frequency,
+        }
+        for (bot_self_id, event_entity_id, user_entity_id), group_word_counts in word_counts.items()
+        for word, frequency in group_word_counts.items()
+    ]
+    async with begin_db_session() as session:
+        await HistoryWordFrequencyDAL(session).replace_date_records(stat_date=stat_date, records=records)
+        await SystemSettingDAL(session).upsert(
+            setting_name=_WORD_FREQUENCY_SETTING_NAME,
+            setting_key=_WORD_FREQUENCY_SETTING_KEY,
+            setting_value=stat_date.isoformat(),
+            info='词云消息词频已统计日期',
+        )
+    logger.debug(f'WordCloud | Aggregated word frequency of {stat_date}, {len(records)} records')
+
+
+async def aggregate_message_history_word_frequency() -> None:
+    """按日预先统计截至昨日的全部未统计日期的消息历史记录词频, 并清理过期的统计结果"""
+    today = date.today()
+    aggregated_date = await _query_word_frequency_aggregated_date()
+    if aggregated_date is None:
+        backfill_days = wordcloud_plugin_config.wordcloud_plugin_word_frequency_backfill_days
+        aggregated_date = today - timedelta(days=backfill_days + 1)
+
+    stat_date = aggregated_date + timedelta(days=1)
+    while stat_date < today:
+        await _aggregate_date_word_frequency(stat_date=stat_date)
+        stat_date += timedelta(days=1)
+
+    keep_days = wordcloud_plugin_config.wordcloud_plugin_word_frequency_keep_days
+    async with begin_db_session() as session:
+        await HistoryWordFrequencyDAL(session).delete_expired_records(before_date=today - timedelta(days=keep_days))
+
+
 async def query_profile_image(bot: 'BaseBot', event: 'BaseEvent', match_user: bool = False) -> 'TemporaryResource':
     """获取头像"""
     async with begin_db_session() as session:
@@ -77,7 +250,10 @@ async def add_user_dict(content: str) -> None:
 
 
 __all__ = [
+    'aggregate_message_history_word_frequency',
+    'query_entity_message_count',
     'query_entity_message_history',
+    'query_entity_word_frequency',
     'query_profile_image',
     'add_user_dict',
 ]
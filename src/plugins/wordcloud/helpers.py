@@ -9,7 +9,8 @@
 """
 
 import re
-from collections.abc import Sequence
+from collections import Counter
+from collections.abc import Mapping, Sequence
 from datetime import datetime
 from io import BytesIO
 from typing import TYPE_CHECKING, Optional
@@ -17,34 +18,40 @@ from typing import TYPE_CHECKING, Optional
 import jieba
 import jieba.analyse
 import numpy as np
-from PIL import Image, ImageDraw, ImageFilter, ImageFont, ImageOps
+from PIL import Image, ImageDraw, ImageFilter, ImageOps
 from emoji import replace_emoji
 from nonebot.log import logger
-from nonebot.utils import run_sync
 from wordcloud import WordCloud
 
 from src.service.artwork_collection import get_artwork_collection, get_artwork_collection_type
+from src.utils.image_utils import load_font
+from src.utils.render_executor import render_job
 from .config import wordcloud_plugin_config, wordcloud_plugin_resource_config
 
 if TYPE_CHECKING:
     from numpy.typing import NDArray
 
-    from src.database.internal.history import History
     from src.resource import TemporaryResource
 
 
+_URL_PATTERN = re.compile(
+    r'(https?://(?:www\.|(?!www))[a-zA-Z0-9][a-zA-Z0-9-]+[a-zA-Z0-9]\.\S{2,}|www\.[a-zA-Z0-9][a-zA-Z0-9-]'
+    r'+[a-zA-Z0-9]\.\S{2,}|https?://(?:www\.|(?!www))[a-zA-Z0-9]+\.\S{2,}|www\.[a-zA-Z0-9]+\.\S{2,})'
+)
+"""网址匹配, ref: https://stackoverflow.com/a/17773849"""
+
+_MAX_WORD_LENGTH: int = 64
+"""参与预先统计的最大词语长度, 与词频统计表字段长度一致"""
+
+
 def prepare_message(messages: Sequence[str]) -> str:
     """预处理消息文本"""
     # 过滤命令消息
     command_start = tuple(i for i in wordcloud_plugin_config.command_start if i)
     message = ' '.join(m for m in messages if not m.startswith(command_start))
 
-    # 过滤网址, ref: https://stackoverflow.com/a/17773849
-    pattern = re.compile(
-        r'(https?://(?:www\.|(?!www))[a-zA-Z0-9][a-zA-Z0-9-]+[a-zA-Z0-9]\.\S{2,}|www\.[a-zA-Z0-9][a-zA-Z0-9-]'
-        r'+[a-zA-Z0-9]\.\S{2,}|https?://(?:www\.|(?!www))[a-zA-Z0-9]+\.\S{2,}|www\.[a-zA-Z0-9]+\.\S{2,})'
-    )
-    message = pattern.sub('', message)
+    # 过滤网址
+    message = _URL_PATTERN.sub('', message)
 
     # 去除零宽空白符
     message = re.sub(r'\u200b', '', message)
@@ -54,6 +61,13 @@ def prepare_message(messages: Sequence[str]) -> str:
     return message
 
 
+def _prepare_jieba() -> None:
+    """设置停用词表和加载用户词典"""
+    jieba.analyse.set_stop_words(wordcloud_plugin_resource_config.default_stop_words_file.resolve_path)
+    if wordcloud_plugin_resource_config.user_dict_file.is_file:
+        jieba.load_userdict(wordcloud_plugin_resource_config.user_dict_file.resolve_path)
+
+
 def _analyse_tf_idf(message_text: str) -> dict[str, float]:
     """基于 TF-IDF 算法的关键词抽取方法统计词频"""
     return {str(word): freq for word, freq in jieba.analyse.extract_tags(message_text, topK=0, withWeight=True)}
@@ -66,10 +80,7 @@ def _analyse_textrank(message_text: str) -> dict[str, float]:
 
 def analyse_message(message_text: str) -> dict[str, float]:
     """使用 jieba 分词, 并进行关键词抽取和词频统计"""
-    # 设置停用词表和加载用户词典
-    jieba.analyse.set_stop_words(wordcloud_plugin_resource_config.default_stop_words_file.resolve_path)
-    if wordcloud_plugin_resource_config.user_dict_file.is_file:
-        jieba.load_userdict(wordcloud_plugin_resource_config.user_dict_file.resolve_path)
+    _prepare_jieba()
 
     # 分词和统计词频
     match wordcloud_plugin_config.wordcloud_plugin_message_analyse_mode:
@@ -79,6 +90,35 @@ def analyse_message(message_text: str) -> dict[str, float]:
             return _analyse_tf_idf(message_text)
 
 
+def count_message_words[K](message_groups: Mapping[K, Sequence[str]]) -> dict[K, Counter[str]]:
+    """使用 jieba 分词并分组统计各词语出现次数, 过滤规则与 TF-IDF 关键词抽取一致, 结果可按日预先统计并合并
+
+    :param message_groups: {分组: 该分组的消息文本}
+    :return: {分组: {词语: 出现次数}}
+    """
+    _prepare_jieba()
+
+    stop_words = jieba.analyse.default_tfidf.stop_words
+    return {
+        group: Counter(
+            word for word in jieba.cut(prepare_message(messages=messages))
+            if 2 <= len(word.strip()) and len(word) <= _MAX_WORD_LENGTH and word.lower() not in stop_words
+        )
+        for group, messages in message_groups.items()
+    }
+
+
+def weight_word_frequency(word_counts: Mapping[str, int]) -> dict[str, float]:
+    """按 TF-IDF 计算词语权重, 与对合并后的原始消息文本直接进行 TF-IDF 关键词抽取的结果一致"""
+    total = sum(word_counts.values())
+    if total <= 0:
+        return {}
+
+    idf_freq = jieba.analyse.default_tfidf.idf_freq
+    median_idf = jieba.analyse.default_tfidf.median_idf
+    return {word: count * idf_freq.get(word, median_idf) / total for word, count in word_counts.items()}
+
+
 async def _get_random_background_artwork() -> 'TemporaryResource':
     """从数据库获取作品作为背景图"""
     random_artworks = await get_artwork_collection_type().query_any_origin_by_condition(
@@ -118,12 +158,8 @@ def _draw_wordcloud_mask(width: int, height: int) -> 'NDArray':
     return mask_np
 
 
-def _generate_message_history_wordcloud(messages: Sequence['History'], **wordcloud_options) -> 'Image.Image':
-    """根据查询到的消息历史记录绘制词云"""
-    # 统计历史消息词频
-    prepared_message = prepare_message(messages=[m.message_text for m in messages])
-    word_frequency = analyse_message(message_text=prepared_message)
-
+def _generate_message_history_wordcloud(word_frequency: Mapping[str, float], **wordcloud_options) -> 'Image.Image':
+    """根据消息历史记录的词频绘制词云"""
     # 生成词云
     wordcloud = WordCloud(**wordcloud_options)
     wordcloud_image: Image.Image = wordcloud.generate_from_frequencies(word_frequency).to_image()
@@ -131,14 +167,14 @@ def _generate_message_history_wordcloud(messages: Sequence['History'], **wordclo
     return wordcloud_image
 
 
-@run_sync
+@render_job('wordcloud')
 def _draw_message_history_wordcloud(
-        messages: Sequence['History'],
+        word_frequency: Mapping[str, float],
         background_file: Optional['TemporaryResource'] = None,
         profile_image_file: Optional['TemporaryResource'] = None,
         desc_text: str | None = None,
 ) -> bytes:
-    """根据查询到的消息历史记录绘制词云"""
+    """根据消息历史记录的词频绘制词云"""
     if background_file is not None:
         background = Image.open(background_file.resolve_path).convert('RGBA')
         background = Image.blend(background, Image.new('RGBA', background.size, (255, 255, 255, 255)), 0.75)
@@ -161,7 +197,7 @@ def _draw_message_history_wordcloud(
         'width': width,
         'height': height,
     })
-    wordcloud_image = _generate_message_history_wordcloud(messages=messages, **wordcloud_options)
+    wordcloud_image = _generate_message_history_wordcloud(word_frequency=word_frequency, **wordcloud_options)
 
     # 放置词云图片
     image_main.paste(
@@ -188,7 +224,7 @@ def _draw_message_history_wordcloud(
 
     # 放置文本内容
     if desc_text is not None:
-        font = ImageFont.truetype(wordcloud_plugin_resource_config.default_font_file.resolve_path, size=height // 54)
+        font = load_font(wordcloud_plugin_resource_config.default_font_file.resolve_path, size=height // 54)
         ImageDraw.Draw(image_main).multiline_text(
             xy=(width - int(height / 10 * 0.2), int(height / 10 * 9.2)),
             text=desc_text,
@@ -205,17 +241,17 @@ def _draw_message_history_wordcloud(
 
 
 async def draw_message_history_wordcloud(
-        messages: Sequence['History'],
+        word_frequency: Mapping[str, float],
         profile_image_file: Optional['TemporaryResource'] = None,
         desc_text: str | None = None,
 ) -> 'TemporaryResource':
-    """根据查询到的消息历史记录绘制词云"""
+    """根据消息历史记录的词频绘制词云"""
     background = None
     if wordcloud_plugin_config.wordcloud_plugin_enable_collected_artwork_background:
         background = await _get_random_background_artwork()
 
     wordcloud_image_content = await _draw_message_history_wordcloud(
-        messages=messages,
+        word_frequency=word_frequency,
         background_file=background,
         profile_image_file=profile_image_file,
         desc_text=desc_text,
@@ -229,5 +265,9 @@ async def draw_message_history_wordcloud(
 
 
 __all__ = [
+    'analyse_message',
+    'count_message_words',
     'draw_message_history_wordcloud',
+    'prepare_message',
+    'weight_word_frequency',
 ]
@@ -0,0 +1,41 @@
+"""
+@Author         : Ailitonia
+@Date           : 2025/1/3 21:02
+@FileName       : scheduled_tasks
+@Project        : omega-miya
+@Description    : 消息词频预先统计任务
+@GitHub         : https://github.com/Ailitonia
+@Software       : PyCharm
+"""
+
+from datetime import datetime, timedelta
+
+from nonebot import logger
+
+from src.service import scheduler
+from .data_source import aggregate_message_history_word_frequency
+
+
+async def wordcloud_word_frequency_aggregator() -> None:
+    logger.debug('WordCloud | Starting aggregating message history word frequency')
+    try:
+        await aggregate_message_history_word_frequency()
+        logger.success('WordCloud | Aggregated message history word frequency succeed')
+    except Exception as e:
+        logger.error(f'WordCloud | Aggregating message history word frequency failed, {e!r}')
+
+
+scheduler.add_job(
+    wordcloud_word_frequency_aggregator,
+    'cron',
+    hour='0',
+    minute='10',
+    second='23',
+    next_run_time=datetime.now() + timedelta(minutes=3),  # 启动后补充统计此前未统计的日期
+    id='wordcloud_word_frequency_aggregator',
+    coalesce=True,
+    max_instances=1,
+    misfire_grace_time=3600,
+)
+
+__all__ = []
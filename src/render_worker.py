@@ -0,0 +1,41 @@
+"""
+@Author         : Ailitonia
+@Date           : 2025/1/14 20:30
+@FileName       : render_worker
+@Project        : nonebot2_miya
+@Description    : 渲染执行器工作进程入口
+@GitHub         : https://github.com/Ailitonia
+@Software       : PyCharm
+"""
+
+import pickle
+from typing import Any
+
+# 本模块会在 NoneBot 初始化前被 spawn/forkserver 方式启动的工作进程导入, 模块顶层仅可依赖标准库,
+# 不可导入 nonebot 或 src 下的其他模块 (src.utils 等包在导入时即需要 NoneBot 已初始化)
+
+
+def initialize_worker() -> None:
+    """工作进程初始化
+
+    仅初始化 NoneBot 以读取配置, 使任务函数所在的模块可以被正常导入, 不注册适配器, 不加载插件, 也不运行驱动器.
+    fork 方式启动的工作进程已继承主进程的 NoneBot 实例, 不再重复初始化.
+    """
+    import nonebot
+
+    try:
+        nonebot.get_driver()
+    except ValueError:
+        nonebot.init()
+
+
+def execute_render_job(payload: bytes) -> Any:
+    """在工作进程中执行渲染任务, payload 为 pickle 序列化后的 RenderJob"""
+    job = pickle.loads(payload)
+    return job.resolve()(*job.args, **job.kwargs)
+
+
+__all__ = [
+    'execute_render_job',
+    'initialize_worker',
+]
@@ -29,8 +29,10 @@ from typing import (
     final,
     overload,
 )
+from uuid import uuid4
 
 import aiofiles
+import aiofiles.os
 
 from src.exception import LocalSourceException
 
@@ -212,6 +214,36 @@ class BaseResource(abc.ABC):
         async with aiofiles.open(file=self.path, mode=mode, encoding=encoding, **kwargs) as _afh:
             yield _afh
 
+    @check_file
+    async def async_write_atomic(self, content: bytes | str, encoding: str | None = None) -> None:
+        """写入文件内容, 先写入同目录下的临时文件再替换目标文件, 读取方不会读到未写完的文件"""
+        temp_path = self.path.with_name(f'.{self.path.name}.{uuid4().hex}.tmp')
+        mode = 'wb' if isinstance(content, bytes) else 'w'
+        try:
+            async with aiofiles.open(file=temp_path, mode=mode, encoding=encoding) as _afh:
+                await _afh.write(content)
+            await aiofiles.os.replace(temp_path, self.path)
+        except BaseException:
+            temp_path.unlink(missing_ok=True)
+            raise
+
+    @check_file
+    async def async_link_from(self, source: 'BaseResource') -> None:
+        """将文件硬链接到 source 文件, 目标文件已存在时原子替换, 不支持硬链接时复制文件内容"""
+        temp_path = self.path.with_name(f'.{self.path.name}.{uuid4().hex}.tmp')
+        try:
+            try:
+                await aiofiles.os.link(source.path, temp_path)
+            except OSError:
+                async with aiofiles.open(file=source.path, mode='rb') as _afh:
+                    content = await _afh.read()
+                async with aiofiles.open(file=temp_path, mode='wb') as _afh:
+                    await _afh.write(content)
+            await aiofiles.os.replace(temp_path, self.path)
+        except BaseException:
+            temp_path.unlink(missing_ok=True)
+            raise
+
     @check_directory
     def list_all_files(self) -> list[Self]:
         """遍历文件夹内所有文件并返回文件列表"""
@@ -9,6 +9,7 @@
 """
 
 from .apscheduler import reschedule_job, scheduler
+from .artwork_warm_pool import artwork_warm_pool
 from .omega_base import (
     OmegaEntity,
     OmegaEntityInterface,
@@ -17,10 +18,16 @@ from .omega_base import (
     OmegaMessageSegment,
     OmegaMessageTransfer,
 )
+from .omega_broadcast import BroadcastResult, broadcast_dispatcher
 from .omega_global_cache import OmegaGlobalCache
+from .omega_history_archive import history_archiver
+from .omega_image_hash import image_hash_index
+from .omega_polling import PollingMonitor, polling_engine
 from .omega_processor import enable_processor_state
+from .omega_resource_cache import resource_cache
 
 __all__ = [
+    'BroadcastResult',
     'OmegaEntity',
     'OmegaEntityInterface',
     'OmegaGlobalCache',
@@ -28,7 +35,14 @@ __all__ = [
     'OmegaMessage',
     'OmegaMessageSegment',
     'OmegaMessageTransfer',
+    'PollingMonitor',
+    'artwork_warm_pool',
+    'broadcast_dispatcher',
     'enable_processor_state',
+    'history_archiver',
+    'image_hash_index',
+    'polling_engine',
+    'resource_cache',
     'reschedule_job',
     'scheduler',
 ]
@@ -10,6 +10,9 @@
 
 from typing import TYPE_CHECKING, Literal, overload
 
+from nonebot import get_driver, logger
+
+from src.database import ArtworkCollectionDAL, begin_db_session
 from src.service.artwork_proxy import ALLOW_ARTWORK_ORIGIN
 from .sites import (
     BehoimiArtworkCollection,
@@ -29,6 +32,24 @@ if TYPE_CHECKING:
     from .typing import ArtworkCollectionType, CollectedArtwork
 
 
+@get_driver().on_startup
+async def _init_artwork_tag_index() -> None:
+    """启动时检查标签倒排索引, 索引为空时 (新建索引表后首次启动) 从已收录作品中回填"""
+    try:
+        async with begin_db_session() as session:
+            dal = ArtworkCollectionDAL(session=session)
+            if await dal.check_tag_index_exists():
+                return
+
+            logger.opt(colors=True).info('<lc>ArtworkCollection</lc> | <ly>正在重建作品标签索引</ly>')
+            processed_count = await dal.rebuild_tag_index()
+        logger.opt(colors=True).success(
+            f'<lc>ArtworkCollection</lc> | <lg>作品标签索引重建完成</lg>, 共处理 {processed_count} 个作品'
+        )
+    except Exception as e:
+        logger.opt(colors=True).error(f'<lc>ArtworkCollection</lc> | 作品标签索引重建失败, {e!r}')
+
+
 @overload
 def get_artwork_collection_type(origin: Literal['pixiv']) -> type[PixivArtworkCollection]:
     ...
@@ -10,21 +10,28 @@
 
 import abc
 from collections.abc import Sequence
-from typing import TYPE_CHECKING, Literal
+from datetime import datetime
+from typing import TYPE_CHECKING, Literal, Self
 
+from nonebot.log import logger
 from sqlalchemy.exc import NoResultFound
 
 from src.database import begin_db_session
+from src.database.internal.artwork_collection import ArtworkCollection as DBArtworkCollection
 from src.database.internal.artwork_collection import ArtworkCollectionDAL
+from src.utils import semaphore_gather
+from ..omega_image_hash import image_hash_index
 
 if TYPE_CHECKING:
     from src.database.internal.artwork_collection import (
         ArtworkClassificationStatistic as DBArtworkClassificationStatistic,
     )
-    from src.database.internal.artwork_collection import ArtworkCollection as DBArtworkCollection
     from src.database.internal.artwork_collection import ArtworkRatingStatistic as DBArtworkRatingStatistic
     from src.service.artwork_proxy.internal import BaseArtworkProxy
     from src.service.artwork_proxy.typing import ArtworkProxyType
+    from ..omega_image_hash import ImageHashMatch
+
+_IMAGE_HASH_NAMESPACE: str = 'artwork_collection'
 
 
 class BaseArtworkCollection(abc.ABC):
@@ -59,6 +66,9 @@ class BaseArtworkCollection(abc.ABC):
             allow_classification_range: tuple[int, int] | None = (2, 3),
             allow_rating_range: tuple[int, int] | None = (0, 0),
             acc_mode: bool = False,
+            keyword_match: Literal['all', 'any'] = 'all',
+            exclude_keywords: str | Sequence[str] | None = None,
+            tag_prefix: bool = False,
             ratio: int | None = None,
             order_mode: Literal['random', 'latest', 'aid', 'aid_desc'] = 'random',
     ) -> list['DBArtworkCollection']:
@@ -66,6 +76,9 @@ class BaseArtworkCollection(abc.ABC):
         if isinstance(keywords, str):
             keywords = [keywords]
 
+        if isinstance(exclude_keywords, str):
+            exclude_keywords = [exclude_keywords]
+
         if allow_classification_range is None:
             allow_classification_range = (2, 3)
 
@@ -77,7 +90,8 @@ class BaseArtworkCollection(abc.ABC):
                 origin=origin, keywords=keywords, num=num,
                 classification_min=min(allow_classification_range), classification_max=max(allow_classification_range),
                 rating_min=min(allow_rating_range), rating_max=max(allow_rating_range),
-                acc_mode=acc_mode, ratio=ratio, order_mode=order_mode
+                acc_mode=acc_mode, keyword_match=keyword_match, exclude_keywords=exclude_keywords,
+                tag_prefix=tag_prefix, ratio=ratio, order_mode=order_mode
             )
         return result
 
@@ -107,6 +121,9 @@ class BaseArtworkCollection(abc.ABC):
             allow_classification_range: tuple[int, int] | None = (2, 3),
             allow_rating_range: tuple[int, int] | None = (0, 0),
             acc_mode: bool = False,
+            keyword_match: Literal['all', 'any'] = 'all',
+            exclude_keywords: str | Sequence[str] | None = None,
+            tag_prefix: bool = False,
             ratio: int | None = None,
             order_mode: Literal['random', 'latest', 'aid', 'aid_desc'] = 'random',
     ) -> list['DBArtworkCollection']:
@@ -114,7 +131,8 @@ class BaseArtworkCollection(abc.ABC):
         return await cls.query_any_origin_by_condition(
             origin=cls._get_origin_name(), keywords=keywords, num=num,
             allow_classification_range=allow_classification_range, allow_rating_range=allow_rating_range,
-            acc_mode=acc_mode, ratio=ratio, order_mode=order_mode
+            acc_mode=acc_mode, keyword_match=keyword_match, exclude_keywords=exclude_keywords,
+            tag_prefix=tag_prefix, ratio=ratio, order_mode=order_mode
         )
 
     @classmethod
@@ -190,6 +208,19 @@ class BaseArtworkCollection(abc.ABC):
             )
         return result
 
+    @classmethod
+    async def query_users_created_times(
+            cls,
+            uids: Sequence[str],
+            start_time: datetime,
+    ) -> list[tuple[str, datetime]]:
+        """查询多个用户在某时间之后收录的全部作品的 (用户ID, 收录时间)"""
+        async with begin_db_session() as session:
+            result = await ArtworkCollectionDAL(session=session).query_users_created_times(
+                origin=cls._get_origin_name(), uids=uids, start_time=start_time
+            )
+        return result
+
     @classmethod
     async def query_exists_aids(
             cls,
@@ -295,12 +326,14 @@ class BaseArtworkCollection(abc.ABC):
             use_cache: bool = True,
             classification: int | None = None,
             rating: int | None = None,
+            index_image_hash: bool = False,
     ) -> None:
         """查询图站获取作品元数据, 向数据库新增该作品信息, 若已存在忽略
 
         :param use_cache: 使用缓存的作品信息
         :param classification: 指定写入的 classification
         :param rating: 指定写入的 rating
+        :param index_image_hash: 新增作品后为其建立图片感知哈希索引, 并记录其他图库中的疑似重复作品
         :return: None
         """
         async with begin_db_session() as session:
@@ -322,11 +355,147 @@ class BaseArtworkCollection(abc.ABC):
                     source=artwork_data.source, cover_page=artwork_data.cover_page_url,
                     description=None if not artwork_data.description else artwork_data.description
                 )
+            else:
+                return
+
+        if index_image_hash:
+            await self._index_image_hash_and_log_duplicates()
+
+    @classmethod
+    async def add_artworks_into_database_ignore_exists(
+            cls,
+            artworks: Sequence['BaseArtworkProxy | str | int'],
+            *,
+            use_cache: bool = True,
+            classification: int | None = None,
+            rating: int | None = None,
+            index_image_hash: bool = False,
+            semaphore_num: int = 8,
+    ) -> list[Self]:
+        """批量向数据库新增作品信息, 已存在的作品忽略
+
+        先一次性筛选出数据库中不存在的作品, 仅为这些作品获取元数据 (由完整搜索结果实例化的作品不会再请求图站,
+        不完整的搜索结果由图库批量补全), 再在同一事务中批量写入
+
+        :param artworks: 作品统一接口实例 (可直接传入 search/random 的结果) 或作品 artwork_id
+        :param use_cache: 使用缓存的作品信息
+        :param classification: 指定写入的 classification
+        :param rating: 指定写入的 rating
+        :param index_image_hash: 新增作品后为其建立图片感知哈希索引, 并记录其他图库中的疑似重复作品
+        :param semaphore_num: 获取作品元数据及建立图片感知哈希索引的并发数
+        :return: 新增的作品
+        """
+        candidates: dict[str, Self] = {}
+        for artwork in artworks:
+            if isinstance(artwork, (str, int)):
+                collection = cls(artwork)
+            else:
+                collection = cls(artwork.s_aid)
+                collection.artwork_proxy.artwork_data = artwork.artwork_data
+                collection.artwork_proxy.is_partial_data = artwork.is_partial_data
+            candidates.setdefault(collection.aid, collection)
+
+        if not candidates:
+            return []
+
+        not_exists_aids = await cls.query_not_exists_aids(aids=list(candidates.keys()))
+        if not not_exists_aids:
+            return []
+
+        try:
+            await cls._get_base_artwork_proxy_type().complete_partial_data(
+                [candidates[aid].artwork_proxy for aid in not_exists_aids]
+            )
+        except Exception as e:
+            logger.warning(f'ArtworkCollection | Completing partial artwork data failed, query one by one, {e!r}')
+
+        tasks = [candidates[aid].artwork_proxy.query(use_cache=use_cache) for aid in not_exists_aids]
+        query_results = await semaphore_gather(tasks=tasks, semaphore_num=semaphore_num, return_exceptions=True)
+
+        new_artworks: list[tuple[Self, DBArtworkCollection]] = []
+        for aid, artwork_data in zip(not_exists_aids, query_results):
+            if isinstance(artwork_data, BaseException):
+                logger.warning(f'ArtworkCollection | Querying {candidates[aid]} failed, {artwork_data!r}')
+                continue
+            new_artworks.append((candidates[aid], DBArtworkCollection.model_validate({
+                'origin': cls._get_origin_name(), 'aid': aid,
+                'title': artwork_data.title, 'uid': artwork_data.uid, 'uname': artwork_data.uname,
+                'classification': classification if (classification is not None) else artwork_data.classification.value,
+                'rating': rating if (rating is not None) else artwork_data.rating.value,
+                'width': artwork_data.width, 'height': artwork_data.height,
+                'tags': ','.join(tag for tag in artwork_data.tags),
+                'source': artwork_data.source, 'cover_page': artwork_data.cover_page_url,
+                'description': None if not artwork_data.description else artwork_data.description,
+            })))
+
+        async with begin_db_session() as session:
+            artwork_dal = ArtworkCollectionDAL(session=session)
+            # 获取元数据期间可能已由其他任务写入
+            exists_aids = set(await artwork_dal.query_exists_aids(
+                origin=cls._get_origin_name(), aids=[x.aid for _, x in new_artworks]
+            ))
+            new_artworks = [x for x in new_artworks if x[1].aid not in exists_aids]
+            await artwork_dal.add_many(artworks=[x for _, x in new_artworks])
+
+        if index_image_hash and new_artworks:
+            await semaphore_gather(
+                tasks=[x._index_image_hash_and_log_duplicates() for x, _ in new_artworks],
+                semaphore_num=semaphore_num,
+            )
+
+        return [x for x, _ in new_artworks]
+
+    async def _index_image_hash_and_log_duplicates(self) -> None:
+        """内部方法, 建立图片感知哈希索引, 并记录其他图库中的疑似重复作品"""
+        try:
+            duplicates = await self.index_image_hash()
+            if duplicates:
+                logger.info(
+                    f'ArtworkCollection | {self} may be duplicate of '
+                    f'{", ".join(f"{x.resource_key}(distance={x.distance})" for x in duplicates)}'
+                )
+        except Exception as e:
+            logger.warning(f'ArtworkCollection | Indexing image hash of {self} failed, {e!r}')
+
+    @property
+    def _image_hash_key(self) -> str:
+        return f'{self.origin_name}/{self.__ap.s_aid}'
+
+    def _filter_duplicates(self, matches: Sequence['ImageHashMatch']) -> list['ImageHashMatch']:
+        """仅保留其他图库中的作品"""
+        return [x for x in matches if not x.resource_key.startswith(f'{self.origin_name}/')]
+
+    async def index_image_hash(self) -> list['ImageHashMatch']:
+        """计算作品预览图的感知哈希并写入索引
+
+        :return: 其他图库中的疑似重复作品, resource_key 格式为 "origin/aid"
+        """
+        preview_file = await self.__ap.get_page_file(page_type='preview')
+        hash_value = await image_hash_index.hash_file(preview_file)
+        await image_hash_index.add(
+            namespace=_IMAGE_HASH_NAMESPACE, resource_key=self._image_hash_key, hash_value=hash_value
+        )
+        return self._filter_duplicates(
+            await image_hash_index.query(namespace=_IMAGE_HASH_NAMESPACE, hash_value=hash_value)
+        )
+
+    async def query_duplicates(self) -> list['ImageHashMatch']:
+        """查询其他图库中的疑似重复作品, 作品未建立图片感知哈希索引时返回空列表
+
+        :return: 其他图库中的疑似重复作品, resource_key 格式为 "origin/aid"
+        """
+        hash_value = await image_hash_index.get(namespace=_IMAGE_HASH_NAMESPACE, resource_key=self._image_hash_key)
+        if hash_value is None:
+            return []
+        return self._filter_duplicates(
+            await image_hash_index.query(namespace=_IMAGE_HASH_NAMESPACE, hash_value=hash_value)
+        )
 
     async def delete_artwork_from_database(self) -> None:
         """从数据库删除该作品信息"""
         async with begin_db_session() as session:
             await ArtworkCollectionDAL(session=session).delete(origin=self.origin_name, aid=self.__ap.s_aid)
+        await image_hash_index.remove(namespace=_IMAGE_HASH_NAMESPACE, resource_key=self._image_hash_key)
 
 
 __all__ = [
@@ -10,6 +10,9 @@
 
 from typing import Literal
 
+from nonebot import logger
+
+from ..apscheduler import scheduler
 from .sites import (
     BehoimiArtworkProxy,
     DanbooruArtworkProxy,
@@ -34,6 +37,44 @@ type ALLOW_ARTWORK_ORIGIN = Literal[
 ]
 
 
+async def _import_legacy_metadata() -> None:
+    """将旧版本逐个保存的 json 元数据文件导入各图库的元数据存储, 导入后删除原文件"""
+    imported_origins: set[str] = set()
+    for proxy_type in (
+            BehoimiArtworkProxy,
+            DanbooruArtworkProxy,
+            GelbooruArtworkProxy,
+            KonachanArtworkProxy,
+            LocalCollectedArtworkProxy,
+            NoneArtworkProxy,
+            PixivArtworkProxy,
+            YandereArtworkProxy,
+    ):
+        origin_name = proxy_type.get_base_origin_name()
+        if origin_name in imported_origins:
+            continue
+        imported_origins.add(origin_name)
+
+        try:
+            imported_count = await proxy_type.import_legacy_metadata()
+            if imported_count:
+                logger.opt(colors=True).success(
+                    f'<lc>ArtworkProxy</lc> | <lg>已导入 {origin_name} 元数据文件</lg>, 共 {imported_count} 个'
+                )
+        except Exception as e:
+            logger.opt(colors=True).error(f'<lc>ArtworkProxy</lc> | 导入 {origin_name} 元数据文件失败, {e!r}')
+
+
+# 启动后执行一次, 迁移旧版本的元数据文件
+scheduler.add_job(
+    _import_legacy_metadata,
+    'date',
+    id='artwork_proxy_import_legacy_metadata',
+    coalesce=True,
+    misfire_grace_time=300,
+)
+
+
 __all__ = [
     'ALLOW_ARTWORK_ORIGIN',
     'DanbooruArtworkProxy',
@@ -9,16 +9,20 @@
 """
 
 import abc
+import hashlib
+import os
 from collections.abc import Sequence
-from typing import TYPE_CHECKING, Literal
+from typing import TYPE_CHECKING, ClassVar, Literal
 
-from nonebot.utils import run_sync
+from PIL import Image, ImageOps
 
-from src.utils import semaphore_gather
+from src.utils import SingleFlight, semaphore_gather
 from src.utils.image_utils import ImageUtils
 from src.utils.image_utils.template import PreviewImageModel, PreviewImageThumbs, generate_thumbs_preview_image
+from src.utils.render_executor import render_job
 from .typing import ArtworkProxyAddonsMixin
 from ..models import ArtworkPool
+from ...omega_resource_cache import resource_cache
 
 if TYPE_CHECKING:
     from src.resource import TemporaryResource
@@ -26,38 +30,95 @@ if TYPE_CHECKING:
     from ..models import ArtworkData
     from ..typing import ArtworkPageParamType
 
+type ProcessMode = Literal['mark', 'blur', 'noise']
+
 
 class ImageOpsMixin(ArtworkProxyAddonsMixin, abc.ABC):
     """作品图片处理工具插件"""
 
-    @staticmethod
-    @run_sync
-    def _handle_blur(image: 'TemporaryResource', origin_mark: str) -> ImageUtils:
-        """模糊处理图片"""
-        _image = ImageUtils.init_from_file(file=image)
-        _image.gaussian_blur()
-        _image.mark(text=origin_mark)
-        _image.convert(mode='RGB')
-        return _image
+    _processed_variant_version: ClassVar[int] = 1
+    """处理后图片的缓存版本, 修改图片处理流程或参数后需递增, 以使已缓存的处理结果失效"""
+
+    _preview_thumb_size: ClassVar[int] = 512
+    """预览图缩略图处理尺寸上限, 预览图中的缩略图远小于原图, 先缩小再处理可大幅降低模糊等操作的开销"""
+
+    _processed_variant_flight: ClassVar[SingleFlight[str, 'TemporaryResource']] = SingleFlight('ImageOpsVariant')
 
     @staticmethod
-    @run_sync
-    def _handle_mark(image: 'TemporaryResource', origin_mark: str) -> ImageUtils:
-        """标记水印"""
-        _image = ImageUtils.init_from_file(file=image)
+    @render_job('image_ops')
+    def _render_processed_variant(
+            image: 'TemporaryResource',
+            output_file: 'TemporaryResource',
+            *,
+            origin_mark: str,
+            process_mode: ProcessMode,
+            thumbnail_size: int | None = None,
+    ) -> 'TemporaryResource':
+        """处理图片并写入 output_file, 在渲染执行器中运行"""
+        with image.open('rb') as f:
+            source_image = Image.open(f)
+            if thumbnail_size is not None:
+                # JPEG 等格式可在解码时直接按比例缩小, 避免完整解码大尺寸原图
+                source_image.draft('RGB', (thumbnail_size, thumbnail_size))
+            source_image.load()
+
+        if thumbnail_size is not None and max(source_image.size) > thumbnail_size:
+            source_image = ImageOps.contain(source_image, (thumbnail_size, thumbnail_size))
+        _image = ImageUtils(image=source_image)
+
+        match process_mode:
+            case 'noise':
+                _image.gaussian_noise(sigma=16)
+            case 'blur':
+                _image.gaussian_blur()
+            case 'mark' | _:
+                pass
         _image.mark(text=origin_mark)
         _image.convert(mode='RGB')
-        return _image
+
+        # 先写入临时文件再替换, 避免其他调用方读取到未写入完成的文件
+        part_path = output_file.path.with_name(f'.{output_file.path.name}.part')
+        part_path.parent.mkdir(parents=True, exist_ok=True)
+        _image.image.save(part_path, format='JPEG')
+        os.replace(part_path, output_file.path)
+        return output_file
 
     @staticmethod
-    @run_sync
-    def _handle_noise(image: 'TemporaryResource', origin_mark: str) -> ImageUtils:
-        """噪点处理图片"""
-        _image = ImageUtils.init_from_file(file=image)
-        _image.gaussian_noise(sigma=16)
-        _image.mark(text=origin_mark)
-        _image.convert(mode='RGB')
-        return _image
+    def _get_source_signature(page_file: 'TemporaryResource') -> str:
+        """根据源文件大小及修改时间生成签名, 源文件变化后缓存的处理结果随之失效"""
+        stat = page_file.path.stat()
+        return hashlib.md5(f'{stat.st_size}:{stat.st_mtime_ns}'.encode()).hexdigest()[:8]
+
+    async def _get_processed_variant(
+            self,
+            page_file: 'TemporaryResource',
+            *,
+            origin_mark: str,
+            process_mode: ProcessMode,
+            thumbnail_size: int | None = None,
+    ) -> 'TemporaryResource':
+        """获取作品图片的处理结果, 相同源文件及处理参数的结果只生成一次"""
+        variant = process_mode if thumbnail_size is None else f'{process_mode}_thumb{thumbnail_size}'
+        output_file_name = (
+            f'{page_file.path.stem}_{variant}_v{self._processed_variant_version}_'
+            f'{self._get_source_signature(page_file)}.jpg'
+        )
+        output_file = self.path_config.processed_path(output_file_name)
+
+        if output_file.is_file:
+            resource_cache.touch(output_file)
+            return output_file
+
+        return await self._processed_variant_flight.do(
+            output_file.resolve_path,
+            lambda: self._render_processed_variant(
+                image=page_file,
+                output_file=output_file,
+                origin_mark=origin_mark,
+                process_mode=process_mode,
+                thumbnail_size=thumbnail_size,
+            ),
+        )
 
     """图片标记工具"""
 
@@ -66,33 +127,21 @@ class ImageOpsMixin(ArtworkProxyAddonsMixin, abc.ABC):
             page_index: int = 0,
             *,
             page_type: 'ArtworkPageParamType' = 'regular',
-            process_mode: Literal['mark', 'blur', 'noise'] = 'mark',
+            process_mode: ProcessMode = 'mark',
     ) -> 'TemporaryResource':
         """处理作品图片"""
-        artwork_data = await self.query()
+        artwork_data = await self.query(allow_partial=True)
         origin_mark = f'{artwork_data.origin.title()} | {artwork_data.aid}'
 
         page_file = await self.get_page_file(page_index=page_index, page_type=page_type)
-        match process_mode:
-            case 'noise':
-                image = await self._handle_noise(image=page_file, origin_mark=origin_mark)
-                output_file_name = f'{page_file.path.stem}_noise_sigma16_marked.jpg'
-            case 'blur':
-                image = await self._handle_blur(image=page_file, origin_mark=origin_mark)
-                output_file_name = f'{page_file.path.stem}_blur_marked.jpg'
-            case 'mark' | _:
-                image = await self._handle_mark(image=page_file, origin_mark=origin_mark)
-                output_file_name = f'{page_file.path.stem}_marked.jpg'
-
-        output_file = self.path_config.processed_path(output_file_name)
-        return await image.save(file=output_file)
+        return await self._get_processed_variant(page_file, origin_mark=origin_mark, process_mode=process_mode)
 
     async def get_custom_proceed_page_file(
             self,
             page_index: int = 0,
             *,
             page_type: 'ArtworkPageParamType' = 'regular',
-            process_mode: Literal['mark', 'blur', 'noise'] = 'mark',
+            process_mode: ProcessMode = 'mark',
     ) -> 'TemporaryResource':
         """使用自定义方法处理作品图片"""
         return await self._process_artwork_page(page_index=page_index, page_type=page_type, process_mode=process_mode)
@@ -112,7 +161,7 @@ class ImageOpsMixin(ArtworkProxyAddonsMixin, abc.ABC):
         :return: TemporaryResource
         """
         max_no_blur_rating = max(0, no_blur_rating)
-        artwork_data = await self.query()
+        artwork_data = await self.query(allow_partial=True)
 
         if artwork_data.rating.value == 0:
             process = self._process_artwork_page(page_index=page_index, page_type=page_type, process_mode='mark')
@@ -138,16 +187,19 @@ class ImageOpsMixin(ArtworkProxyAddonsMixin, abc.ABC):
     ) -> PreviewImageThumbs:
         """获取生成预览图所需要的作品数据"""
         max_no_blur_rating = max(0, no_blur_rating)
-        artwork_data = await self.query()
+        artwork_data = await self.query(allow_partial=True)
 
         image_file = await self.get_page_file(page_type=page_type)
-        if artwork_data.rating.value <= max_no_blur_rating:
-            proceed_image = await self._handle_mark(image=image_file, origin_mark=artwork_data.aid)
-        else:
-            proceed_image = await self._handle_blur(image=image_file, origin_mark=artwork_data.aid)
+        proceed_file = await self._get_processed_variant(
+            image_file,
+            origin_mark=artwork_data.aid,
+            process_mode='mark' if artwork_data.rating.value <= max_no_blur_rating else 'blur',
+            thumbnail_size=self._preview_thumb_size,
+        )
 
         desc_text = await self.get_std_preview_desc()
-        preview_thumb = await proceed_image.async_get_bytes()
+        async with proceed_file.async_open('rb') as af:
+            preview_thumb = await af.read()
 
         return PreviewImageThumbs(desc_text=desc_text, preview_thumb=preview_thumb)
 
@@ -278,15 +330,17 @@ class ImageOpsMixin(ArtworkProxyAddonsMixin, abc.ABC):
 class ImageOpsPlusPoolMixin(ImageOpsMixin, abc.ABC):
     """作品图片处理工具插件(附加图集处理功能)"""
 
-    @classmethod
-    def _get_pool_meta_file(cls, pool_id: str) -> 'TemporaryResource':
-        return cls._generate_path_config().meta_path(f'pool_{pool_id}.json')
+    @staticmethod
+    def _get_pool_meta_key(pool_id: str) -> str:
+        """图集元数据在元数据存储中的键"""
+        return f'pool/{pool_id}'
 
     @classmethod
     async def _dumps_pool_meta(cls, pool_data: ArtworkPool) -> None:
         """内部方法, 缓存图集元数据"""
-        async with cls._get_pool_meta_file(pool_id=pool_data.pool_id).async_open('w', encoding='utf8') as af:
-            await af.write(pool_data.model_dump_json())
+        await cls._get_meta_store().put(
+            cls._get_pool_meta_key(pool_id=pool_data.pool_id), pool_data.model_dump_json().encode('utf8')
+        )
 
     @classmethod
     @abc.abstractmethod
@@ -297,13 +351,11 @@ class ImageOpsPlusPoolMixin(ImageOpsMixin, abc.ABC):
     @classmethod
     async def _fast_query_pool(cls, pool_id: str, *, use_cache: bool = True) -> ArtworkPool:
         """获取图集信息, 优先从本地缓存加载"""
-        if use_cache and cls._get_pool_meta_file(pool_id=pool_id).is_file:
-            async with cls._get_pool_meta_file(pool_id=pool_id).async_open('r', encoding='utf8') as af:
-                pool_data = ArtworkPool.model_validate_json(await af.read())
-        else:
-            pool_data = await cls._query_pool(pool_id=pool_id)
-            await cls._dumps_pool_meta(pool_data=pool_data)
+        if use_cache and (cached_data := await cls._get_meta_store().get(cls._get_pool_meta_key(pool_id))) is not None:
+            return ArtworkPool.model_validate_json(cached_data)
 
+        pool_data = await cls._query_pool(pool_id=pool_id)
+        await cls._dumps_pool_meta(pool_data=pool_data)
         return pool_data
 
     @classmethod
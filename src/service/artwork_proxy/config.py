@@ -8,9 +8,32 @@
 @Software       : PyCharm 
 """
 
+from nonebot import get_plugin_config, logger
+from pydantic import BaseModel, ConfigDict, ValidationError
+
 from src.resource import StaticResource, TemporaryResource
 
 
+class ArtworkProxyConfig(BaseModel):
+    """Artwork Proxy 配置"""
+    # 是否按内容哈希存储作品图片缓存, 内容相同的图片 (如不同图站收录的同一作品) 在磁盘上仅保存一份
+    artwork_proxy_content_addressed_storage: bool = False
+    # 作品及图集元数据缓存的有效期, 单位秒, 超过有效期后重新获取, 为空则永不过期
+    artwork_proxy_metadata_ttl: int | None = None
+    # 元数据缓存中超过该字节数的数据压缩存储, 为空则不压缩
+    artwork_proxy_metadata_compress_threshold: int | None = 1024
+
+    model_config = ConfigDict(extra='ignore')
+
+
+try:
+    artwork_proxy_config = get_plugin_config(ArtworkProxyConfig)
+except ValidationError as e:
+    import sys
+    logger.opt(colors=True).critical(f'<r>Artwork Proxy 配置格式验证失败</r>, 错误信息:\n{e}')
+    sys.exit(f'Artwork Proxy 配置格式验证失败, {e}')
+
+
 class ArtworkProxyPathConfig:
     """作品本地缓存路径配置"""
     _default_text_font_name: str = 'SourceHanSansSC-Regular.otf'
@@ -19,6 +42,11 @@ class ArtworkProxyPathConfig:
     def __init__(self, base_path_name: str):
         self.__base = base_path_name
 
+    @staticmethod
+    def content_path(content_hash: str, file_ext: str) -> TemporaryResource:
+        """按内容哈希存储的作品图片文件, 由全部图库共享"""
+        return TemporaryResource('artwork_proxy_content', content_hash[:2], f'{content_hash}.{file_ext.strip(".")}')
+
     @property
     def text_font(self) -> StaticResource:
         """默认文本字体"""
@@ -36,9 +64,14 @@ class ArtworkProxyPathConfig:
 
     @property
     def meta_path(self) -> TemporaryResource:
-        """作品元数据文件目录"""
+        """作品元数据文件目录 (旧版本逐个作品保存的 json 元数据文件, 仅用于迁移)"""
         return self.base_path('metadata')
 
+    @property
+    def meta_store_file(self) -> TemporaryResource:
+        """作品及图集元数据存储文件, 不位于缓存主目录下, 避免被临时资源缓存清理"""
+        return TemporaryResource('artwork_proxy_metadata', f'{self.__base}.db')
+
     @property
     def artwork_path(self) -> TemporaryResource:
         """作品图片缓存文件目录"""
@@ -56,5 +89,6 @@ class ArtworkProxyPathConfig:
 
 
 __all__ = [
-    'ArtworkProxyPathConfig'
+    'ArtworkProxyPathConfig',
+    'artwork_proxy_config',
 ]
@@ -9,14 +9,19 @@
 """
 
 import abc
-from pathlib import PurePath
-from typing import TYPE_CHECKING, Self
+import hashlib
+from collections.abc import Sequence
+from pathlib import Path, PurePath
+from typing import TYPE_CHECKING, ClassVar, Self
 from urllib.parse import unquote, urlparse
 
+from nonebot.utils import run_sync
 from pydantic import ValidationError
 
-from src.utils import semaphore_gather
-from .config import ArtworkProxyPathConfig
+from src.utils import SingleFlight, semaphore_gather
+from src.utils.kv_store import SQLiteKVStore
+from ..omega_resource_cache import resource_cache
+from .config import ArtworkProxyPathConfig, artwork_proxy_config
 from .models import ArtworkData
 
 if TYPE_CHECKING:
@@ -25,15 +30,28 @@ if TYPE_CHECKING:
     from .typing import ArtworkPageParamType
 
 
+_META_QUERY_FLIGHT: SingleFlight[tuple[str, str, bool], ArtworkData] = SingleFlight(name='artwork_meta_query')
+"""合并同一作品并发的元数据查询, key 为 (图库来源, 元数据键, 是否使用缓存)"""
+_META_STORES: dict[str, SQLiteKVStore] = {}
+"""各图库的元数据存储, key 为图库来源名称"""
+_PAGE_DOWNLOAD_FLIGHT: SingleFlight[str, 'TemporaryResource'] = SingleFlight(name='artwork_page_download')
+"""合并同一作品图片并发的下载, key 为图片缓存文件路径"""
+
+
 class BaseArtworkProxy(abc.ABC):
     """Artwork Proxy 基类"""
 
+    _partial_search_results: ClassVar[bool] = False
+    """搜索及随机接口返回的作品信息是否少于作品详情 (如缺少标题, 描述等), 为真时此类作品信息仅用于获取作品图片"""
+
     def __init__(self, artwork_id: str | int):
         self.__id = artwork_id
         self.__path_config = self._generate_path_config()
 
         # 实例缓存
         self.artwork_data: ArtworkData | None = None
+        # 实例缓存的作品信息是否来自不完整的搜索结果
+        self.is_partial_data: bool = False
 
     def __repr__(self) -> str:
         return f'{self.__class__.__name__}(artwork_id={self.s_aid})'
@@ -50,12 +68,9 @@ class BaseArtworkProxy(abc.ABC):
         return str(self.__id)
 
     @property
-    def meta_file_name(self) -> str:
-        return f'{self.s_aid}.json'
-
-    @property
-    def meta_file(self) -> 'TemporaryResource':
-        return self.path_config.meta_path(self.meta_file_name)
+    def meta_key(self) -> str:
+        """作品元数据在元数据存储中的键"""
+        return f'artwork/{self.s_aid}'
 
     @property
     def origin_name(self) -> str:
@@ -83,12 +98,75 @@ class BaseArtworkProxy(abc.ABC):
         """内部方法, 生成该图库的本地存储路径配置项"""
         return ArtworkProxyPathConfig(base_path_name=cls.get_base_origin_name())
 
+    @classmethod
+    def _get_meta_store(cls) -> SQLiteKVStore:
+        """内部方法, 获取该图库的元数据存储, 同一图库来源共用一个存储文件"""
+        origin_name = cls.get_base_origin_name()
+        if (store := _META_STORES.get(origin_name)) is None:
+            store = SQLiteKVStore(
+                cls._generate_path_config().meta_store_file.resolve_path,
+                compress_threshold=artwork_proxy_config.artwork_proxy_metadata_compress_threshold,
+                ttl=artwork_proxy_config.artwork_proxy_metadata_ttl,
+            )
+            _META_STORES[origin_name] = store
+        return store
+
+    @classmethod
+    async def import_legacy_metadata(cls, *, remove_source: bool = True, batch_size: int = 500) -> int:
+        """将旧版本逐个保存的 json 元数据文件导入元数据存储, 存储中已有的数据不会被覆盖
+
+        :param remove_source: 导入后删除原 json 文件
+        :param batch_size: 每批写入的文件数
+        :return: 导入的文件数
+        """
+        return await run_sync(cls._import_legacy_metadata)(remove_source=remove_source, batch_size=batch_size)
+
+    @classmethod
+    def _import_legacy_metadata(cls, *, remove_source: bool, batch_size: int) -> int:
+        meta_path = cls._generate_path_config().meta_path.path
+        if not meta_path.is_dir():
+            return 0
+
+        store = cls._get_meta_store()
+        imported_count = 0
+        batch: list[tuple[str, bytes, Path]] = []
+
+        def _flush() -> None:
+            store.put_many_sync(((key, value) for key, value, _ in batch), replace=False)
+            if remove_source:
+                for *_, file in batch:
+                    file.unlink(missing_ok=True)
+            batch.clear()
+
+        for file in meta_path.glob('*.json'):
+            if file.stem.startswith('pool_'):
+                key = f'pool/{file.stem.removeprefix("pool_")}'
+            else:
+                key = f'artwork/{file.stem}'
+            batch.append((key, file.read_bytes(), file))
+            imported_count += 1
+            if len(batch) >= batch_size:
+                _flush()
+        if batch:
+            _flush()
+
+        return imported_count
+
     @classmethod
     @abc.abstractmethod
     async def _get_resource_as_bytes(cls, url: str, *, timeout: int = 30) -> bytes:
         """内部方法, 请求原始资源内容, 并转换为 bytes 类型返回"""
         raise NotImplementedError
 
+    @classmethod
+    async def _download_file(cls, url: str, file: 'TemporaryResource', *, timeout: int = 60) -> 'TemporaryResource':
+        """内部方法, 下载原始资源到指定文件
+
+        默认将资源完整读入内存后写入, 图库支持流式下载时应覆盖该方法
+        """
+        await file.async_write_atomic(await cls._get_resource_as_bytes(url=url, timeout=timeout))
+        return file
+
     @classmethod
     @abc.abstractmethod
     async def _get_resource_as_text(cls, url: str, *, timeout: int = 10) -> str:
@@ -97,25 +175,78 @@ class BaseArtworkProxy(abc.ABC):
 
     @classmethod
     @abc.abstractmethod
-    async def _random(cls, *, limit: int = 20) -> list[str | int]:
-        """内部方法, 随机获取作品 ID 列表"""
+    async def _random(cls, *, limit: int = 20) -> Sequence[str | int | ArtworkData]:
+        """内部方法, 随机获取作品 ID 列表, 接口返回完整作品信息时可直接返回作品信息"""
         raise NotImplementedError
 
     @classmethod
     @abc.abstractmethod
-    async def _search(cls, keyword: str, *, page: int | None = None, **kwargs) -> list[str | int]:
-        """内部方法, 根据关键词搜索作品 ID 列表"""
+    async def _search(cls, keyword: str, *, page: int | None = None, **kwargs) -> Sequence[str | int | ArtworkData]:
+        """内部方法, 根据关键词搜索作品 ID 列表, 接口返回完整作品信息时可直接返回作品信息"""
         raise NotImplementedError
 
+    @classmethod
+    async def _init_from_results(cls, results: Sequence[str | int | ArtworkData]) -> list[Self]:
+        """内部方法, 由搜索结果实例化, 结果为作品信息时写入实例缓存, 后续查询不再请求图站
+
+        搜索结果包含的信息少于作品详情的图库, 其作品信息仅标记为不完整的实例缓存而不写入元数据存储
+        """
+        artworks: list[Self] = []
+        for result in results:
+            if isinstance(result, ArtworkData):
+                artwork = cls(artwork_id=result.aid)
+                artwork.artwork_data = result
+                artwork.is_partial_data = cls._partial_search_results
+            else:
+                artwork = cls(artwork_id=result)
+            artworks.append(artwork)
+
+        if cls._partial_search_results:
+            return artworks
+
+        # 不覆盖已有的元数据, 已有的元数据可能来自作品详情
+        await cls._get_meta_store().put_many(
+            ((x.meta_key, x.artwork_data.model_dump_json().encode('utf8')) for x in artworks if x.artwork_data),
+            replace=False,
+        )
+        return artworks
+
+    @classmethod
+    async def _complete_partial_results(cls, artworks_data: Sequence[ArtworkData]) -> Sequence[ArtworkData] | None:
+        """内部方法, 批量补全不完整搜索结果中缺少的作品信息, 按传入顺序返回, 图库不支持批量补全时返回 None"""
+        return None
+
+    @classmethod
+    async def complete_partial_data(cls, artworks: Sequence[Self]) -> None:
+        """批量补全由不完整搜索结果实例化的作品的作品信息, 并写入元数据存储
+
+        图库不支持批量补全时不做处理, 之后查询作品信息时再逐个请求作品详情
+        """
+        partial_artworks = [x for x in artworks if x.is_partial_data and isinstance(x.artwork_data, ArtworkData)]
+        if not partial_artworks:
+            return
+
+        completed = await cls._complete_partial_results([x.artwork_data for x in partial_artworks])
+        if completed is None:
+            return
+
+        for artwork, artwork_data in zip(partial_artworks, completed):
+            artwork.artwork_data = artwork_data
+            artwork.is_partial_data = False
+        await cls._get_meta_store().put_many(
+            ((x.meta_key, x.artwork_data.model_dump_json().encode('utf8')) for x in partial_artworks),
+            replace=False,
+        )
+
     @classmethod
     async def random(cls, *, limit: int = 20) -> list[Self]:
         """随机获取作品列表"""
-        return [cls(artwork_id=aid) for aid in await cls._random(limit=limit)]
+        return await cls._init_from_results(await cls._random(limit=limit))
 
     @classmethod
     async def search(cls, keyword: str, *, page: int | None = None, **kwargs) -> list[Self]:
         """根据关键词搜索作品列表"""
-        return [cls(artwork_id=aid) for aid in await cls._search(keyword=keyword, page=page, **kwargs)]
+        return await cls._init_from_results(await cls._search(keyword=keyword, page=page, **kwargs))
 
     @abc.abstractmethod
     async def _query(self) -> ArtworkData:
@@ -124,28 +255,36 @@ class BaseArtworkProxy(abc.ABC):
 
     async def _dumps_meta(self, artwork_data: ArtworkData) -> None:
         """内部方法, 缓存元数据"""
-        async with self.meta_file.async_open('w', encoding='utf8') as af:
-            await af.write(artwork_data.model_dump_json())
+        await self._get_meta_store().put(self.meta_key, artwork_data.model_dump_json().encode('utf8'))
 
     async def _fast_query(self, *, use_cache: bool = True) -> ArtworkData:
-        """获取作品信息, 优先从本地缓存加载"""
-        if use_cache and self.meta_file.is_file:
+        """获取作品信息, 优先从本地缓存加载, 同一作品并发的查询只执行一次"""
+        return await _META_QUERY_FLIGHT.do(
+            key=(self.get_base_origin_name(), self.meta_key, use_cache),
+            func=lambda: self._load_or_query(use_cache=use_cache),
+        )
+
+    async def _load_or_query(self, *, use_cache: bool = True) -> ArtworkData:
+        """内部方法, 从元数据存储加载作品信息, 无缓存, 缓存过期或无效时查询并缓存"""
+        if use_cache and (cached_data := await self._get_meta_store().get(self.meta_key)) is not None:
             try:
-                async with self.meta_file.async_open('r', encoding='utf8') as af:
-                    artwork_data = ArtworkData.model_validate_json(await af.read())
+                return ArtworkData.model_validate_json(cached_data)
             except ValidationError:
-                artwork_data = await self._query()
-                await self._dumps_meta(artwork_data=artwork_data)
-        else:
-            artwork_data = await self._query()
-            await self._dumps_meta(artwork_data=artwork_data)
+                pass
 
+        artwork_data = await self._query()
+        await self._dumps_meta(artwork_data=artwork_data)
         return artwork_data
 
-    async def query(self, *, use_cache: bool = True) -> ArtworkData:
-        """获取作品信息"""
-        if not isinstance(self.artwork_data, ArtworkData):
+    async def query(self, *, use_cache: bool = True, allow_partial: bool = False) -> ArtworkData:
+        """获取作品信息
+
+        :param use_cache: 是否使用元数据存储中缓存的作品信息
+        :param allow_partial: 是否接受来自不完整搜索结果的作品信息, 仅需要作品图片等搜索结果中完整的信息时使用
+        """
+        if not isinstance(self.artwork_data, ArtworkData) or (self.is_partial_data and not allow_partial):
             self.artwork_data = await self._fast_query(use_cache=use_cache)
+            self.is_partial_data = False
 
         if not isinstance(self.artwork_data, ArtworkData):
             raise TypeError('Query artwork data failed')
@@ -167,7 +306,16 @@ class BaseArtworkProxy(abc.ABC):
             page_type: 'ArtworkPageParamType' = 'regular'
     ) -> bytes:
         """内部方法, 加载作品图片资源"""
-        artwork_data = await self.query()
+        file_url = await self._get_page_url(page_index=page_index, page_type=page_type)
+        return await self._get_resource_as_bytes(url=file_url)
+
+    async def _get_page_url(
+            self,
+            page_index: int = 0,
+            page_type: 'ArtworkPageParamType' = 'regular'
+    ) -> str:
+        """内部方法, 获取作品图片资源链接"""
+        artwork_data = await self.query(allow_partial=True)
 
         match page_type:
             case 'preview':
@@ -177,7 +325,7 @@ class BaseArtworkProxy(abc.ABC):
             case 'regular' | _:
                 file_url = artwork_data.regular_pages_url[page_index]
 
-        return await self._get_resource_as_bytes(url=file_url)  # type: ignore
+        return file_url  # type: ignore
 
     async def _save_page(
             self,
@@ -185,7 +333,7 @@ class BaseArtworkProxy(abc.ABC):
             page_type: 'ArtworkPageParamType' = 'regular'
     ) -> 'TemporaryResource':
         """内部方法, 保存作品资源到本地"""
-        artwork_data = await self.query()
+        artwork_data = await self.query(allow_partial=True)
 
         match page_type:
             case 'preview':
@@ -200,14 +348,53 @@ class BaseArtworkProxy(abc.ABC):
 
         # 如果已经存在则直接返回本地资源
         if page_file.is_file:
+            resource_cache.touch(page_file)
             return page_file
 
-        # 没有的话再下载并保存文件
-        page_content = await self._query_page(page_index=page_index, page_type=page_type)
-        async with page_file.async_open('wb') as af:
-            await af.write(page_content)
+        # 没有的话再下载并保存文件, 同一文件并发的下载只执行一次
+        return await _PAGE_DOWNLOAD_FLIGHT.do(
+            key=page_file.path.as_posix(),
+            func=lambda: self._download_page(
+                page_file=page_file, page_index=page_index, page_type=page_type, file_ext=page.file_ext
+            ),
+        )
+
+    async def _download_page(
+            self,
+            page_file: 'TemporaryResource',
+            page_index: int,
+            page_type: 'ArtworkPageParamType',
+            file_ext: str,
+    ) -> 'TemporaryResource':
+        """内部方法, 下载作品资源并写入本地缓存文件
+
+        启用按内容哈希存储时, 图片内容仅保存一份, 缓存文件为其硬链接
+        """
+        # 等待期间可能已由此前的下载写入
+        if page_file.is_file:
+            return page_file
+
+        file_url = await self._get_page_url(page_index=page_index, page_type=page_type)
+        await self._download_file(url=file_url, file=page_file)
+
+        if artwork_proxy_config.artwork_proxy_content_addressed_storage:
+            content_hash = await run_sync(self._hash_file)(file=page_file)
+            content_file = self.path_config.content_path(content_hash, file_ext)
+            if content_file.is_file:
+                await page_file.async_link_from(content_file)
+            else:
+                await content_file.async_link_from(page_file)
         return page_file
 
+    @staticmethod
+    def _hash_file(file: 'TemporaryResource', chunk_size: int = 64 * 1024) -> str:
+        """内部方法, 分块计算文件 sha256"""
+        file_hash = hashlib.sha256()
+        with file.open('rb') as f:
+            while chunk := f.read(chunk_size):
+                file_hash.update(chunk)
+        return file_hash.hexdigest()
+
     async def _load_page(
             self,
             page_index: int = 0,
@@ -246,7 +433,7 @@ class BaseArtworkProxy(abc.ABC):
         :param page_limit: 返回作品图片最大数量限制, 从第一张图开始计算, 避免漫画作品等单作品图片数量过多出现问题, 0 为无限制
         :param page_type: 类型, original: 原始图片, regular: 默认大图, preview: 缩略图
         """
-        artwork_data = await self.query()
+        artwork_data = await self.query(allow_partial=True)
 
         # 创建获取作品页资源文件的 Task
         if page_limit <= 0:
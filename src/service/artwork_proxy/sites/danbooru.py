@@ -19,12 +19,21 @@ from ..internal import BaseArtworkProxy
 from ..models import ArtworkData, ArtworkPageFile, ArtworkPool
 
 if TYPE_CHECKING:
-    from src.utils.booru_api.models.danbooru import PostMediaAsset, PostVariantTypes
+    from collections.abc import Sequence
+
+    from src.resource import TemporaryResource
+    from src.utils.booru_api.models.danbooru import ArtistCommentary, Post, PostMediaAsset, PostVariantTypes
 
 
 class BaseDanbooruArtworkProxy(BaseArtworkProxy, abc.ABC):
     """Danbooru 图库统一接口实现"""
 
+    # 搜索结果中不包含作品注释 (标题及描述)
+    _partial_search_results = True
+
+    _commentaries_batch_size: int = 100
+    """批量查询作品注释时单次请求的作品数量"""
+
     @classmethod
     @abc.abstractmethod
     def _get_api(cls) -> BaseDanbooruAPI:
@@ -35,6 +44,10 @@ class BaseDanbooruArtworkProxy(BaseArtworkProxy, abc.ABC):
     async def _get_resource_as_bytes(cls, url: str, *, timeout: int = 30) -> bytes:
         return await cls._get_api().get_resource_as_bytes(url=url, timeout=timeout)
 
+    @classmethod
+    async def _download_file(cls, url: str, file: 'TemporaryResource', *, timeout: int = 60) -> 'TemporaryResource':
+        return await cls._get_api().download_file(url=url, file=file, timeout=timeout)
+
     @classmethod
     async def _get_resource_as_text(cls, url: str, *, timeout: int = 10) -> str:
         return await cls._get_api().get_resource_as_text(url=url, timeout=timeout)
@@ -78,7 +91,7 @@ class BaseDanbooruArtworkProxy(BaseArtworkProxy, abc.ABC):
             return cls._get_variant_page_file(variant=media_asset.variant_type_original)
 
     @classmethod
-    async def _random(cls, *, limit: int = 20) -> list[str | int]:
+    async def _random(cls, *, limit: int = 20) -> list[ArtworkData]:
         # More likely to timeout due to increased database load.
         # artworks_data = await cls._get_api().posts_index(tags='order:random', limit=limit, **kwargs)
 
@@ -88,15 +101,49 @@ class BaseDanbooruArtworkProxy(BaseArtworkProxy, abc.ABC):
         # Return only get one artwork.
         # artwork_data = await cls._get_api().post_random()
 
-        return [x.id for x in artworks_data]
+        return [cls._parse_post(artwork_data=x) for x in artworks_data]
 
     @classmethod
-    async def _search(cls, keyword: str, *, page: int | None = None, **kwargs) -> list[str | int]:
+    async def _search(cls, keyword: str, *, page: int | None = None, **kwargs) -> list[ArtworkData]:
         artworks_data = await cls._get_api().posts_index(tags=keyword, page=page, **kwargs)
-        return [x.id for x in artworks_data]
+        return [cls._parse_post(artwork_data=x) for x in artworks_data]
 
-    async def _query(self) -> ArtworkData:
-        artwork_data = await self._get_api().post_show(id_=self.i_aid)
+    @classmethod
+    async def _complete_partial_results(cls, artworks_data: 'Sequence[ArtworkData]') -> list[ArtworkData]:
+        """按作品 ID 批量查询作品注释, 补全搜索结果中缺少的标题及描述, 没有作品注释的作品保持不变"""
+        post_ids = [int(x.aid) for x in artworks_data]
+        commentaries: dict[int, 'ArtistCommentary'] = {}
+        for i in range(0, len(post_ids), cls._commentaries_batch_size):
+            batch_ids = post_ids[i:i + cls._commentaries_batch_size]
+            commentaries.update(
+                (x.post_id, x)
+                for x in await cls._get_api().artist_commentaries_index(
+                    limit=len(batch_ids), search_post_id=','.join(str(x) for x in batch_ids)
+                )
+            )
+
+        return [
+            artwork_data if (commentary := commentaries.get(post_id)) is None else artwork_data.model_copy(update={
+                'title': commentary.original_title or commentary.translated_title,
+                'description': commentary.original_description or commentary.translated_description,
+            })
+            for post_id, artwork_data in zip(post_ids, artworks_data)
+        ]
+
+    @classmethod
+    def _parse_post(
+            cls,
+            artwork_data: 'Post',
+            *,
+            title: str | None = None,
+            description: str | None = None,
+    ) -> ArtworkData:
+        """内部方法, 将图站返回的作品数据转换为作品信息, 未提供标题时以版权标签作为标题
+
+        :param artwork_data: 作品数据
+        :param title: 作品注释中的标题
+        :param description: 作品注释中的描述
+        """
 
         """Danbooru 图站收录作品默认分类分级
         (classification, rating)
@@ -141,18 +188,10 @@ class BaseDanbooruArtworkProxy(BaseArtworkProxy, abc.ABC):
             case _:
                 rating = -1
 
-        try:
-            commentary_data = await self._get_api().post_show_artist_commentary(id_=self.i_aid)
-            title = commentary_data.original_title or commentary_data.translated_title
-            description = commentary_data.original_description or commentary_data.translated_description
-        except WebSourceException:
-            title = artwork_data.tag_string_copyright
-            description = None
-
         return ArtworkData.model_validate({
-            'origin': self.get_base_origin_name(),
+            'origin': cls.get_base_origin_name(),
             'aid': artwork_data.id,
-            'title': title,
+            'title': artwork_data.tag_string_copyright if title is None else title,
             'uid': artwork_data.uploader_id,
             'uname': artwork_data.tag_string_artist,
             'classification': classification,
@@ -164,14 +203,27 @@ class BaseDanbooruArtworkProxy(BaseArtworkProxy, abc.ABC):
             'like_count': artwork_data.score,
             'source': artwork_data.source,
             'pages': [{
-                'preview_file': self._get_preview_file(media_asset=artwork_data.media_asset),
-                'regular_file': self._get_regular_file(media_asset=artwork_data.media_asset),
-                'original_file': self._get_original_file(media_asset=artwork_data.media_asset)
+                'preview_file': cls._get_preview_file(media_asset=artwork_data.media_asset),
+                'regular_file': cls._get_regular_file(media_asset=artwork_data.media_asset),
+                'original_file': cls._get_original_file(media_asset=artwork_data.media_asset)
             }]
         })
 
+    async def _query(self) -> ArtworkData:
+        artwork_data = await self._get_api().post_show(id_=self.i_aid)
+
+        try:
+            commentary_data = await self._get_api().post_show_artist_commentary(id_=self.i_aid)
+            title = commentary_data.original_title or commentary_data.translated_title
+            description = commentary_data.original_description or commentary_data.translated_description
+        except WebSourceException:
+            title = None
+            description = None
+
+        return self._parse_post(artwork_data=artwork_data, title=title, description=description)
+
     async def get_std_desc(self, *, desc_len_limit: int = 128) -> str:
-        artwork_data = await self.query()
+        artwork_data = await self.query(allow_partial=True)
 
         tag_t = ' '.join(f'#{x.strip()}' for x in artwork_data.tags)
         desc_t = (
@@ -184,7 +236,7 @@ class BaseDanbooruArtworkProxy(BaseArtworkProxy, abc.ABC):
         return desc_t.strip()
 
     async def get_std_preview_desc(self, *, text_len_limit: int = 12) -> str:
-        artwork_data = await self.query()
+        artwork_data = await self.query(allow_partial=True)
 
         artist = f'Artist: {artwork_data.uname}'
         artist = f'{artist[:text_len_limit]}...' if len(artist) > text_len_limit else artist
@@ -9,6 +9,7 @@
 """
 
 import abc
+from typing import TYPE_CHECKING
 
 from src.utils.booru_api import behoimi_api, konachan_api, konachan_safe_api, yandere_api
 from src.utils.booru_api.moebooru import BaseMoebooruAPI, BehoimiAPI, KonachanAPI, KonachanSafeAPI, YandereAPI
@@ -16,6 +17,10 @@ from ..add_ons import ImageOpsPlusPoolMixin
 from ..internal import BaseArtworkProxy
 from ..models import ArtworkData, ArtworkPool
 
+if TYPE_CHECKING:
+    from src.resource import TemporaryResource
+    from src.utils.booru_api.models.moebooru import Post
+
 
 class BaseMoebooruArtworkProxy(BaseArtworkProxy, abc.ABC):
     """Moebooru 图库统一接口实现"""
@@ -30,22 +35,27 @@ class BaseMoebooruArtworkProxy(BaseArtworkProxy, abc.ABC):
     async def _get_resource_as_bytes(cls, url: str, *, timeout: int = 30) -> bytes:
         return await cls._get_api().get_resource_as_bytes(url=url, timeout=timeout)
 
+    @classmethod
+    async def _download_file(cls, url: str, file: 'TemporaryResource', *, timeout: int = 60) -> 'TemporaryResource':
+        return await cls._get_api().download_file(url=url, file=file, timeout=timeout)
+
     @classmethod
     async def _get_resource_as_text(cls, url: str, *, timeout: int = 10) -> str:
         return await cls._get_api().get_resource_as_text(url=url, timeout=timeout)
 
     @classmethod
-    async def _random(cls, *, limit: int = 20) -> list[str | int]:
+    async def _random(cls, *, limit: int = 20) -> list[ArtworkData]:
         artworks_data = await cls._get_api().posts_index(tags='order:random', limit=limit)
-        return [x.id for x in artworks_data]
+        return [cls._parse_post(artwork_data=x) for x in artworks_data]
 
     @classmethod
-    async def _search(cls, keyword: str, *, page: int | None = None, **kwargs) -> list[str | int]:
+    async def _search(cls, keyword: str, *, page: int | None = None, **kwargs) -> list[ArtworkData]:
         artworks_data = await cls._get_api().posts_index(tags=keyword, page=page, **kwargs)
-        return [x.id for x in artworks_data]
+        return [cls._parse_post(artwork_data=x) for x in artworks_data]
 
-    async def _query(self) -> ArtworkData:
-        artwork_data = await self._get_api().post_show(id_=self.i_aid)
+    @classmethod
+    def _parse_post(cls, artwork_data: 'Post') -> ArtworkData:
+        """内部方法, 将图站返回的作品数据转换为作品信息"""
 
         """moebooru 图站收录作品默认分类分级
         (classification, rating)
@@ -87,7 +97,7 @@ class BaseMoebooruArtworkProxy(BaseArtworkProxy, abc.ABC):
         preview_url = regular_url if not artwork_data.preview_url else artwork_data.preview_url
 
         return ArtworkData.model_validate({
-            'origin': self.get_base_origin_name(),
+            'origin': cls.get_base_origin_name(),
             'aid': artwork_data.id,
             'title': f'Upload by: {artwork_data.author}',
             'uid': -1 if artwork_data.creator_id is None else artwork_data.creator_id,
@@ -103,25 +113,28 @@ class BaseMoebooruArtworkProxy(BaseArtworkProxy, abc.ABC):
             'pages': [{
                 'preview_file': {
                     'url': preview_url,
-                    'file_ext': self.parse_url_file_suffix(preview_url),
+                    'file_ext': cls.parse_url_file_suffix(preview_url),
                     'width': artwork_data.preview_width,
                     'height': artwork_data.preview_height,
                 },
                 'regular_file': {
                     'url': regular_url,
-                    'file_ext': self.parse_url_file_suffix(regular_url),
+                    'file_ext': cls.parse_url_file_suffix(regular_url),
                     'width': artwork_data.sample_width,
                     'height': artwork_data.sample_height,
                 },
                 'original_file': {
                     'url': original_url,
-                    'file_ext': self.parse_url_file_suffix(original_url),
+                    'file_ext': cls.parse_url_file_suffix(original_url),
                     'width': artwork_data.width,
                     'height': artwork_data.height,
                 },
             }]
         })
 
+    async def _query(self) -> ArtworkData:
+        return self._parse_post(artwork_data=await self._get_api().post_show(id_=self.i_aid))
+
     async def get_std_desc(self, *, desc_len_limit: int = 128) -> str:
         artwork_data = await self.query()
 
@@ -9,12 +9,16 @@
 """
 
 import random
+from typing import TYPE_CHECKING
 
 from src.utils.pixiv_api import PixivArtwork
 from ..add_ons import ImageOpsMixin
 from ..internal import BaseArtworkProxy
 from ..models import ArtworkData
 
+if TYPE_CHECKING:
+    from src.resource import TemporaryResource
+
 
 class _PixivArtworkProxy(BaseArtworkProxy):
     """Pixiv 图库统一接口实现"""
@@ -27,6 +31,10 @@ class _PixivArtworkProxy(BaseArtworkProxy):
     async def _get_resource_as_bytes(cls, url: str, *, timeout: int = 30) -> bytes:
         return await PixivArtwork.get_resource_as_bytes(url=url, timeout=timeout)
 
+    @classmethod
+    async def _download_file(cls, url: str, file: 'TemporaryResource', *, timeout: int = 60) -> 'TemporaryResource':
+        return await PixivArtwork.download_file(url=url, file=file, timeout=timeout)
+
     @classmethod
     async def _get_resource_as_text(cls, url: str, *, timeout: int = 10) -> str:
         return await PixivArtwork.get_resource_as_text(url=url, timeout=timeout)
@@ -0,0 +1,76 @@
+"""
+@Author         : Ailitonia
+@Date           : 2025/1/20 20:00
+@FileName       : artwork_warm_pool
+@Project        : nonebot2_miya
+@Description    : 作品预热池, 预先准备已下载并处理好的作品以供图库命令直接发送
+@GitHub         : https://github.com/Ailitonia
+@Software       : PyCharm
+"""
+
+from nonebot import logger
+
+from ..apscheduler import scheduler
+from .config import artwork_warm_pool_config
+from .pool import ArtworkWarmPool, WarmPoolBucket, WarmPoolBucketStats, WarmPoolProducer, WarmPoolValidator
+
+artwork_warm_pool = ArtworkWarmPool(
+    enable=artwork_warm_pool_config.artwork_warm_pool_enable,
+    default_size=artwork_warm_pool_config.artwork_warm_pool_default_size,
+    refill_concurrency=artwork_warm_pool_config.artwork_warm_pool_refill_concurrency,
+    item_ttl=artwork_warm_pool_config.artwork_warm_pool_item_ttl,
+    bucket_idle_expire=artwork_warm_pool_config.artwork_warm_pool_bucket_idle_expire,
+)
+"""全局作品预热池"""
+
+
+async def _artwork_warm_pool_refill() -> None:
+    """定期补充作品预热池"""
+    try:
+        await artwork_warm_pool.refill_all()
+    except Exception as e:
+        logger.error(f'ArtworkWarmPool | Refilling artwork warm pool failed, {e!r}')
+
+
+async def _artwork_warm_pool_report() -> None:
+    """定期输出作品预热池统计信息"""
+    for stats in artwork_warm_pool.get_stats():
+        hit_rate = '-' if stats.hit_rate is None else f'{stats.hit_rate:.1%}'
+        avg_latency = '-' if stats.avg_refill_latency is None else f'{stats.avg_refill_latency:.2f}s'
+        logger.info(
+            f'ArtworkWarmPool | {stats.key!r} size: {stats.size}/{stats.capacity}, '
+            f'hit rate: {hit_rate} ({stats.served}/{stats.requested}), '
+            f'refill: {stats.refill_count} (failed {stats.refill_failed}), avg refill latency: {avg_latency}'
+        )
+
+
+if artwork_warm_pool_config.artwork_warm_pool_enable:
+    scheduler.add_job(
+        _artwork_warm_pool_refill,
+        'interval',
+        seconds=artwork_warm_pool_config.artwork_warm_pool_refill_interval,
+        id='artwork_warm_pool_refill',
+        coalesce=True,
+        max_instances=1,
+        misfire_grace_time=30,
+    )
+
+    scheduler.add_job(
+        _artwork_warm_pool_report,
+        'interval',
+        minutes=artwork_warm_pool_config.artwork_warm_pool_report_interval,
+        id='artwork_warm_pool_report',
+        coalesce=True,
+        max_instances=1,
+        misfire_grace_time=60,
+    )
+
+
+__all__ = [
+    'ArtworkWarmPool',
+    'WarmPoolBucket',
+    'WarmPoolBucketStats',
+    'WarmPoolProducer',
+    'WarmPoolValidator',
+    'artwork_warm_pool',
+]
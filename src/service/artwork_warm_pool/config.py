@@ -0,0 +1,45 @@
+"""
+@Author         : Ailitonia
+@Date           : 2025/1/20 20:10
+@FileName       : config
+@Project        : nonebot2_miya
+@Description    : Artwork warm pool config
+@GitHub         : https://github.com/Ailitonia
+@Software       : PyCharm
+"""
+
+from nonebot import get_plugin_config, logger
+from pydantic import BaseModel, ConfigDict, ValidationError
+
+
+class ArtworkWarmPoolConfig(BaseModel):
+    """作品预热池配置"""
+    # 是否启用作品预热池, 关闭后命令均直接查询并处理作品
+    artwork_warm_pool_enable: bool = True
+    # 每个分组默认预热的条目数量
+    artwork_warm_pool_default_size: int = 6
+    # 定时补充预热池的间隔, 单位秒
+    artwork_warm_pool_refill_interval: int = 60
+    # 同时补充的分组数量
+    artwork_warm_pool_refill_concurrency: int = 2
+    # 预热条目的有效期, 单位秒. 预热的图片文件位于临时资源缓存中, 应小于缓存清理的保护时间
+    artwork_warm_pool_item_ttl: int = 1200
+    # 分组超过该时间 (秒) 未被使用时不再补充并移除
+    artwork_warm_pool_bucket_idle_expire: int = 21600
+    # 定时输出预热池统计信息的间隔, 单位分钟
+    artwork_warm_pool_report_interval: int = 60
+
+    model_config = ConfigDict(extra='ignore')
+
+
+try:
+    artwork_warm_pool_config = get_plugin_config(ArtworkWarmPoolConfig)
+except ValidationError as e:
+    import sys
+    logger.opt(colors=True).critical(f'<r>Artwork Warm Pool 配置格式验证失败</r>, 错误信息:\n{e}')
+    sys.exit(f'Artwork Warm Pool 配置格式验证失败, {e}')
+
+
+__all__ = [
+    'artwork_warm_pool_config',
+]
@@ -0,0 +1,287 @@
+"""
+@Author         : Ailitonia
+@Date           : 2025/1/20 20:20
+@FileName       : pool
+@Project        : nonebot2_miya
+@Description    : 作品预热池
+@GitHub         : https://github.com/Ailitonia
+@Software       : PyCharm
+"""
+
+import asyncio
+import time
+from collections import deque
+from collections.abc import Awaitable, Callable, Sequence
+from dataclasses import dataclass
+from typing import Any
+
+from nonebot.log import logger
+
+from src.utils import semaphore_gather
+
+LOG_PREFIX: str = '<lc>Artwork Warm Pool</lc> | '
+
+type WarmPoolProducer[T] = Callable[[int], Awaitable[Sequence[T]]]
+"""预热条目生产函数, 参数为需要补充的条目数量, 返回已准备好的条目 (可少于需要的数量)"""
+
+type WarmPoolValidator[T] = Callable[[T], bool]
+"""预热条目检查函数, 取出条目时检查条目是否仍然可用 (如图片文件是否已被清理)"""
+
+
+@dataclass(frozen=True)
+class WarmPoolBucketStats:
+    """预热池分组统计信息"""
+    key: str
+    size: int
+    capacity: int
+    requested: int
+    served: int
+    refill_count: int
+    refill_failed: int
+    last_refill_latency: float | None
+    avg_refill_latency: float | None
+
+    @property
+    def hit_rate(self) -> float | None:
+        """命中率, 即取出的条目数与请求的条目数之比"""
+        return self.served / self.requested if self.requested else None
+
+
+class WarmPoolBucket[T]:
+    """预热池分组, 保存已准备好的条目队列, 数量不足时调用生产函数补充"""
+
+    def __init__(
+            self,
+            key: str,
+            producer: WarmPoolProducer[T],
+            *,
+            capacity: int,
+            item_ttl: float,
+            validator: WarmPoolValidator[T] | None = None,
+    ) -> None:
+        self.key = key
+        self._producer = producer
+        self._capacity = capacity
+        self._item_ttl = item_ttl
+        self._validator = validator
+
+        self._items: deque[tuple[float, T]] = deque()
+        self._refill_lock = asyncio.Lock()
+        self.last_access: float = time.monotonic()
+
+        self._requested: int = 0
+        self._served: int = 0
+        self._refill_count: int = 0
+        self._refill_failed: int = 0
+        self._refill_latency_total: float = 0
+        self._last_refill_latency: float | None = None
+
+    def __repr__(self) -> str:
+        return f'{self.__class__.__name__}(key={self.key!r}, size={len(self._items)}, capacity={self._capacity})'
+
+    @property
+    def is_full(self) -> bool:
+        return len(self._items) >= self._capacity
+
+    @property
+    def is_refilling(self) -> bool:
+        return self._refill_lock.locked()
+
+    def _is_available(self, created_at: float, item: T) -> bool:
+        if time.monotonic() - created_at > self._item_ttl:
+            return False
+        return self._validator is None or self._validator(item)
+
+    def _purge(self) -> None:
+        """移除过期或不可用的条目"""
+        self._items = deque((created_at, item) for created_at, item in self._items
+                            if self._is_available(created_at, item))
+
+    def take(self, num: int) -> list[T]:
+        """取出最多 num 个可用条目, 不会等待补充"""
+        self.last_access = time.monotonic()
+        self._requested += num
+
+        items: list[T] = []
+        while self._items and len(items) < num:
+            created_at, item = self._items.popleft()
+            if self._is_available(created_at, item):
+                items.append(item)
+
+        self._served += len(items)
+        return items
+
+    async def refill(self) -> int:
+        """补充条目至容量上限, 已在补充中时直接返回
+
+        :return: 补充的条目数量
+        """
+        if self._refill_lock.locked():
+            return 0
+
+        async with self._refill_lock:
+            self._purge()
+            if (need := self._capacity - len(self._items)) <= 0:
+                return 0
+
+            start_time = time.perf_counter()
+            try:
+                produced = await self._producer(need)
+            except Exception:
+                self._refill_failed += 1
+                raise
+
+            latency = time.perf_counter() - start_time
+            self._refill_count += 1
+            self._refill_latency_total += latency
+            self._last_refill_latency = latency
+
+            # 补充期间可能有条目被取出, 按补充完成时的剩余空间写入
+            created_at = time.monotonic()
+            added = list(produced)[:max(self._capacity - len(self._items), 0)]
+            self._items.extend((created_at, item) for item in added)
+            return len(added)
+
+    def get_stats(self) -> WarmPoolBucketStats:
+        return WarmPoolBucketStats(
+            key=self.key,
+            size=len(self._items),
+            capacity=self._capacity,
+            requested=self._requested,
+            served=self._served,
+            refill_count=self._refill_count,
+            refill_failed=self._refill_failed,
+            last_refill_latency=self._last_refill_latency,
+            avg_refill_latency=self._refill_latency_total / self._refill_count if self._refill_count else None,
+        )
+
+
+class ArtworkWarmPool:
+    """作品预热池
+
+    按分组预先准备若干已下载并处理好的作品 (或由作品生成的预览图等), 命令处理时直接取出, 不足部分再由调用方实时处理.
+    分组在首次使用 (或被预先注册) 时创建, 由定时任务统一补充, 条目被取出后也会立即在后台补充,
+    长时间未被使用的分组将被移除.
+    """
+
+    def __init__(
+            self,
+            *,
+            enable: bool = True,
+            default_size: int = 6,
+            refill_concurrency: int = 2,
+            item_ttl: float = 1200,
+            bucket_idle_expire: float = 21600,
+    ) -> None:
+        self._enable = enable
+        self._default_size = default_size
+        self._refill_concurrency = refill_concurrency
+        self._item_ttl = item_ttl
+        self._bucket_idle_expire = bucket_idle_expire
+
+        self._buckets: dict[str, WarmPoolBucket[Any]] = {}
+        self._background_tasks: set[asyncio.Task[None]] = set()
+
+    def __repr__(self) -> str:
+        return f'{self.__class__.__name__}(enable={self._enable}, buckets={list(self._buckets.keys())})'
+
+    @property
+    def enable(self) -> bool:
+        return self._enable
+
+    def register[T](
+            self,
+            key: str,
+            producer: WarmPoolProducer[T],
+            *,
+            size: int | None = None,
+            validator: WarmPoolValidator[T] | None = None,
+    ) -> WarmPoolBucket[T]:
+        """获取分组, 分组不存在时创建, 新建的分组将在下次定时任务时补充
+
+        :param key: 分组名称, 相同名称的分组应使用相同的生产函数
+        :param producer: 预热条目生产函数
+        :param size: 分组容量, 为 None 时使用默认容量
+        :param validator: 预热条目检查函数
+        """
+        if (bucket := self._buckets.get(key)) is None:
+            bucket = WarmPoolBucket(
+                key=key,
+                producer=producer,
+                capacity=self._default_size if size is None else size,
+                item_ttl=self._item_ttl,
+                validator=validator,
+            )
+            self._buckets[key] = bucket
+        return bucket
+
+    def take[T](
+            self,
+            key: str,
+            producer: WarmPoolProducer[T],
+            num: int,
+            *,
+            size: int | None = None,
+            validator: WarmPoolValidator[T] | None = None,
+    ) -> list[T]:
+        """从分组中取出最多 num 个条目, 不会等待补充, 预热池未启用时总是返回空列表
+
+        :param key: 分组名称
+        :param producer: 预热条目生产函数, 分组不存在时用于创建分组
+        :param num: 需要的条目数量
+        :param size: 分组容量, 仅在创建分组时使用
+        :param validator: 预热条目检查函数, 仅在创建分组时使用
+        """
+        if not self._enable:
+            return []
+
+        bucket = self.register(key=key, producer=producer, size=size, validator=validator)
+        items = bucket.take(num)
+        if not bucket.is_full and not bucket.is_refilling:
+            self._refill_in_background(bucket)
+        return items
+
+    @staticmethod
+    async def _refill_bucket(bucket: WarmPoolBucket[Any]) -> None:
+        try:
+            added = await bucket.refill()
+            if added:
+                logger.opt(colors=True).debug(f'{LOG_PREFIX}Refilled {added} item(s) of {bucket.key!r}')
+        except Exception as e:
+            logger.opt(colors=True).warning(f'{LOG_PREFIX}<r>Refilling {bucket.key!r} failed</r>, {{!r}}', e)
+
+    def _refill_in_background(self, bucket: WarmPoolBucket[Any]) -> None:
+        task = asyncio.create_task(self._refill_bucket(bucket))
+        self._background_tasks.add(task)
+        task.add_done_callback(self._background_tasks.discard)
+
+    def _remove_idle_buckets(self) -> None:
+        now = time.monotonic()
+        for key, bucket in list(self._buckets.items()):
+            if now - bucket.last_access > self._bucket_idle_expire and not bucket.is_refilling:
+                self._buckets.pop(key, None)
+                logger.opt(colors=True).debug(f'{LOG_PREFIX}Removed idle bucket {key!r}')
+
+    async def refill_all(self) -> None:
+        """补充全部分组, 并移除长时间未被使用的分组"""
+        if not self._enable:
+            return
+
+        self._remove_idle_buckets()
+        await semaphore_gather(
+            tasks=[self._refill_bucket(bucket) for bucket in self._buckets.values() if not bucket.is_full],
+            semaphore_num=self._refill_concurrency,
+        )
+
+    def get_stats(self) -> list[WarmPoolBucketStats]:
+        """获取全部分组的统计信息"""
+        return [bucket.get_stats() for bucket in self._buckets.values()]
+
+
+__all__ = [
+    'ArtworkWarmPool',
+    'WarmPoolBucket',
+    'WarmPoolBucketStats',
+    'WarmPoolProducer',
+    'WarmPoolValidator',
+]
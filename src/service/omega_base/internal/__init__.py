@@ -8,6 +8,9 @@
 @Software       : PyCharm 
 """
 
+from nonebot import get_driver, logger
+
+from src.database import SignInSummaryDAL, begin_db_session
 from .entity import InternalEntity as OmegaEntity
 from .subscription_source import InternalBilibiliDynamicSubscriptionSource as OmegaBiliDynamicSubSource
 from .subscription_source import InternalBilibiliLiveSubscriptionSource as OmegaBiliLiveSubSource
@@ -15,6 +18,21 @@ from .subscription_source import InternalPixivUserSubscriptionSource as OmegaPix
 from .subscription_source import InternalPixivisionSubscriptionSource as OmegaPixivisionSubSource
 from .subscription_source import InternalWeiboUserSubscriptionSource as OmegaWeiboUserSubSource
 
+
+@get_driver().on_startup
+async def _init_sign_in_summary() -> None:
+    """启动时为已有签到记录但没有签到统计的 Entity (新建统计表后首次启动) 回填签到统计"""
+    try:
+        async with begin_db_session() as session:
+            processed_count = await SignInSummaryDAL(session=session).rebuild_missing()
+        if processed_count:
+            logger.opt(colors=True).success(
+                f'<lc>OmegaEntity</lc> | <lg>签到统计回填完成</lg>, 共处理 {processed_count} 个对象'
+            )
+    except Exception as e:
+        logger.opt(colors=True).error(f'<lc>OmegaEntity</lc> | 签到统计回填失败, {e!r}')
+
+
 __all__ = [
     'OmegaEntity',
     'OmegaBiliDynamicSubSource',
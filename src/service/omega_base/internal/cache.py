@@ -0,0 +1,179 @@
+"""
+@Author         : Ailitonia
+@Date           : 2024/12/29 15:20
+@FileName       : cache
+@Project        : nonebot2_miya
+@Description    : Entity 常用查询的进程内读缓存
+@GitHub         : https://github.com/Ailitonia
+@Software       : PyCharm
+"""
+
+from collections.abc import Callable, Hashable
+from typing import TYPE_CHECKING, Any
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from src.database.internal.auth_setting import AuthSetting
+from src.database.internal.bot import BotSelf
+from src.database.internal.entity import Entity
+from src.utils.cache_utils import TTLCache
+from .config import entity_cache_config
+
+if TYPE_CHECKING:
+    from sqlalchemy.ext.asyncio import AsyncSession
+
+type EntityCacheKey = tuple[str, str, str, str]
+"""Entity 缓存键: (bot_id, entity_type, entity_id, parent_id)"""
+
+type AuthNodeKey = tuple[str, str, str]
+"""权限节点缓存键: (module, plugin, node)"""
+
+
+class InternalEntityCache:
+    """BotSelf, Entity 及 AuthSetting 查询结果的读缓存
+
+    缓存仅在本进程内有效, 通过 InternalEntity 进行的写操作会在写入时及 session 提交或回滚后使对应条目失效,
+    从 session 中读取并写入缓存的条目在该 session 回滚后失效,
+    其余途径的写入(直接使用 DAL 等)需调用对应的失效方法, 否则依赖条目有效期自然过期
+    """
+
+    __slots__ = ('bot', 'entity', 'auth_setting', 'auth_setting_hits', 'auth_setting_misses')
+
+    def __init__(self, maxsize: int, ttl: float) -> None:
+        self.bot: TTLCache[str, BotSelf] = TTLCache(maxsize=maxsize, ttl=ttl)
+        self.entity: TTLCache[EntityCacheKey, Entity] = TTLCache(maxsize=maxsize, ttl=ttl)
+        # 已查询过的权限节点, 值为 None 表示该节点未配置
+        self.auth_setting: TTLCache[EntityCacheKey, dict[AuthNodeKey, AuthSetting | None]] = TTLCache(
+            maxsize=maxsize, ttl=ttl
+        )
+        self.auth_setting_hits: int = 0
+        self.auth_setting_misses: int = 0
+
+    def get_bot(self, bot_id: str) -> BotSelf | None:
+        return self.bot.get(bot_id)
+
+    def set_bot(self, bot: BotSelf) -> None:
+        self.bot.set(bot.self_id, bot)
+
+    def get_entity(self, key: EntityCacheKey) -> Entity | None:
+        return self.entity.get(key)
+
+    def set_entity(self, key: EntityCacheKey, entity: Entity) -> None:
+        self.entity.set(key, entity)
+
+    def get_auth_setting(self, key: EntityCacheKey, node: AuthNodeKey) -> tuple[bool, AuthSetting | None]:
+        """读取权限节点缓存
+
+        :return: (是否命中缓存, 权限节点配置, 为 None 表示该节点未配置)
+        """
+        nodes = self.auth_setting.get(key, count=False)
+        if nodes is None or node not in nodes:
+            self.auth_setting_misses += 1
+            return False, None
+
+        self.auth_setting_hits += 1
+        return True, nodes[node]
+
+    def set_auth_setting(self, key: EntityCacheKey, node: AuthNodeKey, auth_setting: AuthSetting | None) -> None:
+        nodes = self.auth_setting.get(key, count=False)
+        if nodes is None:
+            self.auth_setting.set(key, {node: auth_setting})
+        else:
+            nodes[node] = auth_setting
+
+    def invalidate_bot(self, bot_id: str) -> None:
+        self.bot.pop(bot_id)
+
+    def invalidate_auth_setting(self, key: EntityCacheKey) -> None:
+        self.auth_setting.pop(key)
+
+    def invalidate_entity(self, key: EntityCacheKey) -> None:
+        self.entity.pop(key)
+        self.auth_setting.pop(key)
+
+    def clear(self) -> None:
+        self.bot.clear()
+        self.entity.clear()
+        self.auth_setting.clear()
+
+    def statistics(self) -> dict[str, dict[str, Any]]:
+        """各类缓存的容量及命中统计"""
+        auth_setting_total = self.auth_setting_hits + self.auth_setting_misses
+        return {
+            'bot': self.bot.statistics(),
+            'entity': self.entity.statistics(),
+            'auth_setting': {
+                'size': len(self.auth_setting),
+                'maxsize': self.auth_setting.maxsize,
+                'hits': self.auth_setting_hits,
+                'misses': self.auth_setting_misses,
+                'hit_rate': self.auth_setting_hits / auth_setting_total if auth_setting_total else 0.0,
+            },
+        }
+
+
+_INVALIDATE_ON_COMMIT: str = 'omega_entity_cache_invalidate_on_commit'
+"""session.info 中保存提交或回滚后需要执行的失效操作的键"""
+
+_INVALIDATE_ON_ROLLBACK: str = 'omega_entity_cache_invalidate_on_rollback'
+"""session.info 中保存仅在回滚后需要执行的失效操作的键"""
+
+
+def _get_pending_invalidations(session: 'AsyncSession', name: str) -> dict[Hashable, Callable[[], None]]:
+    return session.sync_session.info.setdefault(name, {})
+
+
+def invalidate_after_commit(session: 'AsyncSession', key: Hashable, invalidate: Callable[[], None]) -> None:
+    """立即使缓存失效, 并在 session 提交或回滚后再次使其失效
+
+    提交前其他 session 的并发查询仍会读取到旧数据并写回缓存, 因此需在事务结束后再次失效
+
+    :param session: 执行写入的 session
+    :param key: 失效操作的标识, 同一 session 内相同标识的失效操作只执行一次
+    :param invalidate: 失效操作
+    """
+    invalidate()
+    _get_pending_invalidations(session, _INVALIDATE_ON_COMMIT)[key] = invalidate
+
+
+def invalidate_after_rollback(session: 'AsyncSession', key: Hashable, invalidate: Callable[[], None]) -> None:
+    """在 session 回滚后使缓存失效, 用于从 session 读取后写入缓存的条目, 避免缓存未提交的数据
+
+    :param session: 读取数据的 session
+    :param key: 失效操作的标识, 同一 session 内相同标识的失效操作只执行一次
+    :param invalidate: 失效操作
+    """
+    _get_pending_invalidations(session, _INVALIDATE_ON_ROLLBACK)[key] = invalidate
+
+
+@event.listens_for(Session, 'after_commit')
+def _invalidate_on_commit(session: Session) -> None:
+    session.info.pop(_INVALIDATE_ON_ROLLBACK, None)
+    for invalidate in session.info.pop(_INVALIDATE_ON_COMMIT, {}).values():
+        invalidate()
+
+
+@event.listens_for(Session, 'after_rollback')
+def _invalidate_on_rollback(session: Session) -> None:
+    pending = session.info.pop(_INVALIDATE_ON_ROLLBACK, {})
+    pending.update(session.info.pop(_INVALIDATE_ON_COMMIT, {}))
+    for invalidate in pending.values():
+        invalidate()
+
+
+entity_cache = InternalEntityCache(
+    maxsize=entity_cache_config.omega_entity_cache_size,
+    ttl=entity_cache_config.omega_entity_cache_ttl,
+)
+"""全局 Entity 读缓存实例"""
+
+
+__all__ = [
+    'AuthNodeKey',
+    'EntityCacheKey',
+    'InternalEntityCache',
+    'entity_cache',
+    'invalidate_after_commit',
+    'invalidate_after_rollback',
+]
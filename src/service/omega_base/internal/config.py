@@ -0,0 +1,33 @@
+"""
+@Author         : Ailitonia
+@Date           : 2024/12/29 15:12
+@FileName       : config
+@Project        : nonebot2_miya
+@Description    : Omega internal config
+@GitHub         : https://github.com/Ailitonia
+@Software       : PyCharm
+"""
+
+from nonebot import get_plugin_config, logger
+from pydantic import BaseModel, ConfigDict, ValidationError
+
+
+class InternalEntityCacheConfig(BaseModel):
+    """Entity 读缓存配置"""
+    omega_entity_cache_size: int = 4096  # 每类缓存最多保存的条目数
+    omega_entity_cache_ttl: int = 300  # 缓存条目有效期, 单位秒
+
+    model_config = ConfigDict(extra='ignore')
+
+
+try:
+    entity_cache_config = get_plugin_config(InternalEntityCacheConfig)
+except ValidationError as e:
+    import sys
+    logger.opt(colors=True).critical(f'<r>Entity 缓存配置格式验证失败</r>, 错误信息:\n{e}')
+    sys.exit(f'Entity 缓存配置格式验证失败, {e}')
+
+
+__all__ = [
+    'entity_cache_config',
+]
@@ -41,10 +41,15 @@ RATE_LIMITING_COOLDOWN_EVENT: Literal['OmegaRateLimitingCooldown'] = 'OmegaRateL
 """流控限制冷却 event 名称"""
 
 
+RATE_LIMITING_GROUP_COOLDOWN_EVENT: Literal['OmegaRateLimitingGroupCooldown'] = 'OmegaRateLimitingGroupCooldown'
+"""群组/频道流控限制冷却 event 名称"""
+
+
 __all__ = [
     'PermissionGlobal',
     'PermissionLevel',
     'SKIP_COOLDOWN_PERMISSION_NODE',
     'GLOBAL_COOLDOWN_EVENT',
-    'RATE_LIMITING_COOLDOWN_EVENT'
+    'RATE_LIMITING_COOLDOWN_EVENT',
+    'RATE_LIMITING_GROUP_COOLDOWN_EVENT',
 ]
@@ -9,7 +9,7 @@
 """
 
 from datetime import date, datetime, timedelta
-from typing import TYPE_CHECKING, Literal, Self
+from typing import TYPE_CHECKING, Any, Literal, Self
 
 from sqlalchemy.exc import NoResultFound
 
@@ -19,8 +19,10 @@ from src.database.internal.cooldown import CoolDown, CoolDownDAL
 from src.database.internal.entity import Entity, EntityDAL, EntityType
 from src.database.internal.friendship import Friendship, FriendshipDAL
 from src.database.internal.sign_in import SignInDAL
+from src.database.internal.sign_in_summary import SignInSummary, SignInSummaryDAL
 from src.database.internal.subscription import SubscriptionDAL
 from src.database.internal.subscription_source import SubscriptionSource, SubscriptionSourceDAL
+from .cache import EntityCacheKey, entity_cache, invalidate_after_commit, invalidate_after_rollback
 from .consts import (
     GLOBAL_COOLDOWN_EVENT,
     RATE_LIMITING_COOLDOWN_EVENT,
@@ -61,6 +63,37 @@ class InternalEntity:
     def tid(self) -> str:
         return f'{self.entity_type}_{self.entity_id}'
 
+    @property
+    def cache_key(self) -> EntityCacheKey:
+        return self.bot_id, str(self.entity_type), self.entity_id, self.parent_id
+
+    @classmethod
+    def query_cache_statistics(cls) -> dict[str, dict[str, Any]]:
+        """查询 Bot/Entity/权限配置读缓存的容量及命中统计"""
+        return entity_cache.statistics()
+
+    @classmethod
+    def clear_cache(cls) -> None:
+        """清空 Bot/Entity/权限配置读缓存"""
+        entity_cache.clear()
+
+    def invalidate_cache(self) -> None:
+        """使 Entity 自身及其权限配置的缓存失效, 在绕过本对象直接修改数据库后调用"""
+        invalidate_after_commit(
+            self.db_session, ('entity', self.cache_key), lambda: entity_cache.invalidate_entity(key=self.cache_key)
+        )
+
+    def _invalidate_cache_after_rollback(self) -> None:
+        """从本对象的 session 读取并写入缓存后调用, session 回滚时使 Entity 自身及其权限配置的缓存失效"""
+        invalidate_after_rollback(
+            self.db_session, ('entity', self.cache_key), lambda: entity_cache.invalidate_entity(key=self.cache_key)
+        )
+
+    @classmethod
+    def invalidate_bot_cache(cls, session: 'AsyncSession', bot_id: str) -> None:
+        """使 Bot 的缓存失效, 在绕过本对象直接修改 BotSelf 后调用"""
+        invalidate_after_commit(session, ('bot', bot_id), lambda: entity_cache.invalidate_bot(bot_id=bot_id))
+
     @classmethod
     async def init_from_entity_index_id(cls, session: 'AsyncSession', index_id: int) -> Self:
         entity = await EntityDAL(session=session).query_by_index_id(index_id=index_id)
@@ -90,13 +123,29 @@ class InternalEntity:
 
     async def query_bot_self(self) -> BotSelf:
         """查询 Entity 对应的 Bot"""
-        return await BotSelfDAL(session=self.db_session).query_unique(self_id=self.bot_id)
+        if (bot := entity_cache.get_bot(bot_id=self.bot_id)) is not None:
+            return bot
+
+        bot = await BotSelfDAL(session=self.db_session).query_unique(self_id=self.bot_id)
+        entity_cache.set_bot(bot=bot)
+        invalidate_after_rollback(
+            self.db_session, ('bot', self.bot_id), lambda: entity_cache.invalidate_bot(bot_id=self.bot_id)
+        )
+        return bot
 
     async def query_entity_self(self) -> Entity:
         """查询 Entity 自身"""
+        if (entity := entity_cache.get_entity(key=self.cache_key)) is not None:
+            return entity
+
         bot = await self.query_bot_self()
-        return await EntityDAL(session=self.db_session).query_unique(bot_index_id=bot.id, entity_type=self.entity_type,
-                                                                     entity_id=self.entity_id, parent_id=self.parent_id)
+        entity = await EntityDAL(session=self.db_session).query_unique(bot_index_id=bot.id,
+                                                                       entity_type=self.entity_type,
+                                                                       entity_id=self.entity_id,
+                                                                       parent_id=self.parent_id)
+        entity_cache.set_entity(key=self.cache_key, entity=entity)
+        self._invalidate_cache_after_rollback()
+        return entity
 
     async def add_ignore_exists(
             self,
@@ -104,18 +153,16 @@ class InternalEntity:
             entity_info: str | None = None
     ) -> None:
         """新增 Entity, 若已存在忽略"""
-        bot = await self.query_bot_self()
-        entity_dal = EntityDAL(session=self.db_session)
-
         entity_name = self.entity_name if entity_name is None else entity_name
         entity_info = self.entity_info if entity_info is None else entity_info
 
         try:
-            await entity_dal.query_unique(bot_index_id=bot.id, entity_id=self.entity_id,
-                                          entity_type=self.entity_type, parent_id=self.parent_id)
+            await self.query_entity_self()
         except NoResultFound:
-            await entity_dal.add(bot_index_id=bot.id, entity_id=self.entity_id, entity_type=self.entity_type,
-                                 parent_id=self.parent_id, entity_name=entity_name, entity_info=entity_info)
+            bot = await self.query_bot_self()
+            await EntityDAL(session=self.db_session).add(bot_index_id=bot.id, entity_id=self.entity_id,
+                                                         entity_type=self.entity_type, parent_id=self.parent_id,
+                                                         entity_name=entity_name, entity_info=entity_info)
 
     async def add_upgrade(
             self,
@@ -136,11 +183,13 @@ class InternalEntity:
         except NoResultFound:
             await entity_dal.add(bot_index_id=bot.id, entity_id=self.entity_id, entity_type=self.entity_type,
                                  parent_id=self.parent_id, entity_name=entity_name, entity_info=entity_info)
+        self.invalidate_cache()
 
     async def delete(self) -> None:
         """删除 Entity"""
         entity = await self.query_entity_self()
-        return await EntityDAL(session=self.db_session).delete(id_=entity.id)
+        await EntityDAL(session=self.db_session).delete(id_=entity.id)
+        self.invalidate_cache()
 
     async def set_friendship(
             self,
@@ -232,6 +281,10 @@ class InternalEntity:
         except NoResultFound:
             sign_in_info = 'Normal Sign In' if sign_in_info is None else sign_in_info
             await sign_in_dal.add(entity_index_id=entity.id, sign_in_date=sign_in_date, sign_in_info=sign_in_info)
+            # 在同一事务中更新签到统计
+            await SignInSummaryDAL(session=self.db_session).apply_sign_in(
+                entity_index_id=entity.id, sign_in_date=sign_in_date
+            )
 
     async def check_today_sign_in(self) -> bool:
         """检查今日是否已经签到"""
@@ -249,57 +302,41 @@ class InternalEntity:
         entity = await self.query_entity_self()
         return await SignInDAL(session=self.db_session).query_entity_sign_in_days(entity_index_id=entity.id)
 
+    async def query_sign_in_summary(self) -> SignInSummary | None:
+        """查询签到统计, 没有签到记录返回 None, 尚未建立统计 (如旧数据) 则从签到记录重建"""
+        entity = await self.query_entity_self()
+        summary_dal = SignInSummaryDAL(session=self.db_session)
+        try:
+            return await summary_dal.query_unique(entity_index_id=entity.id)
+        except NoResultFound:
+            return await summary_dal.rebuild(entity_index_id=entity.id)
+
     async def query_total_sign_in_days(self) -> int:
         """查询总共签到的日期数"""
-        return len(await self.query_sign_in_days())
+        summary = await self.query_sign_in_summary()
+        return 0 if summary is None else summary.total_days
 
     async def query_continuous_sign_in_day(self) -> int:
         """查询到现在为止最长连续签到日数"""
-        sign_in_history = await self.query_sign_in_days()
-        if not sign_in_history:
-            return 0
+        summary = await self.query_sign_in_summary()
 
-        date_now_ordinal = datetime.now().date().toordinal()
-        # 先将签到记录中的日期转化为整数便于比较, 去重后由大到小排序
-        all_sign_in_list = sorted(list(set(x.toordinal() for x in sign_in_history)), reverse=True)
-
-        # 如果今日日期不等于已签到日期最大值, 说明今日没有签到, 则连签日数为0
-        if date_now_ordinal != all_sign_in_list[0]:
+        # 如果今日日期不等于最后签到日期, 说明今日没有签到, 则连签日数为0
+        if summary is None or summary.last_sign_in_date != datetime.now().date():
             return 0
 
-        # 从大到小检查(即日期从后向前检查), 如果当日序号大小大于与今日日期之差, 说明在这里断签了
-        for index, value in enumerate(all_sign_in_list):
-            if index != date_now_ordinal - value:
-                return index
-
-        # 如果全部遍历完了那就说明全部没有断签
-        return len(all_sign_in_list)
+        return summary.continuous_days
 
     async def query_last_missing_sign_in_day(self) -> int:
         """查询上一次断签的时间, 返回 ordinal datetime"""
-        sign_in_history = await self.query_sign_in_days()
-        date_now_ordinal = datetime.now().date().toordinal()
+        summary = await self.query_sign_in_summary()
+        date_now = datetime.now().date()
 
-        # 还没有签到过, 对应断签日期就是今天
-        if not sign_in_history:
-            return date_now_ordinal
+        # 还没有签到过, 或今日没有签到, 对应断签日期就是今天
+        if summary is None or summary.last_sign_in_date != date_now:
+            return date_now.toordinal()
 
-        # 有签到记录则处理签到记录
-        # 先将签到记录中的日期转化为整数便于比较, 去重后由大到小排序
-        all_sign_in_list = sorted(list(set(x.toordinal() for x in sign_in_history)), reverse=True)
-
-        # 如果今日日期不等于已签到日期最大值, 说明今日没有签到, 断签日为今日
-        if date_now_ordinal != all_sign_in_list[0]:
-            return date_now_ordinal
-
-        # 从大到小检查(即日期从后向前检查), 如果当日序号大小大于与今日日期之差, 说明在这里断签了
-        # 这里要返回对应最早连签前一天的 ordinal datetime
-        for index, value in enumerate(all_sign_in_list):
-            if index != date_now_ordinal - value:
-                return all_sign_in_list[index - 1] - 1
-
-        # 如果全部遍历完了那就说明全部没有返回开始签到的前一天
-        return date_now_ordinal - len(all_sign_in_list)
+        # 返回对应最早连签前一天的 ordinal datetime
+        return summary.last_missing_date.toordinal()
 
     async def query_all_auth_setting(self) -> list[AuthSetting]:
         """查询 Entity 全部的权限配置"""
@@ -314,9 +351,26 @@ class InternalEntity:
 
     async def query_auth_setting(self, module: str, plugin: str, node: str) -> AuthSetting:
         """查询 Entity 具体某个权限配置"""
+        is_cached, auth_setting = entity_cache.get_auth_setting(key=self.cache_key, node=(module, plugin, node))
+        if is_cached:
+            if auth_setting is None:
+                raise NoResultFound('No row was found when one was required')
+            return auth_setting
+
         entity = await self.query_entity_self()
-        return await AuthSettingDAL(session=self.db_session).query_unique(entity_index_id=entity.id, module=module,
-                                                                          plugin=plugin, node=node)
+        try:
+            auth_setting = await AuthSettingDAL(session=self.db_session).query_unique(entity_index_id=entity.id,
+                                                                                      module=module,
+                                                                                      plugin=plugin,
+                                                                                      node=node)
+        except NoResultFound:
+            entity_cache.set_auth_setting(key=self.cache_key, node=(module, plugin, node), auth_setting=None)
+            self._invalidate_cache_after_rollback()
+            raise
+
+        entity_cache.set_auth_setting(key=self.cache_key, node=(module, plugin, node), auth_setting=auth_setting)
+        self._invalidate_cache_after_rollback()
+        return auth_setting
 
     async def query_global_permission(self) -> AuthSetting:
         """查询 Entity 全局功能开关"""
@@ -423,6 +477,11 @@ class InternalEntity:
         except NoResultFound:
             await auth_setting_dal.add(entity_index_id=entity.id, module=module, plugin=plugin, node=node,
                                        available=available, value=value)
+        invalidate_after_commit(
+            self.db_session,
+            ('auth_setting', self.cache_key),
+            lambda: entity_cache.invalidate_auth_setting(key=self.cache_key),
+        )
 
     async def enable_global_permission(self) -> None:
         """打开 Entity 全局功能开关"""
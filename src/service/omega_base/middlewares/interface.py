@@ -10,6 +10,7 @@
 
 import asyncio
 import inspect
+import os
 from collections.abc import Callable, Coroutine
 from functools import wraps
 from typing import TYPE_CHECKING, Annotated, Any, NoReturn, Self, cast
@@ -17,12 +18,14 @@ from typing import TYPE_CHECKING, Annotated, Any, NoReturn, Self, cast
 from nonebot.exception import FinishedException, PausedException, RejectedException
 from nonebot.internal.adapter import Bot as BaseBot
 from nonebot.internal.adapter import Event as BaseEvent
+from nonebot.internal.adapter import MessageSegment as BaseMessageSegment
 from nonebot.log import logger
 from nonebot.matcher import Matcher, current_bot, current_event, current_matcher
 from nonebot.params import Depends
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from src.database import get_db_session
+from ...omega_resource_cache import resource_cache
 from .const import SupportedPlatform, SupportedTarget
 from .exception import AdapterNotSupported, TargetNotSupported
 from .platform_interface import entity_target_register, event_depend_register, message_builder_register
@@ -32,6 +35,7 @@ if TYPE_CHECKING:
     from pathlib import Path
 
     from ..internal import OmegaEntity
+    from .models import EntityInitParams
     from .platform_interface.entity_target import BaseEntityTarget
     from .platform_interface.event_depend import EventDepend
     from .platform_interface.message_builder import Builder, Extractor
@@ -39,6 +43,20 @@ if TYPE_CHECKING:
 type SentOmegaMessage = BaseSentMessageType['OmegaMessage']
 
 
+def get_message_local_files(message: SentOmegaMessage) -> list[str]:
+    """获取消息中引用的本地文件路径, 发送期间保护这些文件不被缓存清理"""
+    if isinstance(message, str):
+        return []
+
+    segments = [message] if isinstance(message, BaseMessageSegment) else message
+    return [
+        value
+        for segment in segments
+        for key in ('url', 'file')
+        if isinstance(value := segment.data.get(key), str) and os.path.isabs(value)
+    ]
+
+
 class OmegaEntityInterface:
     """Omega 基于对象 (Entity) 的统一接口, 用于在 Event/Matcher 之外调用平台 Bot 相关方法"""
 
@@ -97,7 +115,8 @@ class OmegaEntityInterface:
         send_message = message_builder(message=message).message
 
         bot_api_params = {send_params.message_param_name: send_message, **send_params.params}
-        return await getattr(bot, send_params.api)(**bot_api_params)
+        with resource_cache.hold(*get_message_local_files(message)):
+            return await getattr(bot, send_params.api)(**bot_api_params)
 
     @check_target_implemented
     async def send_entity_message_auto_revoke(
@@ -176,6 +195,23 @@ class OmegaMatcherInterface:
                 raise ValueError(f'Not supported entity acquire_type: {acquire_type!r}')
         return entity_depend(session)
 
+    @classmethod
+    def get_entity_params(
+            cls,
+            bot: BaseBot,
+            event: BaseEvent,
+            acquire_type: EntityAcquireType = 'event',
+    ) -> 'EntityInitParams':
+        """获取事件对应的 Entity 实例化参数, 用于仅需 Entity 标识而无需访问数据库的场景"""
+        event_depend = event_depend_register.get_depend(target_event=event)(bot=bot, event=event)
+        match acquire_type:
+            case 'event':
+                return event_depend.event_entity_params
+            case 'user':
+                return event_depend.user_entity_params
+            case _:
+                raise ValueError(f'Not supported entity acquire_type: {acquire_type!r}')
+
     @classmethod
     def depend(
             cls,
@@ -273,15 +309,18 @@ class OmegaMatcherInterface:
 
     @check_adapter_implemented
     async def send(self, message: 'SentOmegaMessage', **kwargs) -> Any:
-        return await self.get_event_depend().send(message=message, **kwargs)
+        with resource_cache.hold(*get_message_local_files(message)):
+            return await self.get_event_depend().send(message=message, **kwargs)
 
     @check_adapter_implemented
     async def send_at_sender(self, message: 'SentOmegaMessage', **kwargs) -> Any:
-        return await self.get_event_depend().send_at_sender(message=message, **kwargs)
+        with resource_cache.hold(*get_message_local_files(message)):
+            return await self.get_event_depend().send_at_sender(message=message, **kwargs)
 
     @check_adapter_implemented
     async def send_reply(self, message: 'SentOmegaMessage', **kwargs) -> Any:
-        return await self.get_event_depend().send_reply(message=message, **kwargs)
+        with resource_cache.hold(*get_message_local_files(message)):
+            return await self.get_event_depend().send_reply(message=message, **kwargs)
 
     @check_adapter_implemented
     async def send_auto_revoke(
@@ -394,4 +433,5 @@ class OmegaMatcherInterface:
 __all__ = [
     'OmegaEntityInterface',
     'OmegaMatcherInterface',
+    'get_message_local_files',
 ]
@@ -49,6 +49,16 @@ class BaseEventDepend[Bot_T: 'BaseBot', Event_T: 'BaseEvent', Message_T: 'BaseMe
         """根据 Event 提取触发事件用户 Entity 实例化参数"""
         raise NotImplementedError
 
+    @property
+    def event_entity_params(self) -> 'EntityInitParams':
+        """获取事件本身对应 Entity 实例化参数, 不涉及数据库访问"""
+        return self._extract_event_entity_params()
+
+    @property
+    def user_entity_params(self) -> 'EntityInitParams':
+        """获取触发事件用户 Entity 实例化参数, 不涉及数据库访问"""
+        return self._extract_user_entity_params()
+
     @property
     def event_entity_depend(self) -> Callable[['AsyncSession'], OmegaEntity]:
         """获取事件本身对应 Entity 依赖"""
@@ -0,0 +1,36 @@
+"""
+@Author         : Ailitonia
+@Date           : 2025/1/6 21:08
+@FileName       : omega_broadcast
+@Project        : nonebot2_miya
+@Description    : Omega 消息广播, 向多个 Entity 发送同一条消息, 按 Bot 控制发送速率
+@GitHub         : https://github.com/Ailitonia
+@Software       : PyCharm
+"""
+
+from nonebot import get_driver
+
+from .config import broadcast_config
+from .dispatcher import BroadcastDispatcher, BroadcastResult
+
+broadcast_dispatcher = BroadcastDispatcher(
+    rate_per_minute=broadcast_config.omega_broadcast_bot_rate_per_minute,
+    burst=broadcast_config.omega_broadcast_bot_burst,
+    concurrency=broadcast_config.omega_broadcast_bot_concurrency,
+    max_retries=broadcast_config.omega_broadcast_max_retries,
+    retry_backoff=broadcast_config.omega_broadcast_retry_backoff,
+)
+"""全局消息广播器, 全部广播共享各 Bot 的发送速率限制"""
+
+
+@get_driver().on_shutdown
+async def _drain_background_broadcasts() -> None:
+    """关闭时等待后台广播完成, 超时后取消"""
+    await broadcast_dispatcher.drain_background(timeout=broadcast_config.omega_broadcast_shutdown_timeout)
+
+
+__all__ = [
+    'BroadcastDispatcher',
+    'BroadcastResult',
+    'broadcast_dispatcher',
+]
@@ -0,0 +1,43 @@
+"""
+@Author         : Ailitonia
+@Date           : 2025/1/6 21:08
+@FileName       : config
+@Project        : nonebot2_miya
+@Description    : Omega broadcast config
+@GitHub         : https://github.com/Ailitonia
+@Software       : PyCharm
+"""
+
+from nonebot import get_plugin_config, logger
+from pydantic import BaseModel, ConfigDict, ValidationError
+
+
+class OmegaBroadcastConfig(BaseModel):
+    """Omega 消息广播配置"""
+    # 单个 Bot 每分钟发送消息数量上限
+    omega_broadcast_bot_rate_per_minute: float = 20
+    # 单个 Bot 允许连续发送的消息数量
+    omega_broadcast_bot_burst: int = 5
+    # 单个 Bot 同时发送的消息数量
+    omega_broadcast_bot_concurrency: int = 2
+    # 平台返回发送失败 (ActionFailed) 时的重试次数, 网络错误时消息可能已送达, 不重试
+    omega_broadcast_max_retries: int = 2
+    # 首次重试前的等待时间, 之后每次重试翻倍, 单位秒
+    omega_broadcast_retry_backoff: float = 3
+    # 关闭时等待后台广播完成的时间, 超时后取消未完成的广播, 单位秒
+    omega_broadcast_shutdown_timeout: float = 10
+
+    model_config = ConfigDict(extra='ignore')
+
+
+try:
+    broadcast_config = get_plugin_config(OmegaBroadcastConfig)
+except ValidationError as e:
+    import sys
+    logger.opt(colors=True).critical(f'<r>Omega Broadcast 配置格式验证失败</r>, 错误信息:\n{e}')
+    sys.exit(f'Omega Broadcast 配置格式验证失败, {e}')
+
+
+__all__ = [
+    'broadcast_config',
+]
@@ -0,0 +1,335 @@
+"""
+@Author         : Ailitonia
+@Date           : 2025/1/6 21:08
+@FileName       : dispatcher
+@Project        : nonebot2_miya
+@Description    : 向多个 Entity 广播消息
+@GitHub         : https://github.com/Ailitonia
+@Software       : PyCharm
+"""
+
+import asyncio
+import time
+from collections.abc import Iterable
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING, Any
+
+from nonebot.exception import ActionFailed, NetworkError
+from nonebot.log import logger
+
+from src.database import begin_db_session
+from src.database.internal.bot import BotSelfDAL
+from ..omega_base.internal import OmegaEntity
+from ..omega_base.middlewares.const import SupportedPlatform, SupportedTarget
+from ..omega_base.middlewares.interface import SentOmegaMessage, get_message_local_files
+from ..omega_base.middlewares.platform_interface import entity_target_register, message_builder_register
+from ..omega_multibot_support import get_online_bots
+from ..omega_resource_cache import resource_cache
+
+if TYPE_CHECKING:
+    from nonebot.internal.adapter import Bot as BaseBot
+
+    from src.database.internal.entity import Entity
+
+LOG_PREFIX: str = '<lc>Omega Broadcast</lc> | '
+
+
+@dataclass
+class BroadcastResult:
+    """单次广播的投递统计"""
+    total: int = 0
+    succeeded: int = 0
+    failed: int = 0
+    skipped: int = 0
+    retried: int = 0
+    elapsed: float = 0.0
+    failed_targets: list[int] = field(default_factory=list)
+
+    def __str__(self) -> str:
+        return (
+            f'total={self.total}, succeeded={self.succeeded}, failed={self.failed}, skipped={self.skipped}, '
+            f'retried={self.retried}, elapsed={self.elapsed:.2f}s'
+        )
+
+    @property
+    def all_succeeded(self) -> bool:
+        return self.succeeded == self.total
+
+
+class _SendPacer:
+    """单个 Bot 的发送令牌桶, 令牌不足时等待至令牌恢复"""
+
+    __slots__ = ('rate_per_minute', 'capacity', 'tokens', 'updated_at', '_lock')
+
+    def __init__(self, rate_per_minute: float, capacity: int) -> None:
+        self.rate_per_minute = rate_per_minute
+        self.capacity = capacity
+        self.tokens: float = capacity
+        self.updated_at: float = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate_per_minute / 60)
+        self.updated_at = now
+
+    async def wait(self) -> None:
+        async with self._lock:
+            self._refill()
+            if self.tokens < 1:
+                await asyncio.sleep((1 - self.tokens) * 60 / self.rate_per_minute)
+                self._refill()
+            self.tokens -= 1
+
+
+@dataclass(kw_only=True)
+class _ResolvedTarget:
+    """已解析的广播对象"""
+    entity: 'Entity'
+    bot: 'BaseBot'
+    api: str
+    params: dict[str, Any]
+
+
+class BroadcastDispatcher:
+    """向多个 Entity 广播同一条消息
+
+    - 在一个数据库会话中解析全部对象对应的 Bot 及发送参数
+    - 每个平台的消息只构造一次, 同平台的全部对象共用
+    - 每个 Bot 的发送由独立的令牌桶控制速率, 不同 Bot 之间并行发送
+    - 平台返回发送失败 (ActionFailed) 时按指数退避重试, 网络错误 (NetworkError) 时请求可能已送达, 不重试
+    - 受发送速率限制, 对象较多时广播耗时较长, 定时任务等有超时限制的调用方应使用 broadcast_in_background
+    """
+
+    def __init__(
+            self,
+            *,
+            rate_per_minute: float = 20,
+            burst: int = 5,
+            concurrency: int = 2,
+            max_retries: int = 2,
+            retry_backoff: float = 3,
+    ) -> None:
+        """
+        :param rate_per_minute: 单个 Bot 每分钟发送消息数量上限
+        :param burst: 单个 Bot 允许连续发送的消息数量
+        :param concurrency: 单个 Bot 同时发送的消息数量
+        :param max_retries: 发送失败时的重试次数
+        :param retry_backoff: 首次重试前的等待时间, 之后每次重试翻倍, 单位秒
+        """
+        if rate_per_minute <= 0:
+            raise ValueError('rate_per_minute must be greater than 0')
+
+        self._rate_per_minute = rate_per_minute
+        self._burst = max(1, burst)
+        self._concurrency = max(1, concurrency)
+        self._max_retries = max(0, max_retries)
+        self._retry_backoff = retry_backoff
+        self._pacers: dict[str, _SendPacer] = {}
+        self._background_tasks: set[asyncio.Task[BroadcastResult]] = set()
+
+    def __repr__(self) -> str:
+        return (
+            f'{self.__class__.__name__}(rate_per_minute={self._rate_per_minute}, bots={len(self._pacers)}, '
+            f'background={len(self._background_tasks)})'
+        )
+
+    def _get_pacer(self, bot_id: str) -> _SendPacer:
+        if (pacer := self._pacers.get(bot_id)) is None:
+            pacer = _SendPacer(rate_per_minute=self._rate_per_minute, capacity=self._burst)
+            self._pacers[bot_id] = pacer
+        return pacer
+
+    @staticmethod
+    async def _resolve_targets(
+            targets: Iterable['Entity'],
+            message: SentOmegaMessage,
+            result: BroadcastResult,
+            **kwargs,
+    ) -> list[_ResolvedTarget]:
+        """解析全部对象的 Bot 及发送参数, 并为每个平台构造一次消息, 无法发送的对象计入 skipped"""
+        targets = list(targets)
+        online_bots = get_online_bots()
+        resolved: list[_ResolvedTarget] = []
+        platform_messages: dict[str, Any] = {}
+
+        async with begin_db_session() as session:
+            bots = {
+                bot.id: bot
+                for bot in await BotSelfDAL(session=session).query_by_index_ids(
+                    index_ids=(x.bot_index_id for x in targets)
+                )
+            }
+
+            for entity in targets:
+                bot_self = bots.get(entity.bot_index_id)
+                bot = None if bot_self is None else online_bots.get(bot_self.bot_type, {}).get(bot_self.self_id)
+                if bot_self is None or bot is None:
+                    logger.opt(colors=True).debug(f'{LOG_PREFIX}Skipped {entity}, bot is not online')
+                    result.skipped += 1
+                    continue
+
+                internal_entity = OmegaEntity(
+                    session=session,
+                    bot_id=bot_self.self_id,
+                    entity_type=entity.entity_type,
+                    entity_id=entity.entity_id,
+                    parent_id=entity.parent_id,
+                )
+                try:
+                    entity_target = entity_target_register.get_target(SupportedTarget(entity.entity_type))
+                    send_params = entity_target(entity=internal_entity).get_api_to_send_msg(**kwargs)
+
+                    platform = bot.adapter.get_name()
+                    if platform not in platform_messages:
+                        message_builder = message_builder_register.get_builder(SupportedPlatform(platform))
+                        platform_messages[platform] = message_builder(message=message).message
+                except Exception as e:
+                    logger.opt(colors=True).debug(f'{LOG_PREFIX}Skipped {entity}, target not supported, {e!r}')
+                    result.skipped += 1
+                    continue
+
+                resolved.append(_ResolvedTarget(
+                    entity=entity,
+                    bot=bot,
+                    api=send_params.api,
+                    params={send_params.message_param_name: platform_messages[platform], **send_params.params},
+                ))
+
+        return resolved
+
+    async def _send_target(self, target: _ResolvedTarget, pacer: _SendPacer, result: BroadcastResult) -> None:
+        for attempt in range(self._max_retries + 1):
+            await pacer.wait()
+            try:
+                await getattr(target.bot, target.api)(**target.params)
+                result.succeeded += 1
+                return
+            except ActionFailed as e:
+                if attempt >= self._max_retries:
+                    logger.opt(colors=True).warning(f'{LOG_PREFIX}Sending message to {target.entity} failed, {e!r}')
+                    break
+                result.retried += 1
+                await asyncio.sleep(self._retry_backoff * 2 ** attempt)
+            except NetworkError as e:
+                # 请求可能已经送达平台, 仅响应超时或连接中断, 重试可能导致消息重复发送
+                logger.opt(colors=True).warning(
+                    f'{LOG_PREFIX}Sending message to {target.entity} failed, not retried to avoid duplicates, {e!r}'
+                )
+                break
+            except Exception as e:
+                logger.opt(colors=True).error(f'{LOG_PREFIX}Sending message to {target.entity} failed, {e!r}')
+                break
+
+        result.failed += 1
+        result.failed_targets.append(target.entity.id)
+
+    async def _send_bot_targets(self, bot_id: str, targets: list[_ResolvedTarget], result: BroadcastResult) -> None:
+        pacer = self._get_pacer(bot_id=bot_id)
+        semaphore = asyncio.Semaphore(self._concurrency)
+
+        async def _send(target: _ResolvedTarget) -> None:
+            async with semaphore:
+                await self._send_target(target=target, pacer=pacer, result=result)
+
+        await asyncio.gather(*(_send(target) for target in targets))
+
+    async def broadcast(self, message: SentOmegaMessage, targets: Iterable['Entity'], **kwargs) -> BroadcastResult:
+        """向多个 Entity 发送同一条消息
+
+        :param message: 待发送的消息
+        :param targets: 目标对象, 重复的对象只发送一次
+        :param kwargs: 传递给平台发送消息 API 的参数
+        :return: 投递统计
+        """
+        start_time = time.monotonic()
+        unique_targets = list({x.id: x for x in targets}.values())
+        result = BroadcastResult(total=len(unique_targets))
+        if not unique_targets:
+            return result
+
+        resolved = await self._resolve_targets(targets=unique_targets, message=message, result=result, **kwargs)
+
+        bot_targets: dict[str, list[_ResolvedTarget]] = {}
+        for target in resolved:
+            bot_targets.setdefault(target.bot.self_id, []).append(target)
+
+        with resource_cache.hold(*get_message_local_files(message)):
+            await asyncio.gather(*(
+                self._send_bot_targets(bot_id=bot_id, targets=targets, result=result)
+                for bot_id, targets in bot_targets.items()
+            ))
+
+        result.elapsed = time.monotonic() - start_time
+        logger.opt(colors=True).debug(f'{LOG_PREFIX}Broadcast completed, {result}')
+        return result
+
+    async def _broadcast_and_report(
+            self,
+            message: SentOmegaMessage,
+            targets: list['Entity'],
+            source: str,
+            **kwargs,
+    ) -> BroadcastResult:
+        try:
+            result = await self.broadcast(message=message, targets=targets, **kwargs)
+        except Exception as e:
+            # 发送单个对象的异常均已在 broadcast 中处理, 此处异常仅来自发送前的对象解析
+            logger.opt(colors=True).error(f'{LOG_PREFIX}<r>Broadcast from {source} failed</r>, {{!r}}', e)
+            unique_target_ids = list({x.id for x in targets})
+            return BroadcastResult(
+                total=len(unique_target_ids), failed=len(unique_target_ids), failed_targets=unique_target_ids
+            )
+
+        if result.failed:
+            logger.opt(colors=True).warning(
+                f'{LOG_PREFIX}Broadcast from {source}, sending message to {result.failed} target(s) failed, {result}'
+            )
+        return result
+
+    def broadcast_in_background(
+            self,
+            message: SentOmegaMessage,
+            targets: Iterable['Entity'],
+            *,
+            source: str = 'unknown',
+            **kwargs,
+    ) -> asyncio.Task[BroadcastResult]:
+        """在后台任务中向多个 Entity 发送同一条消息, 广播不受调用方超时或取消的影响, 失败的投递由广播器记录日志
+
+        :param message: 待发送的消息
+        :param targets: 目标对象, 重复的对象只发送一次
+        :param source: 广播来源, 用于日志
+        :param kwargs: 传递给平台发送消息 API 的参数
+        :return: 广播任务
+        """
+        task = asyncio.create_task(
+            self._broadcast_and_report(message=message, targets=list(targets), source=source, **kwargs)
+        )
+        self._background_tasks.add(task)
+        task.add_done_callback(self._background_tasks.discard)
+        return task
+
+    async def drain_background(self, timeout: float) -> None:
+        """等待全部后台广播任务完成, 超时后取消仍未完成的任务, 用于关闭时清理
+
+        :param timeout: 等待时间, 单位秒
+        """
+        if not self._background_tasks:
+            return
+
+        tasks = list(self._background_tasks)
+        _, pending = await asyncio.wait(tasks, timeout=timeout)
+        if not pending:
+            return
+
+        for task in pending:
+            task.cancel()
+        await asyncio.gather(*pending, return_exceptions=True)
+        logger.opt(colors=True).warning(f'{LOG_PREFIX}Cancelled {len(pending)} unfinished background broadcast(s)')
+
+
+__all__ = [
+    'BroadcastDispatcher',
+    'BroadcastResult',
+]
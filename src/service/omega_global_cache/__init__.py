@@ -5,73 +5,152 @@
 @Project        : omega-miya
 @Description    : Omega 全局缓存
 @GitHub         : https://github.com/Ailitonia
-@Software       : PyCharm 
+@Software       : PyCharm
 """
 
+from collections.abc import Iterable, Mapping
 from datetime import datetime, timedelta
+from typing import ClassVar
+from weakref import WeakValueDictionary
 
+from nonebot import logger
 from sqlalchemy.exc import NoResultFound
 
 from src.database import GlobalCacheDAL, begin_db_session
+from src.database.internal.global_cache import GlobalCache
+from src.utils.cache_utils import TTLCache
+from ..apscheduler import scheduler
 
 
 class OmegaGlobalCache:
-    """Omega 全局缓存"""
+    """Omega 全局缓存
 
-    def __init__(self, cache_name: str, *, ttl: int = 86400):
+    - 内存缓存: 容量有限的 LRU 缓存, 各条目与数据库缓存使用同样的到期时间
+    - 数据库缓存: 持久化保存, 已过期的条目由后台定时任务清理
+    """
+
+    # 已创建的全局缓存实例, 用于后台定时清理过期条目
+    _instances: ClassVar[WeakValueDictionary[str, 'OmegaGlobalCache']] = WeakValueDictionary()
+
+    def __init__(self, cache_name: str, *, ttl: int = 86400, maxsize: int = 1024):
         self._cache_name = cache_name
         self._ttl = ttl
 
-        # 内存级缓存, 对象存续期间永不失效
-        self._cache: dict[str, str] = {}
+        # 内存级缓存, 条目到期时间与数据库缓存一致
+        self._cache: TTLCache[str, str] = TTLCache(maxsize=maxsize, ttl=ttl)
+        self._instances[cache_name] = self
+
+    def __repr__(self) -> str:
+        return f'{self.__class__.__name__}(cache_name={self._cache_name!r}, internal={self._cache!r})'
 
     @property
     def expired_at(self) -> datetime:
         return datetime.now() + timedelta(seconds=self._ttl)
 
-    async def _query_db_unique(self, key: str) -> str:
+    @staticmethod
+    def _remaining_ttl(expired_at: datetime) -> float:
+        """数据库缓存条目的剩余有效时间, 单位秒"""
+        return (expired_at - datetime.now()).total_seconds()
+
+    def _update_internal_from_db(self, items: Iterable[GlobalCache]) -> dict[str, str]:
+        """按数据库缓存条目的到期时间写入内存缓存"""
+        result = {}
+        for item in items:
+            if (ttl := self._remaining_ttl(item.expired_at)) > 0:
+                self._cache.set(item.cache_key, item.cache_value, ttl=ttl)
+                result[item.cache_key] = item.cache_value
+        return result
+
+    async def _query_db_unique(self, key: str) -> GlobalCache:
         async with begin_db_session() as session:
             result = await GlobalCacheDAL(session).query_unique(cache_name=self._cache_name, cache_key=key)
-        return result.cache_value
+        return result
+
+    async def _query_db_many(self, keys: Iterable[str]) -> list[GlobalCache]:
+        async with begin_db_session() as session:
+            result = await GlobalCacheDAL(session).query_many(cache_name=self._cache_name, cache_keys=list(keys))
+        return result
 
-    async def _query_db_series(self) -> dict[str, str]:
+    async def _query_db_series(self) -> list[GlobalCache]:
         async with begin_db_session() as session:
             result = await GlobalCacheDAL(session).query_series(cache_name=self._cache_name)
-        return {x.cache_key: x.cache_value for x in result}
+        return result
 
     async def _clean_db_expired(self) -> None:
         async with begin_db_session() as session:
             await GlobalCacheDAL(session).delete_series_expired(cache_name=self._cache_name)
 
-    async def _save_db(self, key: str, value: str) -> None:
+    @staticmethod
+    def _check_value(value: str) -> None:
         if len(value) > 4096:
             raise ValueError('the length of value must less than 4096')
 
+    async def _save_db(self, key: str, value: str, expired_at: datetime) -> None:
+        self._check_value(value)
+
         async with begin_db_session() as session:
             await GlobalCacheDAL(session).upsert(
-                cache_name=self._cache_name, cache_key=key, cache_value=value, expired_time=self.expired_at
+                cache_name=self._cache_name, cache_key=key, cache_value=value, expired_time=expired_at
+            )
+
+    async def _save_db_many(self, items: Mapping[str, str], expired_at: datetime) -> None:
+        for value in items.values():
+            self._check_value(value)
+
+        async with begin_db_session() as session:
+            await GlobalCacheDAL(session).upsert_many(
+                cache_name=self._cache_name, cache_items=items, expired_time=expired_at
             )
 
     async def load(self, key: str) -> str | None:
         """读取缓存"""
-        if (value := self._cache.get(key, None)) is not None:
+        if (value := self._cache.get(key)) is not None:
             return value
 
         try:
             result = await self._query_db_unique(key=key)
-            self._cache.update({key: result})
-            return result
         except NoResultFound:
             return None
+        return self._update_internal_from_db([result]).get(key)
+
+    async def load_many(self, keys: Iterable[str]) -> dict[str, str]:
+        """批量读取缓存, 内存缓存未命中的键在一次数据库查询中读取, 不存在的键不包含在结果中"""
+        result: dict[str, str] = {}
+        missing_keys: list[str] = []
+        for key in keys:
+            if (value := self._cache.get(key)) is not None:
+                result[key] = value
+            else:
+                missing_keys.append(key)
+
+        if missing_keys:
+            result.update(self._update_internal_from_db(await self._query_db_many(keys=missing_keys)))
+        return result
 
     async def save(self, key: str, value: str) -> None:
         """更新内部内存缓存及数据库缓存"""
-        self._cache.update({key: value})
-        await self._save_db(key=key, value=value)
+        self._check_value(value)
+        expired_at = self.expired_at
+        self._cache.set(key, value, ttl=self._remaining_ttl(expired_at))
+        await self._save_db(key=key, value=value, expired_at=expired_at)
+
+    async def save_many(self, items: Mapping[str, str]) -> None:
+        """批量更新内部内存缓存及数据库缓存, 数据库缓存在一个事务中批量写入"""
+        if not items:
+            return
+
+        for value in items.values():
+            self._check_value(value)
+
+        expired_at = self.expired_at
+        ttl = self._remaining_ttl(expired_at)
+        for key, value in items.items():
+            self._cache.set(key, value, ttl=ttl)
+        await self._save_db_many(items=items, expired_at=expired_at)
 
     def update_internal(self, key: str, value: str) -> None:
         """仅更新内部内存缓存"""
-        self._cache.update({key: value})
+        self._cache.set(key, value)
 
     def clear_internal(self):
         """仅清空内存缓存"""
@@ -81,7 +160,40 @@ class OmegaGlobalCache:
         """同步内部内存缓存与数据库缓存一致"""
         await self._clean_db_expired()
         self._cache.clear()
-        self._cache.update(await self._query_db_series())
+        self._update_internal_from_db(await self._query_db_series())
+
+    @classmethod
+    async def sweep_expired(cls) -> None:
+        """清理全部全局缓存实例的过期内存缓存条目及数据库缓存条目"""
+        instances = list(cls._instances.values())
+        if not instances:
+            return
+
+        async with begin_db_session() as session:
+            dal = GlobalCacheDAL(session)
+            for instance in instances:
+                instance._cache.expire()
+                await dal.delete_series_expired(cache_name=instance._cache_name)
+
+
+async def _omega_global_cache_sweeper() -> None:
+    """定期清理全局缓存中的过期条目"""
+    try:
+        await OmegaGlobalCache.sweep_expired()
+        logger.debug('OmegaGlobalCache | Expired cache sweeping completed')
+    except Exception as e:
+        logger.error(f'OmegaGlobalCache | Sweeping expired cache failed, {e!r}')
+
+
+scheduler.add_job(
+    _omega_global_cache_sweeper,
+    'interval',
+    minutes=30,
+    id='omega_global_cache_sweeper',
+    coalesce=True,
+    max_instances=1,
+    misfire_grace_time=60,
+)
 
 
 __all__ = [
@@ -0,0 +1,58 @@
+"""
+@Author         : Ailitonia
+@Date           : 2025/1/22 20:50
+@FileName       : omega_history_archive
+@Project        : nonebot2_miya
+@Description    : Omega 消息历史记录保留策略, 定期将超过保留时间的记录按月归档至文件
+@GitHub         : https://github.com/Ailitonia
+@Software       : PyCharm
+"""
+
+from nonebot import logger
+
+from ..apscheduler import scheduler
+from .archiver import HistoryArchiver, RetentionPolicy, build_retention_policies
+from .config import history_archive_config
+
+history_archiver = HistoryArchiver(
+    policies=build_retention_policies(
+        retention_days=history_archive_config.omega_history_retention_days,
+        default_retention_days=history_archive_config.omega_history_default_retention_days,
+    ),
+    archive_enable=history_archive_config.omega_history_archive_enable,
+    batch_size=history_archive_config.omega_history_archive_batch_size,
+)
+"""全局消息历史记录归档器"""
+
+
+async def _archive_expired_history() -> None:
+    """定期归档超过保留时间的消息历史记录"""
+    try:
+        result = await history_archiver.run()
+        if archived_count := sum(result.values()):
+            logger.info(f'OmegaHistoryArchive | Archived {archived_count} expired message history record(s)')
+    except Exception as e:
+        logger.error(f'OmegaHistoryArchive | Archiving expired message history failed, {e!r}')
+
+
+if (
+        history_archive_config.omega_history_retention_days
+        or history_archive_config.omega_history_default_retention_days is not None
+):
+    scheduler.add_job(
+        _archive_expired_history,
+        'cron',
+        hour='4',
+        minute='40',
+        id='omega_history_archive_expired',
+        coalesce=True,
+        max_instances=1,
+        misfire_grace_time=300,
+    )
+
+
+__all__ = [
+    'HistoryArchiver',
+    'RetentionPolicy',
+    'history_archiver',
+]
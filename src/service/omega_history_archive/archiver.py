@@ -0,0 +1,162 @@
+"""
+@Author         : Ailitonia
+@Date           : 2025/1/22 21:10
+@FileName       : archiver
+@Project        : nonebot2_miya
+@Description    : 消息历史记录按保留策略归档
+@GitHub         : https://github.com/Ailitonia
+@Software       : PyCharm
+"""
+
+from collections.abc import Mapping
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+
+from nonebot.log import logger
+from nonebot.utils import run_sync
+
+from src.database import HistoryDAL, begin_db_session
+from src.database.internal.history_archive import get_month_key, history_archive
+
+LOG_PREFIX: str = '<lc>Omega History Archive</lc> | '
+
+
+@dataclass(frozen=True)
+class RetentionPolicy:
+    """消息历史记录保留策略"""
+    name: str
+    retention_days: int
+    entity_types: tuple[str, ...] | None = None
+    exclude_entity_types: tuple[str, ...] = ()
+
+
+def build_retention_policies(
+        retention_days: Mapping[str, int],
+        default_retention_days: int | None = None,
+) -> list[RetentionPolicy]:
+    """根据配置生成保留策略, 每个单独配置的实体类型一个策略, 其余实体类型共用默认策略
+
+    :param retention_days: 各实体类型的保留天数
+    :param default_retention_days: 未单独配置的实体类型的保留天数, 为 None 时不生成默认策略
+    """
+    policies = [
+        RetentionPolicy(name=entity_type, retention_days=days, entity_types=(entity_type,))
+        for entity_type, days in retention_days.items()
+    ]
+    if default_retention_days is not None:
+        policies.append(RetentionPolicy(
+            name='default', retention_days=default_retention_days, exclude_entity_types=tuple(retention_days.keys())
+        ))
+    return policies
+
+
+def _get_next_month(time: datetime) -> datetime:
+    return datetime(time.year + 1, 1, 1) if time.month == 12 else datetime(time.year, time.month + 1, 1)
+
+
+class HistoryArchiver:
+    """消息历史记录归档器
+
+    按保留策略将数据库中超过保留时间的记录以整月为单位写入归档文件后从数据库删除, 未启用归档时直接删除
+    """
+
+    def __init__(self, policies: list[RetentionPolicy], *, archive_enable: bool = True, batch_size: int = 5000):
+        self._policies = policies
+        self._archive_enable = archive_enable
+        self._batch_size = batch_size
+
+    def __repr__(self) -> str:
+        return f'{self.__class__.__name__}(policies={[x.name for x in self._policies]})'
+
+    async def _archive_month(self, policy: RetentionPolicy, month_start: datetime, month_end: datetime) -> int:
+        """归档保留策略在一个月份内的全部记录
+
+        :return: 从数据库删除的记录数量
+        """
+        writer = (
+            await run_sync(history_archive.open_writer)(month=get_month_key(month_start), policy=policy.name)
+            if self._archive_enable else None
+        )
+
+        id_ranges: list[tuple[int, int]] = []
+        after_id = 0
+        try:
+            while True:
+                async with begin_db_session() as session:
+                    records = await HistoryDAL(session).query_live_records_by_time(
+                        start_time=month_start, end_time=month_end, after_id=after_id, limit=self._batch_size,
+                        entity_types=policy.entity_types, exclude_entity_types=policy.exclude_entity_types,
+                    )
+                if not records:
+                    break
+
+                after_id = records[-1].id
+                id_ranges.append((records[0].id, records[-1].id))
+                if writer is not None:
+                    await run_sync(writer.write)([x.model_dump(mode='json') for x in records])
+
+            if writer is not None:
+                await run_sync(writer.commit)()
+        except Exception:
+            if writer is not None:
+                await run_sync(writer.abort)()
+            raise
+
+        # 归档文件写入完成后再从数据库删除, 删除中断时已归档的记录在下次归档时会被跳过
+        deleted_count = 0
+        for first_id, last_id in id_ranges:
+            async with begin_db_session() as session:
+                deleted_count += await HistoryDAL(session).delete_records_by_id_range(
+                    start_time=month_start, end_time=month_end, first_id=first_id, last_id=last_id,
+                    entity_types=policy.entity_types, exclude_entity_types=policy.exclude_entity_types,
+                )
+        return deleted_count
+
+    async def _archive_policy(self, policy: RetentionPolicy) -> int:
+        """从最早的月份开始, 归档保留策略下全部已完整超过保留时间的月份"""
+        cutoff_time = datetime.now() - timedelta(days=policy.retention_days)
+
+        archived_count = 0
+        while True:
+            async with begin_db_session() as session:
+                oldest_time = await HistoryDAL(session).query_oldest_received_time(
+                    entity_types=policy.entity_types, exclude_entity_types=policy.exclude_entity_types
+                )
+            if oldest_time is None:
+                break
+
+            month_start = datetime.fromtimestamp(oldest_time).replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+            month_end = _get_next_month(month_start)
+            if month_end > cutoff_time:
+                break
+
+            deleted_count = await self._archive_month(policy=policy, month_start=month_start, month_end=month_end)
+            logger.opt(colors=True).info(
+                f'{LOG_PREFIX}Archived {deleted_count} record(s) of {policy.name!r} in {get_month_key(month_start)}'
+            )
+            if deleted_count == 0:
+                # 避免因删除失败而重复归档同一月份
+                break
+            archived_count += deleted_count
+
+        return archived_count
+
+    async def run(self) -> dict[str, int]:
+        """执行全部保留策略
+
+        :return: 各保留策略从数据库删除的记录数量
+        """
+        result = {}
+        for policy in self._policies:
+            try:
+                result[policy.name] = await self._archive_policy(policy=policy)
+            except Exception as e:
+                logger.opt(colors=True).error(f'{LOG_PREFIX}<r>Archiving {policy.name!r} failed</r>, {{!r}}', e)
+        return result
+
+
+__all__ = [
+    'HistoryArchiver',
+    'RetentionPolicy',
+    'build_retention_policies',
+]
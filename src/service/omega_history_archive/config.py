@@ -0,0 +1,39 @@
+"""
+@Author         : Ailitonia
+@Date           : 2025/1/22 21:00
+@FileName       : config
+@Project        : nonebot2_miya
+@Description    : Omega history archive config
+@GitHub         : https://github.com/Ailitonia
+@Software       : PyCharm
+"""
+
+from nonebot import get_plugin_config, logger
+from pydantic import BaseModel, ConfigDict, ValidationError
+
+
+class OmegaHistoryArchiveConfig(BaseModel):
+    """Omega 消息历史记录归档配置"""
+    # 按实体类型配置消息历史记录在数据库中的保留天数, 实体类型即消息事件类型的前缀, 如 {"onebot_v11_group": 180}
+    omega_history_retention_days: dict[str, int] = {}
+    # 未单独配置的实体类型的保留天数, 为 None 时永久保留在数据库中
+    omega_history_default_retention_days: int | None = None
+    # 是否将超过保留时间的记录按月归档至文件, 关闭后超过保留时间的记录将被直接删除
+    omega_history_archive_enable: bool = True
+    # 归档时每批读取及删除的记录数量
+    omega_history_archive_batch_size: int = 5000
+
+    model_config = ConfigDict(extra='ignore')
+
+
+try:
+    history_archive_config = get_plugin_config(OmegaHistoryArchiveConfig)
+except ValidationError as e:
+    import sys
+    logger.opt(colors=True).critical(f'<r>Omega History Archive 配置格式验证失败</r>, 错误信息:\n{e}')
+    sys.exit(f'Omega History Archive 配置格式验证失败, {e}')
+
+
+__all__ = [
+    'history_archive_config',
+]
@@ -0,0 +1,51 @@
+"""
+@Author         : Ailitonia
+@Date           : 2025/1/8 21:00
+@FileName       : omega_image_hash
+@Project        : nonebot2_miya
+@Description    : Omega 图片感知哈希索引, 用于识图结果缓存及跨图库重复作品检测
+@GitHub         : https://github.com/Ailitonia
+@Software       : PyCharm
+"""
+
+from nonebot import logger
+
+from ..apscheduler import scheduler
+from .config import image_hash_config
+from .index import ImageHashIndex, ImageHashMatch
+
+image_hash_index = ImageHashIndex(
+    method=image_hash_config.omega_image_hash_method,
+    chunks=image_hash_config.omega_image_hash_index_chunks,
+    duplicate_distance=image_hash_config.omega_image_hash_duplicate_distance,
+)
+"""全局图片感知哈希索引"""
+
+
+async def _purge_expired_image_hash() -> None:
+    """定期清理超过保留时间的哈希"""
+    for namespace, expire_days in image_hash_config.omega_image_hash_namespace_expire_days.items():
+        try:
+            purged = await image_hash_index.purge_expired(namespace=namespace, expire_days=expire_days)
+            if purged:
+                logger.debug(f'OmegaImageHash | Purged {purged} expired hash(es) of {namespace!r}')
+        except Exception as e:
+            logger.error(f'OmegaImageHash | Purging expired hash of {namespace!r} failed, {e!r}')
+
+
+scheduler.add_job(
+    _purge_expired_image_hash,
+    'cron',
+    hour='4',
+    minute='20',
+    id='omega_image_hash_purge_expired',
+    coalesce=True,
+    misfire_grace_time=300,
+)
+
+
+__all__ = [
+    'ImageHashIndex',
+    'ImageHashMatch',
+    'image_hash_index',
+]
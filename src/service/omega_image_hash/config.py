@@ -0,0 +1,41 @@
+"""
+@Author         : Ailitonia
+@Date           : 2025/1/8 21:02
+@FileName       : config
+@Project        : nonebot2_miya
+@Description    : Omega image hash config
+@GitHub         : https://github.com/Ailitonia
+@Software       : PyCharm
+"""
+
+from typing import Literal
+
+from nonebot import get_plugin_config, logger
+from pydantic import BaseModel, ConfigDict, ValidationError
+
+
+class OmegaImageHashConfig(BaseModel):
+    """Omega 图片感知哈希索引配置"""
+    # 感知哈希算法, 不同算法的哈希分别存储, 切换后需要重新建立索引
+    omega_image_hash_method: Literal['dhash', 'phash'] = 'dhash'
+    # 多索引哈希的分段数量, 需为 64 的约数
+    omega_image_hash_index_chunks: int = 4
+    # 判定为同一图片的最大汉明距离
+    omega_image_hash_duplicate_distance: int = 6
+    # 各分类中哈希的保留时间, 单位天, 未配置的分类永久保留
+    omega_image_hash_namespace_expire_days: dict[str, int] = {'image_searcher': 7}
+
+    model_config = ConfigDict(extra='ignore')
+
+
+try:
+    image_hash_config = get_plugin_config(OmegaImageHashConfig)
+except ValidationError as e:
+    import sys
+    logger.opt(colors=True).critical(f'<r>Omega Image Hash 配置格式验证失败</r>, 错误信息:\n{e}')
+    sys.exit(f'Omega Image Hash 配置格式验证失败, {e}')
+
+
+__all__ = [
+    'image_hash_config',
+]
@@ -0,0 +1,146 @@
+"""
+@Author         : Ailitonia
+@Date           : 2025/1/8 21:10
+@FileName       : index
+@Project        : nonebot2_miya
+@Description    : 持久化的图片感知哈希索引
+@GitHub         : https://github.com/Ailitonia
+@Software       : PyCharm
+"""
+
+import asyncio
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import TYPE_CHECKING
+
+from nonebot.log import logger
+from nonebot.utils import run_sync
+
+from src.database import ImageHashDAL, begin_db_session
+from src.utils.perceptual_hash import MultiIndexHashing, hash_image_bytes
+
+if TYPE_CHECKING:
+    from src.resource import BaseResource
+    from src.utils.perceptual_hash import HashMethod
+
+LOG_PREFIX: str = '<lc>Omega Image Hash</lc> | '
+
+
+@dataclass(frozen=True)
+class ImageHashMatch:
+    """近似图片检索结果"""
+    resource_key: str
+    distance: int
+
+
+class ImageHashIndex:
+    """持久化的图片感知哈希索引
+
+    哈希按分类 (namespace) 存储于数据库中, 各分类的内存索引在首次使用时从数据库加载, 之后随写入同步更新
+    """
+
+    def __init__(self, *, method: 'HashMethod' = 'dhash', chunks: int = 4, duplicate_distance: int = 6) -> None:
+        """
+        :param method: 感知哈希算法
+        :param chunks: 多索引哈希的分段数量
+        :param duplicate_distance: 判定为同一图片的最大汉明距离, 查询时未指定距离则使用该值
+        """
+        self._method: HashMethod = method
+        self._chunks = chunks
+        self._duplicate_distance = duplicate_distance
+        self._indexes: dict[str, MultiIndexHashing[str]] = {}
+        self._lock = asyncio.Lock()
+
+    def __repr__(self) -> str:
+        return f'{self.__class__.__name__}(method={self._method!r}, namespaces={list(self._indexes.keys())})'
+
+    def _get_db_namespace(self, namespace: str) -> str:
+        return f'{self._method}/{namespace}'
+
+    async def _get_index(self, namespace: str) -> MultiIndexHashing[str]:
+        if (index := self._indexes.get(namespace)) is not None:
+            return index
+
+        async with self._lock:
+            if (index := self._indexes.get(namespace)) is not None:
+                return index
+
+            async with begin_db_session() as session:
+                stored = await ImageHashDAL(session=session).query_namespace_all(
+                    namespace=self._get_db_namespace(namespace)
+                )
+
+            index = MultiIndexHashing(chunks=self._chunks)
+            index.update((x.resource_key, x.hash_value) for x in stored)
+            self._indexes[namespace] = index
+            logger.opt(colors=True).debug(f'{LOG_PREFIX}Loaded {len(index)} hash(es) of {namespace!r}')
+            return index
+
+    async def hash_bytes(self, content: bytes) -> int:
+        """计算图片内容的感知哈希"""
+        return await run_sync(hash_image_bytes)(content, method=self._method)
+
+    async def hash_file(self, file: 'BaseResource') -> int:
+        """计算图片文件的感知哈希"""
+        async with file.async_open('rb') as af:
+            content = await af.read()
+        return await self.hash_bytes(content=content)
+
+    async def get(self, namespace: str, resource_key: str) -> int | None:
+        """获取已索引的哈希值"""
+        return (await self._get_index(namespace=namespace)).get(resource_key)
+
+    async def add(self, namespace: str, resource_key: str, hash_value: int) -> None:
+        """写入哈希值, 已存在时更新"""
+        index = await self._get_index(namespace=namespace)
+        async with begin_db_session() as session:
+            await ImageHashDAL(session=session).upsert(
+                namespace=self._get_db_namespace(namespace), resource_key=resource_key, hash_value=hash_value
+            )
+        index.add(resource_key, hash_value)
+
+    async def remove(self, namespace: str, resource_key: str) -> None:
+        index = await self._get_index(namespace=namespace)
+        async with begin_db_session() as session:
+            await ImageHashDAL(session=session).delete(
+                namespace=self._get_db_namespace(namespace), resource_key=resource_key
+            )
+        index.remove(resource_key)
+
+    async def query(
+            self,
+            namespace: str,
+            hash_value: int,
+            max_distance: int | None = None,
+    ) -> list[ImageHashMatch]:
+        """查询与 hash_value 汉明距离不超过 max_distance 的图片, 按距离升序排列"""
+        index = await self._get_index(namespace=namespace)
+        max_distance = self._duplicate_distance if max_distance is None else max_distance
+        return [
+            ImageHashMatch(resource_key=key, distance=distance)
+            for key, distance in index.query(value=hash_value, max_distance=max_distance)
+        ]
+
+    async def purge_expired(self, namespace: str, expire_days: int) -> int:
+        """清理分类中超过保留时间的哈希
+
+        :return: 清理的数量
+        """
+        expired_before = datetime.now() - timedelta(days=expire_days)
+        async with begin_db_session() as session:
+            dal = ImageHashDAL(session=session)
+            expired_keys = await dal.query_namespace_expired_keys(
+                namespace=self._get_db_namespace(namespace), expired_before=expired_before
+            )
+            await dal.delete_many(namespace=self._get_db_namespace(namespace), resource_keys=expired_keys)
+
+        if (index := self._indexes.get(namespace)) is not None:
+            for key in expired_keys:
+                index.remove(key)
+        return len(expired_keys)
+
+
+__all__ = [
+    'ImageHashIndex',
+    'ImageHashMatch',
+]
@@ -23,6 +23,7 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from src.compat import AnyHttpUrlStr as AnyHttpUrl
 from src.compat import parse_obj_as
 from src.database import BotSelfDAL, EntityDAL, get_db_session
+from src.service.omega_base import OmegaEntity
 from src.service.omega_base.event import BotConnectEvent, BotDisconnectEvent
 
 
@@ -192,6 +193,7 @@ async def __obv11_bot_connect(
         raise ValueError('Bot self_id not match BotActionEvent bot_id')
 
     bot_dal = BotSelfDAL(session=session)
+    OmegaEntity.invalidate_bot_cache(session=session, bot_id=bot.self_id)
     entity_dal = EntityDAL(session=session)
     allowed_entity_type = entity_dal.entity_type
 
@@ -326,6 +328,7 @@ async def __obv11_bot_disconnect(
         raise ValueError('Bot self_id not match BotActionEvent bot_id')
 
     bot_dal = BotSelfDAL(session)
+    OmegaEntity.invalidate_bot_cache(session=session, bot_id=bot.self_id)
     try:
         exist_bot = await bot_dal.query_unique(self_id=bot.self_id)
         await bot_dal.update(id_=exist_bot.id, bot_type=event.bot_type, bot_status=0)
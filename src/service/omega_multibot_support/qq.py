@@ -18,6 +18,7 @@ from sqlalchemy.exc import NoResultFound
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from src.database import BotSelfDAL, EntityDAL, get_db_session
+from src.service.omega_base import OmegaEntity
 from src.service.omega_base.event import BotConnectEvent, BotDisconnectEvent
 
 if TYPE_CHECKING:
@@ -35,6 +36,7 @@ async def __qq_bot_connect(
         raise ValueError('Bot self_id not match BotActionEvent bot_id')
 
     bot_dal = BotSelfDAL(session=session)
+    OmegaEntity.invalidate_bot_cache(session=session, bot_id=bot.self_id)
     entity_dal = EntityDAL(session=session)
     allowed_entity_type = entity_dal.entity_type
 
@@ -107,6 +109,7 @@ async def __qq_bot_disconnect(
         raise ValueError('Bot self_id not match BotActionEvent bot_id')
 
     bot_dal = BotSelfDAL(session)
+    OmegaEntity.invalidate_bot_cache(session=session, bot_id=bot.self_id)
     try:
         exist_bot = await bot_dal.query_unique(self_id=bot.self_id)
         await bot_dal.update(id_=exist_bot.id, bot_type=event.bot_type, bot_status=0)
@@ -0,0 +1,51 @@
+"""
+@Author         : Ailitonia
+@Date           : 2025/1/5 14:32
+@FileName       : omega_polling
+@Project        : nonebot2_miya
+@Description    : Omega 订阅源轮询调度, 按各订阅源的发布频率及上游站点的请求预算统一安排订阅更新检查
+@GitHub         : https://github.com/Ailitonia
+@Software       : PyCharm
+"""
+
+from nonebot import logger
+
+from ..apscheduler import scheduler
+from .config import polling_config
+from .engine import PollingDomain, PollingEngine, PollingMonitor
+
+polling_engine = PollingEngine(
+    reload_interval=polling_config.omega_polling_reload_interval,
+    activity_window_days=polling_config.omega_polling_activity_window_days,
+    checks_per_post_interval=polling_config.omega_polling_checks_per_post_interval,
+    recent_active_time=polling_config.omega_polling_recent_active_time,
+    domain_budgets=polling_config.omega_polling_domain_budgets,
+)
+"""全局订阅源轮询调度器"""
+
+
+async def _omega_polling_tick() -> None:
+    """定期检查到期的订阅源"""
+    try:
+        await polling_engine.tick()
+    except Exception as e:
+        logger.error(f'OmegaPolling | Polling tick failed, {e!r}')
+
+
+scheduler.add_job(
+    _omega_polling_tick,
+    'interval',
+    seconds=polling_config.omega_polling_tick_interval,
+    id='omega_polling_tick',
+    coalesce=True,
+    max_instances=1,
+    misfire_grace_time=polling_config.omega_polling_tick_interval,
+)
+
+
+__all__ = [
+    'PollingDomain',
+    'PollingEngine',
+    'PollingMonitor',
+    'polling_engine',
+]
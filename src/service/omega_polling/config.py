@@ -0,0 +1,43 @@
+"""
+@Author         : Ailitonia
+@Date           : 2025/1/5 14:32
+@FileName       : config
+@Project        : nonebot2_miya
+@Description    : Omega polling config
+@GitHub         : https://github.com/Ailitonia
+@Software       : PyCharm
+"""
+
+from nonebot import get_plugin_config, logger
+from pydantic import BaseModel, ConfigDict, ValidationError
+
+
+class OmegaPollingConfig(BaseModel):
+    """Omega 订阅源轮询配置"""
+    # 轮询调度间隔, 单位秒
+    omega_polling_tick_interval: int = 10
+    # 重新读取订阅源列表及发布频率的间隔, 单位秒
+    omega_polling_reload_interval: int = 300
+    # 估计发布频率时统计的时间范围, 单位天
+    omega_polling_activity_window_days: int = 14
+    # 每个平均发布间隔内期望检查的次数, 数值越大检查越频繁
+    omega_polling_checks_per_post_interval: float = 48
+    # 最近一次发布在该时间 (秒) 以内的订阅源按最短间隔检查
+    omega_polling_recent_active_time: int = 3 * 3600
+    # 覆盖各上游站点的每分钟请求预算, 如 {"bilibili": 6}
+    omega_polling_domain_budgets: dict[str, float] = {}
+
+    model_config = ConfigDict(extra='ignore')
+
+
+try:
+    polling_config = get_plugin_config(OmegaPollingConfig)
+except ValidationError as e:
+    import sys
+    logger.opt(colors=True).critical(f'<r>Omega Polling 配置格式验证失败</r>, 错误信息:\n{e}')
+    sys.exit(f'Omega Polling 配置格式验证失败, {e}')
+
+
+__all__ = [
+    'polling_config',
+]
@@ -0,0 +1,361 @@
+"""
+@Author         : Ailitonia
+@Date           : 2025/1/5 14:32
+@FileName       : engine
+@Project        : nonebot2_miya
+@Description    : 订阅源自适应轮询调度
+@GitHub         : https://github.com/Ailitonia
+@Software       : PyCharm
+"""
+
+import asyncio
+import heapq
+import itertools
+import random
+import time
+from collections.abc import Awaitable, Callable, Iterable, Mapping, Sequence
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Any
+
+from nonebot import logger
+
+from src.exception import WebSourceException
+
+LOG_PREFIX: str = '<lc>Omega Polling</lc> | '
+
+type SourceQuery = Callable[[], Awaitable[Iterable[str | int]]]
+"""获取全部已订阅的订阅源 ID"""
+type SourceChecker = Callable[[str], Awaitable[Any]]
+"""检查单个订阅源的更新"""
+type ActivityQuery = Callable[[Sequence[str], datetime], Awaitable[Iterable[tuple[str, datetime | None]]]]
+"""获取订阅源在某时间之后发布内容的 (订阅源 ID, 发布/收录时间)"""
+
+
+class PollingDomain:
+    """上游站点请求预算
+
+    - 令牌以每分钟 rate_per_minute 个的速度恢复, 最多积攒一分钟的量, 每次检查消耗一个令牌
+    - 同时进行的检查不超过 concurrency 个
+    - 任一检查抛出 WebSourceException 时视为被风控, 暂停该站点的全部检查 backoff 秒
+    """
+
+    __slots__ = ('name', 'rate_per_minute', 'concurrency', 'backoff', 'tokens', 'updated_at', 'paused_until', 'running')
+
+    def __init__(self, name: str, rate_per_minute: float, *, concurrency: int = 1, backoff: float = 300) -> None:
+        if rate_per_minute <= 0:
+            raise ValueError('rate_per_minute must be greater than 0')
+        if concurrency <= 0:
+            raise ValueError('concurrency must be greater than 0')
+
+        self.name = name
+        self.rate_per_minute = rate_per_minute
+        self.concurrency = concurrency
+        self.backoff = backoff
+        self.tokens: float = self.capacity
+        self.updated_at: float = time.time()
+        self.paused_until: float = 0.0
+        self.running: int = 0
+
+    def __repr__(self) -> str:
+        return (
+            f'{self.__class__.__name__}(name={self.name!r}, rate_per_minute={self.rate_per_minute}, '
+            f'running={self.running}, paused_until={self.paused_until})'
+        )
+
+    @property
+    def capacity(self) -> float:
+        return max(1.0, self.rate_per_minute)
+
+    def acquire(self, now: float) -> bool:
+        """尝试消耗一个令牌, 站点暂停中、并发已满或令牌不足时返回 False"""
+        if self.paused_until > now or self.running >= self.concurrency:
+            return False
+
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate_per_minute / 60)
+        self.updated_at = now
+        if self.tokens < 1:
+            return False
+
+        self.tokens -= 1
+        return True
+
+    def pause(self, now: float) -> None:
+        """暂停该站点的检查 backoff 秒"""
+        self.paused_until = max(self.paused_until, now + self.backoff)
+        self.tokens = 0
+
+
+@dataclass(kw_only=True)
+class PollingMonitor:
+    """注册到轮询引擎的订阅监控
+
+    :param name: 监控名称, 全局唯一
+    :param domain: 上游站点名称, 需先通过 register_domain 注册
+    :param query_sources: 获取全部已订阅的订阅源 ID
+    :param check: 检查单个订阅源的更新
+    :param query_activity: 获取订阅源近期发布内容的时间, 为空则全部订阅源按 max_interval 检查
+    :param min_interval: 检查间隔下限, 单位秒
+    :param max_interval: 检查间隔上限, 单位秒
+    :param timeout: 单次检查超时时间, 单位秒
+    """
+    name: str
+    domain: str
+    query_sources: SourceQuery
+    check: SourceChecker
+    query_activity: ActivityQuery | None = None
+    min_interval: float = 180
+    max_interval: float = 3600
+    timeout: float = 240
+
+
+class _PollingSource:
+    """单个订阅源的轮询状态"""
+
+    __slots__ = ('monitor', 'source_id', 'interval', 'next_check_at', 'last_checked_at', 'running')
+
+    def __init__(self, monitor: PollingMonitor, source_id: str, interval: float, last_checked_at: float) -> None:
+        self.monitor = monitor
+        self.source_id = source_id
+        self.interval = interval
+        self.next_check_at: float = 0.0
+        self.last_checked_at = last_checked_at
+        self.running: bool = False
+
+    @property
+    def key(self) -> tuple[str, str]:
+        return self.monitor.name, self.source_id
+
+
+class PollingEngine:
+    """订阅源自适应轮询调度
+
+    - 每个上游站点维护一个按下次检查时间排序的优先队列, 到期的订阅源在站点请求预算允许时依次检查
+    - 定期重新读取订阅源列表, 并根据订阅源近期发布内容的时间调整各订阅源的检查间隔:
+      近期有发布的订阅源按最短间隔检查, 其余按平均发布间隔的 1/checks_per_post_interval 检查, 无发布记录的按最长间隔检查
+    - 检查间隔带有 ±10% 的随机抖动, 避免同一站点的请求集中在同一时刻
+    """
+
+    def __init__(
+            self,
+            *,
+            reload_interval: float = 300,
+            activity_window_days: int = 14,
+            checks_per_post_interval: float = 48,
+            recent_active_time: float = 3 * 3600,
+            domain_budgets: Mapping[str, float] | None = None,
+    ) -> None:
+        """
+        :param reload_interval: 重新读取订阅源列表及发布频率的间隔, 单位秒
+        :param activity_window_days: 估计发布频率时统计的时间范围, 单位天
+        :param checks_per_post_interval: 每个平均发布间隔内期望检查的次数
+        :param recent_active_time: 最近一次发布在该时间 (秒) 以内的订阅源按最短间隔检查
+        :param domain_budgets: 覆盖各上游站点注册时的每分钟请求预算
+        """
+        if checks_per_post_interval <= 0:
+            raise ValueError('checks_per_post_interval must be greater than 0')
+
+        self._reload_interval = reload_interval
+        self._activity_window = timedelta(days=activity_window_days)
+        self._checks_per_post_interval = checks_per_post_interval
+        self._recent_active_time = recent_active_time
+        self._domain_budgets: dict[str, float] = dict(domain_budgets or {})
+
+        self._domains: dict[str, PollingDomain] = {}
+        self._monitors: dict[str, PollingMonitor] = {}
+        self._reloaded_at: dict[str, float] = {}
+        self._sources: dict[tuple[str, str], _PollingSource] = {}
+        self._queues: dict[str, list[tuple[float, int, _PollingSource]]] = {}
+        self._counter = itertools.count()
+        self._tasks: set[asyncio.Task[None]] = set()
+        # 正在检查的订阅源, 订阅源在检查期间被移除后重新加入时, 新的状态对象不会在检查完成前再次检查
+        self._running_keys: set[tuple[str, str]] = set()
+
+    def __repr__(self) -> str:
+        return (
+            f'{self.__class__.__name__}(domains={list(self._domains)}, monitors={list(self._monitors)}, '
+            f'sources={len(self._sources)}, running={len(self._tasks)})'
+        )
+
+    def register_domain(
+            self,
+            name: str,
+            rate_per_minute: float,
+            *,
+            concurrency: int = 1,
+            backoff: float = 300,
+    ) -> PollingDomain:
+        """注册上游站点请求预算, 站点已注册时返回已有的站点
+
+        :param name: 站点名称
+        :param rate_per_minute: 每分钟检查次数上限, 可被配置项覆盖
+        :param concurrency: 同时进行的检查数量上限
+        :param backoff: 被风控时暂停检查的时间, 单位秒
+        """
+        if (domain := self._domains.get(name)) is not None:
+            return domain
+
+        domain = PollingDomain(
+            name=name,
+            rate_per_minute=self._domain_budgets.get(name, rate_per_minute),
+            concurrency=concurrency,
+            backoff=backoff,
+        )
+        self._domains[name] = domain
+        self._queues[name] = []
+        return domain
+
+    def register(self, monitor: PollingMonitor) -> None:
+        """注册订阅监控, 订阅源在下一次重新读取时加入队列"""
+        if monitor.domain not in self._domains:
+            raise ValueError(f'domain {monitor.domain!r} is not registered')
+        if monitor.name in self._monitors:
+            raise ValueError(f'monitor {monitor.name!r} is already registered')
+        if not 0 < monitor.min_interval <= monitor.max_interval:
+            raise ValueError('interval must satisfy 0 < min_interval <= max_interval')
+
+        self._monitors[monitor.name] = monitor
+        self._reloaded_at[monitor.name] = 0.0
+        logger.opt(colors=True).debug(f'{LOG_PREFIX}Registered monitor <lc>{monitor.name}</lc>({monitor.domain})')
+
+    def estimate_interval(self, monitor: PollingMonitor, post_times: Sequence[datetime], now: datetime) -> float:
+        """根据订阅源近期发布内容的时间估计检查间隔
+
+        同一小时内的多条记录只计一次, 避免首次订阅时批量写入的历史内容被视为高频发布
+        """
+        if not post_times:
+            return monitor.max_interval
+        if (now - max(post_times)).total_seconds() <= self._recent_active_time:
+            return monitor.min_interval
+
+        active_hours = len({x.replace(minute=0, second=0, microsecond=0) for x in post_times})
+        interval = self._activity_window.total_seconds() / active_hours / self._checks_per_post_interval
+        return min(max(interval, monitor.min_interval), monitor.max_interval)
+
+    def query_intervals(self, monitor_name: str) -> dict[str, float]:
+        """获取订阅监控当前各订阅源的检查间隔"""
+        return {
+            source.source_id: source.interval
+            for source in self._sources.values() if source.monitor.name == monitor_name
+        }
+
+    def _schedule(self, source: _PollingSource, check_at: float) -> None:
+        source.next_check_at = check_at
+        heapq.heappush(self._queues[source.monitor.domain], (check_at, next(self._counter), source))
+
+    def _is_valid_entry(self, check_at: float, source: _PollingSource) -> bool:
+        """队列中的条目在订阅源被移除、重新安排或正在检查时失效, 正在检查的订阅源在检查完成后重新安排"""
+        return (
+            self._sources.get(source.key) is source
+            and source.key not in self._running_keys
+            and check_at == source.next_check_at
+        )
+
+    async def _query_post_times(self, monitor: PollingMonitor, source_ids: Sequence[str]) -> dict[str, list[datetime]]:
+        post_times: dict[str, list[datetime]] = {}
+        if monitor.query_activity is None or not source_ids:
+            return post_times
+
+        for source_id, created_at in await monitor.query_activity(source_ids, datetime.now() - self._activity_window):
+            if created_at is not None:
+                post_times.setdefault(str(source_id), []).append(created_at)
+        return post_times
+
+    async def _reload_monitor(self, monitor: PollingMonitor) -> None:
+        """重新读取订阅源列表及发布频率, 更新各订阅源的检查间隔"""
+        source_ids = list(dict.fromkeys(str(x) for x in await monitor.query_sources()))
+        post_times = await self._query_post_times(monitor=monitor, source_ids=source_ids)
+
+        now = time.time()
+        now_datetime = datetime.now()
+        subscribed = set(source_ids)
+        for key in [x for x in self._sources if x[0] == monitor.name and x[1] not in subscribed]:
+            del self._sources[key]
+
+        for source_id in source_ids:
+            interval = self.estimate_interval(monitor, post_times.get(source_id, []), now_datetime)
+            source = self._sources.get((monitor.name, source_id))
+            if source is None:
+                # 新加入的订阅源随机分布在一个检查间隔内, 避免启动时集中检查
+                source = _PollingSource(monitor, source_id, interval, last_checked_at=now - random.uniform(0, interval))
+                self._sources[source.key] = source
+                self._schedule(source, source.last_checked_at + interval)
+                continue
+
+            source.interval = interval
+            if not source.running and (check_at := source.last_checked_at + interval) < source.next_check_at:
+                self._schedule(source, check_at)
+
+        logger.opt(colors=True).debug(
+            f'{LOG_PREFIX}Reloaded <lc>{monitor.name}</lc> with {len(source_ids)} source(s), '
+            f'{len(post_times)} active in last {self._activity_window.days} day(s)'
+        )
+
+    async def _run_check(self, domain: PollingDomain, source: _PollingSource) -> None:
+        monitor = source.monitor
+        try:
+            await asyncio.wait_for(monitor.check(source.source_id), timeout=monitor.timeout)
+        except WebSourceException as e:
+            domain.pause(time.time())
+            logger.opt(colors=True).warning(
+                f'{LOG_PREFIX}<lc>{monitor.name}</lc>({source.source_id}) fetching failed, maybe under the rate '
+                f'limiting, delay checking of domain {domain.name!r} for {domain.backoff} seconds, {e!r}'
+            )
+        except TimeoutError:
+            logger.opt(colors=True).warning(
+                f'{LOG_PREFIX}<lc>{monitor.name}</lc>({source.source_id}) checking timeout after {monitor.timeout}s'
+            )
+        except Exception as e:
+            logger.opt(colors=True).error(
+                f'{LOG_PREFIX}<lc>{monitor.name}</lc>({source.source_id}) checking failed, {e!r}'
+            )
+        finally:
+            domain.running -= 1
+            source.running = False
+            self._running_keys.discard(source.key)
+            # 检查期间订阅源可能被移除后重新加入, 此时按新的状态对象重新安排
+            if (current := self._sources.get(source.key)) is not None:
+                current.last_checked_at = time.time()
+                self._schedule(current, current.last_checked_at + current.interval * random.uniform(0.9, 1.1))
+
+    def _dispatch(self, domain: PollingDomain, source: _PollingSource) -> None:
+        source.running = True
+        self._running_keys.add(source.key)
+        domain.running += 1
+        task = asyncio.create_task(self._run_check(domain=domain, source=source))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def tick(self) -> None:
+        """重新读取到期的订阅监控, 并在站点请求预算内开始检查已到期的订阅源"""
+        for monitor in list(self._monitors.values()):
+            if time.time() - self._reloaded_at[monitor.name] < self._reload_interval:
+                continue
+            self._reloaded_at[monitor.name] = time.time()
+            try:
+                await self._reload_monitor(monitor=monitor)
+            except Exception as e:
+                logger.opt(colors=True).error(f'{LOG_PREFIX}Reloading <lc>{monitor.name}</lc> failed, {e!r}')
+
+        now = time.time()
+        for domain_name, queue in self._queues.items():
+            domain = self._domains[domain_name]
+            while queue and queue[0][0] <= now:
+                check_at, _, source = queue[0]
+                if not self._is_valid_entry(check_at=check_at, source=source):
+                    heapq.heappop(queue)
+                    continue
+                if not domain.acquire(now=now):
+                    break
+                heapq.heappop(queue)
+                self._dispatch(domain=domain, source=source)
+
+
+__all__ = [
+    'ActivityQuery',
+    'PollingDomain',
+    'PollingEngine',
+    'PollingMonitor',
+    'SourceChecker',
+    'SourceQuery',
+]
@@ -12,7 +12,9 @@ from . import universal as universal  # noqa: I001 通用处理模块优先导
 from . import onebot as onebot
 from . import telegram as telegram
 from .plugin_utils import enable_processor_state
+from .universal.history import flush_message_history
 
 __all__ = [
     'enable_processor_state',
+    'flush_message_history',
 ]
@@ -0,0 +1,44 @@
+"""
+@Author         : Ailitonia
+@Date           : 2024/12/31 14:26
+@FileName       : config
+@Project        : nonebot2_miya
+@Description    : Omega processor config
+@GitHub         : https://github.com/Ailitonia
+@Software       : PyCharm
+"""
+
+from nonebot import get_plugin_config, logger
+from pydantic import BaseModel, ConfigDict, ValidationError
+
+
+class OmegaProcessorConfig(BaseModel):
+    """Omega processor 配置"""
+    # 用户速率限制, 令牌桶容量 (允许的突发消息数), 每秒恢复的令牌数, 及触发限制后的限制时间 (秒)
+    omega_rate_limiting_user_capacity: int = 10
+    omega_rate_limiting_user_refill_rate: float = 1.0
+    omega_rate_limiting_user_ban_time: int = 1800
+    # 群组/频道速率限制, 仅限制群组内触发的插件响应而不影响消息记录等事件后处理
+    # 容量为 0 时不启用, 限制时间为 0 时仅忽略超出速率的响应而不限制群组
+    omega_rate_limiting_group_capacity: int = 0
+    omega_rate_limiting_group_refill_rate: float = 3.0
+    omega_rate_limiting_group_ban_time: int = 0
+    # 速率限制状态闲置多久后清除 (秒), 实际不会短于令牌桶回满所需时间
+    omega_rate_limiting_idle_expire: int = 600
+    # 是否将触发的速率限制写入冷却表, 重启后恢复
+    omega_rate_limiting_persist_ban: bool = True
+
+    model_config = ConfigDict(extra='ignore')
+
+
+try:
+    processor_config = get_plugin_config(OmegaProcessorConfig)
+except ValidationError as e:
+    import sys
+    logger.opt(colors=True).critical(f'<r>Omega Processor 配置格式验证失败</r>, 错误信息:\n{e}')
+    sys.exit(f'Omega Processor 配置格式验证失败, {e}')
+
+
+__all__ = [
+    'processor_config',
+]
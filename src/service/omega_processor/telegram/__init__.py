@@ -10,18 +10,18 @@
 
 from nonebot.adapters.telegram.bot import Bot
 from nonebot.adapters.telegram.event import Event, MessageEvent
-from nonebot.message import event_preprocessor
+from nonebot.message import run_preprocessor
 
-from .image_parser import handle_parse_message_image_event_preprocessor
+from .image_parser import handle_parse_message_image_run_preprocessor
 
 
-@event_preprocessor
-async def handle_telegram_event_preprocessor(bot: Bot, event: Event):
-    """事件预处理"""
+@run_preprocessor
+async def handle_telegram_run_preprocessor(bot: Bot, event: Event):
+    """运行预处理"""
     # 针对消息事件的处理
     if isinstance(event, MessageEvent):
-        # 处理消息段图片解析
-        await handle_parse_message_image_event_preprocessor(bot=bot, event=event)
+        # 处理消息段图片解析, 仅在 matcher 运行前进行, 未命中任何 matcher 的消息不解析
+        await handle_parse_message_image_run_preprocessor(bot=bot, event=event)
 
 
 __all__ = []
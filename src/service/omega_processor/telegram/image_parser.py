@@ -8,6 +8,7 @@
 @Software       : PyCharm
 """
 
+import asyncio
 from urllib.parse import quote
 
 from nonebot import get_plugin_config, logger
@@ -17,7 +18,8 @@ from nonebot.adapters.telegram.message import File, Message, MessageSegment
 from pydantic import BaseModel, ConfigDict
 
 from src.resource import TemporaryResource
-from src.utils import OmegaRequests
+from src.utils import OmegaRequests, SingleFlight
+from src.utils.cache_utils import TTLCache
 
 _TMP_IMG_PATH = TemporaryResource('telegram', 'tmp', 'images')
 
@@ -28,59 +30,103 @@ class OmegaProcessorTelegramImageParserConfig(BaseModel):
     # 启用: 所有收到的图片均会以文件形式缓存在本地, 更消耗带宽和硬盘空间
     # 禁用: 仅解析收到图片的真实 URL, 但在向 Telegram 平台直接转发图片链接时可能失败
     telegram_processor_parse_photo_replace_as_local: bool = False
+    # 已解析图片地址的缓存时间 (秒), Telegram 文件下载链接至少一小时内有效
+    telegram_processor_photo_url_cache_ttl: int = 3000
+    telegram_processor_photo_url_cache_size: int = 2048
     model_config = ConfigDict(extra='ignore')
 
 
 _plugin_config = get_plugin_config(OmegaProcessorTelegramImageParserConfig)
 
+_PHOTO_CACHE: TTLCache[tuple[str, str], tuple[str, str | None]] = TTLCache(
+    maxsize=_plugin_config.telegram_processor_photo_url_cache_size,
+    ttl=_plugin_config.telegram_processor_photo_url_cache_ttl,
+)
+"""已解析的图片, (bot self_id, file_id) -> (file, origin_url)"""
 
-async def _parse_photo_segment(bot: Bot, seg: MessageSegment) -> MessageSegment:
-    """解析 photo 消息段中图片的真实 url"""
-    if seg.type != 'photo':
-        return seg
+_PHOTO_RESOLVE_FLIGHT: SingleFlight[tuple[str, str], tuple[str, str | None] | None] = SingleFlight(
+    name='telegram_photo_resolve'
+)
+"""合并同一图片的并发解析, 同一事件被多个 matcher 处理时各 matcher 的运行预处理会同时解析相同的图片"""
+
+
+async def _resolve_photo(bot: Bot, file_id: str) -> tuple[str, str | None] | None:
+    """解析图片 file_id 对应的真实 url (或本地文件), 无法解析时返回 None"""
+    cache_key = (bot.self_id, file_id)
+    if (cached := _PHOTO_CACHE.get(cache_key)) is not None:
+        return cached
 
-    file = await bot.get_file(file_id=seg.data.get('file', ''))
+    return await _PHOTO_RESOLVE_FLIGHT.do(cache_key, lambda: _fetch_photo(bot=bot, file_id=file_id))
+
+
+async def _fetch_photo(bot: Bot, file_id: str) -> tuple[str, str | None] | None:
+    """请求 Telegram 文件接口解析图片, 解析结果写入缓存"""
+    cache_key = (bot.self_id, file_id)
+    file = await bot.get_file(file_id=file_id)
     if file.file_path is None:
-        return seg
+        return None
 
     url = f'https://api.telegram.org/file/bot{quote(bot.bot_config.token)}/{quote(file.file_path)}'
     # 该链接不能直接作为向 Telegram 平台发送图片的 url, 会返回错误: "wrong file identifier/HTTP URL specified"
 
     if not _plugin_config.telegram_processor_parse_photo_replace_as_local:
-        return File.photo(file=url, has_spoiler=seg.data.get('has_spoiler'))
+        resolved = (url, None)
+    else:
+        img_target_file = _TMP_IMG_PATH(f'{file.file_unique_id}_{OmegaRequests.hash_url_file_name("photo", url=url)}')
+        await OmegaRequests().download(url=url, file=img_target_file)
+        resolved = (img_target_file.resolve_path, url)
 
-    img_target_file = _TMP_IMG_PATH(f'{file.file_unique_id}_{OmegaRequests.hash_url_file_name("photo", url=url)}')
-    await OmegaRequests().download(url=url, file=img_target_file)
+    _PHOTO_CACHE.set(cache_key, resolved)
+    return resolved
 
-    parsed_seg = File.photo(file=img_target_file.resolve_path, has_spoiler=seg.data.get('has_spoiler'))
-    parsed_seg.data.update({'origin_url': url})
 
+async def _parse_photo_segment(bot: Bot, seg: MessageSegment) -> MessageSegment:
+    """解析 photo 消息段中图片的真实 url"""
+    if seg.type != 'photo' or 'file_id' in seg.data:
+        return seg
+
+    file_id = seg.data.get('file', '')
+    try:
+        resolved = await _resolve_photo(bot=bot, file_id=file_id)
+    except Exception as e:
+        logger.warning(f'parsing telegram message image {seg.data} failed, {e}')
+        return seg
+
+    if resolved is None:
+        return seg
+
+    file, origin_url = resolved
+    parsed_seg = File.photo(file=file, has_spoiler=seg.data.get('has_spoiler'))
+    # 保留原始 file_id, 同时作为已解析的标记
+    parsed_seg.data.update({'file_id': file_id})
+    if origin_url is not None:
+        parsed_seg.data.update({'origin_url': origin_url})
     return parsed_seg
 
 
 async def _parse_message(bot: Bot, message: Message) -> Message:
-    output_message = Message()
-    for seg in message:
-        if seg.type == 'photo':
-            try:
-                parsed_seg = await _parse_photo_segment(bot=bot, seg=seg)
-                output_message.append(parsed_seg)
-            except Exception as e:
-                logger.warning(f'parsing telegram message image {seg.data} failed, {e}')
-                output_message.append(seg)
-        else:
-            output_message.append(seg)
+    """并发解析消息中的全部 photo 消息段"""
+    return Message(await asyncio.gather(*(_parse_photo_segment(bot=bot, seg=seg) for seg in message)))
+
+
+def _has_unparsed_photo(message: Message) -> bool:
+    return any(seg.type == 'photo' and 'file_id' not in seg.data for seg in message)
+
 
-    return output_message
+async def handle_parse_message_image_run_preprocessor(bot: Bot, event: MessageEvent):
+    """运行预处理, 将 photo 消息段中的图片 file_id 替换为真实图片 url
 
+    仅在有 matcher 即将处理该事件时解析, 不会被任何 matcher 处理的消息不再请求 Telegram 文件接口,
+    同一事件已解析的消息段不会重复解析
+    """
+    async def _parse_event_message(target: MessageEvent) -> None:
+        if _has_unparsed_photo(target.message):
+            target.message = await _parse_message(bot=bot, message=target.message.copy())
 
-async def handle_parse_message_image_event_preprocessor(bot: Bot, event: MessageEvent):
-    """事件预处理, 将 photo 消息段中的图片 file_id 替换为真实图片 url"""
-    event.message = await _parse_message(bot=bot, message=event.message.copy())
-    if event.reply_to_message:
-        event.reply_to_message.message = await _parse_message(bot=bot, message=event.reply_to_message.message.copy())
+    targets = [event] if event.reply_to_message is None else [event, event.reply_to_message]
+    await asyncio.gather(*(_parse_event_message(target) for target in targets))
 
 
 __all__ = [
-    'handle_parse_message_image_event_preprocessor',
+    'handle_parse_message_image_run_preprocessor',
 ]
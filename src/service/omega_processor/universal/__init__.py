@@ -13,15 +13,16 @@ from nonebot.internal.adapter import Bot, Event
 from nonebot.matcher import Matcher
 from nonebot.message import event_postprocessor, event_preprocessor, run_postprocessor, run_preprocessor
 
+from .authorization import AuthorizationContext
 from .cancellation import preprocessor_cancellation
 from .cooldown import preprocessor_global_cooldown, preprocessor_plugin_cooldown
 from .cost import preprocessor_plugin_cost
 from .friendship import postprocessor_friendship
-from .history import postprocessor_history
+from .history import history_buffer, postprocessor_history
 from .permission import preprocessor_global_permission, preprocessor_plugin_permission
 from .plugin import preprocessor_plugin_manager, startup_init_plugins
-from .rate_limiting import preprocessor_rate_limiting
-from .statistic import postprocessor_statistic
+from .rate_limiting import preprocessor_group_rate_limiting, preprocessor_rate_limiting, startup_load_rate_limiting
+from .statistic import postprocessor_statistic, statistic_buffer
 
 driver = get_driver()
 
@@ -31,33 +32,52 @@ async def handle_universal_on_startup():
     """启动时预处理"""
     # 初始化插件信息
     await startup_init_plugins()
+    # 恢复持久化的速率限制
+    await startup_load_rate_limiting()
+    # 启动历史记录及统计信息的批量写入任务
+    history_buffer.start()
+    statistic_buffer.start()
+
+
+@driver.on_shutdown
+async def handle_universal_on_shutdown():
+    """关闭时处理, 需在断开数据库连接前完成"""
+    # 写入缓冲队列中剩余的历史记录及统计信息
+    await history_buffer.close()
+    await statistic_buffer.close()
 
 
 @event_preprocessor
 async def handle_universal_event_preprocessor(bot: Bot, event: Event):
     """事件预处理"""
-    # 处理速率控制
+    # 处理用户速率控制
     await preprocessor_rate_limiting(bot=bot, event=event)
 
 
 @run_preprocessor
 async def handle_universal_run_preprocessor(matcher: Matcher, bot: Bot, event: Event):
     """运行预处理"""
+    # 处理群组速率控制
+    await preprocessor_group_rate_limiting(bot=bot, event=event)
+    # 在单个 session 中批量加载插件状态/权限/冷却/好感度, 后续检查均基于该快照进行
+    context = await AuthorizationContext.load(matcher=matcher, bot=bot, event=event)
     # 处理插件管理
-    await preprocessor_plugin_manager(matcher=matcher, event=event)
+    await preprocessor_plugin_manager(matcher=matcher, context=context)
     # 处理消息事件
     try:
         message = event.get_message()
         # 处理用户取消
         await preprocessor_cancellation(matcher=matcher, message=message)
         # 处理权限
-        await preprocessor_global_permission(matcher=matcher, bot=bot, event=event)
-        await preprocessor_plugin_permission(matcher=matcher, bot=bot, event=event)
+        await preprocessor_global_permission(matcher=matcher, context=context)
+        await preprocessor_plugin_permission(matcher=matcher, context=context)
         # 处理冷却
-        await preprocessor_global_cooldown(matcher=matcher, bot=bot, event=event)
-        await preprocessor_plugin_cooldown(matcher=matcher, bot=bot, event=event)
+        await preprocessor_global_cooldown(matcher=matcher, context=context)
+        await preprocessor_plugin_cooldown(matcher=matcher, context=context)
         # 处理消耗
-        await preprocessor_plugin_cost(matcher=matcher, bot=bot, event=event)
+        await preprocessor_plugin_cost(matcher=matcher, context=context)
+        # 全部检查通过后统一写入冷却及消耗变更
+        await context.commit()
     except ValueError as e:
         logger.debug(f'UniversalRunPreprocessor ignored {event!r} without message, {e}')
 
@@ -0,0 +1,387 @@
+"""
+@Author         : Ailitonia
+@Date           : 2024/12/28 15:21
+@FileName       : authorization
+@Project        : nonebot2_miya
+@Description    : 运行预处理授权上下文, 统一加载插件状态/权限/冷却/好感度等信息
+@GitHub         : https://github.com/Ailitonia
+@Software       : PyCharm
+"""
+
+from datetime import datetime, timedelta
+from typing import TYPE_CHECKING, Literal, Self
+
+from nonebot import get_driver, logger
+from nonebot.internal.adapter import Bot, Event
+from nonebot.matcher import Matcher
+from sqlalchemy.exc import NoResultFound
+
+from src.database import AuthSettingDAL, CoolDownDAL, EntityDAL, FriendshipDAL, PluginDAL, begin_db_session
+from src.database.internal.auth_setting import AuthSetting
+from src.database.internal.cooldown import CoolDown
+from src.database.internal.entity import Entity
+from src.database.internal.friendship import Friendship
+from src.database.internal.plugin import Plugin
+from src.service import OmegaEntity, OmegaMatcherInterface
+from src.service.omega_base.internal.cache import AuthNodeKey, entity_cache
+from src.service.omega_base.internal.consts import (
+    GLOBAL_COOLDOWN_EVENT,
+    SKIP_COOLDOWN_PERMISSION_NODE,
+    PermissionGlobal,
+    PermissionLevel,
+)
+from ..plugin_utils import OmegaProcessorState, parse_processor_state
+
+if TYPE_CHECKING:
+    from sqlalchemy.ext.asyncio import AsyncSession
+
+SUPERUSERS = get_driver().config.superusers
+PLUGIN_CD_PREFIX: str = 'plugin_cd'
+LOG_PREFIX: str = '<lc>Authorization</lc> | '
+
+type _AcquireType = Literal['event', 'user']
+type _EntityKey = tuple[str, str, str]
+type _AuthSettingKey = tuple[int, str, str, str]
+type _CooldownKey = tuple[int, str]
+
+
+class AuthorizationContext:
+    """运行预处理授权上下文
+
+    在同一个数据库 session 中以尽可能少的批量查询加载插件状态, 事件/用户 Entity, 权限配置, 冷却及好感度信息,
+    其中 Entity 及权限配置优先从 Entity 读缓存中获取, 之后各项权限/冷却/消耗检查均基于该快照在内存中完成,
+    检查过程中产生的冷却及消耗变更统一在 commit 时一次性写入
+    """
+
+    __slots__ = (
+        'matcher',
+        'user_id',
+        'plugin_name',
+        'module_name',
+        'processor_state',
+        'is_ignored',
+        'plugin',
+        '_entities',
+        '_entity_rows',
+        '_auth_settings',
+        '_cooldowns',
+        '_friendship',
+        '_pending_cooldowns',
+        '_pending_currency',
+    )
+
+    def __init__(self, matcher: Matcher, user_id: str | None) -> None:
+        self.matcher = matcher
+        self.user_id = user_id
+        self.plugin_name = matcher.plugin.name if matcher.plugin is not None else ''
+        self.module_name = matcher.plugin.module_name if matcher.plugin is not None else ''
+        self.processor_state: OmegaProcessorState = parse_processor_state(state=matcher.state)
+
+        # 非插件创建的 Matcher, 无 user_id 事件, 超级用户均不需要进行授权检查
+        self.is_ignored: bool = matcher.plugin is None or user_id is None or user_id in SUPERUSERS
+
+        self.plugin: Plugin | None = None
+        self._entities: dict[_AcquireType, OmegaEntity] = {}
+        self._entity_rows: dict[_EntityKey, Entity] = {}
+        self._auth_settings: dict[_AuthSettingKey, AuthSetting] = {}
+        self._cooldowns: dict[_CooldownKey, CoolDown] = {}
+        self._friendship: Friendship | None = None
+
+        self._pending_cooldowns: dict[tuple[_AcquireType, str], tuple[datetime, str | None]] = {}
+        self._pending_currency: float = 0
+
+    def __repr__(self) -> str:
+        return f'{self.__class__.__name__}(plugin={self.plugin_name}, user_id={self.user_id})'
+
+    @property
+    def plugin_cooldown_event(self) -> str:
+        return f'{PLUGIN_CD_PREFIX}_{self.plugin_name}_{self.processor_state.name}'
+
+    @staticmethod
+    def _get_user_id(event: Event) -> str | None:
+        try:
+            return event.get_user_id()
+        except (NotImplementedError, ValueError):
+            logger.opt(colors=True).trace(f'{LOG_PREFIX}Ignored with no-user_id event')
+        except Exception as e:
+            logger.opt(colors=True).error(f'{LOG_PREFIX}Detecting event type failed, {e}')
+        return None
+
+    @staticmethod
+    def _has_message(event: Event) -> bool:
+        try:
+            event.get_message()
+        except (NotImplementedError, ValueError):
+            return False
+        return True
+
+    @staticmethod
+    def _entity_key(entity: OmegaEntity) -> _EntityKey:
+        return str(entity.entity_type), entity.entity_id, entity.parent_id
+
+    @classmethod
+    async def load(cls, matcher: Matcher, bot: Bot, event: Event) -> Self:
+        """在单个 session 中批量加载授权检查所需的全部数据"""
+        context = cls(matcher=matcher, user_id=cls._get_user_id(event=event))
+        if context.is_ignored:
+            return context
+
+        async with begin_db_session() as session:
+            try:
+                context.plugin = await PluginDAL(session=session).query_unique(
+                    plugin_name=context.plugin_name, module_name=context.module_name
+                )
+            except NoResultFound:
+                context.plugin = None
+            except Exception as e:
+                context.plugin = None
+                logger.opt(colors=True).error(f'{LOG_PREFIX}插件 {context.plugin_name!r} 状态异常, {e}')
+
+            # 仅有消息事件且启用 processor 的 matcher 才需要进行权限/冷却/消耗检查
+            if not context.processor_state.enable_processor or not cls._has_message(event=event):
+                return context
+
+            for acquire_type in ('event', 'user'):
+                context._entities[acquire_type] = OmegaMatcherInterface.get_entity(
+                    bot=bot, event=event, session=session, acquire_type=acquire_type
+                )
+
+            await context._load_entity_rows(session=session)
+            entity_index_ids = [x.id for x in context._entity_rows.values()]
+            if not entity_index_ids:
+                return context
+
+            await context._load_auth_settings(session=session)
+
+            cooldown_events = [GLOBAL_COOLDOWN_EVENT]
+            if not matcher.temp and context.processor_state.cooldown > 0:
+                cooldown_events.append(context.plugin_cooldown_event)
+            cooldowns = await CoolDownDAL(session=session).query_entities_events(
+                entity_index_ids=entity_index_ids, events=cooldown_events
+            )
+            context._cooldowns = {(x.entity_index_id, x.event): x for x in cooldowns}
+
+            user_entity_row = context.get_entity_row(acquire_type='user')
+            if not matcher.temp and context.processor_state.cost > 0 and user_entity_row is not None:
+                try:
+                    context._friendship = await FriendshipDAL(session=session).query_unique(
+                        entity_index_id=user_entity_row.id
+                    )
+                except NoResultFound:
+                    context._friendship = None
+
+        return context
+
+    async def _load_entity_rows(self, session: 'AsyncSession') -> None:
+        """加载事件/用户 Entity 记录, 优先使用 Entity 读缓存, 未命中的部分合并为一次查询"""
+        missing_entities: dict[_EntityKey, OmegaEntity] = {}
+        for entity in self._entities.values():
+            if (entity_row := entity_cache.get_entity(key=entity.cache_key)) is not None:
+                self._entity_rows[self._entity_key(entity)] = entity_row
+            else:
+                missing_entities[self._entity_key(entity)] = entity
+
+        if not missing_entities:
+            return
+
+        entity_rows = await EntityDAL(session=session).query_bot_entities(
+            bot_self_id=self.get_entity(acquire_type='event').bot_id, entities=missing_entities.keys()
+        )
+        for entity_row in entity_rows:
+            entity_key = (str(entity_row.entity_type), entity_row.entity_id, entity_row.parent_id)
+            self._entity_rows[entity_key] = entity_row
+            entity_cache.set_entity(key=missing_entities[entity_key].cache_key, entity=entity_row)
+
+    def _required_auth_nodes(self) -> set[tuple[_AcquireType, AuthNodeKey]]:
+        """本次检查需要用到的权限节点"""
+        required_nodes: set[tuple[_AcquireType, AuthNodeKey]] = {
+            ('event', (PermissionGlobal.module, PermissionGlobal.plugin, PermissionGlobal.node)),
+            ('event', (PermissionLevel.module, PermissionLevel.plugin, PermissionLevel.node)),
+            ('event', (self.module_name, self.plugin_name, self.processor_state.auth_node)),
+        }
+        if not self.matcher.temp and self.processor_state.cooldown > 0:
+            required_nodes.add((
+                self.processor_state.cooldown_type,
+                (self.module_name, self.plugin_name, SKIP_COOLDOWN_PERMISSION_NODE)
+            ))
+        return required_nodes
+
+    async def _load_auth_settings(self, session: 'AsyncSession') -> None:
+        """加载所需的权限节点配置, 优先使用 Entity 读缓存, 未命中的部分合并为一次查询"""
+        missing_nodes: list[tuple[OmegaEntity, Entity, AuthNodeKey]] = []
+        for acquire_type, node in self._required_auth_nodes():
+            entity = self.get_entity(acquire_type=acquire_type)
+            entity_row = self.get_entity_row(acquire_type=acquire_type)
+            if entity_row is None:
+                continue
+
+            is_cached, auth_setting = entity_cache.get_auth_setting(key=entity.cache_key, node=node)
+            if not is_cached:
+                missing_nodes.append((entity, entity_row, node))
+            elif auth_setting is not None:
+                self._auth_settings[(entity_row.id, *node)] = auth_setting
+
+        if not missing_nodes:
+            return
+
+        auth_settings = await AuthSettingDAL(session=session).query_entities_all(
+            entity_index_ids=list({entity_row.id for _, entity_row, _ in missing_nodes}),
+            modules=[PermissionGlobal.module, self.module_name]
+        )
+        self._auth_settings.update({(x.entity_index_id, x.module, x.plugin, x.node): x for x in auth_settings})
+        for entity, entity_row, node in missing_nodes:
+            entity_cache.set_auth_setting(
+                key=entity.cache_key, node=node, auth_setting=self._auth_settings.get((entity_row.id, *node))
+            )
+
+    def get_entity(self, acquire_type: _AcquireType) -> OmegaEntity:
+        """获取事件/用户对应的 Entity 对象"""
+        return self._entities[acquire_type]
+
+    def get_entity_row(self, acquire_type: _AcquireType) -> Entity | None:
+        """获取事件/用户 Entity 在数据库中的记录, 不存在则返回 None"""
+        entity = self._entities.get(acquire_type)
+        if entity is None:
+            return None
+        return self._entity_rows.get(self._entity_key(entity))
+
+    """插件状态检查"""
+
+    def check_plugin_enabled(self) -> bool:
+        """检查插件是否已注册并启用"""
+        return self.plugin is not None and self.plugin.enabled == 1
+
+    """权限检查, 与 OmegaEntity 中对应方法逻辑一致"""
+
+    def verify_auth_setting(
+            self,
+            acquire_type: _AcquireType,
+            module: str,
+            plugin: str,
+            node: str,
+            *,
+            available: int = 1,
+            strict_match_available: bool = True
+    ) -> Literal[-1, 0, 1]:
+        """检查 Entity 对应权限节点是否启用/符合需求值
+
+        :return: 结果状态码
+            -1: 已查找到条目, 该权限节点不符合需求/被拒绝
+            0: 条目不存在, Entity 没有配置该权限节点
+            1: 已查找到条目, 该权限节点符合需求/验证通过
+        """
+        entity_row = self.get_entity_row(acquire_type=acquire_type)
+        if entity_row is None:
+            return 0
+
+        auth_setting = self._auth_settings.get((entity_row.id, module, plugin, node))
+        if auth_setting is None:
+            return 0
+        elif strict_match_available and auth_setting.available == available:
+            return 1
+        elif not strict_match_available and auth_setting.available >= available:
+            return 1
+        else:
+            return -1
+
+    def check_global_permission(self) -> bool:
+        """检查事件 Entity 是否打开全局功能开关"""
+        return self.verify_auth_setting(
+            acquire_type='event', module=PermissionGlobal.module, plugin=PermissionGlobal.plugin,
+            node=PermissionGlobal.node, available=1, strict_match_available=True
+        ) == 1
+
+    def check_permission_level(self, level: int) -> bool:
+        """检查事件 Entity 权限等级是否达到要求"""
+        return self.verify_auth_setting(
+            acquire_type='event', module=PermissionLevel.module, plugin=PermissionLevel.plugin,
+            node=PermissionLevel.node, available=level, strict_match_available=False
+        ) == 1
+
+    def check_permission_skip_cooldown(self, acquire_type: _AcquireType) -> bool:
+        """检查 Entity 是否有插件跳过冷却的权限"""
+        return self.verify_auth_setting(
+            acquire_type=acquire_type, module=self.module_name, plugin=self.plugin_name,
+            node=SKIP_COOLDOWN_PERMISSION_NODE, available=1, strict_match_available=True
+        ) == 1
+
+    """冷却检查"""
+
+    def check_cooldown_expired(self, acquire_type: _AcquireType, cooldown_event: str) -> tuple[bool, datetime]:
+        """查询冷却是否到期
+
+        :return: True: 已到期(或不存在改冷却事件), False: 仍在冷却中, (到期时间)
+        """
+        entity_row = self.get_entity_row(acquire_type=acquire_type)
+        if entity_row is None:
+            return True, datetime.now()
+
+        cooldown = self._cooldowns.get((entity_row.id, cooldown_event))
+        if cooldown is None:
+            return True, datetime.now()
+        elif cooldown.stop_at <= datetime.now():
+            return True, cooldown.stop_at
+        else:
+            return False, cooldown.stop_at
+
+    def check_global_cooldown_expired(self, acquire_type: _AcquireType) -> tuple[bool, datetime]:
+        """查询全局冷却是否到期"""
+        return self.check_cooldown_expired(acquire_type=acquire_type, cooldown_event=GLOBAL_COOLDOWN_EVENT)
+
+    def set_cooldown(
+            self,
+            acquire_type: _AcquireType,
+            cooldown_event: str,
+            expired_time: timedelta,
+            description: str | None = None
+    ) -> None:
+        """设置冷却, 在 commit 时写入"""
+        self._pending_cooldowns[(acquire_type, cooldown_event)] = (datetime.now() + expired_time, description)
+
+    """好感度/消耗"""
+
+    def query_currency(self) -> float:
+        """获取用户持有货币, 未初始化好感度的用户视为 0"""
+        return 0 if self._friendship is None else self._friendship.currency
+
+    def change_currency(self, currency: float) -> None:
+        """变更用户持有货币, 在 commit 时写入"""
+        self._pending_currency += currency
+
+    async def commit(self) -> None:
+        """在单个 session 中写入检查过程中产生的冷却及消耗变更"""
+        if not self._pending_cooldowns and not self._pending_currency:
+            return
+
+        async with begin_db_session() as session:
+            cooldown_dal = CoolDownDAL(session=session)
+            for (acquire_type, cooldown_event), (stop_at, description) in self._pending_cooldowns.items():
+                entity_row = self.get_entity_row(acquire_type=acquire_type)
+                if entity_row is None:
+                    logger.opt(colors=True).warning(
+                        f'{LOG_PREFIX}Entity({self.get_entity(acquire_type).tid}) not found, '
+                        f'ignored setting cooldown {cooldown_event!r}'
+                    )
+                    continue
+
+                cooldown = self._cooldowns.get((entity_row.id, cooldown_event))
+                if cooldown is None:
+                    await cooldown_dal.add(
+                        entity_index_id=entity_row.id, event=cooldown_event, stop_at=stop_at, description=description
+                    )
+                else:
+                    await cooldown_dal.update(id_=cooldown.id, stop_at=stop_at, description=description)
+
+            if self._pending_currency and self._friendship is not None:
+                friendship_dal = FriendshipDAL(session=session)
+                # 重新读取以避免覆盖并发产生的好感度变更
+                friendship = await friendship_dal.query_unique(entity_index_id=self._friendship.entity_index_id)
+                await friendship_dal.update(id_=friendship.id, currency=friendship.currency + self._pending_currency)
+
+        self._pending_cooldowns.clear()
+        self._pending_currency = 0
+
+
+__all__ = [
+    'AuthorizationContext',
+]
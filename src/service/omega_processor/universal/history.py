@@ -9,6 +9,7 @@
 """
 
 from datetime import datetime
+from typing import Any
 
 from nonebot import logger
 from nonebot.internal.adapter import Bot, Event, Message
@@ -16,10 +17,25 @@ from nonebot.internal.adapter import Bot, Event, Message
 from src.compat import dump_json_as
 from src.database import HistoryDAL, begin_db_session
 from src.service import OmegaMatcherInterface
+from .write_behind import WriteBehindBuffer
 
 LOG_PREFIX: str = '<lc>Message History</lc> | '
 
 
+async def _flush_history(records: list[dict[str, Any]]) -> None:
+    async with begin_db_session() as session:
+        await HistoryDAL(session=session).add_all(records=records)
+
+
+history_buffer: WriteBehindBuffer[dict[str, Any]] = WriteBehindBuffer(name='history', flush_func=_flush_history)
+"""消息历史记录写入缓冲队列"""
+
+
+async def flush_message_history() -> None:
+    """立即写入缓冲队列中的全部消息历史记录, 在需要从数据库查询刚收到的消息前调用"""
+    await history_buffer.flush()
+
+
 async def postprocessor_history(bot: Bot, event: Event, message: Message):
     """事件后处理, 消息历史记录"""
     if (message_id := getattr(event, 'message_id', None)) is not None:
@@ -39,24 +55,28 @@ async def postprocessor_history(bot: Bot, event: Event, message: Message):
         message_text = message_text[:4096]
 
     try:
+        # 仅用于从事件中解析 Entity 信息, 不会产生数据库查询
         async with begin_db_session() as session:
             event_entity = OmegaMatcherInterface.get_entity(bot, event, session, acquire_type='event')
             user_entity = OmegaMatcherInterface.get_entity(bot, event, session, acquire_type='user')
-            await HistoryDAL(session=session).add(
-                message_id=message_id,
-                bot_self_id=bot.self_id,
-                event_entity_id=event_entity.entity_id,
-                user_entity_id=user_entity.entity_id,
-                received_time=int(datetime.now().timestamp()),
-                message_type=f'{event_entity.entity_type}.{event.get_event_name()}',
-                message_raw=message_raw,
-                message_text=message_text,
-            )
-        logger.opt(colors=True).trace(f'{LOG_PREFIX}Message(id={message_id!r}, text={message_text!r}) recorded')
+
+        await history_buffer.put({
+            'message_id': message_id,
+            'bot_self_id': bot.self_id,
+            'event_entity_id': event_entity.entity_id,
+            'user_entity_id': user_entity.entity_id,
+            'received_time': int(datetime.now().timestamp()),
+            'message_type': f'{event_entity.entity_type}.{event.get_event_name()}',
+            'message_raw': message_raw,
+            'message_text': message_text,
+        })
+        logger.opt(colors=True).trace(f'{LOG_PREFIX}Message(id={message_id!r}, text={message_text!r}) queued')
     except Exception as e:
         logger.opt(colors=True).error(f'{LOG_PREFIX}Recording message failed, {e!r}, {message_raw!r}')
 
 
 __all__ = [
+    'flush_message_history',
+    'history_buffer',
     'postprocessor_history',
 ]
@@ -8,49 +8,35 @@
 @Software       : PyCharm
 """
 
-from nonebot import get_driver, logger
+from nonebot import logger
 from nonebot.exception import IgnoredException
-from nonebot.internal.adapter import Bot, Event
 from nonebot.matcher import Matcher
 
-from src.database import begin_db_session
-from src.service import OmegaEntity, OmegaMatcherInterface
-from ..plugin_utils import parse_processor_state
+from .authorization import AuthorizationContext
 
-SUPERUSERS = get_driver().config.superusers
 LOG_PREFIX: str = '<lc>Permission Manager</lc> | '
 
 
-async def preprocessor_global_permission(matcher: Matcher, bot: Bot, event: Event):
+async def preprocessor_global_permission(matcher: Matcher, context: AuthorizationContext):
     """运行预处理, 检查是否启用全局权限"""
 
-    # 跳过非插件创建的 Matcher
-    if matcher.plugin is None:
-        logger.opt(colors=True).debug(f'{LOG_PREFIX}Non-plugin matcher, ignore')
+    # 跳过非插件创建的 Matcher 及超级用户
+    if context.is_ignored:
+        logger.opt(colors=True).debug(f'{LOG_PREFIX}{matcher} ignored global permission checking')
         return
 
     # 从 state 中解析已配置的权限要求
-    plugin_name = matcher.plugin.name
-    processor_state = parse_processor_state(state=matcher.state)
+    plugin_name = context.plugin_name
+    processor_state = context.processor_state
 
     # 跳过不需要 processor 处理的
     if not processor_state.enable_processor:
         logger.opt(colors=True).debug(f'{LOG_PREFIX}Plugin({plugin_name}) ignored global check with disable processor')
         return
 
-    user_id = event.get_user_id()
-    # 忽略超级用户
-    if user_id in SUPERUSERS:
-        logger.opt(colors=True).debug(f'{LOG_PREFIX}Ignored with <ly>SUPERUSER({user_id})</ly>')
-        return
-
-    async with begin_db_session() as session:
-        event_entity = OmegaMatcherInterface.get_entity(bot=bot, event=event, session=session, acquire_type='event')
-        is_enabled_global_permission = await event_entity.check_global_permission()
-
-    if not is_enabled_global_permission:
+    if not context.check_global_permission():
         logger.opt(colors=True).info(
-            f'{LOG_PREFIX}{matcher}/Plugin({matcher.plugin.name}) is blocked, <ly>global permission not enabled</ly>'
+            f'{LOG_PREFIX}{matcher}/Plugin({plugin_name}) is blocked, <ly>global permission not enabled</ly>'
         )
         if processor_state.echo_processor_result:
             try:
@@ -58,42 +44,33 @@ async def preprocessor_global_permission(matcher: Matcher, bot: Bot, event: Even
                 await matcher.send(message=echo_message)
             except Exception as e:
                 logger.opt(colors=True).warning(
-                    f'{LOG_PREFIX}{matcher}/Plugin({matcher.plugin.name}) send permission blocked message failed, {e!r}'
+                    f'{LOG_PREFIX}{matcher}/Plugin({plugin_name}) send permission blocked message failed, {e!r}'
                 )
         raise IgnoredException('权限不足')
 
 
-async def preprocessor_plugin_permission(matcher: Matcher, bot: Bot, event: Event):
+async def preprocessor_plugin_permission(matcher: Matcher, context: AuthorizationContext):
     """运行预处理, 检查会话对象是否具备插件要求权限"""
 
-    # 跳过非插件创建的 Matcher
-    if matcher.plugin is None:
-        logger.opt(colors=True).debug(f'{LOG_PREFIX}Non-plugin matcher, ignore')
+    # 跳过非插件创建的 Matcher 及超级用户
+    if context.is_ignored:
+        logger.opt(colors=True).debug(f'{LOG_PREFIX}{matcher} ignored plugin permission checking')
         return
 
     # 从 state 中解析已配置的权限要求
-    plugin_name = matcher.plugin.name
-    module_name = matcher.plugin.module_name
-    processor_state = parse_processor_state(state=matcher.state)
+    plugin_name = context.plugin_name
+    processor_state = context.processor_state
 
     # 跳过不需要 processor 处理的
     if not processor_state.enable_processor:
         logger.opt(colors=True).debug(f'{LOG_PREFIX}Plugin({plugin_name}) ignored with disable processor')
         return
 
-    user_id = event.get_user_id()
-    # 忽略超级用户
-    if user_id in SUPERUSERS:
-        logger.opt(colors=True).debug(f'{LOG_PREFIX}Plugin({plugin_name}) ignored with <ly>SUPERUSER({user_id})</ly>')
-        return
-
     # 检查事件会话对象是否具备插件要求权限
-    async with begin_db_session() as session:
-        event_entity = OmegaMatcherInterface.get_entity(bot=bot, event=event, session=session, acquire_type='event')
-        is_permission_allowed = await _check_event_entity_permission(
-            entity=event_entity, module_name=module_name, plugin_name=plugin_name,
-            level=processor_state.level, auth_node=processor_state.auth_node
-        )
+    event_entity = context.get_entity(acquire_type='event')
+    is_permission_allowed = _check_event_entity_permission(
+        context=context, level=processor_state.level, auth_node=processor_state.auth_node
+    )
 
     if is_permission_allowed:
         logger.opt(colors=True).debug(
@@ -122,10 +99,8 @@ async def preprocessor_plugin_permission(matcher: Matcher, bot: Bot, event: Even
         raise IgnoredException('权限不足')
 
 
-async def _check_event_entity_permission(
-        entity: OmegaEntity,
-        module_name: str,
-        plugin_name: str,
+def _check_event_entity_permission(
+        context: AuthorizationContext,
         level: int,
         auth_node: str | None
 ) -> bool:
@@ -140,7 +115,7 @@ async def _check_event_entity_permission(
     """
     is_permission_allowed: bool = False
 
-    is_level_allowed = await entity.check_permission_level(level=level)
+    is_level_allowed = context.check_permission_level(level=level)
 
     if auth_node is None:
         # 无 node 声明: level 通过则视为通过
@@ -148,7 +123,9 @@ async def _check_event_entity_permission(
             is_permission_allowed = True
     else:
         # 有 node 声明
-        node_permission = await entity.verify_auth_setting(module=module_name, plugin=plugin_name, node=auth_node)
+        node_permission = context.verify_auth_setting(
+            acquire_type='event', module=context.module_name, plugin=context.plugin_name, node=auth_node
+        )
         match node_permission:
             case 1:  # node 通过: 不论 level 是否通过均视为通过
                 is_permission_allowed = True
@@ -10,17 +10,16 @@
 
 from collections.abc import Iterable
 
-from nonebot import get_driver, get_loaded_plugins, logger
+from nonebot import get_loaded_plugins, logger
 from nonebot.exception import IgnoredException
-from nonebot.internal.adapter import Event as BaseEvent
 from nonebot.matcher import Matcher
 from nonebot.plugin import Plugin
 from sqlalchemy.exc import NoResultFound
 
 from src.database import PluginDAL, begin_db_session
+from .authorization import AuthorizationContext
 
 LOG_PREFIX: str = '<lc>Plugin Manager</lc> | '
-SUPERUSERS = get_driver().config.superusers
 
 
 async def _upsert_plugins(plugins: Iterable[Plugin]) -> None:
@@ -56,44 +55,20 @@ async def startup_init_plugins():
     logger.opt(colors=True).success(f'{LOG_PREFIX}<lg>插件信息初始化已完成.</lg>')
 
 
-async def preprocessor_plugin_manager(matcher: Matcher, event: BaseEvent):
+async def preprocessor_plugin_manager(matcher: Matcher, context: AuthorizationContext):
     """运行预处理, 处理插件管理器"""
-    try:
-        user_id = event.get_user_id()
-    except (NotImplementedError, ValueError):
-        logger.opt(colors=True).trace(f'{LOG_PREFIX}Ignored with no-user_id event')
-        return
-    except Exception as e:
-        logger.opt(colors=True).error(f'{LOG_PREFIX}Detecting event type failed, {e}')
-        return
-
-    # 跳过非插件创建的 Matcher
-    if matcher.plugin is None:
-        logger.opt(colors=True).debug(f'{LOG_PREFIX}Non-plugin matcher, ignore')
+    # 跳过非插件创建的 Matcher, 无 user_id 的事件及超级用户
+    if context.is_ignored:
+        logger.opt(colors=True).debug(f'{LOG_PREFIX}{matcher} ignored plugin manager checking')
         return
 
-    # 忽略超级用户
-    if user_id in SUPERUSERS:
-        logger.opt(colors=True).debug(f'{LOG_PREFIX}Ignored with <ly>SUPERUSER({user_id})</ly>')
-        return
-
-    plugin_name = matcher.plugin.name
-    module_name = matcher.plugin.module_name
-
-    async with begin_db_session() as session:
-        dal = PluginDAL(session=session)
-        try:
-            plugin = await dal.query_unique(plugin_name=plugin_name, module_name=module_name)
-            plugin_enabled = True if plugin.enabled == 1 else False
-            logger.opt(colors=True).debug(f'{LOG_PREFIX}已注册插件 {plugin_name!r}, 启用状态: {plugin.enabled}')
-        except NoResultFound:
-            plugin_enabled = False
-            logger.opt(colors=True).warning(f'{LOG_PREFIX}未注册的插件 {plugin_name!r}')
-        except Exception as e:
-            plugin_enabled = False
-            logger.opt(colors=True).error(f'{LOG_PREFIX}插件 {plugin_name!r} 状态异常, {e}')
+    plugin_name = context.plugin_name
+    if context.plugin is None:
+        logger.opt(colors=True).warning(f'{LOG_PREFIX}未注册的插件 {plugin_name!r}')
+    else:
+        logger.opt(colors=True).debug(f'{LOG_PREFIX}已注册插件 {plugin_name!r}, 启用状态: {context.plugin.enabled}')
 
-    if not plugin_enabled:
+    if not context.check_plugin_enabled():
         raise IgnoredException('插件未启用')
 
 
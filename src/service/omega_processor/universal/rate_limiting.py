@@ -8,106 +8,302 @@
 @Software       : PyCharm
 """
 
+import asyncio
 import time
-from datetime import datetime, timedelta
+from collections import OrderedDict
+from collections.abc import Hashable
+from datetime import datetime
+from enum import IntEnum, unique
+from typing import Literal
 
 from nonebot import get_driver, logger
 from nonebot.exception import IgnoredException
 from nonebot.internal.adapter import Bot as BaseBot
 from nonebot.internal.adapter import Event as BaseEvent
+from sqlalchemy.exc import NoResultFound
+
+from src.database import CoolDownDAL, begin_db_session
+from src.service import OmegaEntity, OmegaMatcherInterface
+from src.service.omega_base.internal.consts import RATE_LIMITING_COOLDOWN_EVENT, RATE_LIMITING_GROUP_COOLDOWN_EVENT
+from ..config import processor_config
 
 SUPERUSERS = get_driver().config.superusers
 LOG_PREFIX: str = '<lc>Rate Limiting</lc> | '
 
 
-# 速率限制次数阈值, 触发超过该次数后启用限制
-RATE_LIMITING_THRESHOLD: int = 10
-# 速率限制时间阈值, 判断连续消息触发的时间间隔小于该值, 单位为秒, 判断依据时间戳为标准
-RATE_LIMITING_TIME: float = 1.0
-# 触发速率限制时为用户设置的流控冷却时间, 单位秒
-RATE_LIMITING_COOL_DOWN: int = 1800
-# 记录用户上次消息的时间戳, 作为对比依据
-USER_LAST_MSG_TIME: dict[str, int | float] = {}
-# 记录用户消息在速率限制时间阈值内触发的次数
-RATE_LIMITING_COUNT: dict[str, int] = {}
-# 已被限制的用户id及到期时间
-RATE_LIMITING_USER_TEMP: dict[str, datetime] = {}
+@unique
+class RateLimitingResult(IntEnum):
+    """速率限制检查结果"""
+    allowed = 0  # 允许
+    banned = 1  # 仍在限制中
+    triggered = 2  # 本次触发限制
 
 
-async def preprocessor_rate_limiting(bot: BaseBot, event: BaseEvent):
-    """事件预处理, 针对用户的速率限制处理"""
+class _BucketState:
+    """单个 key 的令牌桶状态"""
+
+    __slots__ = ('tokens', 'updated_at', 'banned_until')
+
+    def __init__(self, tokens: float, updated_at: float, banned_until: float = 0.0) -> None:
+        self.tokens = tokens
+        self.updated_at = updated_at
+        self.banned_until = banned_until
+
+
+class TokenBucketRateLimiter:
+    """令牌桶速率限制器
+
+    - 令牌以 refill_rate 每秒的速度恢复, 最多 capacity 个, 每条消息消耗一个令牌, 令牌不足即触发限制
+    - 触发限制后在 ban_time 秒内拒绝该 key 的全部消息, ban_time 为 0 则仅拒绝超出速率的消息
+    - 状态按最近访问顺序保存, 新增 key 时清除闲置超过 idle_expire 秒的状态.
+      idle_expire 不短于令牌回满所需时间, 清除后重新创建的状态与原状态等价, 内存占用仅与活跃 key 数量相关
+    """
+
+    __slots__ = ('name', 'capacity', 'refill_rate', 'ban_time', 'idle_expire', '_states')
+
+    def __init__(
+            self,
+            name: str,
+            capacity: int,
+            refill_rate: float,
+            ban_time: float,
+            idle_expire: float,
+    ) -> None:
+        if capacity > 0 and refill_rate <= 0:
+            raise ValueError('refill_rate must be greater than 0')
+
+        self.name = name
+        self.capacity = capacity
+        self.refill_rate = refill_rate
+        self.ban_time = ban_time
+        self.idle_expire = max(idle_expire, capacity / refill_rate) if capacity > 0 else idle_expire
+        self._states: OrderedDict[Hashable, _BucketState] = OrderedDict()
+
+    def __repr__(self) -> str:
+        return f'{self.__class__.__name__}(name={self.name!r}, size={len(self._states)})'
+
+    def __len__(self) -> int:
+        return len(self._states)
+
+    @property
+    def enabled(self) -> bool:
+        return self.capacity > 0
+
+    def _expire(self, now: float) -> None:
+        """从最久未访问的状态开始清除已闲置的状态, 遇到仍活跃的状态即停止
+
+        仍在限制中的状态不会被清除, 将其移至末尾后继续检查, 避免长时间的限制阻塞其后闲置状态的清除
+        """
+        deadline = now - self.idle_expire
+        states = self._states
+        for _ in range(len(states)):
+            key = next(iter(states))
+            state = states[key]
+            if state.banned_until > now:
+                states.move_to_end(key)
+                continue
+            if state.updated_at > deadline:
+                break
+            del states[key]
+
+    def acquire(self, key: Hashable, now: float) -> RateLimitingResult:
+        """消耗 key 的一个令牌
+
+        :param key: 限制对象标识
+        :param now: 当前时间戳
+        """
+        state = self._states.get(key)
+        if state is None:
+            self._expire(now)
+            self._states[key] = _BucketState(tokens=self.capacity - 1, updated_at=now)
+            return RateLimitingResult.allowed
+
+        self._states.move_to_end(key)
+        if state.banned_until > now:
+            return RateLimitingResult.banned
+
+        tokens = min(self.capacity, state.tokens + (now - state.updated_at) * self.refill_rate)
+        state.updated_at = now
+        if tokens >= 1:
+            state.tokens = tokens - 1
+            return RateLimitingResult.allowed
+
+        if self.ban_time > 0:
+            state.banned_until = now + self.ban_time
+            state.tokens = self.capacity
+        else:
+            state.tokens = tokens
+        return RateLimitingResult.triggered
+
+    def ban(self, key: Hashable, until: float) -> None:
+        """直接限制 key 至指定时间戳, 用于恢复持久化的限制"""
+        state = self._states.get(key)
+        if state is None:
+            self._states[key] = _BucketState(tokens=self.capacity, updated_at=time.time(), banned_until=until)
+        else:
+            state.banned_until = max(state.banned_until, until)
+
+    def banned_until(self, key: Hashable) -> float:
+        """获取 key 的限制到期时间戳, 未被限制返回 0"""
+        state = self._states.get(key)
+        return 0.0 if state is None else state.banned_until
+
+
+USER_RATE_LIMITER = TokenBucketRateLimiter(
+    name='user',
+    capacity=processor_config.omega_rate_limiting_user_capacity,
+    refill_rate=processor_config.omega_rate_limiting_user_refill_rate,
+    ban_time=processor_config.omega_rate_limiting_user_ban_time,
+    idle_expire=processor_config.omega_rate_limiting_idle_expire,
+)
+"""用户速率限制器, key 为 (bot_id, user_id)"""
+
+GROUP_RATE_LIMITER = TokenBucketRateLimiter(
+    name='group',
+    capacity=processor_config.omega_rate_limiting_group_capacity,
+    refill_rate=processor_config.omega_rate_limiting_group_refill_rate,
+    ban_time=processor_config.omega_rate_limiting_group_ban_time,
+    idle_expire=processor_config.omega_rate_limiting_idle_expire,
+)
+"""群组/频道速率限制器, key 为 (bot_id, event_entity_id)"""
+
+_PERSIST_TASKS: set[asyncio.Task[None]] = set()
+"""正在写入的限制持久化任务, 保持引用避免被回收"""
+
+
+async def _persist_ban(bot: BaseBot, event: BaseEvent, acquire_type: Literal['event', 'user'], until: float) -> None:
+    """将触发的速率限制写入冷却表"""
+    cooldown_event = RATE_LIMITING_COOLDOWN_EVENT if acquire_type == 'user' else RATE_LIMITING_GROUP_COOLDOWN_EVENT
+    try:
+        async with begin_db_session() as session:
+            entity = OmegaMatcherInterface.get_entity(bot=bot, event=event, session=session, acquire_type=acquire_type)
+            await entity.set_cooldown(
+                cooldown_event=cooldown_event, expired_time=datetime.fromtimestamp(until), description='流控冷却'
+            )
+    except NoResultFound:
+        logger.opt(colors=True).debug(f'{LOG_PREFIX}Entity not found, ignored persisting rate limiting')
+    except Exception as e:
+        logger.opt(colors=True).error(f'{LOG_PREFIX}Persisting rate limiting failed, {e!r}')
+
+
+def _handle_acquire_result(
+        limiter: TokenBucketRateLimiter,
+        result: RateLimitingResult,
+        key: tuple[str, str],
+        bot: BaseBot,
+        event: BaseEvent,
+        acquire_type: Literal['event', 'user'],
+) -> None:
+    """处理速率限制检查结果, 被限制时抛出 IgnoredException"""
+    match result:
+        case RateLimitingResult.allowed:
+            return
+        case RateLimitingResult.banned:
+            banned_until = datetime.fromtimestamp(limiter.banned_until(key))
+            logger.opt(colors=True).info(f'{LOG_PREFIX}{limiter.name}{key} 仍在速率限制中, 到期时间 {banned_until}')
+            raise IgnoredException('速率限制中')
+        case RateLimitingResult.triggered if limiter.ban_time > 0:
+            logger.opt(colors=True).info(
+                f'{LOG_PREFIX}{limiter.name}{key} 触发速率限制, 已设置限制 {limiter.ban_time} 秒'
+            )
+            if processor_config.omega_rate_limiting_persist_ban:
+                task = asyncio.create_task(_persist_ban(bot, event, acquire_type, limiter.banned_until(key)))
+                _PERSIST_TASKS.add(task)
+                task.add_done_callback(_PERSIST_TASKS.discard)
+            raise IgnoredException('触发速率限制')
+        case _:
+            logger.opt(colors=True).debug(f'{LOG_PREFIX}{limiter.name}{key} 超出速率限制, 已忽略本条消息')
+            raise IgnoredException('超出速率限制')
+
+
+async def startup_load_rate_limiting() -> None:
+    """从冷却表中恢复尚未到期的速率限制"""
+    if not processor_config.omega_rate_limiting_persist_ban:
+        return
+
+    try:
+        async with begin_db_session() as session:
+            cooldown_dal = CoolDownDAL(session=session)
+            for cooldown_event, limiter in (
+                    (RATE_LIMITING_COOLDOWN_EVENT, USER_RATE_LIMITER),
+                    (RATE_LIMITING_GROUP_COOLDOWN_EVENT, GROUP_RATE_LIMITER),
+            ):
+                for cooldown in await cooldown_dal.query_event_active(event=cooldown_event):
+                    entity = await OmegaEntity.init_from_entity_index_id(
+                        session=session, index_id=cooldown.entity_index_id
+                    )
+                    limiter.ban(key=(entity.bot_id, entity.entity_id), until=cooldown.stop_at.timestamp())
+        logger.opt(colors=True).debug(f'{LOG_PREFIX}Loaded rate limiting, {USER_RATE_LIMITER}, {GROUP_RATE_LIMITER}')
+    except Exception as e:
+        logger.opt(colors=True).error(f'{LOG_PREFIX}Loading rate limiting failed, {e!r}')
+
+
+def _get_limited_user_id(bot: BaseBot, event: BaseEvent) -> str | None:
+    """获取需要进行速率限制的消息事件的用户 ID, 非消息事件或无需限制的用户返回 None"""
     try:
         _ = event.get_message()
         user_id = event.get_user_id()
     except (NotImplementedError, ValueError):
         logger.opt(colors=True).trace(f'{LOG_PREFIX}Ignored with no-message event')
-        return
+        return None
     except Exception as e:
         logger.opt(colors=True).error(f'{LOG_PREFIX}Detecting event type failed, {e}')
-        return
+        return None
 
     # 忽略 Bot 本身
-    if bot.self_id == event.get_user_id():
+    if bot.self_id == user_id:
         logger.opt(colors=True).trace(f'{LOG_PREFIX}Ignored with <ly>BotSelf({user_id})</ly>')
-        return
+        return None
 
     # 忽略超级用户
     if user_id in SUPERUSERS:
         logger.opt(colors=True).debug(f'{LOG_PREFIX}Ignored with <ly>SUPERUSER({user_id})</ly>')
+        return None
+
+    return user_id
+
+
+async def preprocessor_rate_limiting(bot: BaseBot, event: BaseEvent):
+    """事件预处理, 针对用户的速率限制处理"""
+    if not USER_RATE_LIMITER.enabled:
+        return
+
+    if (user_id := _get_limited_user_id(bot=bot, event=event)) is None:
+        return
+
+    user_key = (bot.self_id, user_id)
+    result = USER_RATE_LIMITER.acquire(key=user_key, now=time.time())
+    _handle_acquire_result(USER_RATE_LIMITER, result, user_key, bot, event, 'user')
+
+
+async def preprocessor_group_rate_limiting(bot: BaseBot, event: BaseEvent):
+    """运行预处理, 针对群组/频道的速率限制处理
+
+    群组内消息数量通常较多, 仅在插件响应前限制, 被限制时群组内的消息仍会被正常记录
+    """
+    if not GROUP_RATE_LIMITER.enabled:
         return
 
-    # 用户标识符根据 bot 生成
-    user_flag = f'{bot.type}_{bot.self_id}_{user_id}'
-
-    # 检测该用户是否已经被速率限制
-    if RATE_LIMITING_USER_TEMP.get(user_flag, datetime.now()) > datetime.now():
-        logger.opt(colors=True).info(
-            f'{LOG_PREFIX}User({user_flag}) 仍在速率限制中, 到期时间 {RATE_LIMITING_USER_TEMP.get(user_flag)}'
-        )
-        raise IgnoredException('速率限制中')
-
-    # 获取上条消息的时间戳
-    last_msg_timestamp = USER_LAST_MSG_TIME.get(user_flag, None)
-    # 获取当前时间戳
-    this_msg_timestamp = time.time()
-    # 更新上次消息时间戳为本次消息时间戳
-    if last_msg_timestamp is None:
-        USER_LAST_MSG_TIME.update({user_flag: this_msg_timestamp})
-        # 上次消息时间戳为空则这是第一条消息
+    if (user_id := _get_limited_user_id(bot=bot, event=event)) is None:
         return
-    else:
-        USER_LAST_MSG_TIME.update({user_flag: this_msg_timestamp})
-
-    # 获取速录限制触发计数
-    over_limiting_count = RATE_LIMITING_COUNT.get(user_flag, 0)
-
-    # 进行速率判断
-    if this_msg_timestamp - last_msg_timestamp <= RATE_LIMITING_TIME:
-        # 小于等于时间阈值则计数 +1
-        over_limiting_count += 1
-        logger.opt(colors=True).debug(
-            f'{LOG_PREFIX}User({user_flag}) over rate limiting, count {over_limiting_count}/{RATE_LIMITING_THRESHOLD}'
-        )
-    else:
-        # 否则重置计数
-        over_limiting_count = 0
-        logger.opt(colors=True).trace(
-            f'{LOG_PREFIX}User({user_flag}) under rate limiting, last: {last_msg_timestamp}, now: {this_msg_timestamp}'
-        )
-
-    # 更新计数
-    RATE_LIMITING_COUNT.update({user_flag: over_limiting_count})
-
-    # 判断计数大于阈值则触发限制, 为用户设置限流冷却并重置计数
-    if over_limiting_count > RATE_LIMITING_THRESHOLD:
-        RATE_LIMITING_USER_TEMP.update({user_flag: datetime.now() + timedelta(seconds=RATE_LIMITING_COOL_DOWN)})
-        logger.opt(colors=True).info(
-            f'{LOG_PREFIX}User({user_flag}) 触发速率限制, 已设置用户限制 {RATE_LIMITING_COOL_DOWN} 秒'
-        )
-        RATE_LIMITING_COUNT.update({user_flag: 0})
-        raise IgnoredException('触发速率限制')
+
+    try:
+        event_entity_id = OmegaMatcherInterface.get_entity_params(bot, event, acquire_type='event').entity_id
+    except Exception as e:
+        logger.opt(colors=True).trace(f'{LOG_PREFIX}Ignored group rate limiting, {e}')
+        return
+
+    # 私聊等事件对象即为用户本身时不重复限制
+    if event_entity_id == user_id:
+        return
+
+    group_key = (bot.self_id, event_entity_id)
+    result = GROUP_RATE_LIMITER.acquire(key=group_key, now=time.time())
+    _handle_acquire_result(GROUP_RATE_LIMITER, result, group_key, bot, event, 'event')
 
 
 __all__ = [
+    'preprocessor_group_rate_limiting',
     'preprocessor_rate_limiting',
+    'startup_load_rate_limiting',
 ]
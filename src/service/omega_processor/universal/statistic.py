@@ -9,6 +9,7 @@
 """
 
 from datetime import datetime
+from typing import Any
 
 from nonebot import logger
 from nonebot.internal.adapter import Bot, Event
@@ -17,10 +18,20 @@ from nonebot.matcher import Matcher
 from src.database import StatisticDAL, begin_db_session
 from src.service import OmegaMatcherInterface
 from ..plugin_utils import parse_processor_state
+from .write_behind import WriteBehindBuffer
 
 LOG_PREFIX: str = '<lc>Statistic</lc> | '
 
 
+async def _flush_statistic(records: list[dict[str, Any]]) -> None:
+    async with begin_db_session() as session:
+        await StatisticDAL(session=session).add_all(records=records)
+
+
+statistic_buffer: WriteBehindBuffer[dict[str, Any]] = WriteBehindBuffer(name='statistic', flush_func=_flush_statistic)
+"""插件调用统计写入缓冲队列"""
+
+
 async def postprocessor_statistic(matcher: Matcher, bot: Bot, event: Event):
     """运行后处理, 统计插件使用信息"""
 
@@ -56,21 +67,25 @@ async def postprocessor_statistic(matcher: Matcher, bot: Bot, event: Event):
     #     return
 
     try:
+        # 仅用于从事件中解析 Entity 信息, 不会产生数据库查询
         async with begin_db_session() as session:
             entity = OmegaMatcherInterface.get_entity(bot=bot, event=event, session=session)
-            parent_entity_id = entity.parent_id
-            entity_id = entity.entity_id
-            call_info = f'{custom_plugin_name!r} called by {entity!r} in Event: {event}'
-
-            dal = StatisticDAL(session=session)
-            await dal.add(module_name=module_name, plugin_name=custom_plugin_name,
-                          bot_self_id=bot.self_id, parent_entity_id=parent_entity_id, entity_id=entity_id,
-                          call_time=datetime.now(), call_info=call_info)
-        logger.opt(colors=True).debug(f'{LOG_PREFIX}Add Plugin({custom_plugin_name}) statistic succeed')
+
+        await statistic_buffer.put({
+            'module_name': module_name,
+            'plugin_name': custom_plugin_name,
+            'bot_self_id': bot.self_id,
+            'parent_entity_id': entity.parent_id,
+            'entity_id': entity.entity_id,
+            'call_time': datetime.now(),
+            'call_info': f'{custom_plugin_name!r} called by {entity!r} in Event: {event}'[:4096],
+        })
+        logger.opt(colors=True).debug(f'{LOG_PREFIX}Plugin({custom_plugin_name}) statistic queued')
     except Exception as e:
         logger.opt(colors=True).error(f'{LOG_PREFIX}Add Plugin({custom_plugin_name}) statistic failed, {e}')
 
 
 __all__ = [
     'postprocessor_statistic',
+    'statistic_buffer',
 ]
@@ -0,0 +1,174 @@
+"""
+@Author         : Ailitonia
+@Date           : 2024/12/30 20:36
+@FileName       : write_behind
+@Project        : nonebot2_miya
+@Description    : 异步批量写入缓冲队列
+@GitHub         : https://github.com/Ailitonia
+@Software       : PyCharm
+"""
+
+import asyncio
+from collections.abc import Awaitable, Callable
+from contextlib import suppress
+from typing import Any
+
+from nonebot import logger
+
+LOG_PREFIX: str = '<lc>Write Behind</lc> | '
+
+
+class WriteBehindBuffer[T]:
+    """异步批量写入缓冲队列
+
+    - 写入方仅将记录放入队列, 不等待数据库提交
+    - 后台任务在积攒到 batch_size 条记录或距本批首条记录超过 flush_interval 秒时调用 flush_func 批量写入
+    - 批量写入由单个后台任务串行执行, 数据库写入缓慢时队列逐渐积满, 写入方将在 put 时等待 (背压)
+    - 可调用 flush 立即写入当前全部待写入记录, 用于需要读取刚放入记录的场景
+    - 关闭时将剩余记录全部写入
+    """
+
+    __slots__ = (
+        'name', '_flush_func', '_batch_size', '_flush_interval', '_queue',
+        '_batch', '_task', '_flushing', '_closed', 'flushed_count', 'dropped_count',
+    )
+
+    def __init__(
+            self,
+            name: str,
+            flush_func: Callable[[list[T]], Awaitable[Any]],
+            *,
+            batch_size: int = 500,
+            flush_interval: float = 5.0,
+            maxsize: int = 10000,
+    ) -> None:
+        """
+        :param name: 队列名称, 用于日志
+        :param flush_func: 批量写入函数
+        :param batch_size: 单次批量写入的最大记录数
+        :param flush_interval: 最长写入间隔, 单位秒
+        :param maxsize: 队列容量, 队列满时 put 将等待
+        """
+        if batch_size <= 0:
+            raise ValueError('batch_size must be greater than 0')
+
+        self.name = name
+        self._flush_func = flush_func
+        self._batch_size = batch_size
+        self._flush_interval = flush_interval
+        self._queue: asyncio.Queue[T] = asyncio.Queue(maxsize=maxsize)
+        self._batch: list[T] = []
+        self._task: asyncio.Task[None] | None = None
+        self._flushing: asyncio.Future[None] | None = None
+        self._closed: bool = False
+        self.flushed_count: int = 0
+        self.dropped_count: int = 0
+
+    def __repr__(self) -> str:
+        return f'{self.__class__.__name__}(name={self.name!r}, pending={self.pending})'
+
+    @property
+    def pending(self) -> int:
+        """尚未写入的记录数"""
+        return self._queue.qsize() + len(self._batch)
+
+    def start(self) -> None:
+        """启动后台写入任务"""
+        if self._task is None or self._task.done():
+            self._closed = False
+            self._task = asyncio.create_task(self._run(), name=f'write_behind_{self.name}')
+
+    async def put(self, item: T) -> None:
+        """放入待写入记录, 队列已满时等待后台任务写入"""
+        if self._closed:
+            self.dropped_count += 1
+            logger.opt(colors=True).warning(f'{LOG_PREFIX}{self} is closed, record dropped')
+            return
+
+        self.start()
+        if self._queue.full():
+            logger.opt(colors=True).debug(f'{LOG_PREFIX}{self} is full, waiting for flushing')
+        await self._queue.put(item)
+
+    async def _collect(self) -> None:
+        """从队列中收集一批记录, 直到达到 batch_size 或超过 flush_interval"""
+        self._batch.append(await self._queue.get())
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self._flush_interval
+        while len(self._batch) < self._batch_size:
+            # 优先取出已在队列中的记录, 避免逐条等待
+            while not self._queue.empty() and len(self._batch) < self._batch_size:
+                self._batch.append(self._queue.get_nowait())
+            if len(self._batch) >= self._batch_size:
+                break
+
+            timeout = deadline - loop.time()
+            if timeout <= 0:
+                break
+            try:
+                self._batch.append(await asyncio.wait_for(self._queue.get(), timeout=timeout))
+            except TimeoutError:
+                break
+
+    async def _flush(self, batch: list[T]) -> None:
+        """写入一批记录, 写入失败时丢弃该批记录"""
+        try:
+            await self._flush_func(batch)
+            self.flushed_count += len(batch)
+            logger.opt(colors=True).trace(f'{LOG_PREFIX}{self} flushed {len(batch)} records')
+        except Exception as e:
+            self.dropped_count += len(batch)
+            logger.opt(colors=True).error(f'{LOG_PREFIX}{self} flushing {len(batch)} records failed, {e!r}')
+
+    async def _run(self) -> None:
+        while True:
+            await self._collect()
+            batch, self._batch = self._batch, []
+            if not batch:
+                # 本批记录已被 flush 取出写入
+                continue
+            # 写入过程不受后台任务取消影响, 关闭时由 close 等待其完成
+            self._flushing = asyncio.ensure_future(self._flush(batch))
+            await asyncio.shield(self._flushing)
+
+    def _take_pending(self) -> list[T]:
+        """取出全部尚未开始写入的记录"""
+        pending, self._batch = self._batch, []
+        while not self._queue.empty():
+            pending.append(self._queue.get_nowait())
+        return pending
+
+    async def flush(self) -> None:
+        """立即写入调用时全部尚未写入的记录, 并等待正在进行的写入完成"""
+        pending = self._take_pending()
+        if self._flushing is not None and not self._flushing.done():
+            await asyncio.shield(self._flushing)
+
+        for index in range(0, len(pending), self._batch_size):
+            await self._flush(pending[index:index + self._batch_size])
+
+    async def close(self) -> None:
+        """停止后台写入任务并写入剩余全部记录"""
+        self._closed = True
+        if self._task is not None:
+            self._task.cancel()
+            with suppress(asyncio.CancelledError):
+                await self._task
+            self._task = None
+
+        if self._flushing is not None:
+            await self._flushing
+            self._flushing = None
+
+        remaining = self._take_pending()
+        for index in range(0, len(remaining), self._batch_size):
+            await self._flush(remaining[index:index + self._batch_size])
+
+        logger.opt(colors=True).debug(
+            f'{LOG_PREFIX}{self} closed, flushed {self.flushed_count} records, dropped {self.dropped_count} records'
+        )
+
+
+__all__ = [
+    'WriteBehindBuffer',
+]
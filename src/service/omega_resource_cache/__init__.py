@@ -0,0 +1,49 @@
+"""
+@Author         : Ailitonia
+@Date           : 2025/1/2 15:10
+@FileName       : omega_resource_cache
+@Project        : nonebot2_miya
+@Description    : Omega 临时资源缓存管理, 按命名空间容量上限定期清理最久未访问的缓存文件
+@GitHub         : https://github.com/Ailitonia
+@Software       : PyCharm
+"""
+
+from nonebot import logger
+
+from ..apscheduler import scheduler
+from .config import resource_cache_config
+from .manager import NamespaceUsage, ResourceCacheManager
+
+resource_cache = ResourceCacheManager(
+    budgets=resource_cache_config.omega_resource_cache_budgets,
+    evict_ratio=resource_cache_config.omega_resource_cache_evict_ratio,
+    protect_time=resource_cache_config.omega_resource_cache_protect_time,
+)
+"""全局临时资源缓存管理器"""
+
+
+async def _omega_resource_cache_sweeper() -> None:
+    """定期清理超出容量上限的临时资源缓存"""
+    try:
+        await resource_cache.sweep()
+        logger.debug('OmegaResourceCache | Resource cache sweeping completed')
+    except Exception as e:
+        logger.error(f'OmegaResourceCache | Sweeping resource cache failed, {e!r}')
+
+
+scheduler.add_job(
+    _omega_resource_cache_sweeper,
+    'interval',
+    minutes=resource_cache_config.omega_resource_cache_sweep_interval,
+    id='omega_resource_cache_sweeper',
+    coalesce=True,
+    max_instances=1,
+    misfire_grace_time=60,
+)
+
+
+__all__ = [
+    'NamespaceUsage',
+    'ResourceCacheManager',
+    'resource_cache',
+]
@@ -0,0 +1,57 @@
+"""
+@Author         : Ailitonia
+@Date           : 2025/1/2 15:10
+@FileName       : config
+@Project        : nonebot2_miya
+@Description    : Omega resource cache config
+@GitHub         : https://github.com/Ailitonia
+@Software       : PyCharm
+"""
+
+from nonebot import get_plugin_config, logger
+from pydantic import BaseModel, ConfigDict, ValidationError
+
+
+class OmegaResourceCacheConfig(BaseModel):
+    """Omega 临时资源缓存配置"""
+    # 各缓存命名空间的容量上限, 单位 MB. 命名空间为临时文件目录下的相对路径, 未配置的目录不会被清理
+    omega_resource_cache_budgets: dict[str, int] = {
+        'pixiv': 4096,
+        'danbooru': 1024,
+        'gelbooru': 1024,
+        'behoimi': 512,
+        'konachan': 1024,
+        'yandere': 1024,
+        'artwork_proxy_content': 4096,
+        'bilibili': 1024,
+        'weibo': 1024,
+        'comic18': 2048,
+        'nhentai': 2048,
+        'pixivision': 512,
+        'message_transfer_utils': 1024,
+        'image_searcher': 256,
+        'sticker_maker/output': 256,
+        'telegram/tmp': 512,
+        'omega_requests/http_cache': 256,
+    }
+    # 超出容量上限时, 清理至容量上限的该比例以下
+    omega_resource_cache_evict_ratio: float = 0.8
+    # 最近访问时间在该时间 (秒) 以内的文件不会被清理
+    omega_resource_cache_protect_time: int = 1800
+    # 定时清理间隔, 单位分钟
+    omega_resource_cache_sweep_interval: int = 60
+
+    model_config = ConfigDict(extra='ignore')
+
+
+try:
+    resource_cache_config = get_plugin_config(OmegaResourceCacheConfig)
+except ValidationError as e:
+    import sys
+    logger.opt(colors=True).critical(f'<r>Omega Resource Cache 配置格式验证失败</r>, 错误信息:\n{e}')
+    sys.exit(f'Omega Resource Cache 配置格式验证失败, {e}')
+
+
+__all__ = [
+    'resource_cache_config',
+]
@@ -0,0 +1,214 @@
+"""
+@Author         : Ailitonia
+@Date           : 2025/1/2 15:10
+@FileName       : manager
+@Project        : nonebot2_miya
+@Description    : 临时资源缓存容量管理
+@GitHub         : https://github.com/Ailitonia
+@Software       : PyCharm
+"""
+
+import asyncio
+import os
+import time
+from collections import Counter
+from collections.abc import Generator, Iterable, Mapping
+from contextlib import contextmanager
+from dataclasses import dataclass
+from pathlib import PurePath
+
+from nonebot import logger
+
+from src.resource import BaseResource, TemporaryResource
+
+LOG_PREFIX: str = '<lc>Resource Cache</lc> | '
+
+type ResourcePathType = BaseResource | PurePath | str
+
+
+@dataclass
+class NamespaceUsage:
+    """缓存命名空间占用统计"""
+    namespace: str
+    budget: int
+    used: int = 0
+    file_count: int = 0
+    evicted_count: int = 0
+    evicted_size: int = 0
+
+    @property
+    def usage_ratio(self) -> float:
+        return self.used / self.budget if self.budget > 0 else 0.0
+
+
+class ResourceCacheManager:
+    """临时资源缓存容量管理
+
+    - 每个命名空间 (临时文件目录下的子目录) 有独立的容量上限, 超出时按最近访问时间从旧到新清理文件
+    - 文件的最近访问时间为 atime 与 mtime 中较晚者, 命中缓存时通过 touch 显式更新 atime, 不依赖文件系统的 atime 挂载选项
+    - 被 hold 的文件及最近访问时间在 protect_time 以内的文件不会被清理
+    """
+
+    def __init__(
+            self,
+            budgets: Mapping[str, int],
+            *,
+            evict_ratio: float = 0.8,
+            protect_time: float = 1800,
+    ) -> None:
+        """
+        :param budgets: 各命名空间的容量上限, 单位 MB
+        :param evict_ratio: 超出容量上限时, 清理至容量上限的该比例以下
+        :param protect_time: 最近访问时间在该时间 (秒) 以内的文件不会被清理
+        """
+        if not 0 < evict_ratio <= 1:
+            raise ValueError('evict_ratio must be in (0, 1]')
+
+        self._budgets: dict[str, int] = {
+            PurePath(namespace).as_posix().strip('/'): budget * 1024 * 1024
+            for namespace, budget in budgets.items()
+        }
+        self._evict_ratio = evict_ratio
+        self._protect_time = protect_time
+        self._holding: Counter[str] = Counter()
+        self._evicted: dict[str, tuple[int, int]] = {}
+        self._lock = asyncio.Lock()
+
+    def __repr__(self) -> str:
+        return f'{self.__class__.__name__}(namespaces={len(self._budgets)}, holding={len(self._holding)})'
+
+    @property
+    def namespaces(self) -> list[str]:
+        return list(self._budgets.keys())
+
+    @staticmethod
+    def _get_real_path(file: ResourcePathType) -> str:
+        path = file.path if isinstance(file, BaseResource) else file
+        return os.path.realpath(path)
+
+    def _get_namespace_root(self, namespace: str) -> str:
+        return os.path.realpath(TemporaryResource(*namespace.split('/')).path)
+
+    @classmethod
+    def touch(cls, file: ResourcePathType) -> None:
+        """更新文件的最近访问时间, 用于命中缓存时调用"""
+        path = cls._get_real_path(file)
+        try:
+            os.utime(path, (time.time(), os.stat(path).st_mtime))
+        except OSError:
+            pass
+
+    @contextmanager
+    def hold(self, *files: ResourcePathType) -> Generator[None, None, None]:
+        """在上下文中保护文件不被清理, 用于文件正在被读取或发送时"""
+        paths = [self._get_real_path(file) for file in files]
+        for path in paths:
+            self.touch(path)
+        self._holding.update(paths)
+        try:
+            yield
+        finally:
+            self._holding.subtract(paths)
+            for path in paths:
+                if self._holding[path] <= 0:
+                    del self._holding[path]
+
+    def is_holding(self, file: ResourcePathType) -> bool:
+        return self._get_real_path(file) in self._holding
+
+    def _scan_namespace(self, namespace: str) -> list[tuple[float, int, list[str]]]:
+        """遍历命名空间下的全部文件, 不包含嵌套的其他命名空间
+
+        同一文件的多个硬链接 (如内容寻址存储的页面文件) 仅计算一次占用
+
+        :return: (最近访问时间, 文件大小, 文件的全部路径) 列表, 每个文件 (inode) 一项
+        """
+        root = self._get_namespace_root(namespace)
+        nested_roots = {
+            self._get_namespace_root(x) for x in self._budgets
+            if x != namespace and x.startswith(f'{namespace}/')
+        }
+
+        files: dict[tuple[int, int], tuple[float, int, list[str]]] = {}
+        for dir_path, dir_names, file_names in os.walk(root):
+            dir_names[:] = [x for x in dir_names if os.path.join(dir_path, x) not in nested_roots]
+            for file_name in file_names:
+                path = os.path.join(dir_path, file_name)
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                if (inode := (stat.st_dev, stat.st_ino)) in files:
+                    files[inode][2].append(path)
+                else:
+                    files[inode] = (max(stat.st_atime, stat.st_mtime), stat.st_size, [path])
+        return list(files.values())
+
+    def _sweep_namespace(self, namespace: str, *, evict: bool) -> NamespaceUsage:
+        """统计命名空间占用, 超出容量上限时从最久未访问的文件开始清理, 清理文件时删除其在命名空间内的全部硬链接"""
+        budget = self._budgets[namespace]
+        files = self._scan_namespace(namespace)
+        usage = NamespaceUsage(
+            namespace=namespace, budget=budget, used=sum(x[1] for x in files), file_count=sum(len(x[2]) for x in files)
+        )
+        if not evict or usage.used <= budget:
+            return usage
+
+        target = int(budget * self._evict_ratio)
+        protect_after = time.time() - self._protect_time
+        files.sort()
+        for last_access, size, paths in files:
+            if usage.used <= target or last_access > protect_after:
+                break
+            if any(path in self._holding for path in paths):
+                continue
+
+            removed_count = 0
+            for path in paths:
+                try:
+                    os.remove(path)
+                    removed_count += 1
+                except OSError as e:
+                    logger.opt(colors=True).warning(f'{LOG_PREFIX}Removing file {path!r} failed, {e!r}')
+            usage.file_count -= removed_count
+            usage.evicted_count += removed_count
+            # 仍有硬链接未能删除时文件占用的空间不会释放
+            if removed_count == len(paths):
+                usage.used -= size
+                usage.evicted_size += size
+
+        evicted_count, evicted_size = self._evicted.get(namespace, (0, 0))
+        self._evicted[namespace] = (evicted_count + usage.evicted_count, evicted_size + usage.evicted_size)
+        return usage
+
+    def _sweep_all(self, namespaces: Iterable[str], *, evict: bool) -> list[NamespaceUsage]:
+        return [self._sweep_namespace(namespace, evict=evict) for namespace in namespaces]
+
+    async def sweep(self) -> list[NamespaceUsage]:
+        """清理超出容量上限的全部命名空间, 文件遍历及删除在线程中执行"""
+        async with self._lock:
+            result = await asyncio.to_thread(self._sweep_all, self.namespaces, evict=True)
+
+        for usage in result:
+            if usage.evicted_count > 0:
+                logger.opt(colors=True).info(
+                    f'{LOG_PREFIX}Evicted {usage.evicted_count} file(s) ({usage.evicted_size / 1024 / 1024:.2f} MB) '
+                    f'from <lc>{usage.namespace}</lc>, '
+                    f'used {usage.used / 1024 / 1024:.2f}/{usage.budget // 1024 // 1024} MB'
+                )
+        return result
+
+    async def statistics(self) -> list[NamespaceUsage]:
+        """统计全部命名空间的当前占用及累计清理量"""
+        async with self._lock:
+            result = await asyncio.to_thread(self._sweep_all, self.namespaces, evict=False)
+
+        for usage in result:
+            usage.evicted_count, usage.evicted_size = self._evicted.get(usage.namespace, (0, 0))
+        return result
+
+
+__all__ = [
+    'NamespaceUsage',
+    'ResourceCacheManager',
+]
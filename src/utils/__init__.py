@@ -10,11 +10,12 @@
 
 from .omega_common_api import BaseCommonAPI
 from .omega_requests import OmegaRequests
-from .process_utils import run_async_delay, run_async_with_time_limited, semaphore_gather
+from .process_utils import SingleFlight, run_async_delay, run_async_with_time_limited, semaphore_gather
 
 __all__ = [
     'BaseCommonAPI',
     'OmegaRequests',
+    'SingleFlight',
     'run_async_delay',
     'run_async_with_time_limited',
     'semaphore_gather',
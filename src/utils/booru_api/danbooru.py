@@ -42,6 +42,8 @@ from .models.danbooru import (
 if TYPE_CHECKING:
     from nonebot.internal.driver import CookieTypes, HeaderTypes, QueryTypes
 
+    from src.resource import TemporaryResource
+
 
 class BaseDanbooruAPI(BaseCommonAPI, abc.ABC):
     """Danbooru API 基类, 文档见 https://danbooru.donmai.us/wiki_pages/help:api"""
@@ -104,6 +106,16 @@ class BaseDanbooruAPI(BaseCommonAPI, abc.ABC):
     ) -> str:
         return await self._get_resource_as_text(url, params, timeout=timeout)
 
+    async def download_file(
+            self,
+            url: str,
+            file: 'TemporaryResource',
+            params: 'QueryTypes' = None,
+            *,
+            timeout: int = 60,
+    ) -> 'TemporaryResource':
+        return await self._download_file(url, file, params, timeout=timeout)
+
     @staticmethod
     def generate_common_search_params(
             page: int | None = None,
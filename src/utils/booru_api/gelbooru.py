@@ -17,6 +17,8 @@ from .models.gelbooru import CommentsData, Post, PostsData, TagsData, UsersData
 if TYPE_CHECKING:
     from nonebot.internal.driver import CookieTypes, HeaderTypes, QueryTypes
 
+    from src.resource import TemporaryResource
+
 
 class BaseGelbooruAPI(BaseCommonAPI, abc.ABC):
     """Gelbooru API 基类, 文档见 https://gelbooru.com/index.php?page=help&topic=dapi"""
@@ -79,6 +81,16 @@ class BaseGelbooruAPI(BaseCommonAPI, abc.ABC):
     ) -> str:
         return await self._get_resource_as_text(url, params, timeout=timeout)
 
+    async def download_file(
+            self,
+            url: str,
+            file: 'TemporaryResource',
+            params: 'QueryTypes' = None,
+            *,
+            timeout: int = 60,
+    ) -> 'TemporaryResource':
+        return await self._download_file(url, file, params, timeout=timeout)
+
     """Posts API"""
 
     async def posts_index(
@@ -29,6 +29,8 @@ from .models.moebooru import (
 if TYPE_CHECKING:
     from nonebot.internal.driver import CookieTypes, HeaderTypes, QueryTypes
 
+    from src.resource import TemporaryResource
+
 
 class BaseMoebooruAPI(BaseCommonAPI, abc.ABC):
     """Moebooru API 基类
@@ -115,6 +117,16 @@ class BaseMoebooruAPI(BaseCommonAPI, abc.ABC):
     ) -> str:
         return await self._get_resource_as_text(url, params, timeout=timeout)
 
+    async def download_file(
+            self,
+            url: str,
+            file: 'TemporaryResource',
+            params: 'QueryTypes' = None,
+            *,
+            timeout: int = 60,
+    ) -> 'TemporaryResource':
+        return await self._download_file(url, file, params, timeout=timeout)
+
     """Posts API"""
 
     async def posts_index(
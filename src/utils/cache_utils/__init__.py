@@ -0,0 +1,124 @@
+"""
+@Author         : Ailitonia
+@Date           : 2024/12/29 14:07
+@FileName       : cache_utils
+@Project        : nonebot2_miya
+@Description    : 进程内缓存工具
+@GitHub         : https://github.com/Ailitonia
+@Software       : PyCharm
+"""
+
+import time
+from collections import OrderedDict
+from collections.abc import Hashable, Iterator
+
+
+class TTLCache[K: Hashable, V]:
+    """有容量上限的 LRU 内存缓存, 每个条目在写入 ttl 秒后失效
+
+    - 读取时惰性清除已过期条目, 超出容量时淘汰最久未访问的条目
+    - 记录命中/未命中次数, 用于调整缓存容量和有效期
+    """
+
+    __slots__ = ('_maxsize', '_ttl', '_data', 'hits', 'misses')
+
+    def __init__(self, maxsize: int = 1024, ttl: float = 300) -> None:
+        if maxsize <= 0:
+            raise ValueError('maxsize must be greater than 0')
+
+        self._maxsize = maxsize
+        self._ttl = ttl
+        self._data: OrderedDict[K, tuple[float, V]] = OrderedDict()
+        self.hits: int = 0
+        self.misses: int = 0
+
+    def __repr__(self) -> str:
+        return f'{self.__class__.__name__}(size={len(self._data)}/{self._maxsize}, ttl={self._ttl})'
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def __contains__(self, key: K) -> bool:
+        item = self._data.get(key)
+        return item is not None and item[0] > time.monotonic()
+
+    def __iter__(self) -> Iterator[K]:
+        return iter(list(self._data.keys()))
+
+    @property
+    def maxsize(self) -> int:
+        return self._maxsize
+
+    @property
+    def ttl(self) -> float:
+        return self._ttl
+
+    def get(self, key: K, *, count: bool = True) -> V | None:
+        """读取缓存, 不存在或已过期返回 None
+
+        :param key: 缓存键
+        :param count: 是否计入命中统计
+        """
+        item = self._data.get(key)
+        if item is None:
+            if count:
+                self.misses += 1
+            return None
+
+        expired_at, value = item
+        if expired_at <= time.monotonic():
+            del self._data[key]
+            if count:
+                self.misses += 1
+            return None
+
+        self._data.move_to_end(key)
+        if count:
+            self.hits += 1
+        return value
+
+    def set(self, key: K, value: V, *, ttl: float | None = None) -> None:
+        """写入缓存
+
+        :param key: 缓存键
+        :param value: 缓存值
+        :param ttl: 为该条目单独指定有效期, 单位秒
+        """
+        expired_at = time.monotonic() + (self._ttl if ttl is None else ttl)
+        self._data[key] = (expired_at, value)
+        self._data.move_to_end(key)
+        while len(self._data) > self._maxsize:
+            self._data.popitem(last=False)
+
+    def pop(self, key: K) -> V | None:
+        """移除缓存条目并返回其值"""
+        item = self._data.pop(key, None)
+        return None if item is None else item[1]
+
+    def clear(self) -> None:
+        """清空全部缓存条目"""
+        self._data.clear()
+
+    def expire(self) -> int:
+        """清除全部已过期的条目, 返回清除的数量"""
+        now = time.monotonic()
+        expired_keys = [key for key, (expired_at, _) in self._data.items() if expired_at <= now]
+        for key in expired_keys:
+            del self._data[key]
+        return len(expired_keys)
+
+    def statistics(self) -> dict[str, int | float]:
+        """缓存容量及命中统计"""
+        total = self.hits + self.misses
+        return {
+            'size': len(self._data),
+            'maxsize': self._maxsize,
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / total if total else 0.0,
+        }
+
+
+__all__ = [
+    'TTLCache',
+]
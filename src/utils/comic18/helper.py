@@ -22,6 +22,7 @@ from nonebot.utils import run_sync
 from pydantic import ValidationError
 
 from src.utils.image_utils import ImageUtils
+from src.utils.render_executor import render_executor
 from .model import AlbumData, AlbumPage, AlbumsResult
 
 if TYPE_CHECKING:
@@ -252,35 +253,37 @@ class Comic18ImgOps(ImageUtils):
 
         return split_num
 
-    @run_sync
-    def reverse_segmental_image(self, album_id: int, page_id: str) -> 'Comic18ImgOps':
+    async def reverse_segmental_image(self, album_id: int, page_id: str) -> 'Comic18ImgOps':
         """对被分割图片进行重新排序"""
         split_num = self.get_split_num(album_id=album_id, page_id=page_id)
         if split_num <= 1:
             return self
 
-        src_image = self.image
-        width, height = src_image.size
-        output_image = Image.new(src_image.mode, src_image.size)
-
-        # 图片高度一般不能被分割数整除
-        # 分割图片最下面一条(即原图最上面一条)需保留余数高度
-        remain_height = height % split_num
-        split_height = (height - remain_height) // split_num
-
-        down_pointer = height
-        for up_pointer in range(height - remain_height - split_height, - split_height, - split_height):
-            # 裁剪分割区块
-            segment_block_image = src_image.crop(box=(0, up_pointer, width, down_pointer))
-            # 倒序粘贴
-            output_image.paste(segment_block_image, box=(0, height - down_pointer, width, height - up_pointer))
-            # 移动区块指针
-            down_pointer = up_pointer
-
-        self._image = output_image
+        self._image = await render_executor.run('comic18', _reverse_segmental_image, self.image, split_num)
         return self
 
 
+def _reverse_segmental_image(src_image: Image.Image, split_num: int) -> Image.Image:
+    """将被分割为 split_num 块并倒序排列的图片恢复原状, 在渲染执行器中运行"""
+    width, height = src_image.size
+    output_image = Image.new(src_image.mode, src_image.size)
+
+    # 图片高度一般不能被分割数整除
+    # 分割图片最下面一条(即原图最上面一条)需保留余数高度
+    remain_height = height % split_num
+    split_height = (height - remain_height) // split_num
+
+    down_pointer = height
+    for up_pointer in range(height - remain_height - split_height, - split_height, - split_height):
+        # 裁剪分割区块
+        segment_block_image = src_image.crop(box=(0, up_pointer, width, down_pointer))
+        # 倒序粘贴
+        output_image.paste(segment_block_image, box=(0, height - down_pointer, width, height - up_pointer))
+        # 移动区块指针
+        down_pointer = up_pointer
+
+    return output_image
+
 __all__ = [
     'Comic18Parser',
     'Comic18ImgOps'
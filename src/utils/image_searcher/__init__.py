@@ -8,9 +8,12 @@
 @Software       : PyCharm 
 """
 
+import asyncio
+from collections.abc import AsyncIterator
 from typing import TYPE_CHECKING
 
-from src.utils import semaphore_gather
+from nonebot.log import logger
+
 from .config import image_searcher_config
 from .model import BaseImageSearcher
 from .seachers import (
@@ -42,14 +45,53 @@ class ComplexImageSearcher(BaseImageSearcher):
     if image_searcher_config.image_searcher_enable_yandex:
         _searcher.append(Yandex)
 
-    async def search(self) -> list['ImageSearchingResult']:
-        searching_tasks = [
-            searcher(image_url=self.image_url).search()
+    async def _search_with_deadline(
+            self,
+            searcher: type['BaseImageSearcherAPI'],
+            timeout: float,
+    ) -> list['ImageSearchingResult']:
+        try:
+            async with asyncio.timeout(timeout):
+                return await searcher(image_url=self.image_url, image_content=self.image_content).search()
+        except TimeoutError:
+            logger.warning(f'ComplexImageSearcher | {searcher.__name__} searching timed out after {timeout}s')
+        except Exception as e:
+            logger.warning(f'ComplexImageSearcher | {searcher.__name__} searching failed, {e!r}')
+        return []
+
+    async def iter_search(
+            self,
+            *,
+            cancel_on_confident: bool = True,
+            timeout: float | None = None,
+    ) -> AsyncIterator[list['ImageSearchingResult']]:
+        """并发执行各识图引擎, 按完成先后逐个返回各引擎的搜索结果
+
+        :param cancel_on_confident: 得到高置信度结果后取消其余仍在进行的搜索
+        :param timeout: 单个识图引擎的最长等待时间, 未指定时使用配置值
+        """
+        timeout = image_searcher_config.image_searcher_searcher_timeout if timeout is None else timeout
+        pending = {
+            asyncio.create_task(self._search_with_deadline(searcher=searcher, timeout=timeout))
             for searcher in self._searcher
-        ]
-        all_results = await semaphore_gather(tasks=searching_tasks, semaphore_num=4, filter_exception=True)
+        }
 
-        return [x for searcher_results in all_results for x in searcher_results]
+        try:
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if not (results := task.result()):
+                        continue
+
+                    yield results
+                    if cancel_on_confident and any(self.is_confident_result(x) for x in results):
+                        return
+        finally:
+            for task in pending:
+                task.cancel()
+
+    async def search(self) -> list['ImageSearchingResult']:
+        return [x async for searcher_results in self.iter_search(cancel_on_confident=False) for x in searcher_results]
 
 
 __all__ = [
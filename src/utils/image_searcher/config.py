@@ -22,6 +22,11 @@ class ImageSearcherConfig(BaseModel):
     image_searcher_enable_yandex: bool = False
     image_searcher_enable_trace_moe: bool = True
 
+    # 综合搜索中单个识图引擎的最长等待时间, 单位秒, 超时的引擎结果将被忽略
+    image_searcher_searcher_timeout: float = 20
+    # 高置信度结果的相似度阈值 (百分比), 综合搜索得到该相似度以上的结果后将取消其余仍在进行的搜索
+    image_searcher_confidence_threshold: float = 90
+
     model_config = ConfigDict(extra='ignore')
 
 
@@ -9,12 +9,15 @@
 """
 
 import abc
+import re
+from collections.abc import AsyncIterator
 from typing import TYPE_CHECKING
 
 from pydantic import BaseModel, ConfigDict
 
 from src.compat import AnyUrlStr as AnyUrl
 from src.utils import BaseCommonAPI
+from .config import image_searcher_config
 
 if TYPE_CHECKING:
     from nonebot.internal.driver import QueryTypes
@@ -29,25 +32,43 @@ class ImageSearchingResult(BaseModel):
 
     model_config = ConfigDict(extra='ignore', frozen=True, coerce_numbers_to_str=True)
 
+    @property
+    def similarity_score(self) -> float | None:
+        """相似度数值 (百分比), 各引擎相似度格式不一 (如 "92.5", "95% similarity"), 无法解析时返回 None"""
+        if self.similarity is None or (match := re.search(r'\d+(?:\.\d+)?', self.similarity)) is None:
+            return None
+        return float(match.group())
+
 
 class BaseImageSearcher(abc.ABC):
     """识图引擎基类"""
 
-    def __init__(self, image_url: str):
-        """仅支持传入图片 url
-
+    def __init__(self, image_url: str, image_content: bytes | None = None):
+        """
         :param image_url: 待识别的图片 url
+        :param image_content: 已下载的图片内容, 提供时支持上传图片的识图引擎直接上传, 识图引擎无需再通过 url 获取图片
         """
         self.image_url = image_url
+        self.image_content = image_content
 
     def __repr__(self) -> str:
         return f'{self.__class__.__name__}(image_url={self.image_url})'
 
+    @staticmethod
+    def is_confident_result(result: ImageSearchingResult) -> bool:
+        """是否为高置信度结果"""
+        score = result.similarity_score
+        return score is not None and score >= image_searcher_config.image_searcher_confidence_threshold
+
     @abc.abstractmethod
     async def search(self) -> list[ImageSearchingResult]:
         """获取搜索结果"""
         raise NotImplementedError
 
+    async def iter_search(self) -> AsyncIterator[list[ImageSearchingResult]]:
+        """逐批获取搜索结果, 默认在搜索完成后一次性返回全部结果"""
+        yield await self.search()
+
 
 class BaseImageSearcherAPI(BaseImageSearcher, BaseCommonAPI, abc.ABC):
     """识图引擎 API 基类"""
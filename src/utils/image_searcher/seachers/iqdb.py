@@ -94,8 +94,8 @@ class Iqdb(BaseImageSearcherAPI):
             ('service[]', (None, '6', None)),
             ('service[]', (None, '11', None)),
             ('service[]', (None, '13', None)),
-            ('file', ('', b'', 'application/octet-stream')),
-            ('url', (None, self.image_url, None)),
+            ('file', ('', b'' if self.image_content is None else self.image_content, 'application/octet-stream')),
+            ('url', (None, self.image_url if self.image_content is None else '', None)),
         ]
 
         iqdb_response = await self._request_post(url=self._get_root_url(), files=form_data)
@@ -143,8 +143,13 @@ class TraceMoe(BaseImageSearcherAPI):
         return ImageSearchingResult(source=source, source_urls=None, similarity=similarity, thumbnail=data.image)
 
     async def search(self) -> list[ImageSearchingResult]:
-        params = {'url': self.image_url}
-        tracemoe_result = TraceMoeResult.model_validate(await self._get_json(url=self.api_url, params=params))
+        if self.image_content is not None:
+            headers = self._get_default_headers()
+            headers.update({'Content-Type': 'application/octet-stream'})
+            response_data = await self._post_json(url=self.api_url, content=self.image_content, headers=headers)
+        else:
+            response_data = await self._get_json(url=self.api_url, params={'url': self.image_url})
+        tracemoe_result = TraceMoeResult.model_validate(response_data)
 
         anilist_tasks = [
             self._handel_anilist_result(data=x)
@@ -8,8 +8,11 @@
 @Software       : PyCharm 
 """
 
+from .assets import load_font, load_static_image
 from .image_util import ImageUtils
 
 __all__ = [
-    'ImageUtils'
+    'ImageUtils',
+    'load_font',
+    'load_static_image',
 ]
@@ -0,0 +1,157 @@
+"""
+@Author         : Ailitonia
+@Date           : 2025/1/12 15:20
+@FileName       : assets
+@Project        : nonebot2_miya
+@Description    : 进程内字体及静态图片资源缓存
+@GitHub         : https://github.com/Ailitonia
+@Software       : PyCharm
+"""
+
+import os
+import threading
+from collections import OrderedDict
+from typing import TYPE_CHECKING
+
+from PIL import Image, ImageFont
+
+from .config import image_utils_config
+
+if TYPE_CHECKING:
+    from src.resource import BaseResource
+
+type AssetPath = BaseResource | str | os.PathLike[str]
+
+
+def _resolve_asset_path(file: AssetPath) -> str:
+    if isinstance(file, str):
+        return file
+    if isinstance(file, os.PathLike):
+        return os.fspath(file)
+    return file.resolve_path
+
+
+class _ThreadLocalFontCache(threading.local):
+    """字体对象缓存, 每个线程单独缓存
+
+    FreeTypeFont 内部的 FreeType 字体对象不保证线程安全, 而渲染通常经由 run_sync 在多个线程中同时进行,
+    因此字体对象只在创建它的线程内复用, 不在线程之间共享
+    """
+
+    def __init__(self) -> None:
+        self.fonts: OrderedDict[tuple[str, int, int], ImageFont.FreeTypeFont] = OrderedDict()
+
+
+_font_cache = _ThreadLocalFontCache()
+
+
+def _load_font(path: str, size: int, index: int) -> ImageFont.FreeTypeFont:
+    fonts = _font_cache.fonts
+    key = (path, size, index)
+    if (font := fonts.get(key)) is not None:
+        fonts.move_to_end(key)
+        return font
+
+    font = fonts[key] = ImageFont.truetype(path, size, index=index)
+    while len(fonts) > image_utils_config.font_cache_size:
+        fonts.popitem(last=False)
+    return font
+
+
+class _StaticImageCache:
+    """静态图片素材解码结果缓存, 按最近使用顺序淘汰, 同时限制缓存数量及解码后的总大小
+
+    解码后超过单张大小上限的图片 (如大尺寸卡面等) 不缓存, 避免少量大图长期占用内存
+    """
+
+    __slots__ = ('maxsize', 'max_bytes', 'cacheable_max_bytes', 'current_bytes', '_images', '_lock')
+
+    def __init__(self, maxsize: int, max_bytes: int, cacheable_max_bytes: int) -> None:
+        self.maxsize = maxsize
+        self.max_bytes = max_bytes
+        self.cacheable_max_bytes = min(cacheable_max_bytes, max_bytes)
+        self.current_bytes: int = 0
+        self._images: OrderedDict[str, tuple[Image.Image | None, int]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _get_decoded_size(image: Image.Image) -> int:
+        return image.width * image.height * len(image.getbands())
+
+    @staticmethod
+    def _load(path: str) -> tuple[Image.Image | None, int]:
+        """解码图片, 多帧图片或解码后过大的图片仅记录为不缓存"""
+        with Image.open(path) as image:
+            # 多帧图片的 copy 仅包含当前帧, 此类图片不缓存解码结果
+            if getattr(image, 'n_frames', 1) > 1:
+                return None, 0
+            image.load()
+            loaded = image.copy()
+            loaded.format = image.format
+        return loaded, _StaticImageCache._get_decoded_size(loaded)
+
+    def get(self, path: str) -> Image.Image | None:
+        """获取缓存的解码结果, 不可缓存的图片返回 None"""
+        with self._lock:
+            if (cached := self._images.get(path)) is not None:
+                self._images.move_to_end(path)
+                return cached[0]
+
+        image, size = self._load(path)
+        if size > self.cacheable_max_bytes:
+            image, size = None, 0
+
+        with self._lock:
+            if path not in self._images:
+                self._images[path] = (image, size)
+                self.current_bytes += size
+            while len(self._images) > self.maxsize or self.current_bytes > self.max_bytes:
+                _, (_, evicted_size) = self._images.popitem(last=False)
+                self.current_bytes -= evicted_size
+        return image
+
+    def clear(self) -> None:
+        with self._lock:
+            self._images.clear()
+            self.current_bytes = 0
+
+
+_static_image_cache = _StaticImageCache(
+    maxsize=image_utils_config.static_image_cache_size,
+    max_bytes=image_utils_config.static_image_cache_max_bytes,
+    cacheable_max_bytes=image_utils_config.static_image_cacheable_max_bytes,
+)
+
+
+def load_font(font_file: AssetPath, size: int, *, index: int = 0) -> ImageFont.FreeTypeFont:
+    """加载字体, 相同字体文件及字号的字体对象在同一线程内共享
+
+    注意: 返回的字体对象为共享实例, 不应调用 set_variation_by_name 等会修改字体状态的方法, 也不应传递给其他线程使用
+
+    :param font_file: 字体文件
+    :param size: 字号
+    :param index: 字体集合 (ttc) 中的字体序号
+    """
+    return _load_font(_resolve_asset_path(font_file), size, index)
+
+
+def load_static_image(image_file: AssetPath) -> Image.Image:
+    """加载静态图片素材, 解码结果在进程内缓存, 每次调用返回独立的副本, 调用方可任意修改
+
+    缓存按数量及解码后的总大小限制, 数量较多的大尺寸图片 (如卡面) 应直接使用 Image.open 加载
+
+    :param image_file: 图片文件, 应为内容不会变化的静态资源
+    """
+    path = _resolve_asset_path(image_file)
+    if (cached := _static_image_cache.get(path)) is None:
+        return Image.open(path)
+
+    image = cached.copy()
+    image.format = cached.format
+    return image
+
+
+__all__ = [
+    'load_font',
+    'load_static_image',
+]
@@ -24,6 +24,13 @@ class ImageUtilsConfig:
     default_preview_font: StaticResource = default_font_folder('SourceHanSerif-Regular.ttc')
     default_emoji_font: StaticResource = default_font_folder('AppleColorEmoji.ttf')
 
+    # 每个线程缓存的字体对象 (按字体文件及字号区分) 及进程内缓存的静态图片素材的数量上限
+    font_cache_size: int = 64
+    static_image_cache_size: int = 128
+    # 进程内缓存的静态图片素材解码后的总大小上限, 及单张可缓存图片解码后的大小上限, 单位字节
+    static_image_cache_max_bytes: int = 64 * 1024 * 1024
+    static_image_cacheable_max_bytes: int = 4 * 1024 * 1024
+
     # 默认的生成缓存文件路径
     tmp_folder: TemporaryResource = TemporaryResource('image_utils')
     tmp_download_folder: TemporaryResource = tmp_folder('download')
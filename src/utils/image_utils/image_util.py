@@ -18,6 +18,7 @@ from nonebot.utils import run_sync
 
 from src.resource import BaseResource, TemporaryResource
 from src.utils import OmegaRequests
+from .assets import load_font
 from .config import image_utils_config
 
 
@@ -98,7 +99,7 @@ class ImageUtils:
 
         # 处理文字层 主体部分
         font_size = image_width // 25
-        font = ImageFont.truetype(font_file.resolve_path, font_size)
+        font = load_font(font_file.resolve_path, font_size)
         # 按长度切分文本
         text = cls.split_multiline_text(text=text, width=int(image_width * 0.75), font=font)
         _, text_height = cls.get_text_size(text, font=font)
@@ -167,11 +168,11 @@ class ImageUtils:
         :param stroke_width: 文字描边, 像素
         """
         if font is None:
-            font = ImageFont.truetype(image_utils_config.default_font_file.resolve_path,
-                                      image_utils_config.default_font_size)
+            font = load_font(image_utils_config.default_font_file.resolve_path,
+                             image_utils_config.default_font_size)
         elif isinstance(font, str):
-            font = ImageFont.truetype(image_utils_config.default_font_folder(font).resolve_path,
-                                      image_utils_config.default_font_size)
+            font = load_font(image_utils_config.default_font_folder(font).resolve_path,
+                             image_utils_config.default_font_size)
 
         spl_num = 0
         spl_list = []
@@ -264,7 +265,7 @@ class ImageUtils:
         edge_w = width // 32 if width // 32 <= 10 else 10
         edge_h = height // 32 if height // 32 <= 10 else 10
 
-        font = ImageFont.truetype(image_utils_config.default_font_file.resolve_path, width // 32)
+        font = load_font(image_utils_config.default_font_file.resolve_path, width // 32)
         text_kwargs = {
             'text': text,
             'font': font,
@@ -0,0 +1,196 @@
+"""
+@Author         : Ailitonia
+@Date           : 2025/1/18 16:40
+@FileName       : kv_store
+@Project        : nonebot2_miya
+@Description    : 基于 SQLite 的单文件键值存储
+@GitHub         : https://github.com/Ailitonia
+@Software       : PyCharm
+"""
+
+import os
+import sqlite3
+import threading
+import time
+import zlib
+from collections.abc import Iterable, Mapping, Sequence
+
+from nonebot.utils import run_sync
+
+type KVPath = str | os.PathLike[str]
+
+
+class SQLiteKVStore:
+    """基于 SQLite (WAL 模式) 的单文件键值存储
+
+    - 全部数据保存在一个数据库文件中, 按主键索引读取, 适合替代大量小文件形式的缓存
+    - 值为 bytes, 超过 compress_threshold 的值使用 zlib 压缩存储
+    - 记录写入时间, 读取时可按有效期 (ttl) 忽略过期条目, 由调用方重新获取后覆盖写入
+    - 数据库操作在线程池中执行, 同一实例的操作共享一个连接并串行执行
+    """
+
+    # SQLite 单条语句的参数数量上限较低 (旧版本为 999), 批量读取时分批查询
+    _batch_size: int = 500
+
+    def __init__(
+            self,
+            path: KVPath,
+            *,
+            compress_threshold: int | None = 1024,
+            compress_level: int = 6,
+            ttl: float | None = None,
+    ) -> None:
+        """
+        :param path: 数据库文件路径
+        :param compress_threshold: 值超过该字节数时压缩存储, 为 None 时不压缩
+        :param compress_level: zlib 压缩等级
+        :param ttl: 默认有效期 (秒), 为 None 时永不过期
+        """
+        self._path = os.fspath(path)
+        self._compress_threshold = compress_threshold
+        self._compress_level = compress_level
+        self._ttl = ttl
+
+        self._conn: sqlite3.Connection | None = None
+        self._lock = threading.Lock()
+
+    def __repr__(self) -> str:
+        return f'{self.__class__.__name__}(path={self._path!r})'
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._conn is None:
+            os.makedirs(os.path.dirname(self._path) or '.', exist_ok=True)
+            conn = sqlite3.connect(self._path, check_same_thread=False, isolation_level=None)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            conn.execute(
+                'CREATE TABLE IF NOT EXISTS kv ('
+                'key TEXT PRIMARY KEY NOT NULL, '
+                'value BLOB NOT NULL, '
+                'compressed INTEGER NOT NULL, '
+                'updated_at REAL NOT NULL'
+                ') WITHOUT ROWID'
+            )
+            self._conn = conn
+        return self._conn
+
+    def _encode(self, value: bytes) -> tuple[bytes, int]:
+        if self._compress_threshold is not None and len(value) > self._compress_threshold:
+            return zlib.compress(value, self._compress_level), 1
+        return value, 0
+
+    @staticmethod
+    def _decode(value: bytes, compressed: int) -> bytes:
+        return zlib.decompress(value) if compressed else value
+
+    def _get_expired_before(self, ttl: float | None) -> float:
+        ttl = self._ttl if ttl is None else ttl
+        return float('-inf') if ttl is None else time.time() - ttl
+
+    def get_sync(self, key: str, *, ttl: float | None = None) -> bytes | None:
+        """读取值, 不存在或已过期返回 None
+
+        :param key: 键
+        :param ttl: 有效期 (秒), 为 None 时使用默认有效期
+        """
+        with self._lock:
+            row = self._connect().execute(
+                'SELECT value, compressed, updated_at FROM kv WHERE key = ?', (key,)
+            ).fetchone()
+
+        if row is None or row[2] < self._get_expired_before(ttl):
+            return None
+        return self._decode(row[0], row[1])
+
+    def get_many_sync(self, keys: Sequence[str], *, ttl: float | None = None) -> dict[str, bytes]:
+        """批量读取值, 返回结果中不包含不存在或已过期的键"""
+        expired_before = self._get_expired_before(ttl)
+        rows: list[tuple[str, bytes, int, float]] = []
+        with self._lock:
+            conn = self._connect()
+            for index in range(0, len(keys), self._batch_size):
+                batch = keys[index:index + self._batch_size]
+                rows.extend(conn.execute(
+                    f'SELECT key, value, compressed, updated_at FROM kv WHERE key IN ({",".join("?" * len(batch))})',
+                    batch,
+                ).fetchall())
+
+        return {
+            key: self._decode(value, compressed)
+            for key, value, compressed, updated_at in rows
+            if updated_at >= expired_before
+        }
+
+    def put_sync(self, key: str, value: bytes, *, replace: bool = True) -> None:
+        """写入值
+
+        :param key: 键
+        :param value: 值
+        :param replace: 键已存在时是否覆盖
+        """
+        self.put_many_sync({key: value}, replace=replace)
+
+    def put_many_sync(self, items: Mapping[str, bytes] | Iterable[tuple[str, bytes]], *, replace: bool = True) -> None:
+        """在同一事务中批量写入值
+
+        :param items: 键值对
+        :param replace: 键已存在时是否覆盖
+        """
+        updated_at = time.time()
+        rows = [
+            (key, *self._encode(value), updated_at)
+            for key, value in (items.items() if isinstance(items, Mapping) else items)
+        ]
+        if not rows:
+            return
+
+        conflict = 'REPLACE' if replace else 'IGNORE'
+        with self._lock:
+            conn = self._connect()
+            with conn:
+                conn.execute('BEGIN')
+                conn.executemany(
+                    f'INSERT OR {conflict} INTO kv (key, value, compressed, updated_at) VALUES (?, ?, ?, ?)', rows
+                )
+
+    def delete_sync(self, key: str) -> None:
+        with self._lock:
+            self._connect().execute('DELETE FROM kv WHERE key = ?', (key,))
+
+    def count_sync(self) -> int:
+        with self._lock:
+            return self._connect().execute('SELECT COUNT(*) FROM kv').fetchone()[0]
+
+    def close(self) -> None:
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+    async def get(self, key: str, *, ttl: float | None = None) -> bytes | None:
+        return await run_sync(self.get_sync)(key, ttl=ttl)
+
+    async def get_many(self, keys: Sequence[str], *, ttl: float | None = None) -> dict[str, bytes]:
+        return await run_sync(self.get_many_sync)(keys, ttl=ttl)
+
+    async def put(self, key: str, value: bytes, *, replace: bool = True) -> None:
+        await run_sync(self.put_sync)(key, value, replace=replace)
+
+    async def put_many(
+            self,
+            items: Mapping[str, bytes] | Iterable[tuple[str, bytes]],
+            *,
+            replace: bool = True,
+    ) -> None:
+        await run_sync(self.put_many_sync)(items, replace=replace)
+
+    async def delete(self, key: str) -> None:
+        await run_sync(self.delete_sync)(key)
+
+    async def count(self) -> int:
+        return await run_sync(self.count_sync)()
+
+
+__all__ = [
+    'SQLiteKVStore',
+]
@@ -262,6 +262,27 @@ class BaseCommonAPI(abc.ABC):
         else:
             file = save_folder(subdir, file_name)
 
+        return await cls._download_file(
+            url=url, file=file, params=params,
+            headers=headers, cookies=cookies, timeout=timeout,
+            ignore_exist_file=ignore_exist_file, no_headers=no_headers, no_cookies=no_cookies,
+        )
+
+    @classmethod
+    async def _download_file(
+            cls,
+            url: str,
+            file: 'TemporaryResource',
+            params: 'QueryTypes' = None,
+            *,
+            headers: 'HeaderTypes' = None,
+            cookies: 'CookieTypes' = None,
+            timeout: int = 60,
+            ignore_exist_file: bool = False,
+            no_headers: bool = False,
+            no_cookies: bool = False,
+    ) -> 'TemporaryResource':
+        """内部方法, 流式下载资源到指定文件, 默认直接覆盖已存在文件"""
         requests = cls._init_omega_requests(
             headers=headers, cookies=cookies, timeout=timeout, no_headers=no_headers, no_cookies=no_cookies
         )
@@ -0,0 +1,139 @@
+"""
+@Author         : Ailitonia
+@Date           : 2025/1/7 20:48
+@FileName       : cache
+@Project        : nonebot2_miya
+@Description    : 基于 ETag/Last-Modified 条件请求的 HTTP 响应磁盘缓存
+@GitHub         : https://github.com/Ailitonia
+@Software       : PyCharm
+"""
+
+import hashlib
+from typing import TYPE_CHECKING
+
+import ujson
+from nonebot import logger
+from nonebot.drivers import Response
+
+from src.resource import TemporaryResource
+
+if TYPE_CHECKING:
+    from nonebot.drivers import Request
+
+LOG_PREFIX: str = '<lc>Omega Requests</lc> | '
+
+
+class HttpResponseCache:
+    """GET 响应的磁盘缓存
+
+    仅缓存带有 ETag 或 Last-Modified 的 200 响应, 再次请求时附加 If-None-Match/If-Modified-Since 请求头,
+    上游返回 304 时使用缓存内容构造响应. 缓存文件首行为 json 格式的响应头, 其后为响应内容.
+    """
+
+    # 304 响应中需要更新到缓存响应的响应头
+    _refreshed_headers: tuple[str, ...] = ('cache-control', 'date', 'etag', 'expires', 'last-modified')
+
+    def __init__(self, folder: TemporaryResource, max_entry_size: int) -> None:
+        """
+        :param folder: 缓存文件目录
+        :param max_entry_size: 可缓存的单个响应大小上限, 单位字节
+        """
+        self._folder = folder
+        self._max_entry_size = max_entry_size
+
+    @staticmethod
+    def is_cacheable_request(setup: 'Request') -> bool:
+        if setup.method.upper() != 'GET':
+            return False
+        if setup.content or setup.data or setup.json is not None or setup.files:
+            return False
+        if 'range' in setup.headers or 'if-none-match' in setup.headers or 'if-modified-since' in setup.headers:
+            return False
+        return True
+
+    def _get_cache_file(self, setup: 'Request') -> TemporaryResource:
+        # 不同身份请求同一 url 时得到的内容可能不同, 缓存键中需要包含 Cookies 及 Authorization
+        cookies = ';'.join(sorted(f'{x.name}={x.value}' for x in setup.cookies if x.value is not None))
+        key_source = '\n'.join((
+            str(setup.url),
+            cookies,
+            setup.headers.get('cookie', ''),
+            setup.headers.get('authorization', ''),
+        ))
+        return self._folder(f'{hashlib.sha256(key_source.encode('utf-8')).hexdigest()}.cache')
+
+    async def _load(self, file: TemporaryResource) -> tuple[dict[str, str], bytes] | None:
+        if not file.is_file:
+            return None
+
+        try:
+            async with file.async_open('rb') as af:
+                raw = await af.read()
+            meta, content = raw.split(b'\n', 1)
+            return ujson.loads(meta), content
+        except Exception as e:
+            logger.opt(colors=True).debug(f'{LOG_PREFIX}Loading http cache {file} failed, {e!r}')
+            return None
+
+    async def prepare(self, setup: 'Request') -> tuple[dict[str, str], bytes] | None:
+        """读取缓存并为请求附加条件请求头, 返回缓存的响应头及内容"""
+        cached = await self._load(self._get_cache_file(setup=setup))
+        if cached is None:
+            return None
+
+        headers, _ = cached
+        if etag := headers.get('etag'):
+            setup.headers['If-None-Match'] = etag
+        if last_modified := headers.get('last-modified'):
+            setup.headers['If-Modified-Since'] = last_modified
+        return cached
+
+    async def resolve(
+            self,
+            setup: 'Request',
+            response: Response,
+            cached: tuple[dict[str, str], bytes] | None,
+    ) -> Response:
+        """处理响应, 304 时返回由缓存构造的响应, 可缓存的 200 响应写入缓存"""
+        if response.status_code == 304 and cached is not None:
+            headers, content = cached
+            headers.update(
+                (k.lower(), v) for k, v in response.headers.items() if k.lower() in self._refreshed_headers
+            )
+            return Response(200, headers=headers, content=content, request=setup)
+
+        if response.status_code != 200:
+            return response
+
+        headers = {k.lower(): v for k, v in response.headers.items()}
+        if 'etag' not in headers and 'last-modified' not in headers:
+            return response
+        if 'no-store' in headers.get('cache-control', '').lower():
+            return response
+        if 'set-cookie' in headers:
+            return response
+
+        if isinstance(response.content, str):
+            content = response.content.encode('utf-8')
+        elif isinstance(response.content, bytes):
+            content = response.content
+        else:
+            return response
+        if len(content) > self._max_entry_size:
+            return response
+
+        # 内容已解码, 不能保留压缩及分块相关的响应头
+        for name in ('content-encoding', 'content-length', 'transfer-encoding'):
+            headers.pop(name, None)
+
+        try:
+            cache_file = self._get_cache_file(setup=setup)
+            await cache_file.async_write_atomic(ujson.dumps(headers).encode('utf-8') + b'\n' + content)
+        except Exception as e:
+            logger.opt(colors=True).debug(f'{LOG_PREFIX}Saving http cache for {setup.url} failed, {e!r}')
+        return response
+
+
+__all__ = [
+    'HttpResponseCache',
+]
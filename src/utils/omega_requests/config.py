@@ -32,6 +32,32 @@ class HttpProxyConfig(BaseModel):
         return proxy
 
 
+class OmegaRequestsConfig(BaseModel):
+    """OmegaRequests 连接池及请求控制配置"""
+    # 复用按 (host, proxy) 区分的持久会话, 关闭时每个请求都新建会话
+    omega_requests_pooled_session: bool = True
+    # 持久会话空闲该时间 (秒) 后关闭
+    omega_requests_session_idle_timeout: int = 300
+    # 单个 host 同时进行的请求数量
+    omega_requests_host_concurrency: int = 8
+    # 单个 host 每分钟请求数量上限, 为 0 时不限制
+    omega_requests_host_rate_per_minute: float = 180
+    # 单个 host 允许连续发出的请求数量
+    omega_requests_host_burst: int = 30
+    # 覆盖指定 host 的每分钟请求数量上限, 如 {"api.bilibili.com": 60}, 与内置的图片 CDN 不限速配置合并
+    omega_requests_host_rate_limits: dict[str, float] = {}
+    # 对 GET 请求启用基于 ETag/Last-Modified 的条件请求缓存
+    omega_requests_http_cache: bool = True
+    # 可缓存的单个响应大小上限, 单位 KB
+    omega_requests_http_cache_max_entry_size: int = 2048
+    # 首次重试前的等待时间, 之后每次重试翻倍并附加随机抖动, 单位秒
+    omega_requests_backoff_base: float = 0.5
+    # 重试等待时间上限, Retry-After 超过该值时不再重试, 单位秒
+    omega_requests_backoff_max: float = 30
+
+    model_config = ConfigDict(extra='ignore')
+
+
 try:
     http_proxy_config = get_plugin_config(HttpProxyConfig)  # 导入并验证代理配置
 except ValidationError as e:
@@ -39,7 +65,15 @@ except ValidationError as e:
     logger.opt(colors=True).critical(f'<r>Http 代理配置格式验证失败</r>, 错误信息:\n{e}')
     sys.exit(f'Http 代理配置格式验证失败, {e}')
 
+try:
+    omega_requests_config = get_plugin_config(OmegaRequestsConfig)
+except ValidationError as e:
+    import sys
+    logger.opt(colors=True).critical(f'<r>OmegaRequests 配置格式验证失败</r>, 错误信息:\n{e}')
+    sys.exit(f'OmegaRequests 配置格式验证失败, {e}')
+
 
 __all__ = [
-    'http_proxy_config'
+    'http_proxy_config',
+    'omega_requests_config',
 ]
@@ -0,0 +1,261 @@
+"""
+@Author         : Ailitonia
+@Date           : 2025/1/7 20:16
+@FileName       : pool
+@Project        : nonebot2_miya
+@Description    : 按 (host, proxy) 复用的持久会话池及按 host 的并发/速率限制
+@GitHub         : https://github.com/Ailitonia
+@Software       : PyCharm
+"""
+
+import asyncio
+import time
+from collections.abc import AsyncGenerator
+from contextlib import asynccontextmanager
+from functools import cache
+from typing import TYPE_CHECKING
+
+from nonebot import logger
+
+if TYPE_CHECKING:
+    from nonebot.drivers import HTTPClientMixin, Request
+    from nonebot.internal.driver import HTTPClientSession, Response
+
+type SessionKey = tuple[str, str, int | None, str | None]
+
+LOG_PREFIX: str = '<lc>Omega Requests</lc> | '
+
+
+DEFAULT_HOST_RATE_LIMITS: dict[str, float] = {
+    'i.pximg.net': 0,
+    'cdn.donmai.us': 0,
+    'files.yande.re': 0,
+}
+"""内置的按 host 每分钟请求数量上限, 图片 CDN 在下载多页作品时会短时间内发出大量请求, 默认不限制速率 (仍受并发数限制)"""
+
+
+@cache
+def _get_cookieless_session_class() -> type['HTTPClientSession'] | None:
+    """持久会话不能保存响应设置的 Cookies, 否则会泄漏给共用会话的其他请求
+
+    目前仅支持 aiohttp 驱动, 创建会话时使用 DummyCookieJar, 不支持时返回 None
+    """
+    try:
+        from aiohttp import ClientSession, DummyCookieJar
+        from nonebot.drivers.aiohttp import Session
+    except ImportError:
+        return None
+
+    class _CookielessSession(Session):
+        """不保存响应 Cookies 的 aiohttp 会话"""
+
+        async def setup(self) -> None:
+            if self._client is not None:
+                raise RuntimeError('Session has already been initialized')
+            self._client = ClientSession(
+                cookies=self._cookies,
+                headers=self._headers,
+                version=self._version,
+                timeout=self._timeout,
+                trust_env=True,
+                cookie_jar=DummyCookieJar(),
+            )
+            await self._client.__aenter__()
+
+    return _CookielessSession
+
+
+def _create_cookieless_session(driver: 'HTTPClientMixin', proxy: str | None) -> 'HTTPClientSession | None':
+    """创建不保存响应 Cookies 的会话, 当前驱动不支持时返回 None"""
+    try:
+        from nonebot.drivers.aiohttp import Mixin
+    except ImportError:
+        return None
+
+    if not isinstance(driver, Mixin) or (session_class := _get_cookieless_session_class()) is None:
+        return None
+    return session_class(proxy=proxy)
+
+
+class _HostLimiter:
+    """单个 host 的并发数及令牌桶速率限制"""
+
+    __slots__ = ('rate_per_minute', 'capacity', 'tokens', 'updated_at', '_semaphore', '_lock')
+
+    def __init__(self, concurrency: int, rate_per_minute: float, capacity: int) -> None:
+        self.rate_per_minute = rate_per_minute
+        self.capacity = capacity
+        self.tokens: float = capacity
+        self.updated_at: float = time.monotonic()
+        self._semaphore = asyncio.Semaphore(max(1, concurrency))
+        self._lock = asyncio.Lock()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate_per_minute / 60)
+        self.updated_at = now
+
+    async def _wait_token(self) -> None:
+        if self.rate_per_minute <= 0:
+            return
+
+        async with self._lock:
+            self._refill()
+            if self.tokens < 1:
+                await asyncio.sleep((1 - self.tokens) * 60 / self.rate_per_minute)
+                self._refill()
+            self.tokens -= 1
+
+    @asynccontextmanager
+    async def acquire(self) -> AsyncGenerator[None, None]:
+        async with self._semaphore:
+            await self._wait_token()
+            yield
+
+
+class _PooledSession:
+    """持久会话及其使用状态"""
+
+    __slots__ = ('session', 'in_flight', 'last_used')
+
+    def __init__(self, session: 'HTTPClientSession') -> None:
+        self.session = session
+        self.in_flight: int = 0
+        self.last_used: float = time.monotonic()
+
+
+class HostSessionPool:
+    """按 (scheme, host, port, proxy) 复用的持久会话池
+
+    - 同一 host 的请求复用同一个会话的连接, 避免重复的 TCP/TLS 握手
+    - 每个 host 的请求受并发数及速率限制, 避免突发请求触发上游站点封禁, 图片 CDN 默认不限制速率
+    - 空闲超时的会话在下次取用会话时关闭
+    """
+
+    def __init__(
+            self,
+            *,
+            idle_timeout: float = 300,
+            host_concurrency: int = 8,
+            host_rate_per_minute: float = 180,
+            host_burst: int = 30,
+            host_rate_limits: dict[str, float] | None = None,
+    ) -> None:
+        self._idle_timeout = idle_timeout
+        self._host_concurrency = host_concurrency
+        self._host_rate_per_minute = host_rate_per_minute
+        self._host_burst = max(1, host_burst)
+        self._host_rate_limits = {**DEFAULT_HOST_RATE_LIMITS, **(host_rate_limits or {})}
+
+        self._sessions: dict[SessionKey, _PooledSession] = {}
+        self._limiters: dict[str, _HostLimiter] = {}
+        self._lock = asyncio.Lock()
+        self._unsupported: bool = False
+
+    def __repr__(self) -> str:
+        return f'{self.__class__.__name__}(sessions={len(self._sessions)}, hosts={len(self._limiters)})'
+
+    @property
+    def supported(self) -> bool:
+        return not self._unsupported
+
+    def _get_limiter(self, host: str) -> _HostLimiter:
+        if (limiter := self._limiters.get(host)) is None:
+            limiter = _HostLimiter(
+                concurrency=self._host_concurrency,
+                rate_per_minute=self._host_rate_limits.get(host, self._host_rate_per_minute),
+                capacity=self._host_burst,
+            )
+            self._limiters[host] = limiter
+        return limiter
+
+    async def _close_idle_sessions(self) -> None:
+        now = time.monotonic()
+        idle_keys = [
+            key for key, pooled in self._sessions.items()
+            if pooled.in_flight == 0 and now - pooled.last_used > self._idle_timeout
+        ]
+        for key in idle_keys:
+            pooled = self._sessions.pop(key)
+            try:
+                await pooled.session.close()
+            except Exception as e:
+                logger.opt(colors=True).debug(f'{LOG_PREFIX}Closing idle session {key} failed, {e!r}')
+
+    async def _get_session(self, driver: 'HTTPClientMixin', key: SessionKey) -> _PooledSession | None:
+        async with self._lock:
+            await self._close_idle_sessions()
+
+            if (pooled := self._sessions.get(key)) is not None:
+                return pooled
+            if self._unsupported:
+                return None
+
+            if (session := _create_cookieless_session(driver=driver, proxy=key[3])) is None:
+                self._unsupported = True
+                logger.opt(colors=True).warning(
+                    f'{LOG_PREFIX}Current driver does not support pooled session, fallback to per-request session'
+                )
+                return None
+
+            await session.setup()
+            pooled = _PooledSession(session=session)
+            self._sessions[key] = pooled
+            return pooled
+
+    @asynccontextmanager
+    async def limit(self, setup: 'Request') -> AsyncGenerator[None, None]:
+        """按请求的 host 限制并发数及速率"""
+        async with self._get_limiter(host=setup.url.host or '').acquire():
+            yield
+
+    async def request(self, driver: 'HTTPClientMixin', setup: 'Request') -> 'Response':
+        """使用持久会话发送请求, 驱动不支持持久会话时每个请求新建会话"""
+        key: SessionKey = (setup.url.scheme, setup.url.host or '', setup.url.port, setup.proxy)
+        if (pooled := await self._get_session(driver=driver, key=key)) is None:
+            return await driver.request(setup=setup)
+
+        pooled.in_flight += 1
+        try:
+            return await pooled.session.request(setup=setup)
+        finally:
+            pooled.in_flight -= 1
+            pooled.last_used = time.monotonic()
+
+    async def stream_request(
+            self,
+            driver: 'HTTPClientMixin',
+            setup: 'Request',
+            *,
+            chunk_size: int = 1024,
+    ) -> AsyncGenerator['Response', None]:
+        """使用持久会话发送流式请求, 驱动不支持持久会话时每个请求新建会话"""
+        key: SessionKey = (setup.url.scheme, setup.url.host or '', setup.url.port, setup.proxy)
+        if (pooled := await self._get_session(driver=driver, key=key)) is None:
+            async for response in driver.stream_request(setup=setup, chunk_size=chunk_size):
+                yield response
+            return
+
+        pooled.in_flight += 1
+        try:
+            async for response in pooled.session.stream_request(setup=setup, chunk_size=chunk_size):
+                yield response
+        finally:
+            pooled.in_flight -= 1
+            pooled.last_used = time.monotonic()
+
+    async def close(self) -> None:
+        """关闭全部持久会话"""
+        async with self._lock:
+            sessions, self._sessions = self._sessions, {}
+            for pooled in sessions.values():
+                try:
+                    await pooled.session.close()
+                except Exception as e:
+                    logger.opt(colors=True).debug(f'{LOG_PREFIX}Closing session failed, {e!r}')
+
+
+__all__ = [
+    'DEFAULT_HOST_RATE_LIMITS',
+    'HostSessionPool',
+]
@@ -8,15 +8,21 @@
 @Software       : PyCharm 
 """
 
+import asyncio
 import hashlib
 import pathlib
+import random
 from asyncio.exceptions import TimeoutError as AsyncTimeoutError
 from collections.abc import AsyncGenerator
 from contextlib import asynccontextmanager
 from copy import deepcopy
+from datetime import UTC, datetime
+from email.utils import parsedate_to_datetime
 from typing import TYPE_CHECKING, Any, Optional
 from urllib.parse import unquote, urlparse
 
+import aiofiles
+import aiofiles.os
 import ujson
 from nonebot import get_driver, logger
 from nonebot.drivers import (
@@ -25,9 +31,13 @@ from nonebot.drivers import (
     Request,
     WebSocketClientMixin,
 )
+from nonebot.utils import run_sync
 
 from src.exception import WebSourceException
-from .config import http_proxy_config
+from src.resource import TemporaryResource
+from .cache import HttpResponseCache
+from .config import http_proxy_config, omega_requests_config
+from .pool import HostSessionPool
 from .utils import cloudflare_clearance_config
 
 if TYPE_CHECKING:
@@ -46,6 +56,28 @@ if TYPE_CHECKING:
     from src.resource import BaseResource
 
 
+_host_session_pool = HostSessionPool(
+    idle_timeout=omega_requests_config.omega_requests_session_idle_timeout,
+    host_concurrency=omega_requests_config.omega_requests_host_concurrency,
+    host_rate_per_minute=omega_requests_config.omega_requests_host_rate_per_minute,
+    host_burst=omega_requests_config.omega_requests_host_burst,
+    host_rate_limits=omega_requests_config.omega_requests_host_rate_limits,
+)
+"""全局持久会话池, 所有 OmegaRequests 实例共用"""
+
+_http_response_cache = HttpResponseCache(
+    folder=TemporaryResource('omega_requests', 'http_cache'),
+    max_entry_size=omega_requests_config.omega_requests_http_cache_max_entry_size * 1024,
+)
+"""全局条件请求响应缓存"""
+
+
+@get_driver().on_shutdown
+async def _close_host_session_pool() -> None:
+    await _host_session_pool.close()
+    logger.opt(colors=True).debug('<lc>Omega Requests</lc> | Pooled sessions closed')
+
+
 class OmegaRequests:
     """对 ForwardDriver 二次封装实现的 HttpClient"""
 
@@ -149,28 +181,87 @@ class OmegaRequests:
             proxy=http_proxy_config.proxy_url if use_proxy else None
         )
 
+    @staticmethod
+    def _parse_retry_after(response: 'Response') -> float | None:
+        """解析 Retry-After 响应头, 支持秒数及 HTTP-date 两种格式"""
+        if not (retry_after := response.headers.get('retry-after')):
+            return None
+
+        if retry_after.isdigit():
+            return float(retry_after)
+        try:
+            return max(0.0, (parsedate_to_datetime(retry_after) - datetime.now(UTC)).total_seconds())
+        except (TypeError, ValueError):
+            return None
+
+    @staticmethod
+    def _get_backoff_delay(attempts_num: int, retry_after: float | None = None) -> float:
+        """指数退避等待时间, 附加随机抖动避免多个请求同时重试"""
+        delay = min(
+            omega_requests_config.omega_requests_backoff_max,
+            omega_requests_config.omega_requests_backoff_base * 2 ** attempts_num
+        )
+        delay = random.uniform(delay / 2, delay)
+        return delay if retry_after is None else max(retry_after, delay)
+
+    def _load_cloudflare_clearance(self, setup: Request) -> None:
+        """处理加载 Cloudflare Clearance Cookies"""
+        if self.load_cloudflare_clearance:
+            domain_cloudflare_clearance = cloudflare_clearance_config.get_url_config(url=str(setup.url))
+            if domain_cloudflare_clearance is not None:
+                setup.headers.update(domain_cloudflare_clearance.get_headers())
+                setup.cookies.update(domain_cloudflare_clearance.get_cookies())
+
+    async def _stream(self, setup: Request, chunk_size: int) -> AsyncGenerator['Response', None]:
+        if omega_requests_config.omega_requests_pooled_session:
+            stream = _host_session_pool.stream_request(driver=self.driver, setup=setup, chunk_size=chunk_size)  # type: ignore
+        else:
+            stream = self.driver.stream_request(setup=setup, chunk_size=chunk_size)  # type: ignore
+        async for response in stream:
+            yield response
+
+    async def _send(self, setup: Request) -> 'Response':
+        if omega_requests_config.omega_requests_pooled_session:
+            return await _host_session_pool.request(driver=self.driver, setup=setup)  # type: ignore
+        return await self.driver.request(setup=setup)  # type: ignore
+
     async def request(self, setup: Request) -> 'Response':
-        """装饰原 request 方法, 自动重试"""
+        """装饰原 request 方法, 按 host 限制并发及速率, 处理条件请求缓存, 失败时指数退避重试"""
         if not isinstance(self.driver, HTTPClientMixin):
             raise RuntimeError(
                 f"Current driver {self.driver.type} doesn't support forward http connections! "
                 "OmegaRequests need a HTTPClient Driver to work."
             )
 
-        # 处理加载 Cloudflare Clearance Cookies
-        if self.load_cloudflare_clearance:
-            domain_cloudflare_clearance = cloudflare_clearance_config.get_url_config(url=str(setup.url))
-            if domain_cloudflare_clearance is not None:
-                setup.headers.update(domain_cloudflare_clearance.get_headers())
-                setup.cookies.update(domain_cloudflare_clearance.get_cookies())
+        self._load_cloudflare_clearance(setup=setup)
+
+        # 处理条件请求缓存
+        use_cache = omega_requests_config.omega_requests_http_cache and _http_response_cache.is_cacheable_request(setup)
+        cached = await _http_response_cache.prepare(setup=setup) if use_cache else None
 
         # 处理自动重试
         attempts_num = 0
         final_exception = None
         while attempts_num < self.retry_limit:
+            retry_after = None
             try:
                 logger.opt(colors=True).trace(f'<lc>Omega Requests</lc> | Starting request <ly>{setup!r}</ly>')
-                return await self.driver.request(setup=setup)
+                async with _host_session_pool.limit(setup=setup):
+                    response = await self._send(setup=setup)
+
+                if response.status_code not in (429, 503) or attempts_num + 1 >= self.retry_limit:
+                    if use_cache:
+                        return await _http_response_cache.resolve(setup=setup, response=response, cached=cached)
+                    return response
+
+                retry_after = self._parse_retry_after(response=response)
+                if retry_after is not None and retry_after > omega_requests_config.omega_requests_backoff_max:
+                    return response
+                logger.opt(colors=True).debug(
+                    f'<lc>Omega Requests</lc> | <ly>{setup!r} failed on the {attempts_num + 1} attempt</ly> <c>></c> '
+                    f'<r>Status {response.status_code}</r>, retry after {retry_after}'
+                )
+                final_exception = WebSourceException(response.status_code, 'Server is busy or rate limited.')
             except AsyncTimeoutError as e:
                 logger.opt(colors=True).debug(
                     f'<lc>Omega Requests</lc> | <ly>{setup!r} failed on the {attempts_num + 1} attempt</ly> <c>></c> '
@@ -186,6 +277,9 @@ class OmegaRequests:
             finally:
                 attempts_num += 1
 
+            if attempts_num < self.retry_limit:
+                await asyncio.sleep(self._get_backoff_delay(attempts_num=attempts_num - 1, retry_after=retry_after))
+
         logger.opt(colors=True).error(
             f'<lc>Omega Requests</lc> | <ly>{setup!r} failed with {attempts_num} times attempts</ly> <c>></c> '
             f'<r>ExceededAttemptLimited</r>: The number of attempts exceeds limit with final exception: '
@@ -291,39 +385,236 @@ class OmegaRequests:
         )
         return await self.request(setup=setup)
 
+    @staticmethod
+    def _get_validator_file(part_file: pathlib.Path) -> pathlib.Path:
+        """临时文件对应的校验标识文件, 保存下载开始时响应的 ETag 或 Last-Modified, 续传时用于 If-Range"""
+        return part_file.with_name(f'{part_file.name}.validator')
+
+    @staticmethod
+    def _parse_range_validator(response: 'Response') -> str | None:
+        """解析可用于 If-Range 的校验标识, If-Range 不支持弱 ETag, 此时使用 Last-Modified"""
+        etag = response.headers.get('etag')
+        if etag and not etag.startswith('W/'):
+            return etag
+        return response.headers.get('last-modified') or None
+
+    async def _download_part(
+            self,
+            setup: Request,
+            part_file: pathlib.Path,
+            chunk_size: int,
+            resume: bool,
+    ) -> 'Response | None':
+        """下载内容并写入临时文件
+
+        临时文件已存在, 允许续传且保存有校验标识时, 使用 Range 及 If-Range 请求继续下载,
+        服务器文件已变化时服务器返回完整内容 (200), 此时从头重新写入临时文件
+
+        :return: 下载完成时返回 None, 服务器返回非预期状态时返回该响应
+        """
+        validator_file = self._get_validator_file(part_file=part_file)
+        validator = None
+        offset = 0
+        if resume and part_file.exists() and validator_file.exists():
+            validator = validator_file.read_text(encoding='utf-8').strip() or None
+            offset = part_file.stat().st_size if validator is not None else 0
+
+        if offset > 0 and validator is not None:
+            setup.headers['Range'] = f'bytes={offset}-'
+            setup.headers['If-Range'] = validator
+        else:
+            setup.headers.pop('Range', None)
+            setup.headers.pop('If-Range', None)
+
+        status_code: int | None = None
+        expected_size: int | None = None
+        af = None
+        try:
+            async with _host_session_pool.limit(setup=setup):
+                async for response in self._stream(setup=setup, chunk_size=chunk_size):
+                    if af is None:
+                        status_code = response.status_code
+                        if status_code == 206 and offset > 0:
+                            expected_size = self._parse_content_range_total(response=response)
+                            af = await aiofiles.open(part_file, mode='ab')
+                        elif status_code == 200:
+                            offset = 0
+                            if response.headers.get('content-encoding', 'identity').lower() != 'identity':
+                                # 服务器忽略 Accept-Encoding: identity 时响应内容已被自动解压,
+                                # Content-Length 与写入的大小不一致, 且临时文件无法按原始字节续传
+                                validator_file.unlink(missing_ok=True)
+                            else:
+                                content_length = response.headers.get('content-length')
+                                expected_size = (
+                                    int(content_length) if content_length and content_length.isdigit() else None
+                                )
+                                if (new_validator := self._parse_range_validator(response=response)) is not None:
+                                    validator_file.write_text(new_validator, encoding='utf-8')
+                                else:
+                                    validator_file.unlink(missing_ok=True)
+                            af = await aiofiles.open(part_file, mode='wb')
+                        else:
+                            return response
+                    await af.write(self.parse_content_as_bytes(response=response))
+        finally:
+            if af is not None:
+                await af.close()
+
+        if status_code is None:
+            # 响应内容为空时流式请求不会返回响应, 重新请求获取状态码
+            response = await self._send(setup=setup)
+            if response.status_code == 200 and not response.content:
+                part_file.write_bytes(b'')
+                return None
+            return response
+
+        received_size = part_file.stat().st_size
+        if expected_size is not None and received_size != expected_size:
+            raise WebSourceException(
+                500, f'Incomplete download, received {received_size} of {expected_size} bytes'
+            )
+        return None
+
+    @staticmethod
+    def _parse_content_range_total(response: 'Response') -> int | None:
+        """解析 Content-Range 响应头中的完整文件大小"""
+        content_range = response.headers.get('content-range', '')
+        total = content_range.rsplit('/', 1)[-1].strip()
+        return int(total) if total.isdigit() else None
+
+    @staticmethod
+    def _verify_checksum(file: pathlib.Path, checksum: str, algorithm: str, chunk_size: int) -> bool:
+        """分块计算文件哈希并与 checksum 比较"""
+        file_hash = hashlib.new(algorithm)
+        with file.open('rb') as f:
+            while chunk := f.read(chunk_size):
+                file_hash.update(chunk)
+        return file_hash.hexdigest().lower() == checksum.lower()
+
     async def download[T: 'BaseResource'](
             self,
             url: str,
             file: T,
             *,
             params: 'QueryTypes' = None,
+            headers: 'HeaderTypes' = None,
+            cookies: 'CookieTypes' = None,
+            timeout: float | None = None,
+            use_proxy: bool = True,
             ignore_exist_file: bool = False,
-            **kwargs
+            checksum: str | None = None,
+            checksum_algorithm: str = 'sha256',
+            resume: bool = True,
+            chunk_size: int = 64 * 1024,
     ) -> T:
         """下载文件
 
+        以流式请求分块写入同目录下的临时文件, 校验完整后原子替换目标文件, 内存占用不超过 chunk_size.
+        下载中断时保留临时文件, 重试及下次下载时使用 Range 请求续传, 并通过 If-Range 确保服务器文件未发生变化.
+
         :param url: 链接
         :param file: 下载目标路径
         :param params: 请求参数
+        :param headers: 请求头
+        :param cookies: Cookies
+        :param timeout: 超时时间
+        :param use_proxy: 是否使用代理
         :param ignore_exist_file: 忽略已存在文件
+        :param checksum: 文件哈希值, 提供时下载完成后校验文件内容
+        :param checksum_algorithm: 文件哈希算法
+        :param resume: 是否续传已存在的临时文件
+        :param chunk_size: 分块大小
         :return: 下载目标路径
         """
         if ignore_exist_file and file.is_file:
             return file
 
-        response = await self.get(url=url, params=params, **kwargs)
-
-        if response.status_code != 200:
-            logger.opt(colors=True).error(f'<lc>Omega Requests</lc> | Download <ly>{url!r}</ly> '
-                                          f'to {file!r} failed with code <lr>{response.status_code!r}</lr>')
-            raise WebSourceException(
-                response.status_code, f'Download {url!r} to {file!r} failed with code {response.status_code!r}'
+        if not isinstance(self.driver, HTTPClientMixin):
+            raise RuntimeError(
+                f"Current driver {self.driver.type} doesn't support forward http connections! "
+                "OmegaRequests need a HTTPClient Driver to work."
             )
 
-        async with file.async_open(mode='wb') as af:
-            await af.write(self.parse_content_as_bytes(response=response))
+        file.path.parent.mkdir(parents=True, exist_ok=True)
+        part_file = file.path.with_name(f'.{file.path.name}.part')
+        validator_file = self._get_validator_file(part_file=part_file)
+
+        setup = Request(
+            method='GET',
+            url=url,
+            params=params,
+            headers=self.headers if headers is None else headers,
+            cookies=self.cookies if cookies is None else cookies,
+            timeout=self.timeout if timeout is None else timeout,
+            proxy=http_proxy_config.proxy_url if use_proxy else None
+        )
+        # 按原始字节下载, 使 Content-Length 及 Range 偏移量与写入临时文件的内容一致
+        setup.headers['Accept-Encoding'] = 'identity'
+        self._load_cloudflare_clearance(setup=setup)
+
+        attempts_num = 0
+        final_exception = None
+        while attempts_num < self.retry_limit:
+            retry_after = None
+            try:
+                response = await self._download_part(
+                    setup=setup, part_file=part_file, chunk_size=chunk_size, resume=resume
+                )
+
+                if response is None:
+                    if checksum is not None and not await run_sync(self._verify_checksum)(
+                            file=part_file, checksum=checksum, algorithm=checksum_algorithm, chunk_size=chunk_size
+                    ):
+                        part_file.unlink(missing_ok=True)
+                        validator_file.unlink(missing_ok=True)
+                        raise WebSourceException(500, f'Checksum of {url!r} mismatched')
+                    await aiofiles.os.replace(part_file, file.path)
+                    validator_file.unlink(missing_ok=True)
+                    return file
+
+                if response.status_code == 416:
+                    # 临时文件已损坏或服务器文件已变化, 丢弃后重新下载
+                    part_file.unlink(missing_ok=True)
+                    validator_file.unlink(missing_ok=True)
+                    final_exception = WebSourceException(416, 'Range not satisfiable.')
+                elif response.status_code in (429, 503) and attempts_num + 1 < self.retry_limit:
+                    retry_after = self._parse_retry_after(response=response)
+                    final_exception = WebSourceException(response.status_code, 'Server is busy or rate limited.')
+                    if retry_after is not None and retry_after > omega_requests_config.omega_requests_backoff_max:
+                        break
+                else:
+                    logger.opt(colors=True).error(f'<lc>Omega Requests</lc> | Download <ly>{url!r}</ly> '
+                                                  f'to {file!r} failed with code <lr>{response.status_code!r}</lr>')
+                    raise WebSourceException(
+                        response.status_code,
+                        f'Download {url!r} to {file!r} failed with code {response.status_code!r}'
+                    )
+            except WebSourceException as e:
+                if e.status_code not in (416, 429, 500, 503):
+                    raise
+                logger.opt(colors=True).debug(
+                    f'<lc>Omega Requests</lc> | Download <ly>{url!r}</ly> failed on the {attempts_num + 1} attempt, '
+                    f'{e!r}'
+                )
+                final_exception = e
+            except Exception as e:
+                logger.opt(colors=True).warning(
+                    f'<lc>Omega Requests</lc> | Download <ly>{url!r}</ly> failed on the {attempts_num + 1} attempt '
+                    f'<c>></c> <r>Exception {e.__class__.__name__}</r>: {e}'
+                )
+                final_exception = e
+            finally:
+                attempts_num += 1
+
+            if attempts_num < self.retry_limit:
+                await asyncio.sleep(self._get_backoff_delay(attempts_num=attempts_num - 1, retry_after=retry_after))
 
-        return file
+        logger.opt(colors=True).error(
+            f'<lc>Omega Requests</lc> | Download <ly>{url!r}</ly> to {file!r} '
+            f'failed with {attempts_num} times attempts <c>></c> '
+            f'<r>{final_exception.__class__.__name__}</r>: {final_exception}'
+        )
+        raise WebSourceException(500, f'Download {url!r} to {file!r} failed, the number of attempts exceeds limit.')
 
 
 __all__ = [
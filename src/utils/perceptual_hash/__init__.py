@@ -0,0 +1,31 @@
+"""
+@Author         : Ailitonia
+@Date           : 2025/1/8 19:18
+@FileName       : perceptual_hash
+@Project        : nonebot2_miya
+@Description    : 图片感知哈希计算及汉明距离近邻检索工具
+@GitHub         : https://github.com/Ailitonia
+@Software       : PyCharm
+"""
+
+from .hashing import (
+    HASH_BITS,
+    HashMethod,
+    hamming_distance,
+    hamming_distances,
+    hash_image,
+    hash_image_bytes,
+    hash_images,
+)
+from .index import MultiIndexHashing
+
+__all__ = [
+    'HASH_BITS',
+    'HashMethod',
+    'MultiIndexHashing',
+    'hamming_distance',
+    'hamming_distances',
+    'hash_image',
+    'hash_image_bytes',
+    'hash_images',
+]
@@ -0,0 +1,116 @@
+"""
+@Author         : Ailitonia
+@Date           : 2025/1/8 19:20
+@FileName       : hashing
+@Project        : nonebot2_miya
+@Description    : 图片感知哈希 (dHash/pHash) 计算, 支持批量向量化计算
+@GitHub         : https://github.com/Ailitonia
+@Software       : PyCharm
+"""
+
+from collections.abc import Sequence
+from functools import cache
+from io import BytesIO
+from typing import Literal
+
+import numpy as np
+from PIL import Image
+
+type HashMethod = Literal['dhash', 'phash']
+
+HASH_BITS: int = 64
+"""哈希位数, 固定为 64 位以便存储为 BigInteger"""
+
+_HASH_SIZE: int = 8
+_PHASH_HIGHFREQ_FACTOR: int = 4
+
+
+def _to_grayscale_array(image: Image.Image, size: tuple[int, int]) -> np.ndarray:
+    """转换为指定尺寸 (宽, 高) 的灰度数组"""
+    if image.mode in ('RGBA', 'LA', 'PA') or (image.mode == 'P' and 'transparency' in image.info):
+        # 透明背景按白色处理, 避免不同软件导出的透明像素颜色不同导致哈希不同
+        background = Image.new('RGBA', image.size, (255, 255, 255, 255))
+        image = Image.alpha_composite(background, image.convert('RGBA'))
+    return np.asarray(image.convert('L').resize(size, Image.Resampling.LANCZOS), dtype=np.float32)
+
+
+def _pack_bits(bits: np.ndarray) -> np.ndarray:
+    """将 (N, 64) 的布尔数组按行打包为 uint64 数组, 高位在前"""
+    packed = np.packbits(bits.reshape(bits.shape[0], HASH_BITS), axis=1)
+    return packed.view('>u8').reshape(-1).astype(np.uint64)
+
+
+@cache
+def _dct_matrix(size: int) -> np.ndarray:
+    """DCT-II 变换矩阵"""
+    k = np.arange(size, dtype=np.float32).reshape(-1, 1)
+    n = np.arange(size, dtype=np.float32).reshape(1, -1)
+    matrix = np.cos(np.pi * (2 * n + 1) * k / (2 * size)) * np.sqrt(2 / size)
+    matrix[0] /= np.sqrt(2)
+    return matrix.astype(np.float32)
+
+
+def dhash_arrays(arrays: np.ndarray) -> np.ndarray:
+    """对 (N, 8, 9) 的灰度数组批量计算 dHash, 比较每行相邻像素的亮度变化"""
+    return _pack_bits(arrays[:, :, 1:] > arrays[:, :, :-1])
+
+
+def phash_arrays(arrays: np.ndarray) -> np.ndarray:
+    """对 (N, 32, 32) 的灰度数组批量计算 pHash, 比较二维 DCT 低频分量与其中位数"""
+    size = arrays.shape[-1]
+    dct = _dct_matrix(size)
+    low_freq = (dct @ arrays @ dct.T)[:, :_HASH_SIZE, :_HASH_SIZE].reshape(arrays.shape[0], -1)
+    return _pack_bits(low_freq > np.median(low_freq, axis=1, keepdims=True))
+
+
+def hash_images(images: Sequence[Image.Image], method: HashMethod = 'dhash') -> np.ndarray:
+    """批量计算图片感知哈希, 缩放及灰度化逐张进行, 哈希计算在整个批次上向量化进行
+
+    :return: uint64 数组
+    """
+    if not images:
+        return np.empty(0, dtype=np.uint64)
+
+    match method:
+        case 'phash':
+            side = _HASH_SIZE * _PHASH_HIGHFREQ_FACTOR
+            arrays = np.stack([_to_grayscale_array(image, (side, side)) for image in images])
+            return phash_arrays(arrays)
+        case 'dhash' | _:
+            arrays = np.stack([_to_grayscale_array(image, (_HASH_SIZE + 1, _HASH_SIZE)) for image in images])
+            return dhash_arrays(arrays)
+
+
+def hash_image(image: Image.Image, method: HashMethod = 'dhash') -> int:
+    """计算单张图片的感知哈希"""
+    return int(hash_images([image], method=method)[0])
+
+
+def hash_image_bytes(content: bytes, method: HashMethod = 'dhash') -> int:
+    """计算图片文件内容的感知哈希, 动图使用第一帧"""
+    with Image.open(BytesIO(content)) as image:
+        image.seek(0)
+        return hash_image(image, method=method)
+
+
+def hamming_distance(a: int, b: int) -> int:
+    """两个哈希值的汉明距离"""
+    return (a ^ b).bit_count()
+
+
+def hamming_distances(hashes: np.ndarray, target: int) -> np.ndarray:
+    """一组 uint64 哈希值与目标哈希值的汉明距离"""
+    return np.bitwise_count(hashes ^ np.uint64(target))
+
+
+__all__ = [
+    'HASH_BITS',
+    'HashMethod',
+    'dhash_arrays',
+    'hamming_distance',
+    'hamming_distances',
+    'hash_image',
+    'hash_image_bytes',
+    'hash_images',
+    'phash_arrays',
+]
@@ -0,0 +1,152 @@
+"""
+@Author         : Ailitonia
+@Date           : 2025/1/8 19:52
+@FileName       : index
+@Project        : nonebot2_miya
+@Description    : 基于多索引哈希 (Multi-Index Hashing) 的汉明距离近邻检索
+@GitHub         : https://github.com/Ailitonia
+@Software       : PyCharm
+"""
+
+from collections.abc import Hashable, Iterable, Iterator
+from functools import cache
+from itertools import combinations
+
+import numpy as np
+
+from .hashing import HASH_BITS, hamming_distances
+
+
+@cache
+def _flip_masks(bits: int, radius: int) -> tuple[int, ...]:
+    """长度为 bits 的值在汉明距离 radius 以内的全部翻转掩码"""
+    return tuple(
+        sum(1 << i for i in positions)
+        for r in range(radius + 1)
+        for positions in combinations(range(bits), r)
+    )
+
+
+class MultiIndexHashing[K: Hashable]:
+    """64 位哈希值的汉明距离近邻检索
+
+    将哈希值等分为 chunks 段, 每段建立一张精确匹配的桶表.
+    由鸽巢原理, 与查询值汉明距离不超过 d 的哈希值至少有一段与查询值对应段的距离不超过 d // chunks,
+    因此只需在每张桶表中枚举该半径内的值得到候选, 再计算完整距离过滤.
+    查询半径过大导致枚举数量超过全表扫描时, 改为使用 numpy 向量化全表扫描.
+    """
+
+    # 桶表探测单次开销与全表扫描单个元素开销之比的估计值
+    _scan_cost_ratio: int = 500
+
+    def __init__(self, chunks: int = 4) -> None:
+        if chunks <= 0 or HASH_BITS % chunks != 0:
+            raise ValueError(f'chunks must be a positive divisor of {HASH_BITS}')
+
+        self._chunks = chunks
+        self._chunk_bits = HASH_BITS // chunks
+        self._chunk_mask = (1 << self._chunk_bits) - 1
+        self._tables: list[dict[int, set[K]]] = [{} for _ in range(chunks)]
+        self._hashes: dict[K, int] = {}
+
+        # 全表扫描使用的数组, 在索引变化后首次全表扫描时重建
+        self._array_keys: list[K] = []
+        self._array: np.ndarray = np.empty(0, dtype=np.uint64)
+        self._array_outdated: bool = False
+
+    def __repr__(self) -> str:
+        return f'{self.__class__.__name__}(chunks={self._chunks}, size={len(self._hashes)})'
+
+    def __len__(self) -> int:
+        return len(self._hashes)
+
+    def __contains__(self, key: K) -> bool:
+        return key in self._hashes
+
+    def __iter__(self) -> Iterator[tuple[K, int]]:
+        return iter(self._hashes.items())
+
+    def _split(self, value: int) -> Iterator[tuple[int, int]]:
+        for index in range(self._chunks):
+            yield index, (value >> (index * self._chunk_bits)) & self._chunk_mask
+
+    def get(self, key: K) -> int | None:
+        return self._hashes.get(key)
+
+    def add(self, key: K, value: int) -> None:
+        """添加或更新哈希值"""
+        if key in self._hashes:
+            self.remove(key)
+
+        self._hashes[key] = value
+        for index, chunk in self._split(value):
+            self._tables[index].setdefault(chunk, set()).add(key)
+        self._array_outdated = True
+
+    def update(self, items: Iterable[tuple[K, int]]) -> None:
+        for key, value in items:
+            self.add(key, value)
+
+    def remove(self, key: K) -> None:
+        if (value := self._hashes.pop(key, None)) is None:
+            return
+
+        for index, chunk in self._split(value):
+            bucket = self._tables[index].get(chunk)
+            if bucket is not None:
+                bucket.discard(key)
+                if not bucket:
+                    del self._tables[index][chunk]
+        self._array_outdated = True
+
+    def clear(self) -> None:
+        self._tables = [{} for _ in range(self._chunks)]
+        self._hashes.clear()
+        self._array_outdated = True
+
+    def _scan(self, value: int, max_distance: int) -> list[tuple[K, int]]:
+        if self._array_outdated:
+            self._array_keys = list(self._hashes.keys())
+            self._array = np.fromiter(self._hashes.values(), dtype=np.uint64, count=len(self._hashes))
+            self._array_outdated = False
+
+        distances = hamming_distances(self._array, value)
+        matched = np.flatnonzero(distances <= max_distance)
+        return [(self._array_keys[i], int(distances[i])) for i in matched]
+
+    def _probe(self, value: int, max_distance: int) -> list[tuple[K, int]]:
+        masks = _flip_masks(self._chunk_bits, max_distance // self._chunks)
+        candidates: set[K] = set()
+        for index, chunk in self._split(value):
+            table = self._tables[index]
+            for mask in masks:
+                if (bucket := table.get(chunk ^ mask)) is not None:
+                    candidates.update(bucket)
+
+        result = []
+        for key in candidates:
+            distance = (self._hashes[key] ^ value).bit_count()
+            if distance <= max_distance:
+                result.append((key, distance))
+        return result
+
+    def query(self, value: int, max_distance: int) -> list[tuple[K, int]]:
+        """查询与 value 汉明距离不超过 max_distance 的全部哈希值
+
+        :return: (key, distance) 列表, 按距离升序排列
+        """
+        if not self._hashes:
+            return []
+
+        probe_count = len(_flip_masks(self._chunk_bits, max_distance // self._chunks)) * self._chunks
+        expected_candidates = probe_count * len(self._hashes) / (1 << self._chunk_bits)
+        if (probe_count + expected_candidates) * self._scan_cost_ratio > len(self._hashes):
+            result = self._scan(value=value, max_distance=max_distance)
+        else:
+            result = self._probe(value=value, max_distance=max_distance)
+        return sorted(result, key=lambda x: x[1])
+
+
+__all__ = [
+    'MultiIndexHashing',
+]
@@ -16,6 +16,8 @@ from .config import pixiv_config
 if TYPE_CHECKING:
     from nonebot.internal.driver import CookieTypes, HeaderTypes, QueryTypes
 
+    from src.resource import TemporaryResource
+
 
 class BasePixivAPI(BaseCommonAPI):
     """Pixiv API 基类"""
@@ -52,6 +54,18 @@ class BasePixivAPI(BaseCommonAPI):
         """请求原始资源内容"""
         return await cls._get_resource_as_text(url, params, timeout=timeout)
 
+    @classmethod
+    async def download_file(
+            cls,
+            url: str,
+            file: 'TemporaryResource',
+            *,
+            params: 'QueryTypes' = None,
+            timeout: int = 60,
+    ) -> 'TemporaryResource':
+        """流式下载原始资源到指定文件"""
+        return await cls._download_file(url, file, params, timeout=timeout)
+
 
 __all__ = [
     'BasePixivAPI'
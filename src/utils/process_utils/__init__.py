@@ -12,7 +12,7 @@ import asyncio
 import inspect
 import random
 from asyncio import Future
-from collections.abc import Awaitable, Callable, Coroutine, Sequence
+from collections.abc import Awaitable, Callable, Coroutine, Hashable, Sequence
 from functools import wraps
 from typing import Any, Literal, overload
 
@@ -171,7 +171,54 @@ async def semaphore_gather[T](
     return result
 
 
+class SingleFlight[K: Hashable, T]:
+    """按 key 合并并发执行的异步任务
+
+    - 同一 key 的任务执行期间, 其余调用方不再重复执行, 而是等待同一个任务的结果 (包括异常)
+    - 任务在独立的 asyncio.Task 中运行, 单个调用方被取消不会影响正在等待同一结果的其他调用方
+    - 任务完成后即移除, 之后的调用会重新执行
+    """
+
+    __slots__ = ('name', '_tasks')
+
+    def __init__(self, name: str) -> None:
+        self.name = name
+        self._tasks: dict[K, asyncio.Task[T]] = {}
+
+    def __repr__(self) -> str:
+        return f'{self.__class__.__name__}(name={self.name!r}, in_flight={len(self._tasks)})'
+
+    def __len__(self) -> int:
+        return len(self._tasks)
+
+    def __contains__(self, key: K) -> bool:
+        return key in self._tasks
+
+    def _discard(self, key: K, task: asyncio.Task[T]) -> None:
+        if self._tasks.get(key) is task:
+            del self._tasks[key]
+        # 调用方均已取消时任务异常无人获取, 在此标记为已获取避免事件循环报告未处理异常
+        if not task.cancelled():
+            task.exception()
+
+    async def do(self, key: K, func: Callable[[], Coroutine[Any, Any, T]]) -> T:
+        """执行 key 对应的任务, 若已有相同 key 的任务正在执行则等待其结果
+
+        :param key: 任务标识
+        :param func: 创建任务协程的无参函数, 仅在没有相同 key 的任务正在执行时调用
+        """
+        task = self._tasks.get(key)
+        if task is None:
+            task = asyncio.create_task(func())
+            self._tasks[key] = task
+            task.add_done_callback(lambda t: self._discard(key, t))
+        else:
+            logger.opt(colors=True).trace(f'<lc>SingleFlight</lc> | {self.name}({key!r}) joined in-flight task')
+        return await asyncio.shield(task)
+
+
 __all__ = [
+    'SingleFlight',
     'run_async_delay',
     'run_async_with_time_limited',
     'semaphore_gather',
@@ -0,0 +1,45 @@
+"""
+@Author         : Ailitonia
+@Date           : 2025/1/14 20:00
+@FileName       : render_executor
+@Project        : nonebot2_miya
+@Description    : CPU 密集型图片处理任务执行器
+@GitHub         : https://github.com/Ailitonia
+@Software       : PyCharm
+"""
+
+from nonebot import get_driver
+
+from .config import render_executor_config
+from .executor import RenderExecutor, RenderJob
+
+render_executor = RenderExecutor(
+    backend=render_executor_config.omega_render_executor_backend,
+    max_workers=render_executor_config.omega_render_executor_max_workers,
+    start_method=render_executor_config.omega_render_executor_start_method,
+    job_limits=render_executor_config.omega_render_executor_job_limits,
+    job_timeouts=render_executor_config.omega_render_executor_job_timeouts,
+    default_timeout=render_executor_config.omega_render_executor_timeout,
+)
+"""全局图片渲染执行器"""
+
+render_job = render_executor.render_job
+"""装饰器: 将同步的图片处理函数包装为在全局渲染执行器中运行的异步函数"""
+
+
+@get_driver().on_startup
+async def _warm_up_render_executor() -> None:
+    render_executor.warm_up()
+
+
+@get_driver().on_shutdown
+async def _shutdown_render_executor() -> None:
+    render_executor.shutdown()
+
+
+__all__ = [
+    'RenderExecutor',
+    'RenderJob',
+    'render_executor',
+    'render_job',
+]
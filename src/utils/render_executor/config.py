@@ -0,0 +1,48 @@
+"""
+@Author         : Ailitonia
+@Date           : 2025/1/14 20:05
+@FileName       : config
+@Project        : nonebot2_miya
+@Description    : Render executor config
+@GitHub         : https://github.com/Ailitonia
+@Software       : PyCharm
+"""
+
+import os
+from typing import Literal
+
+from nonebot import get_plugin_config, logger
+from pydantic import BaseModel, ConfigDict, ValidationError
+
+
+class RenderExecutorConfig(BaseModel):
+    """图片渲染执行器配置"""
+    # 渲染任务执行后端, process 为进程池, thread 为事件循环默认线程池
+    omega_render_executor_backend: Literal['process', 'thread'] = 'process'
+    # 进程池工作进程数量
+    omega_render_executor_max_workers: int = min(4, os.cpu_count() or 1)
+    # 进程启动方式, 工作进程由 src.render_worker 初始化 NoneBot 后按需导入任务函数所在模块;
+    # spawn/forkserver 方式下子进程会以 __mp_main__ 重新导入启动入口文件, 其中的初始化代码需置于 __main__ 判断内;
+    # fork 方式会复制运行中的事件循环及各线程持有的锁, 可能导致工作进程死锁, 不建议使用
+    omega_render_executor_start_method: Literal['fork', 'forkserver', 'spawn'] = 'spawn'
+    # 各类任务的并发数量限制, 未配置的任务类型使用工作进程数量
+    omega_render_executor_job_limits: dict[str, int] = {'wordcloud': 2}
+    # 任务的默认超时时间 (秒)
+    omega_render_executor_timeout: float = 60
+    # 各类任务的超时时间 (秒)
+    omega_render_executor_job_timeouts: dict[str, float] = {}
+
+    model_config = ConfigDict(extra='ignore')
+
+
+try:
+    render_executor_config = get_plugin_config(RenderExecutorConfig)
+except ValidationError as e:
+    import sys
+    logger.opt(colors=True).critical(f'<r>Render Executor 配置格式验证失败</r>, 错误信息:\n{e}')
+    sys.exit(f'Render Executor 配置格式验证失败, {e}')
+
+
+__all__ = [
+    'render_executor_config',
+]
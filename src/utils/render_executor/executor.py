@@ -0,0 +1,235 @@
+"""
+@Author         : Ailitonia
+@Date           : 2025/1/14 20:20
+@FileName       : executor
+@Project        : nonebot2_miya
+@Description    : 基于进程池的图片渲染执行器
+@GitHub         : https://github.com/Ailitonia
+@Software       : PyCharm
+"""
+
+import asyncio
+import importlib
+import multiprocessing
+import os
+import pickle
+from collections.abc import Callable, Coroutine
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from dataclasses import dataclass
+from functools import wraps
+from typing import Any, Literal
+
+from nonebot.log import logger
+from nonebot.utils import run_sync
+
+from src.render_worker import execute_render_job, initialize_worker
+
+LOG_PREFIX: str = '<lc>Render Executor</lc> | '
+
+
+def _unwrap_render_func(func: Callable[..., Any]) -> Callable[..., Any]:
+    """获取被 render_job 装饰器包装的原始同步函数"""
+    return getattr(func, '__render_func__', func)
+
+
+@dataclass(frozen=True)
+class RenderJob:
+    """可序列化的渲染任务描述, 任务函数以所在模块及限定名引用, 在工作进程中重新解析"""
+    job_type: str
+    module: str
+    qualname: str
+    args: tuple[Any, ...]
+    kwargs: dict[str, Any]
+
+    @classmethod
+    def from_func(
+            cls,
+            job_type: str,
+            func: Callable[..., Any],
+            args: tuple[Any, ...],
+            kwargs: dict[str, Any],
+    ) -> 'RenderJob':
+        func = _unwrap_render_func(func)
+        if '<locals>' in func.__qualname__ or '<lambda>' in func.__qualname__:
+            raise ValueError(f'{func.__qualname__} is not a module-level function')
+        return cls(job_type=job_type, module=func.__module__, qualname=func.__qualname__, args=args, kwargs=kwargs)
+
+    def resolve(self) -> Callable[..., Any]:
+        obj: Any = importlib.import_module(self.module)
+        for attr in self.qualname.split('.'):
+            obj = getattr(obj, attr)
+        return _unwrap_render_func(obj)
+
+
+class RenderExecutor:
+    """图片渲染执行器
+
+    CPU 密集的图片处理在事件循环的默认线程池中运行时, 大部分时间持有 GIL, 会拖慢整个事件循环.
+    渲染执行器将任务序列化为 RenderJob 后交由进程池执行, 并按任务类型限制并发及超时.
+    任务函数需为模块级函数 (或类的静态方法), 参数及返回值需可被 pickle 序列化 (如 bytes, 文件资源, PIL Image 等),
+    无法序列化的任务, 或进程池不可用时, 回退至线程池执行.
+    工作进程默认以 spawn 方式启动, 由 src.render_worker 完成初始化, 避免在已运行事件循环及多个线程的主进程中 fork.
+    """
+
+    def __init__(
+            self,
+            *,
+            backend: Literal['process', 'thread'] = 'process',
+            max_workers: int = 4,
+            start_method: Literal['fork', 'forkserver', 'spawn'] = 'spawn',
+            job_limits: dict[str, int] | None = None,
+            job_timeouts: dict[str, float] | None = None,
+            default_timeout: float = 60,
+    ) -> None:
+        self._backend = backend
+        self._max_workers = max_workers
+        self._start_method = start_method
+        self._job_limits = job_limits or {}
+        self._job_timeouts = job_timeouts or {}
+        self._default_timeout = default_timeout
+
+        self._pool: ProcessPoolExecutor | None = None
+        self._semaphores: dict[str, asyncio.Semaphore] = {}
+
+    def __repr__(self) -> str:
+        return f'{self.__class__.__name__}(backend={self._backend!r}, max_workers={self._max_workers})'
+
+    def _get_pool(self) -> ProcessPoolExecutor | None:
+        if self._backend != 'process':
+            return None
+
+        if self._pool is None:
+            try:
+                self._pool = ProcessPoolExecutor(
+                    max_workers=self._max_workers,
+                    mp_context=multiprocessing.get_context(self._start_method),
+                    initializer=initialize_worker,
+                )
+            except (ValueError, OSError, NotImplementedError) as e:
+                logger.opt(colors=True).warning(
+                    f'{LOG_PREFIX}<r>Process pool unavailable</r>, fallback to thread pool, {{!r}}', e
+                )
+                self._backend = 'thread'
+        return self._pool
+
+    def _reset_pool(self) -> None:
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+
+    def _recycle_pool(self, pool: ProcessPoolExecutor) -> None:
+        """终止进程池的全部工作进程, 下次执行任务时重建进程池
+
+        超时的任务无法被取消, 只能终止执行该任务的工作进程, 而 ProcessPoolExecutor 未提供终止单个工作进程的接口,
+        同一进程池中正在执行的其他任务将以 BrokenProcessPool 失败
+        """
+        if self._pool is pool:
+            self._pool = None
+
+        processes = list((getattr(pool, '_processes', None) or {}).values())
+        pool.shutdown(wait=False, cancel_futures=True)
+        for process in processes:
+            if process.is_alive():
+                process.terminate()
+
+    def _get_semaphore(self, job_type: str) -> asyncio.Semaphore:
+        if (semaphore := self._semaphores.get(job_type)) is None:
+            semaphore = asyncio.Semaphore(self._job_limits.get(job_type, self._max_workers))
+            self._semaphores[job_type] = semaphore
+        return semaphore
+
+    @staticmethod
+    def _dump_job(
+            job_type: str,
+            func: Callable[..., Any],
+            args: tuple[Any, ...],
+            kwargs: dict[str, Any],
+    ) -> bytes | None:
+        try:
+            return pickle.dumps(RenderJob.from_func(job_type, func, args, kwargs), protocol=pickle.HIGHEST_PROTOCOL)
+        except (pickle.PicklingError, AttributeError, TypeError, ValueError) as e:
+            # 异常信息中可能包含 "<locals>" 等与颜色标签冲突的内容, 作为参数传入避免被解析
+            logger.opt(colors=True).debug(
+                f'{LOG_PREFIX}{job_type!r} job is not picklable, run in thread pool, {{!r}}', e
+            )
+            return None
+
+    async def _dispatch[R](
+            self,
+            job_type: str,
+            func: Callable[..., R],
+            args: tuple[Any, ...],
+            kwargs: dict[str, Any],
+            timeout: float,
+    ) -> R:
+        pool = self._get_pool()
+        if pool is None or (payload := self._dump_job(job_type, func, args, kwargs)) is None:
+            async with asyncio.timeout(timeout):
+                return await run_sync(_unwrap_render_func(func))(*args, **kwargs)
+
+        try:
+            async with asyncio.timeout(timeout):
+                return await asyncio.get_running_loop().run_in_executor(pool, execute_render_job, payload)
+        except TimeoutError:
+            logger.opt(colors=True).error(
+                f'{LOG_PREFIX}<r>{job_type!r} job timed out</r> after {timeout}s, terminate process pool workers'
+            )
+            self._recycle_pool(pool)
+            raise
+        except BrokenProcessPool as e:
+            # 工作进程异常退出可能正是由该任务导致的, 不回退至线程池执行, 以免影响主进程
+            logger.opt(colors=True).error(f'{LOG_PREFIX}<r>Process pool broken</r> in {job_type!r} job, {{!r}}', e)
+            self._recycle_pool(pool)
+            raise
+
+    async def run[R](self, job_type: str, func: Callable[..., R], /, *args: Any, **kwargs: Any) -> R:
+        """执行渲染任务
+
+        注意: 进程池中的任务超时后会终止进程池的全部工作进程;
+        线程无法被终止, 回退至线程池执行的任务超时后仍会在线程中运行至结束
+
+        :param job_type: 任务类型, 用于区分并发限制及超时时间
+        :param func: 同步任务函数
+        :raise TimeoutError: 任务超时
+        :raise BrokenProcessPool: 执行任务的工作进程异常退出 (或因其他任务超时被终止), 进程池将在下次执行任务时重建
+        """
+        timeout = self._job_timeouts.get(job_type, self._default_timeout)
+        async with self._get_semaphore(job_type):
+            return await self._dispatch(job_type, func, args, kwargs, timeout)
+
+    def render_job[**P, R](
+            self,
+            job_type: str,
+    ) -> Callable[[Callable[P, R]], Callable[P, Coroutine[Any, Any, R]]]:
+        """装饰器: 将同步的图片处理函数包装为在渲染执行器中运行的异步函数
+
+        被装饰的函数需定义于模块顶层, 或为类的静态方法 (staticmethod 需置于本装饰器外层)
+        """
+
+        def decorator(func: Callable[P, R]) -> Callable[P, Coroutine[Any, Any, R]]:
+            @wraps(func)
+            async def _wrapper(*args: P.args, **kwargs: P.kwargs) -> R:
+                return await self.run(job_type, func, *args, **kwargs)
+
+            setattr(_wrapper, '__render_func__', func)
+            return _wrapper
+
+        return decorator
+
+    def warm_up(self) -> None:
+        """预先启动工作进程"""
+        if (pool := self._get_pool()) is not None:
+            # 非 fork 方式下进程池按需逐个启动工作进程
+            for _ in range(self._max_workers):
+                pool.submit(os.getpid)
+            logger.opt(colors=True).debug(f'{LOG_PREFIX}Process pool started with {self._max_workers} worker(s)')
+
+    def shutdown(self) -> None:
+        self._reset_pool()
+
+
+__all__ = [
+    'RenderExecutor',
+    'RenderJob',
+]
@@ -0,0 +1,110 @@
+"""
+@Author         : Ailitonia
+@Date           : 2025/1/16 21:10
+@FileName       : benchmark_artwork_sampling
+@Project        : nonebot2_miya
+@Description    : 图库随机抽样性能对比, ORDER BY random() 与 ArtworkCollectionDAL 随机抽样
+@GitHub         : https://github.com/Ailitonia
+@Software       : PyCharm
+"""
+
+import asyncio
+import random
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import nonebot
+from nonebot.log import logger
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+nonebot.init()
+
+from sqlalchemy import func, insert, select
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+
+from src.database.internal import artwork_collection
+from src.database.internal.artwork_collection import ArtworkCollectionDAL
+from src.database.schema import ArtworkCollectionOrm
+from src.database.schema_base import OmegaDeclarativeBase
+
+SIZES: tuple[int, ...] = (10_000, 50_000, 100_000, 400_000)
+"""测试数据量, 按顺序逐步扩充数据表"""
+
+REPEAT: int = 20
+"""每项测试的重复次数"""
+
+KEYWORD: str = 'rare'
+"""模糊搜索测试关键词, 约 1% 的作品标签包含该关键词"""
+
+
+async def fill(session_factory: async_sessionmaker[AsyncSession], start: int, end: int) -> None:
+    rows = [
+        {
+            'origin': 'pixiv', 'aid': str(i), 'title': f'title{i}', 'uid': str(i % 1000), 'uname': f'user{i % 1000}',
+            'classification': random.choice([1, 2, 3]), 'rating': random.choice([0, 0, 1, 2, 3]),
+            'width': random.randint(500, 2000), 'height': random.randint(500, 2000),
+            'tags': 'a,b,c,rare' if random.random() < 0.01 else 'a,b,c', 'source': '', 'cover_page': '',
+        }
+        for i in range(start, end)
+    ]
+    async with session_factory.begin() as session:
+        for index in range(0, len(rows), 5000):
+            await session.execute(insert(ArtworkCollectionOrm), rows[index:index + 5000])
+
+
+async def order_by_random(session: AsyncSession, keywords: list[str] | None) -> int:
+    conditions = ArtworkCollectionDAL._build_query_conditions(
+        'pixiv', keywords, classification_min=2, classification_max=3, rating_min=0, rating_max=0,
+        acc_mode=False, keyword_match='all', exclude_keywords=None, tag_prefix=False, ratio=None,
+    )
+    stmt = select(ArtworkCollectionOrm).where(*conditions).order_by(func.random()).limit(3)
+    return len((await session.execute(stmt)).scalars().all())
+
+
+async def dal_sample(session: AsyncSession, keywords: list[str] | None) -> int:
+    return len(await ArtworkCollectionDAL(session).query_by_condition('pixiv', keywords, 3))
+
+
+async def timeit(
+        session_factory: async_sessionmaker[AsyncSession],
+        func_,
+        keywords: list[str] | None,
+        repeat: int = REPEAT,
+) -> float:
+    start = time.perf_counter()
+    for _ in range(repeat):
+        async with session_factory() as session:
+            assert await func_(session, keywords) == 3
+    return (time.perf_counter() - start) / repeat * 1000
+
+
+async def main() -> None:
+    with tempfile.TemporaryDirectory() as temp_dir:
+        engine = create_async_engine(f'sqlite+aiosqlite:///{Path(temp_dir) / "benchmark.db"}')
+        session_factory = async_sessionmaker(engine, expire_on_commit=False)
+        async with engine.begin() as conn:
+            await conn.run_sync(OmegaDeclarativeBase.metadata.create_all)
+
+        logger.info(f'{"size":<8} {"query":<8} {"ORDER BY random()":>18} {"sampled(cold)":>14} {"sampled(warm)":>14}')
+        filled = 0
+        for size in SIZES:
+            await fill(session_factory, filled, size)
+            filled = size
+            for name, keywords in (('random', None), ('keyword', [KEYWORD])):
+                # 冷启动时需查询候选主键或主键锚点, 之后使用缓存
+                artwork_collection._SAMPLE_KEYS_CACHE.clear()
+                artwork_collection._OVERSIZED_SAMPLE_KEYS.clear()
+                artwork_collection._SAMPLE_ANCHORS_CACHE.clear()
+                artwork_collection._ORIGINS_CACHE.clear()
+                baseline = await timeit(session_factory, order_by_random, keywords)
+                cold = await timeit(session_factory, dal_sample, keywords, repeat=1)
+                warm = await timeit(session_factory, dal_sample, keywords)
+                logger.info(f'{size:<8} {name:<8} {baseline:>15.2f} ms {cold:>11.2f} ms {warm:>11.2f} ms')
+
+        await engine.dispose()
+
+
+if __name__ == '__main__':
+    asyncio.run(main())